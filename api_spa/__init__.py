@@ -153,6 +153,7 @@ from api_spa import school_year_closure as _spa_school_year_closure  # noqa: F40
 from api_spa import school_years as _spa_school_years  # noqa: F401, E402
 from api_spa import attendance as _spa_attendance  # noqa: F401, E402
 from api_spa import report_cards as _spa_report_cards  # noqa: F401, E402
+from api_spa import report_card_exports as _spa_report_card_exports  # noqa: F401, E402
 from api_spa import grade_standards as _spa_grade_standards  # noqa: F401, E402
 from api_spa import billing as _spa_billing  # noqa: F401, E402
 from api_spa import student_jobs as _spa_student_jobs  # noqa: F401, E402
@@ -179,3 +180,4 @@ from api_spa import academic_concerns as _spa_academic_concerns  # noqa: F401, E
 from api_spa import class_syllabus as _spa_class_syllabus  # noqa: F401, E402
 from api_spa import class_notes as _spa_class_notes  # noqa: F401, E402
 from api_spa import parent_dashboard as _spa_parent_dashboard  # noqa: F401, E402
+from api_spa import live_events as _spa_live_events  # noqa: F401, E402
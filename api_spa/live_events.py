@@ -0,0 +1,36 @@
+"""Server-Sent Events stream for the SPA (new messages, reactions, notification counts)."""
+
+from __future__ import annotations
+
+from flask import Response, current_app, jsonify, request
+from flask_login import current_user, login_required
+
+from services.live_events import live_events_enabled, open_stream
+
+from . import spa_api_blueprint
+
+
+@spa_api_blueprint.route("/events")
+@login_required
+def live_events_stream():
+    """``text/event-stream`` for the signed-in user; resumes after ``Last-Event-ID``."""
+    if not live_events_enabled():
+        return jsonify({"success": False, "message": "Live updates are turned off."}), 404
+
+    raw_last = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_event_id = int(raw_last) if raw_last else None
+    except (TypeError, ValueError):
+        last_event_id = None
+
+    body = open_stream(current_user.id, last_event_id, current_app._get_current_object())
+    if body is None:
+        response = jsonify({"success": False, "message": "Live updates are busy; retry shortly."})
+        response.status_code = 503
+        response.headers["Retry-After"] = "30"
+        return response
+
+    response = Response(body, mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
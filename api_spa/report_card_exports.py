@@ -0,0 +1,68 @@
+"""Bulk report card export API (whole grade / class list) for the React management SPA."""
+
+from __future__ import annotations
+
+import os
+
+from flask import jsonify, request, send_file
+from flask_login import current_user, login_required
+
+from decorators import permissions_required
+from extensions import db
+from models import ReportCardExportJob
+from services.report_card_export import (
+    create_report_card_export,
+    export_download_name,
+    export_job_payload,
+    schedule_report_card_export,
+)
+
+from . import spa_api_blueprint
+
+
+@spa_api_blueprint.route("/report-cards/exports", methods=["POST"])
+@login_required
+@permissions_required("report_cards:generate")
+def report_card_export_create():
+    body = request.get_json(silent=True) or {}
+    try:
+        grade_level = body.get("grade_level")
+        job = create_report_card_export(
+            school_year_id=int(body.get("school_year_id") or 0),
+            quarters=list(body.get("quarters") or []),
+            grade_level=int(grade_level) if grade_level not in (None, "") else None,
+            class_ids=[int(c) for c in (body.get("class_ids") or [])],
+            output_format=(body.get("output_format") or "zip").strip().lower(),
+            generate_missing=bool(body.get("generate_missing", False)),
+            created_by_user_id=current_user.id,
+        )
+    except (TypeError, ValueError) as exc:
+        db.session.rollback()
+        return jsonify({"success": False, "message": str(exc) or "Invalid export request."}), 400
+    schedule_report_card_export(job.id)
+    return jsonify({"success": True, "job": export_job_payload(job)}), 202
+
+
+@spa_api_blueprint.route("/report-cards/exports/<int:job_id>")
+@login_required
+@permissions_required("report_cards:generate")
+def report_card_export_status(job_id: int):
+    job = ReportCardExportJob.query.get_or_404(job_id)
+    return jsonify({"job": export_job_payload(job)})
+
+
+@spa_api_blueprint.route("/report-cards/exports/<int:job_id>/download")
+@login_required
+@permissions_required("report_cards:generate")
+def report_card_export_download(job_id: int):
+    job = ReportCardExportJob.query.get_or_404(job_id)
+    if job.status != "done" or not job.output_path or not os.path.isfile(job.output_path):
+        return jsonify({"error": "Export is not ready or has expired."}), 404
+    mimetype = "application/pdf" if job.output_format == "pdf" else "application/zip"
+    return send_file(
+        job.output_path,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=export_download_name(job),
+        max_age=0,
+    )
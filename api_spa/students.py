@@ -15,7 +15,10 @@ from . import spa_api_blueprint
 @login_required
 @permissions_required("students:view", "students:edit")
 def students_list():
-    payload = query_students_list(request.args)
+    try:
+        payload = query_students_list(request.args)
+    except ValueError as exc:
+        return jsonify({"success": False, "message": str(exc)}), 400
     return jsonify(
         {
             "items": payload["items"],
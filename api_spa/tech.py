@@ -11,6 +11,7 @@ from models import BugReport, db
 from tech_routes.spa_helpers import (
     build_activity_log_payload,
     build_audit_logs_payload,
+    build_background_jobs_payload,
     build_device_form_payload,
     build_devices_list_payload,
     build_error_reports_payload,
@@ -19,10 +20,12 @@ from tech_routes.spa_helpers import (
     build_tech_settings_payload,
     build_user_detail_payload,
     build_user_management_payload,
+    cancel_background_job,
     clear_app_cache,
     delete_device,
     impersonate_user_spa,
     reset_user_password_spa,
+    retry_background_job,
     run_database_backup,
     run_database_integrity,
     save_device,
@@ -147,10 +150,13 @@ def tech_spa_audit_logs():
             method=request.args.get("method", ""),
             status=request.args.get("status", ""),
             user_id=request.args.get("user_id", type=int),
+            role=request.args.get("role", ""),
+            endpoint=request.args.get("endpoint", ""),
             start=request.args.get("start", ""),
             end=request.args.get("end", ""),
             page=request.args.get("page", 1, type=int),
             per_page=request.args.get("per_page", 50, type=int),
+            archive_month=request.args.get("archive_month", ""),
         )
     )
 
@@ -168,6 +174,39 @@ def tech_spa_error_reports():
     )
 
 
+@spa_api_blueprint.route("/tech/background-jobs")
+@login_required
+@tech_required
+def tech_spa_background_jobs():
+    return jsonify(
+        build_background_jobs_payload(
+            state=request.args.get("state", ""),
+            job_type=request.args.get("job_type", ""),
+            limit=request.args.get("limit", 100, type=int),
+        )
+    )
+
+
+@spa_api_blueprint.route("/tech/background-jobs/<int:job_id>/retry", methods=["POST"])
+@login_required
+@tech_required
+def tech_spa_background_job_retry(job_id: int):
+    payload, error, status = retry_background_job(job_id)
+    if error:
+        return jsonify({"error": error}), status
+    return jsonify(payload)
+
+
+@spa_api_blueprint.route("/tech/background-jobs/<int:job_id>/cancel", methods=["POST"])
+@login_required
+@tech_required
+def tech_spa_background_job_cancel(job_id: int):
+    payload, error, status = cancel_background_job(job_id)
+    if error:
+        return jsonify({"error": error}), status
+    return jsonify(payload)
+
+
 @spa_api_blueprint.route("/tech/system")
 @login_required
 @tech_required
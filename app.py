@@ -168,6 +168,30 @@ def create_app(config_class=None):
     csrf.init_app(app)
     mail.init_app(app)
 
+    # Attendance analytics rollups follow every ORM write to Attendance.
+    from services.attendance_rollups import register_attendance_rollup_hooks
+    register_attendance_rollup_hooks()
+    from services.attendance_streaks import register_absence_streak_hooks
+    register_absence_streak_hooks()
+    # Management home counters follow Grade / Attendance / Enrollment writes.
+    from services.dashboard_counters import register_dashboard_counter_hooks
+    register_dashboard_counter_hooks()
+    # Students list header counts are cached per roster version (Student / User writes).
+    from services.student_list_stats import register_student_list_hooks
+    register_student_list_hooks()
+    # Student search documents (and the SQLite FTS table) follow Student writes.
+    from services.student_search import register_student_search_hooks
+    register_student_search_hooks()
+    # Unread badges (notifications, DMs, channel cursors) follow Message / Notification writes.
+    from services.unread_counters import register_unread_counter_hooks
+    register_unread_counter_hooks()
+    # SSE push: Message / reaction / Notification / Announcement writes fill the live_event outbox.
+    from services.live_events import register_live_event_hooks
+    register_live_event_hooks()
+    # Communications search: SQLite FTS5 rows follow Message / Announcement text writes.
+    from services.communication_search import register_communication_search_hooks
+    register_communication_search_hooks()
+
     # gzip compression for HTML/CSS/JS/JSON. Big templates (e.g. the grading page,
     # dashboards) shrink ~5-10x over the wire and noticeably cut perceived load time.
     try:
@@ -418,6 +442,7 @@ def create_app(config_class=None):
             ('is_repeating', 'BOOLEAN NOT NULL DEFAULT false', 'INTEGER NOT NULL DEFAULT 0'),
             ('year_end_intent', 'VARCHAR(20)', 'TEXT'),
             ('departure_status', 'VARCHAR(20)', 'TEXT'),
+            ('search_document', 'TEXT', 'TEXT'),
         ]
         try:
             with db.engine.connect() as conn:
@@ -535,6 +560,132 @@ def create_app(config_class=None):
         except Exception as e:
             print(f"Note: class primary_teacher_name column check failed (may already exist): {e}")
 
+        # Google Classroom roster fingerprint (skip unchanged classes on re-provision)
+        try:
+            with db.engine.connect() as conn:
+                dialect = db.engine.dialect.name
+                _roster_cols = [
+                    ('google_roster_fingerprint', 'VARCHAR(64)', 'VARCHAR(64)'),
+                    ('google_roster_synced_at', 'DATETIME', 'TIMESTAMP'),
+                ]
+                if dialect == 'sqlite':
+                    r = conn.execute(text("PRAGMA table_info(class)"))
+                    columns = [row[1] for row in r]
+                    for col_name, sqlite_type, _pg_type in _roster_cols:
+                        if col_name not in columns:
+                            conn.execute(text(f"ALTER TABLE class ADD COLUMN {col_name} {sqlite_type}"))
+                            conn.commit()
+                            print(f"Added class.{col_name} column.")
+                elif dialect == 'postgresql':
+                    for col_name, _sqlite_type, pg_type in _roster_cols:
+                        r = conn.execute(text(
+                            "SELECT 1 FROM information_schema.columns "
+                            "WHERE table_name = 'class' AND column_name = :col"
+                        ), {"col": col_name})
+                        if r.fetchone() is None:
+                            conn.execute(text(f'ALTER TABLE "class" ADD COLUMN {col_name} {pg_type}'))
+                            conn.commit()
+                            print(f"Added class.{col_name} column.")
+        except Exception as e:
+            print(f"Note: class roster fingerprint column check failed (may already exist): {e}")
+
+        # Channel read cursor for unread counters; existing members start caught up.
+        try:
+            with db.engine.connect() as conn:
+                dialect = db.engine.dialect.name
+                if dialect == 'sqlite':
+                    r = conn.execute(text("PRAGMA table_info(message_group_member)"))
+                    missing = 'last_read_message_id' not in [row[1] for row in r]
+                else:
+                    r = conn.execute(text(
+                        "SELECT 1 FROM information_schema.columns "
+                        "WHERE table_name = 'message_group_member' AND column_name = 'last_read_message_id'"
+                    ))
+                    missing = r.fetchone() is None
+                if missing:
+                    conn.execute(text("ALTER TABLE message_group_member ADD COLUMN last_read_message_id INTEGER"))
+                    conn.execute(text(
+                        "UPDATE message_group_member SET last_read_message_id = "
+                        "(SELECT MAX(message.id) FROM message WHERE message.group_id = message_group_member.group_id)"
+                    ))
+                    conn.commit()
+                    print("Added message_group_member.last_read_message_id column.")
+        except Exception as e:
+            print(f"Note: message_group_member read cursor column check failed (may already exist): {e}")
+
+        # Attendance lookups by date / student+date (rollup refresh, analytics, exports)
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_attendance_date ON attendance (date)"))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_attendance_student_date ON attendance (student_id, date)"
+                ))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_school_day_attendance_date ON school_day_attendance (date)"
+                ))
+                conn.commit()
+        except Exception as e:
+            print(f"Note: attendance index check failed (may already exist): {e}")
+
+        # Audit / activity log filters (date range, user), CSV export and retention month scans
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_admin_audit_log_created_at ON admin_audit_log (created_at)"
+                ))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_admin_audit_log_user_id ON admin_audit_log (user_id)"
+                ))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_activity_log_timestamp ON activity_log (timestamp)"
+                ))
+                conn.commit()
+        except Exception as e:
+            print(f"Note: audit log index check failed (may already exist): {e}")
+
+        # Channel history paging and the grouped reply-count lookup
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_message_group_id_id ON message (group_id, id)"))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_message_parent_message_id ON message (parent_message_id)"
+                ))
+                conn.commit()
+        except Exception as e:
+            print(f"Note: message index check failed (may already exist): {e}")
+
+        # Student search index (pg_trgm / FTS5) plus a one-time document backfill.
+        try:
+            from services.student_search import ensure_student_search_index
+            ensure_student_search_index()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Note: student search index setup failed (run ops/rebuild_student_search.py): {e}")
+
+        # Communications search indexes (tsvector GIN / FTS5) plus a one-time backfill.
+        try:
+            from services.communication_search import ensure_communication_search_index
+            ensure_communication_search_index()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Note: communications search index setup failed (run ops/rebuild_communication_search.py): {e}")
+
+        # First boot with the unread counter table: count existing unread rows once.
+        try:
+            from services.unread_counters import ensure_unread_counters
+            ensure_unread_counters()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Note: unread counter initial build failed (run ops/rebuild_unread_counters.py): {e}")
+
+        # First boot with rollup tables: build them once; writes keep them current after that.
+        try:
+            from services.attendance_rollups import ensure_attendance_rollups
+            ensure_attendance_rollups()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Note: attendance rollup initial build failed (run ops/rebuild_attendance_rollups.py): {e}")
+
         # Add assignment advanced grading columns if missing
         _assignment_cols = [
             ('allow_extra_credit', 'BOOLEAN DEFAULT FALSE', 'INTEGER DEFAULT 0'),
@@ -542,6 +693,7 @@ def create_app(config_class=None):
             ('late_penalty_enabled', 'BOOLEAN DEFAULT FALSE', 'INTEGER DEFAULT 0'),
             ('late_penalty_per_day', 'DOUBLE PRECISION DEFAULT 0.0', 'REAL DEFAULT 0.0'),
             ('late_penalty_max_days', 'INTEGER DEFAULT 0', 'INTEGER DEFAULT 0'),
+            ('google_form_response_watermark', 'VARCHAR(40)', 'VARCHAR(40)'),
         ]
         try:
             with db.engine.connect() as conn:
@@ -943,6 +1095,47 @@ def create_app(config_class=None):
         except Exception as e:
             print(f"Note: school_year_closure table check failed (may already exist): {e}")
 
+        # Resumable finalize checkpoint columns on school_year_closure
+        try:
+            with db.engine.connect() as conn:
+                dialect = db.engine.dialect.name
+                if dialect == 'sqlite':
+                    result = conn.execute(text("PRAGMA table_info(school_year_closure)"))
+                    cols = {row[1] for row in result}
+                    for col_name, col_sql in (
+                        ('finalize_step', 'VARCHAR(20)'),
+                        ('finalize_cursor_student_id', 'INTEGER'),
+                        ('finalize_progress', 'TEXT'),
+                        ('finalize_started_at', 'DATETIME'),
+                        ('finalize_heartbeat_at', 'DATETIME'),
+                    ):
+                        if cols and col_name not in cols:
+                            conn.execute(text(
+                                f"ALTER TABLE school_year_closure ADD COLUMN {col_name} {col_sql}"
+                            ))
+                            conn.commit()
+                            print(f"Added school_year_closure.{col_name} column.")
+                elif dialect == 'postgresql':
+                    for col_name, col_sql in (
+                        ('finalize_step', 'VARCHAR(20)'),
+                        ('finalize_cursor_student_id', 'INTEGER'),
+                        ('finalize_progress', 'TEXT'),
+                        ('finalize_started_at', 'TIMESTAMP'),
+                        ('finalize_heartbeat_at', 'TIMESTAMP'),
+                    ):
+                        r = conn.execute(text(
+                            "SELECT 1 FROM information_schema.columns "
+                            "WHERE table_name = 'school_year_closure' AND column_name = :col"
+                        ), {"col": col_name})
+                        if r.fetchone() is None:
+                            conn.execute(text(
+                                f"ALTER TABLE school_year_closure ADD COLUMN {col_name} {col_sql}"
+                            ))
+                            conn.commit()
+                            print(f"Added school_year_closure.{col_name} column.")
+        except Exception as e:
+            print(f"Note: school_year_closure finalize column check failed (may already exist): {e}")
+
         # Optional: run one-off production DB fix only when explicitly requested.
         # Prefer Flask-Migrate for schema changes: flask db migrate / flask db upgrade
         if os.environ.get('RUN_PRODUCTION_DB_FIX', '').strip() == '1':
@@ -1945,6 +2138,14 @@ def create_app(config_class=None):
             download_name=group_assignment.attachment_original_filename or group_assignment.attachment_filename or 'group_assignment_file'
         )
 
+    if app.config.get('REPORT_CARD_PDF_PREWARM'):
+        try:
+            from services.report_card_pdf import prewarm_render_pool
+            with app.app_context():
+                prewarm_render_pool()
+        except Exception as e:
+            app.logger.warning("Report card PDF pool prewarm failed: %s", e)
+
     # Start GPA scheduler in development mode
     if app.config.get('ENV') == 'development':
         try:
@@ -2219,6 +2420,40 @@ def create_app(config_class=None):
         result = process_due_license_removals()
         return jsonify(result)
 
+    @app.route('/cron/background-jobs', methods=['POST'])
+    @csrf.exempt
+    def cron_background_jobs():
+        """
+        Drain due background jobs for up to ~40s (for hosts without an embedded or
+        dedicated worker). Protect with CRON_SECRET: header X-Cron-Secret or query ?token=
+        """
+        secret = app.config.get('CRON_SECRET') or os.environ.get('CRON_SECRET')
+        if not secret:
+            return jsonify({'ok': False, 'error': 'CRON_SECRET is not configured'}), 503
+        received = request.headers.get('X-Cron-Secret') or request.args.get('token')
+        if received != secret:
+            return jsonify({'ok': False, 'error': 'invalid or missing secret'}), 403
+        from services.background_jobs import run_due_jobs
+        result = run_due_jobs(worker_id='cron', max_seconds=40)
+        return jsonify({'ok': True, 'result': result})
+
+    # Embedded background job worker: started by the first request so only processes
+    # that actually serve traffic (not ops scripts or render pool children) run it.
+    if app.config.get('BACKGROUND_JOBS_EMBEDDED_WORKER'):
+        _embedded_worker_started = []
+
+        @app.before_request
+        def _start_embedded_background_worker():
+            if _embedded_worker_started:
+                return None
+            _embedded_worker_started.append(True)
+            try:
+                from services.background_jobs import start_embedded_worker
+                start_embedded_worker(app)
+            except Exception as e:
+                app.logger.warning("Embedded background job worker failed to start: %s", e)
+            return None
+
     # ------------------------------------------------------------------
     # Request access log via Flask (Werkzeug's own access log sometimes
     # doesn't propagate to the root logger under certain Windows setups).
@@ -2259,11 +2494,14 @@ def create_app(config_class=None):
 
     return app
 
-# Create the application instance
-print("Initializing Clara Science App (first load may take 1–2 minutes)...", flush=True)
-app = create_app()
-_cfg = app.config.get('ENV', 'production')
-print(f"Application ready (config: {_cfg}, react_spa={app.config.get('REACT_SPA_ENABLED')}, spa_built={os.path.isfile(os.path.join(app.root_path, 'static', 'spa', 'index.html'))}).", flush=True)
+# Create the application instance. Spawned PDF render pool workers re-import this
+# module as ``__mp_main__`` when it is the entry script (``python app.py``); they only
+# run WeasyPrint and must not build a second app or touch the database.
+if __name__ != '__mp_main__':
+    print("Initializing Clara Science App (first load may take 1–2 minutes)...", flush=True)
+    app = create_app()
+    _cfg = app.config.get('ENV', 'production')
+    print(f"Application ready (config: {_cfg}, react_spa={app.config.get('REACT_SPA_ENABLED')}, spa_built={os.path.isfile(os.path.join(app.root_path, 'static', 'spa', 'index.html'))}).", flush=True)
 
 if __name__ == '__main__':
     # use_reloader=False avoids a common Windows hang with debug mode
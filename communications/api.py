@@ -17,16 +17,30 @@ from .shared import (
     build_announcement_compose_payload,
     serialize_announcement_for_panel,
 )
-from .helpers import get_user_full_name
+from .helpers import get_user_full_name, get_user_full_names, serialize_messages
+from services.unread_counters import clear_unread, dm_scope, drop_channel_counters, mark_channel_read
 from utils.user_roles import user_primary_role_is_teaching_staff
 from werkzeug.exceptions import HTTPException
 
 api_bp = Blueprint('communications_api', __name__)
 
+CHANNEL_PAGE_SIZE = 100
+CHANNEL_PAGE_SIZE_MAX = 200
+
 @api_bp.route('/communications/api/channel/<int:channel_id>/messages')
 @login_required
 def get_channel_messages(channel_id):
-    """Get messages for a channel."""
+    """
+    Get a page of channel messages in chronological order (latest page by default).
+
+    ``?before=<message id>`` returns the page just older than that message, ``?after=``
+    the page just newer; ``limit`` defaults to 100 (max 200). ``paging`` in the response
+    carries the ids to pass next and whether more history exists on either side.
+
+    The cursors are API-only: no in-tree page calls this endpoint yet. Without them the
+    response is the latest page, as before; API clients use ``after`` to catch up after a
+    live ``message`` event (services/live_events.py) and ``before`` to scroll back.
+    """
     try:
         # Verify user has access to this channel
         group = MessageGroup.query.get_or_404(channel_id)
@@ -59,66 +73,53 @@ def get_channel_messages(channel_id):
             else:
                 return jsonify({'success': False, 'message': 'Access denied'}), 403
         
-        # Get messages
-        messages = Message.query.filter_by(
-            group_id=channel_id
-        ).order_by(Message.created_at.asc()).limit(100).all()
-        
-        # Mark as read
+        # Mark as read first: the commit would otherwise expire the page loaded below
         Message.query.filter_by(
             group_id=channel_id,
             recipient_id=current_user.id,
             is_read=False
         ).update({'is_read': True, 'read_at': datetime.utcnow()})
+        mark_channel_read(current_user.id, channel_id)
         db.session.commit()
-        
+
+        # Page of history: newest by default, ``before``/``after`` are message-id cursors
+        try:
+            before_id = request.args.get('before', type=int)
+            after_id = request.args.get('after', type=int)
+            limit = int(request.args.get('limit', CHANNEL_PAGE_SIZE))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'Invalid paging parameters'}), 400
+        if before_id is not None and after_id is not None:
+            return jsonify({'success': False, 'message': 'Use either before or after, not both'}), 400
+        limit = max(1, min(limit, CHANNEL_PAGE_SIZE_MAX))
+
+        query = Message.query.filter(Message.group_id == channel_id)
+        if after_id is not None:
+            messages = query.filter(Message.id > after_id).order_by(Message.id.asc()).limit(limit + 1).all()
+            has_more = len(messages) > limit
+            messages = messages[:limit]
+            has_older, has_newer = True, has_more
+        else:
+            if before_id is not None:
+                query = query.filter(Message.id < before_id)
+            messages = query.order_by(Message.id.desc()).limit(limit + 1).all()
+            has_more = len(messages) > limit
+            messages = messages[:limit][::-1]
+            has_older, has_newer = has_more, before_id is not None
+
         # Get participants
-        members = MessageGroupMember.query.filter_by(group_id=channel_id).all()
-        participants = []
-        for mem in members:
-            user = User.query.get(mem.user_id)
-            if user:
-                participants.append({
-                    'id': user.id,
-                    'name': get_user_full_name(user)
-                })
-        
-        # Get reactions for each message
-        message_data = []
-        for msg in messages:
-            reactions = MessageReaction.query.filter_by(message_id=msg.id).all()
-            reaction_counts = {}
-            user_reactions = []
-            for reaction in reactions:
-                emoji = reaction.emoji
-                if emoji not in reaction_counts:
-                    reaction_counts[emoji] = 0
-                reaction_counts[emoji] += 1
-                if reaction.user_id == current_user.id:
-                    user_reactions.append(emoji)
-            
-            # Get reply count safely
-            reply_count = 0
-            try:
-                if hasattr(Message, 'parent_message_id'):
-                    reply_count = Message.query.filter_by(parent_message_id=msg.id).count()
-            except:
-                pass
-            
-            message_data.append({
-                'id': msg.id,
-                'sender_id': msg.sender_id,
-                'sender_name': get_user_full_name(msg.sender) if msg.sender else 'Unknown',
-                'content': msg.content,
-                'created_at': msg.created_at.isoformat(),
-                'updated_at': msg.updated_at.isoformat() if msg.updated_at else msg.created_at.isoformat(),
-                'is_edited': getattr(msg, 'is_edited', False),
-                'parent_message_id': getattr(msg, 'parent_message_id', None),
-                'reactions': reaction_counts if reaction_counts else {},
-                'user_reactions': user_reactions,
-                'reply_count': reply_count
-            })
-        
+        member_ids = [
+            user_id for (user_id,) in
+            db.session.query(MessageGroupMember.user_id).filter_by(group_id=channel_id).all()
+        ]
+        member_names = get_user_full_names(member_ids)
+        participants = [
+            {'id': user_id, 'name': member_names[user_id]}
+            for user_id in member_ids if user_id in member_names
+        ]
+
+        message_data = serialize_messages(messages, current_user.id)
+
         return jsonify({
             'success': True,
             'messages': message_data,
@@ -126,7 +127,14 @@ def get_channel_messages(channel_id):
                 'title': group.name,
                 'description': group.description or ''
             },
-            'participants': participants
+            'participants': participants,
+            'paging': {
+                'limit': limit,
+                'oldest_id': messages[0].id if messages else None,
+                'newest_id': messages[-1].id if messages else None,
+                'has_older': has_older,
+                'has_newer': has_newer,
+            }
         })
     except HTTPException:
         raise
@@ -150,6 +158,8 @@ def get_direct_message_conversation(other_user_id):
                 and_(Message.group_id.is_(None), Message.recipient_id.isnot(None))
             )
         ).order_by(Message.created_at.asc()).limit(100).all()
+        # Serialize before the read-marking commit expires the loaded rows
+        message_data = serialize_messages(messages, current_user.id)
         
         # Mark as read (both direct type and NULL group_id)
         Message.query.filter(
@@ -161,46 +171,11 @@ def get_direct_message_conversation(other_user_id):
                 and_(Message.group_id.is_(None), Message.recipient_id.isnot(None))
             )
         ).update({'is_read': True, 'read_at': datetime.utcnow()})
+        clear_unread(current_user.id, dm_scope(other_user_id))
         db.session.commit()
         
         other_user = User.query.get(other_user_id)
         
-        # Get reactions for each message
-        message_data = []
-        for msg in messages:
-            reactions = MessageReaction.query.filter_by(message_id=msg.id).all()
-            reaction_counts = {}
-            user_reactions = []
-            for reaction in reactions:
-                emoji = reaction.emoji
-                if emoji not in reaction_counts:
-                    reaction_counts[emoji] = 0
-                reaction_counts[emoji] += 1
-                if reaction.user_id == current_user.id:
-                    user_reactions.append(emoji)
-            
-            # Get reply count safely
-            reply_count = 0
-            try:
-                if hasattr(Message, 'parent_message_id'):
-                    reply_count = Message.query.filter_by(parent_message_id=msg.id).count()
-            except:
-                pass
-            
-            message_data.append({
-                'id': msg.id,
-                'sender_id': msg.sender_id,
-                'sender_name': get_user_full_name(msg.sender) if msg.sender else 'Unknown',
-                'content': msg.content,
-                'created_at': msg.created_at.isoformat(),
-                'updated_at': msg.updated_at.isoformat() if msg.updated_at else msg.created_at.isoformat(),
-                'is_edited': getattr(msg, 'is_edited', False),
-                'parent_message_id': getattr(msg, 'parent_message_id', None),
-                'reactions': reaction_counts if reaction_counts else {},
-                'user_reactions': user_reactions,
-                'reply_count': reply_count
-            })
-        
         return jsonify({
             'success': True,
             'messages': message_data,
@@ -229,6 +204,29 @@ def get_announcements_api():
         current_app.logger.error(f"Error getting announcements: {e}", exc_info=True)
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@api_bp.route('/communications/api/search')
+@login_required
+def search_communications_api():
+    """Full-text search over the messages or announcements the current user can read."""
+    try:
+        from services.communication_search import PAGE_SIZE, search_communications
+        try:
+            page = search_communications(
+                current_user,
+                request.args.get('q', ''),
+                scope=request.args.get('scope', 'messages'),
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', PAGE_SIZE, type=int),
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        return jsonify({'success': True, **page})
+    except HTTPException:
+        raise
+    except Exception as e:
+        current_app.logger.error(f"Error searching communications: {e}", exc_info=True)
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @api_bp.route('/communications/api/send-message', methods=['POST'])
 @login_required
 def send_message_api():
@@ -992,6 +990,8 @@ def delete_group(group_id):
         
         # Delete all members
         MessageGroupMember.query.filter_by(group_id=group_id).delete()
+        # Query-level deletes skip the unread counter hooks
+        drop_channel_counters(group_id)
         
         # Delete the group
         db.session.delete(group)
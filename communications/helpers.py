@@ -24,3 +24,82 @@ def get_user_full_name(user):
     # Fallback to username if no profile found
     return user.username
 
+
+def get_user_full_names(user_ids):
+    """``{user_id: full name}`` for many users in three queries (users, students, staff)."""
+    ids = {uid for uid in user_ids if uid is not None}
+    if not ids:
+        return {}
+    users = User.query.filter(User.id.in_(ids)).all()
+    student_ids = {u.student_id for u in users if u.student_id}
+    staff_ids = {u.teacher_staff_id for u in users if u.teacher_staff_id}
+    students = {
+        s.id: s for s in Student.query.filter(Student.id.in_(student_ids)).all()
+    } if student_ids else {}
+    staff = {
+        t.id: t for t in TeacherStaff.query.filter(TeacherStaff.id.in_(staff_ids)).all()
+    } if staff_ids else {}
+
+    names = {}
+    for user in users:
+        profile = students.get(user.student_id) or staff.get(user.teacher_staff_id)
+        names[user.id] = f"{profile.first_name} {profile.last_name}" if profile else user.username
+    return names
+
+
+def serialize_messages(messages, viewer_id):
+    """
+    Message dicts for a thread view with reactions, the viewer's own reactions and reply
+    counts. Uses one grouped query for reactions, one for reply counts and
+    ``get_user_full_names`` for senders, however many messages are passed.
+    """
+    from sqlalchemy import case, func
+    from models import db, Message, MessageReaction
+
+    if not messages:
+        return []
+    ids = [msg.id for msg in messages]
+
+    reactions = {}
+    user_reactions = {}
+    rows = (
+        db.session.query(
+            MessageReaction.message_id,
+            MessageReaction.emoji,
+            func.count(MessageReaction.id),
+            func.sum(case((MessageReaction.user_id == viewer_id, 1), else_=0)),
+        )
+        .filter(MessageReaction.message_id.in_(ids))
+        .group_by(MessageReaction.message_id, MessageReaction.emoji)
+        .order_by(func.min(MessageReaction.id))
+        .all()
+    )
+    for message_id, emoji, count, mine in rows:
+        reactions.setdefault(message_id, {})[emoji] = count
+        if mine:
+            user_reactions.setdefault(message_id, []).append(emoji)
+
+    reply_counts = dict(
+        db.session.query(Message.parent_message_id, func.count(Message.id))
+        .filter(Message.parent_message_id.in_(ids))
+        .group_by(Message.parent_message_id)
+        .all()
+    )
+    sender_names = get_user_full_names(msg.sender_id for msg in messages)
+
+    return [
+        {
+            'id': msg.id,
+            'sender_id': msg.sender_id,
+            'sender_name': sender_names.get(msg.sender_id, 'Unknown'),
+            'content': msg.content,
+            'created_at': msg.created_at.isoformat(),
+            'updated_at': msg.updated_at.isoformat() if msg.updated_at else msg.created_at.isoformat(),
+            'is_edited': msg.is_edited or False,
+            'parent_message_id': msg.parent_message_id,
+            'reactions': reactions.get(msg.id, {}),
+            'user_reactions': user_reactions.get(msg.id, []),
+            'reply_count': reply_counts.get(msg.id, 0),
+        }
+        for msg in messages
+    ]
@@ -10,6 +10,7 @@ from models import (
 )
 from datetime import datetime
 from sqlalchemy import or_, and_
+from services.unread_counters import channel_scope, dm_scope, get_unread_count
 
 def get_user_channels(user_id, user_role):
     """Get all channels/groups accessible to a user."""
@@ -31,11 +32,7 @@ def get_user_channels(user_id, user_role):
         ).all()
         
         for group in class_groups:
-            unread = Message.query.filter(
-                Message.group_id == group.id,
-                Message.sender_id != user_id,
-                Message.is_read == False
-            ).count()
+            unread = get_unread_count(user_id, channel_scope(group.id))
             
             channels.append({
                 'id': group.id,
@@ -58,11 +55,7 @@ def get_user_channels(user_id, user_role):
             ).first()
             
             if member:
-                unread = Message.query.filter(
-                    Message.group_id == group.id,
-                    Message.sender_id != user_id,
-                    Message.is_read == False
-                ).count()
+                unread = get_unread_count(user_id, channel_scope(group.id))
                 
                 channels.append({
                     'id': group.id,
@@ -96,11 +89,7 @@ def get_user_channels(user_id, user_role):
         ).all()
         
         for group in class_groups:
-            unread = Message.query.filter(
-                Message.group_id == group.id,
-                Message.sender_id != user_id,
-                Message.is_read == False
-            ).count()
+            unread = get_unread_count(user_id, channel_scope(group.id))
             
             channels.append({
                 'id': group.id,
@@ -123,11 +112,7 @@ def get_user_channels(user_id, user_role):
             ).first()
             
             if member:
-                unread = Message.query.filter(
-                    Message.group_id == group.id,
-                    Message.sender_id != user_id,
-                    Message.is_read == False
-                ).count()
+                unread = get_unread_count(user_id, channel_scope(group.id))
                 
                 channels.append({
                     'id': group.id,
@@ -196,16 +181,7 @@ def get_direct_messages(user_id, user_role=None):
         if latest_msg:
             other_user = User.query.get(partner_id)
             if other_user:
-                # Count unread messages (both direct type and NULL group_id)
-                unread = Message.query.filter(
-                    Message.sender_id == partner_id,
-                    Message.recipient_id == user_id,
-                    Message.is_read == False,
-                    or_(
-                        Message.message_type == 'direct',
-                        and_(Message.group_id.is_(None), Message.recipient_id.isnot(None))
-                    )
-                ).count()
+                unread = get_unread_count(user_id, dm_scope(partner_id))
                 
                 dms.append({
                     'id': latest_msg.id,
@@ -431,15 +407,7 @@ def get_dm_conversations(user_id, user_role=None):
         if latest_msg:
             other_user = User.query.get(partner_id)
             if other_user:
-                unread = Message.query.filter(
-                    Message.sender_id == partner_id,
-                    Message.recipient_id == user_id,
-                    or_(
-                        Message.group_id.is_(None),
-                        Message.message_type == 'direct'
-                    ),
-                    Message.is_read == False
-                ).count()
+                unread = get_unread_count(user_id, dm_scope(partner_id))
                 
                 dm_conversations.append({
                     'id': f'dm_{partner_id}',  # Virtual ID for DM
@@ -52,6 +52,68 @@ class Config:
     # NEVER set DEBUG=True in production for security reasons
     DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() in ('true', '1', 'yes', 'on')
 
+    # Report card PDFs: WeasyPrint renders run in a small process pool (0 = render inline)
+    # and are cached on disk per snapshot. Requests wait up to REPORT_CARD_PDF_WAIT_SECONDS
+    # (keep below gunicorn --timeout) before answering 202 and letting the render finish.
+    REPORT_CARD_PDF_CACHE_DIR = os.environ.get('REPORT_CARD_PDF_CACHE_DIR')
+    try:
+        REPORT_CARD_PDF_WORKERS = int(os.environ.get('REPORT_CARD_PDF_WORKERS') or 1)
+    except (TypeError, ValueError):
+        REPORT_CARD_PDF_WORKERS = 1
+    # Start (and warm: stylesheets, fonts, logo) the pool processes at app start instead
+    # of on the first download. Off by default to keep idle memory low on small instances.
+    REPORT_CARD_PDF_PREWARM = os.environ.get('REPORT_CARD_PDF_PREWARM', 'false').lower() in (
+        'true', '1', 'yes', 'on',
+    )
+    try:
+        REPORT_CARD_PDF_WAIT_SECONDS = int(os.environ.get('REPORT_CARD_PDF_WAIT_SECONDS') or 40)
+    except (TypeError, ValueError):
+        REPORT_CARD_PDF_WAIT_SECONDS = 40
+
+    # School-year finalize: report cards are generated in chunks of
+    # SCHOOL_YEAR_FINALIZE_CHUNK_SIZE students (one commit + checkpoint per chunk) by
+    # SCHOOL_YEAR_FINALIZE_WORKERS threads (always 1 on SQLite). A single invocation
+    # stops after SCHOOL_YEAR_FINALIZE_TIME_BUDGET_SECONDS and the next one resumes.
+    try:
+        SCHOOL_YEAR_FINALIZE_CHUNK_SIZE = int(os.environ.get('SCHOOL_YEAR_FINALIZE_CHUNK_SIZE') or 25)
+    except (TypeError, ValueError):
+        SCHOOL_YEAR_FINALIZE_CHUNK_SIZE = 25
+    try:
+        SCHOOL_YEAR_FINALIZE_WORKERS = int(os.environ.get('SCHOOL_YEAR_FINALIZE_WORKERS') or 3)
+    except (TypeError, ValueError):
+        SCHOOL_YEAR_FINALIZE_WORKERS = 3
+    try:
+        SCHOOL_YEAR_FINALIZE_TIME_BUDGET_SECONDS = int(
+            os.environ.get('SCHOOL_YEAR_FINALIZE_TIME_BUDGET_SECONDS') or 40
+        )
+    except (TypeError, ValueError):
+        SCHOOL_YEAR_FINALIZE_TIME_BUDGET_SECONDS = 40
+
+    # Background job queue (services/background_jobs.py). The embedded worker is a
+    # daemon thread in the web process, started on the first request; turn it off when
+    # a dedicated `python ops/run_background_worker.py` process is deployed.
+    BACKGROUND_JOBS_EMBEDDED_WORKER = os.environ.get(
+        'BACKGROUND_JOBS_EMBEDDED_WORKER', 'true'
+    ).lower() in ('true', '1', 'yes', 'on')
+    try:
+        BACKGROUND_JOBS_POLL_SECONDS = float(os.environ.get('BACKGROUND_JOBS_POLL_SECONDS') or 2)
+    except (TypeError, ValueError):
+        BACKGROUND_JOBS_POLL_SECONDS = 2.0
+    try:
+        BACKGROUND_JOBS_LEASE_SECONDS = int(os.environ.get('BACKGROUND_JOBS_LEASE_SECONDS') or 300)
+    except (TypeError, ValueError):
+        BACKGROUND_JOBS_LEASE_SECONDS = 300
+    try:
+        BACKGROUND_JOBS_MAX_ATTEMPTS = int(os.environ.get('BACKGROUND_JOBS_MAX_ATTEMPTS') or 5)
+    except (TypeError, ValueError):
+        BACKGROUND_JOBS_MAX_ATTEMPTS = 5
+    # Secret payload values (initial Google passwords) are encrypted in the job row and
+    # stop decrypting after this many seconds; every finished or failed job drops them.
+    try:
+        BACKGROUND_JOBS_SECRET_TTL_SECONDS = int(os.environ.get('BACKGROUND_JOBS_SECRET_TTL_SECONDS') or 21600)
+    except (TypeError, ValueError):
+        BACKGROUND_JOBS_SECRET_TTL_SECONDS = 21600
+
     # PDFKit configuration
     WKHTMLTOPDF_PATH = os.environ.get('WKHTMLTOPDF_PATH') or '/usr/bin/wkhtmltopdf'
     
@@ -87,6 +149,76 @@ class Config:
     GOOGLE_CLASSROOM_COURSE_OWNER = os.environ.get('GOOGLE_CLASSROOM_COURSE_OWNER')
     # Legacy alias: used as fallback for both API subject and course owner when the above are unset.
     GOOGLE_CLASSROOM_DELEGATED_USER = os.environ.get('GOOGLE_CLASSROOM_DELEGATED_USER')
+    # Shared adaptive rate limit per Google API (requests/second ceiling; halves on quota
+    # errors and recovers on success) and the worker pool size for bulk syncs.
+    try:
+        GOOGLE_API_RATE_DIRECTORY = float(os.environ.get('GOOGLE_API_RATE_DIRECTORY') or 20)
+        GOOGLE_API_RATE_CLASSROOM = float(os.environ.get('GOOGLE_API_RATE_CLASSROOM') or 8)
+        GOOGLE_API_RATE_LICENSING = float(os.environ.get('GOOGLE_API_RATE_LICENSING') or 2)
+        GOOGLE_API_RATE_FORMS = float(os.environ.get('GOOGLE_API_RATE_FORMS') or 4)
+    except (TypeError, ValueError):
+        GOOGLE_API_RATE_DIRECTORY, GOOGLE_API_RATE_CLASSROOM = 20.0, 8.0
+        GOOGLE_API_RATE_LICENSING, GOOGLE_API_RATE_FORMS = 2.0, 4.0
+    try:
+        GOOGLE_API_MAX_RETRIES = int(os.environ.get('GOOGLE_API_MAX_RETRIES') or 6)
+    except (TypeError, ValueError):
+        GOOGLE_API_MAX_RETRIES = 6
+    # Calls made inside a web request retry briefly so they finish well under the worker timeout.
+    try:
+        GOOGLE_API_REQUEST_MAX_RETRIES = int(os.environ.get('GOOGLE_API_REQUEST_MAX_RETRIES') or 2)
+        GOOGLE_API_REQUEST_RETRY_BUDGET_SECONDS = float(os.environ.get('GOOGLE_API_REQUEST_RETRY_BUDGET_SECONDS') or 15)
+    except (TypeError, ValueError):
+        GOOGLE_API_REQUEST_MAX_RETRIES, GOOGLE_API_REQUEST_RETRY_BUDGET_SECONDS = 2, 15.0
+    try:
+        GOOGLE_SYNC_WORKERS = int(os.environ.get('GOOGLE_SYNC_WORKERS') or 4)
+    except (TypeError, ValueError):
+        GOOGLE_SYNC_WORKERS = 4
+    # Seconds the cached Directory org-unit tree is trusted before re-listing (0 = no cache).
+    try:
+        GOOGLE_OU_TREE_TTL_SECONDS = int(os.environ.get('GOOGLE_OU_TREE_TTL_SECONDS', '600'))
+    except (TypeError, ValueError):
+        GOOGLE_OU_TREE_TTL_SECONDS = 600
+    # Seconds absence-streak query results are reused per date range (0 = no cache).
+    try:
+        ATTENDANCE_STREAK_CACHE_SECONDS = int(os.environ.get('ATTENDANCE_STREAK_CACHE_SECONDS', '300'))
+    except (TypeError, ValueError):
+        ATTENDANCE_STREAK_CACHE_SECONDS = 300
+    # Seconds before the management home's counters row is recounted in the background (0 = never).
+    try:
+        DASHBOARD_COUNTERS_RECONCILE_SECONDS = int(os.environ.get('DASHBOARD_COUNTERS_RECONCILE_SECONDS', str(6 * 3600)))
+    except (TypeError, ValueError):
+        DASHBOARD_COUNTERS_RECONCILE_SECONDS = 6 * 3600
+    # Seconds the students list header counts are reused for one roster version (0 = no cache).
+    try:
+        STUDENTS_LIST_COUNTS_CACHE_SECONDS = int(os.environ.get('STUDENTS_LIST_COUNTS_CACHE_SECONDS', '300'))
+    except (TypeError, ValueError):
+        STUDENTS_LIST_COUNTS_CACHE_SECONDS = 300
+    # Log retention: admin_audit_log / activity_log rows older than LOG_RETENTION_HOT_DAYS
+    # (whole months only) move to gzip JSON-lines files under LOG_ARCHIVE_DIR (default
+    # instance/log_archive). 0 = keep everything in the database. Point LOG_ARCHIVE_DIR at a
+    # persistent disk before enabling on a PaaS with an ephemeral filesystem.
+    try:
+        LOG_RETENTION_HOT_DAYS = int(os.environ.get('LOG_RETENTION_HOT_DAYS', '0'))
+    except (TypeError, ValueError):
+        LOG_RETENTION_HOT_DAYS = 0
+    LOG_ARCHIVE_DIR = os.environ.get('LOG_ARCHIVE_DIR')
+    # Hours between background recounts of the unread badge counters (0 = only on demand).
+    try:
+        UNREAD_COUNTERS_REPAIR_HOURS = int(os.environ.get('UNREAD_COUNTERS_REPAIR_HOURS', '24'))
+    except (TypeError, ValueError):
+        UNREAD_COUNTERS_REPAIR_HOURS = 24
+    # Server-Sent Events push (/api/spa/events). Each open stream holds one gunicorn thread,
+    # so LIVE_EVENTS_MAX_STREAMS per process must stay below --threads; extra clients get
+    # 503 and retry. Other processes' events are read from the outbox every POLL_SECONDS.
+    LIVE_EVENTS_ENABLED = os.environ.get('LIVE_EVENTS_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    try:
+        LIVE_EVENTS_MAX_STREAMS = int(os.environ.get('LIVE_EVENTS_MAX_STREAMS', '8'))
+    except (TypeError, ValueError):
+        LIVE_EVENTS_MAX_STREAMS = 8
+    try:
+        LIVE_EVENTS_POLL_SECONDS = float(os.environ.get('LIVE_EVENTS_POLL_SECONDS', '1'))
+    except (TypeError, ValueError):
+        LIVE_EVENTS_POLL_SECONDS = 1.0
     
     # Idle logout: minutes without activity before forced sign-out (server + SPA).
     try:
@@ -3,6 +3,8 @@ import type {
   ReportCardActionResponse,
   ReportCardClassOption,
   ReportCardDetailResponse,
+  ReportCardExportJob,
+  ReportCardExportPayload,
   ReportCardGenerateFormResponse,
   ReportCardGeneratePayload,
   ReportCardGenerateResponse,
@@ -152,3 +154,16 @@ export async function revokeReportCard(reportCardId: number): Promise<ReportCard
 export function reportCardPdfUrl(reportCardId: number): string {
   return `/api/spa/report-cards/${reportCardId}/pdf`
 }
+
+export async function startReportCardExport(
+  payload: ReportCardExportPayload,
+): Promise<{ success: boolean; job: ReportCardExportJob }> {
+  return apiFetch<{ success: boolean; job: ReportCardExportJob }>('/api/spa/report-cards/exports', {
+    method: 'POST',
+    body: JSON.stringify(payload),
+  })
+}
+
+export async function fetchReportCardExport(jobId: number): Promise<{ job: ReportCardExportJob }> {
+  return apiFetch<{ job: ReportCardExportJob }>(`/api/spa/report-cards/exports/${jobId}`)
+}
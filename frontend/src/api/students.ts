@@ -11,6 +11,8 @@ function filtersToParams(filters: StudentFilters): string {
   if (filters.sort) params.set('sort', filters.sort)
   if (filters.order) params.set('order', filters.order)
   if (filters.page > 1) params.set('page', String(filters.page))
+  // Keyset paging: cost per page stays flat however deep the list goes.
+  params.set('cursor', filters.cursor || '')
   const qs = params.toString()
   return qs ? `?${qs}` : ''
 }
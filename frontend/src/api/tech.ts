@@ -72,6 +72,19 @@ export async function fetchTechErrorReports(query: Record<string, string | undef
   return apiFetch<any>(`/api/spa/tech/error-reports${qs ? `?${qs}` : ''}`)
 }
 
+export async function fetchTechBackgroundJobs(query: Record<string, string | number | undefined>) {
+  const params = new URLSearchParams()
+  Object.entries(query).forEach(([k, v]) => {
+    if (v != null && v !== '') params.set(k, String(v))
+  })
+  const qs = params.toString()
+  return apiFetch<any>(`/api/spa/tech/background-jobs${qs ? `?${qs}` : ''}`)
+}
+
+export async function postTechBackgroundJobAction(jobId: number, action: 'retry' | 'cancel') {
+  return apiFetch<any>(`/api/spa/tech/background-jobs/${jobId}/${action}`, { method: 'POST' })
+}
+
 export async function fetchTechSystem() {
   return apiFetch<any>('/api/spa/tech/system')
 }
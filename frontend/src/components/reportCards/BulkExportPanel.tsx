@@ -0,0 +1,192 @@
+import { useEffect, useRef, useState } from 'react'
+
+import { fetchReportCardExport, fetchReportCardGenerateForm, startReportCardExport } from '../../api/reportCards'
+import type { ReportCardExportJob } from '../../types/reportCards'
+
+const QUARTERS = ['Q1', 'Q2', 'Q3', 'Q4']
+const GRADE_OPTIONS = Array.from({ length: 13 }, (_, grade) => ({
+  value: grade,
+  label: grade === 0 ? 'Kindergarten' : `Grade ${grade}`,
+}))
+const POLL_MS = 2000
+
+export default function BulkExportPanel() {
+  const [schoolYears, setSchoolYears] = useState<Array<{ id: number; name: string; is_active: boolean }>>([])
+  const [schoolYearId, setSchoolYearId] = useState<number | null>(null)
+  const [gradeLevel, setGradeLevel] = useState<number>(0)
+  const [quarters, setQuarters] = useState<string[]>(['Q1'])
+  const [outputFormat, setOutputFormat] = useState<'zip' | 'pdf'>('zip')
+  const [generateMissing, setGenerateMissing] = useState(false)
+  const [job, setJob] = useState<ReportCardExportJob | null>(null)
+  const [busy, setBusy] = useState(false)
+  const [error, setError] = useState<string | null>(null)
+  const pollRef = useRef<number | null>(null)
+
+  useEffect(() => {
+    let cancelled = false
+    fetchReportCardGenerateForm()
+      .then((data) => {
+        if (cancelled) return
+        setSchoolYears(data.school_years)
+        setSchoolYearId(data.default_school_year_id ?? data.school_years[0]?.id ?? null)
+      })
+      .catch(() => {
+        /* panel stays disabled without school years */
+      })
+    return () => {
+      cancelled = true
+      if (pollRef.current) window.clearTimeout(pollRef.current)
+    }
+  }, [])
+
+  function poll(jobId: number) {
+    pollRef.current = window.setTimeout(async () => {
+      try {
+        const { job: next } = await fetchReportCardExport(jobId)
+        setJob(next)
+        if (next.status === 'queued' || next.status === 'running') poll(jobId)
+      } catch (err) {
+        setError(err instanceof Error ? err.message : 'Failed to check export progress')
+      }
+    }, POLL_MS)
+  }
+
+  async function handleStart() {
+    if (!schoolYearId || !quarters.length) return
+    setBusy(true)
+    setError(null)
+    setJob(null)
+    try {
+      const result = await startReportCardExport({
+        school_year_id: schoolYearId,
+        quarters,
+        grade_level: gradeLevel,
+        output_format: outputFormat,
+        generate_missing: generateMissing,
+      })
+      setJob(result.job)
+      poll(result.job.id)
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to start export')
+    } finally {
+      setBusy(false)
+    }
+  }
+
+  const running = job?.status === 'queued' || job?.status === 'running'
+
+  return (
+    <section className="rounded-2xl border border-slate-200 bg-white p-5 shadow-sm">
+      <h2 className="text-base font-bold text-hub-text">
+        <i className="bi bi-file-earmark-zip-fill mr-2 text-violet-700" aria-hidden />
+        Bulk export
+      </h2>
+      <p className="mt-1 text-sm text-hub-muted">
+        Download every student&apos;s latest report card for a grade as one ZIP or merged PDF.
+      </p>
+
+      <div className="mt-4 grid gap-3 sm:grid-cols-2 lg:grid-cols-4">
+        <label className="text-sm font-semibold text-hub-text">
+          School year
+          <select
+            className="mt-1 w-full rounded-lg border border-slate-200 px-3 py-2 text-sm"
+            value={schoolYearId ?? ''}
+            onChange={(e) => setSchoolYearId(e.target.value ? Number(e.target.value) : null)}
+          >
+            {schoolYears.map((sy) => (
+              <option key={sy.id} value={sy.id}>
+                {sy.name}
+                {sy.is_active ? ' (current)' : ''}
+              </option>
+            ))}
+          </select>
+        </label>
+        <label className="text-sm font-semibold text-hub-text">
+          Grade
+          <select
+            className="mt-1 w-full rounded-lg border border-slate-200 px-3 py-2 text-sm"
+            value={gradeLevel}
+            onChange={(e) => setGradeLevel(Number(e.target.value))}
+          >
+            {GRADE_OPTIONS.map((option) => (
+              <option key={option.value} value={option.value}>
+                {option.label}
+              </option>
+            ))}
+          </select>
+        </label>
+        <label className="text-sm font-semibold text-hub-text">
+          Format
+          <select
+            className="mt-1 w-full rounded-lg border border-slate-200 px-3 py-2 text-sm"
+            value={outputFormat}
+            onChange={(e) => setOutputFormat(e.target.value === 'pdf' ? 'pdf' : 'zip')}
+          >
+            <option value="zip">ZIP of PDFs</option>
+            <option value="pdf">One merged PDF</option>
+          </select>
+        </label>
+        <fieldset className="text-sm font-semibold text-hub-text">
+          <legend>Quarters</legend>
+          <div className="mt-2 flex flex-wrap gap-3">
+            {QUARTERS.map((quarter) => (
+              <label key={quarter} className="inline-flex items-center gap-1 font-normal">
+                <input
+                  type="checkbox"
+                  checked={quarters.includes(quarter)}
+                  onChange={(e) =>
+                    setQuarters((prev) =>
+                      e.target.checked
+                        ? QUARTERS.filter((q) => q === quarter || prev.includes(q))
+                        : prev.filter((q) => q !== quarter),
+                    )
+                  }
+                />
+                {quarter}
+              </label>
+            ))}
+          </div>
+        </fieldset>
+      </div>
+
+      <label className="mt-3 inline-flex items-center gap-2 text-sm text-hub-text">
+        <input type="checkbox" checked={generateMissing} onChange={(e) => setGenerateMissing(e.target.checked)} />
+        Generate report cards for students who do not have one yet
+      </label>
+
+      <div className="mt-4 flex flex-wrap items-center gap-3">
+        <button
+          type="button"
+          disabled={busy || running || !schoolYearId || !quarters.length}
+          onClick={() => void handleStart()}
+          className="inline-flex items-center gap-2 rounded-xl bg-violet-700 px-4 py-2 text-sm font-semibold text-white hover:bg-violet-800 disabled:opacity-60"
+        >
+          <i className="bi bi-download" aria-hidden />
+          {running ? 'Exporting…' : 'Start export'}
+        </button>
+        {job ? (
+          <span className="text-sm text-hub-muted">
+            {job.completed}/{job.total} done ({job.percent}%)
+            {job.failed ? ` · ${job.failed} failed` : ''}
+            {job.skipped ? ` · ${job.skipped} without a card` : ''}
+          </span>
+        ) : null}
+        {job?.status === 'done' && job.download_url ? (
+          <a
+            href={job.download_url}
+            className="inline-flex items-center gap-1 text-sm font-semibold text-violet-800 hover:text-violet-950"
+          >
+            <i className="bi bi-file-earmark-arrow-down" aria-hidden />
+            Download
+          </a>
+        ) : null}
+      </div>
+
+      {job?.status === 'failed' || error ? (
+        <p className="mt-3 text-sm font-medium text-rose-700">
+          {error || job?.errors[0]?.error || 'Export failed.'}
+        </p>
+      ) : null}
+    </section>
+  )
+}
@@ -0,0 +1,66 @@
+import { useEffect, useRef } from 'react'
+
+/** Server-Sent Events pushed from /api/spa/events (payloads carry ids and counts only). */
+export type LiveEventHandlers = {
+  message?: (data: {
+    message_id: number
+    group_id: number | null
+    sender_id: number
+    parent_message_id: number | null
+  }) => void
+  reaction?: (data: { message_id: number; group_id: number | null; reactions: Record<string, number> }) => void
+  notifications?: (data: {
+    unread_count: number
+    notification: { id: number; type: string; title: string; link: string | null } | null
+  }) => void
+  announcement?: (data: { announcement_id: number; target_group: string; class_id: number | null }) => void
+  /** Too many events were missed; reload whatever the page shows. */
+  resync?: () => void
+}
+
+const BUSY_RETRY_MS = 30_000
+
+/**
+ * Subscribe to the live event stream while the component is mounted. The browser
+ * reconnects with Last-Event-ID on its own; when the server refuses (busy / disabled)
+ * the stream closes and we try again later.
+ */
+export function useLiveEvents(handlers: LiveEventHandlers) {
+  const handlersRef = useRef(handlers)
+  handlersRef.current = handlers
+
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return undefined
+    let source: EventSource | null = null
+    let retryTimer: number | undefined
+    let closed = false
+
+    const connect = () => {
+      source = new EventSource('/api/spa/events', { withCredentials: true })
+      for (const type of ['message', 'reaction', 'notifications', 'announcement'] as const) {
+        source.addEventListener(type, (event) => {
+          const handler = handlersRef.current[type] as ((data: unknown) => void) | undefined
+          if (!handler) return
+          try {
+            handler(JSON.parse((event as MessageEvent<string>).data))
+          } catch {
+            /* ignore malformed frames */
+          }
+        })
+      }
+      source.addEventListener('resync', () => handlersRef.current.resync?.())
+      source.onerror = () => {
+        if (source?.readyState === EventSource.CLOSED && !closed) {
+          retryTimer = window.setTimeout(connect, BUSY_RETRY_MS)
+        }
+      }
+    }
+
+    connect()
+    return () => {
+      closed = true
+      window.clearTimeout(retryTimer)
+      source?.close()
+    }
+  }, [])
+}
@@ -135,6 +135,18 @@ export function AttendanceReportsPanel({
     }
   }
 
+  // Export exactly what the server applied (resolved dates and filters).
+  const exportQuery = useMemo(() => {
+    const params = new URLSearchParams()
+    if (!data) return ''
+    params.set('start_date', data.filters.start_date)
+    params.set('end_date', data.filters.end_date)
+    if (data.filters.status) params.set('status', data.filters.status)
+    data.filters.student_ids.forEach((id) => params.append('student_ids', String(id)))
+    data.filters.class_ids.forEach((id) => params.append('class_ids', String(id)))
+    return params.toString()
+  }, [data])
+
   const activePreset = useMemo(() => {
     if (!data) return null
     return (
@@ -197,6 +209,13 @@ export function AttendanceReportsPanel({
                   {preset.label}
                 </button>
               ))}
+              <a
+                href={`/management/attendance/reports/export.csv?${exportQuery}`}
+                className="rounded-full border border-slate-200 bg-white px-3 py-1.5 text-xs font-semibold text-hub-text hover:bg-slate-50"
+              >
+                <i className="bi bi-download mr-1" aria-hidden />
+                Export CSV
+              </a>
               {embedded ? (
                 <Link
                   to={`/management/attendance/reports?${searchParams.toString()}`}
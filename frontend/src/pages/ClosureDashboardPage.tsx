@@ -118,8 +118,17 @@ export function ClosureDashboardPage() {
     )
   }
 
-  const { closure, school_year, days_to, checklist, finalize_stats, extensions, events, eighth_grade_outcomes } =
-    data
+  const {
+    closure,
+    school_year,
+    days_to,
+    checklist,
+    finalize_stats,
+    finalize_progress,
+    extensions,
+    events,
+    eighth_grade_outcomes,
+  } = data
   const phase = closure.phase
   const isTerminal = data.terminal_phases.includes(phase)
   const isPaused = phase === 'paused'
@@ -325,6 +334,40 @@ export function ClosureDashboardPage() {
                 />
               ) : null}
 
+              {finalize_progress ? (
+                <section className="mgmt-syc-card">
+                  <h2 className="mgmt-syc-card-title">
+                    <i className="bi bi-hourglass-split" aria-hidden="true" />
+                    Finalize in progress
+                  </h2>
+                  <dl className="mgmt-syc-stat-grid">
+                    <div>
+                      <dt>Step</dt>
+                      <dd>{finalize_progress.step === 'archive' ? 'Archiving classes' : 'Report cards'}</dd>
+                    </div>
+                    <div>
+                      <dt>Students processed</dt>
+                      <dd>
+                        {finalize_progress.processed} / {finalize_progress.total}
+                      </dd>
+                    </div>
+                    <div>
+                      <dt>Report cards saved</dt>
+                      <dd>{finalize_progress.ok}</dd>
+                    </div>
+                    <div>
+                      <dt>Errors</dt>
+                      <dd>{finalize_progress.errors}</dd>
+                    </div>
+                  </dl>
+                  {!finalize_progress.running ? (
+                    <p className="mgmt-syc-form-hint">
+                      Not currently running. Finalize now (or the next cron tick) resumes from the last checkpoint.
+                    </p>
+                  ) : null}
+                </section>
+              ) : null}
+
               {finalize_stats ? (
                 <section className="mgmt-syc-card">
                   <h2 className="mgmt-syc-card-title">
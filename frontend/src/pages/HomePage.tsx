@@ -9,6 +9,7 @@ import {
   type HomeActionGroup,
   type HomeQuickAction,
 } from '../config/homeQuickActions'
+import { useLiveEvents } from '../hooks/useLiveEvents'
 import type { ManagementOutletContext } from '../types/layout'
 import type { DashboardHomeResponse } from '../types/dashboard'
 
@@ -93,6 +94,19 @@ export function HomePage() {
       .finally(() => setLoading(false))
   }, [])
 
+  // Refresh the notification feed when one arrives instead of waiting for a reload.
+  const refreshHome = () => {
+    void fetchDashboardHome()
+      .then(setData)
+      .catch(() => undefined)
+  }
+  useLiveEvents({
+    notifications: (data) => {
+      if (data.notification) refreshHome()
+    },
+    resync: refreshHome,
+  })
+
   return (
     <ManagementPageShell director={isDirector}>
       <div className="mgmt-home container-fluid px-0 px-md-1">
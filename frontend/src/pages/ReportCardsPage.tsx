@@ -5,6 +5,7 @@ import { Link, useOutletContext } from 'react-router-dom'
 
 
 import { deleteReportCard, fetchReportCardsHub, reportCardPdfUrl } from '../api/reportCards'
+import BulkExportPanel from '../components/reportCards/BulkExportPanel'
 import PendingApprovalNotifier from '../components/reportCards/PendingApprovalNotifier'
 import { ManagementPageHero, ManagementPageShell } from '../components/layout/ManagementPageShell'
 import { spaRoute } from '../utils/spaRoute'
@@ -717,6 +718,10 @@ export default function ReportCardsPage() {
 
 
 
+          <BulkExportPanel />
+
+
+
           <section className="space-y-4">
 
             <div className="flex items-center justify-between gap-3">
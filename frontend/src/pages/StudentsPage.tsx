@@ -166,12 +166,16 @@ export function StudentsPage() {
   const [detailLoading, setDetailLoading] = useState(false)
   const [editStudentId, setEditStudentId] = useState<number | null>(null)
   const deepLinkHandled = useRef(false)
+  // Cursor that loads each page number, filled in as Next is followed.
+  const pageCursors = useRef<Record<number, string>>({ 1: '' })
 
   const load = useCallback(async (active: StudentFilters) => {
     setLoading(true)
     setError(null)
     try {
       const data = await fetchStudentList(active)
+      if (active.page <= 1) pageCursors.current = { 1: '' }
+      if (data.pagination.next_cursor) pageCursors.current[active.page + 1] = data.pagination.next_cursor
       setItems(data.items)
       setStats(data.stats)
       setPagination(data.pagination)
@@ -201,7 +205,7 @@ export function StudentsPage() {
       nextView = recordsView === 'grouped' ? 'table' : recordsView
     }
     setRecordsView(nextView)
-    setFilters({ ...draft, alert_filter: alertFilter, page: 1 })
+    setFilters({ ...draft, alert_filter: alertFilter, page: 1, cursor: '' })
   }
 
   const resetFilters = () => {
@@ -212,8 +216,10 @@ export function StudentsPage() {
   }
 
   const goToPage = (page: number) => {
-    setFilters((prev) => ({ ...prev, page }))
-    setDraft((prev) => ({ ...prev, page }))
+    const cursor = pageCursors.current[page] ?? ''
+    const target = cursor || page <= 1 ? page : 1
+    setFilters((prev) => ({ ...prev, page: target, cursor }))
+    setDraft((prev) => ({ ...prev, page: target, cursor }))
   }
 
   const toggleSelect = (id: number) => {
@@ -564,6 +570,7 @@ export function StudentsPage() {
                       <option value="id">Student ID</option>
                       <option value="gpa">GPA (Low to High)</option>
                       <option value="gpa_desc">GPA (High to Low)</option>
+                      <option value="relevance">Best match (when searching)</option>
                     </select>
                   </div>
                   <div className="col-md-2">
@@ -1,12 +1,17 @@
 import { useCallback, useEffect, useState } from 'react'
 import { Navigate, useSearchParams } from 'react-router-dom'
-import { fetchTechActivityLog, fetchTechAuditLogs } from '../api/tech'
+import {
+  fetchTechActivityLog,
+  fetchTechAuditLogs,
+  fetchTechBackgroundJobs,
+  postTechBackgroundJobAction,
+} from '../api/tech'
 import {
   ManagementPageHero,
   ManagementPageShell,
 } from '../components/layout/ManagementPageShell'
 
-type LogsTab = 'activity' | 'audit'
+type LogsTab = 'activity' | 'audit' | 'jobs'
 
 const fieldClass =
   'w-full rounded-xl border border-[color-mix(in_srgb,var(--spa-mgmt-accent)_22%,var(--spa-mgmt-border))] bg-[var(--spa-mgmt-surface)] px-3 py-2.5 text-sm text-hub-text shadow-sm outline-none transition focus:border-[var(--spa-mgmt-accent)] focus:ring-2 focus:ring-[color-mix(in_srgb,var(--spa-mgmt-accent)_25%,transparent)]'
@@ -46,7 +51,7 @@ function statusTone(code: number | null | undefined) {
 export function TechLogsPage() {
   const [searchParams, setSearchParams] = useSearchParams()
   const rawTab = searchParams.get('tab')
-  const tab: LogsTab = rawTab === 'audit' ? 'audit' : 'activity'
+  const tab: LogsTab = rawTab === 'audit' || rawTab === 'jobs' ? rawTab : 'activity'
 
   function setTab(next: LogsTab) {
     const nextParams = new URLSearchParams(searchParams)
@@ -66,6 +71,11 @@ export function TechLogsPage() {
       icon: 'bi-journal-text',
       hint: 'HTTP request trail for management and tech endpoints.',
     },
+    jobs: {
+      label: 'Jobs',
+      icon: 'bi-cpu',
+      hint: 'Background job queue — Google syncs, class provisioning and exports, with retries.',
+    },
   } as const
 
   return (
@@ -80,19 +90,28 @@ export function TechLogsPage() {
             <p className="mb-0 mt-2 max-w-xl text-sm spa-mgmt-hero-muted">{tabMeta[tab].hint}</p>
           </div>
           {tab === 'audit' ? (
-            <a
-              href="/tech/audit-logs/export.csv?legacy=1"
-              className="inline-flex items-center gap-2 rounded-full bg-white/15 px-4 py-2 text-sm font-semibold text-white no-underline hover:bg-white/25"
-            >
-              <i className="bi bi-download" aria-hidden />
-              Export CSV
-            </a>
+            <div className="flex flex-wrap gap-2">
+              <a
+                href="/tech/audit-logs/export.csv?legacy=1"
+                className="inline-flex items-center gap-2 rounded-full bg-white/15 px-4 py-2 text-sm font-semibold text-white no-underline hover:bg-white/25"
+              >
+                <i className="bi bi-download" aria-hidden />
+                Export CSV
+              </a>
+              <a
+                href="/tech/audit-logs/export.csv?legacy=1&gzip=1"
+                className="inline-flex items-center gap-2 rounded-full bg-white/15 px-4 py-2 text-sm font-semibold text-white no-underline hover:bg-white/25"
+              >
+                <i className="bi bi-file-earmark-zip" aria-hidden />
+                .csv.gz
+              </a>
+            </div>
           ) : null}
         </div>
       </ManagementPageHero>
 
       <div className="mb-5 flex flex-wrap gap-2" role="tablist" aria-label="Log sections">
-        {(['activity', 'audit'] as const).map((t) => (
+        {(['activity', 'audit', 'jobs'] as const).map((t) => (
           <button
             key={t}
             type="button"
@@ -107,7 +126,7 @@ export function TechLogsPage() {
         ))}
       </div>
 
-      {tab === 'activity' ? <ActivityLogPanel /> : <AuditLogPanel />}
+      {tab === 'activity' ? <ActivityLogPanel /> : tab === 'audit' ? <AuditLogPanel /> : <BackgroundJobsPanel />}
     </ManagementPageShell>
   )
 }
@@ -316,7 +335,7 @@ function ActivityLogPanel() {
 }
 
 function AuditLogPanel() {
-  const [filters, setFilters] = useState({ q: '', method: '', page: 1 })
+  const [filters, setFilters] = useState({ q: '', method: '', archive_month: '', page: 1 })
   const [data, setData] = useState<any>(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
@@ -329,6 +348,7 @@ function AuditLogPanel() {
         await fetchTechAuditLogs({
           q: filters.q || undefined,
           method: filters.method || undefined,
+          archive_month: filters.archive_month || undefined,
           page: filters.page,
         }),
       )
@@ -344,12 +364,30 @@ function AuditLogPanel() {
   }, [load])
 
   const logs = (data?.logs || []) as any[]
+  const archiveMonths = (data?.archive_months || []) as string[]
 
   return (
     <div className="space-y-4">
       <section className="spa-mgmt-card overflow-hidden shadow-sm">
         <div className="spa-mgmt-accent-bar" />
         <div className="flex flex-col gap-3 p-4 sm:flex-row sm:flex-wrap sm:items-end">
+          {archiveMonths.length ? (
+            <label className="flex min-w-[9rem] flex-col gap-1.5 sm:max-w-[12rem]">
+              <span className={labelClass}>Period</span>
+              <select
+                className={fieldClass}
+                value={filters.archive_month}
+                onChange={(e) => setFilters((f) => ({ ...f, archive_month: e.target.value, page: 1 }))}
+              >
+                <option value="">Recent (live)</option>
+                {archiveMonths.map((m) => (
+                  <option key={m} value={m}>
+                    Archive {m}
+                  </option>
+                ))}
+              </select>
+            </label>
+          ) : null}
           <label className="flex min-w-[14rem] flex-[2] flex-col gap-1.5">
             <span className={labelClass}>Search path / endpoint</span>
             <input
@@ -487,3 +525,217 @@ function AuditLogPanel() {
     </div>
   )
 }
+
+const JOB_STATE_TONE: Record<string, string> = {
+  queued: 'bg-sky-100 text-sky-800',
+  running: 'bg-amber-100 text-amber-800',
+  done: 'bg-emerald-100 text-emerald-800',
+  failed: 'bg-rose-100 text-rose-800',
+  cancelled: 'bg-slate-100 text-slate-700',
+}
+
+function formatWhen(iso: string | null | undefined): string {
+  if (!iso) return '—'
+  const d = new Date(`${iso}${/[zZ]|[+-]\d\d:?\d\d$/.test(iso) ? '' : 'Z'}`)
+  return Number.isNaN(d.getTime()) ? iso : d.toLocaleString()
+}
+
+function BackgroundJobsPanel() {
+  const [filters, setFilters] = useState({ state: '', job_type: '' })
+  const [data, setData] = useState<any>(null)
+  const [loading, setLoading] = useState(true)
+  const [error, setError] = useState<string | null>(null)
+  const [message, setMessage] = useState<string | null>(null)
+  const [busyId, setBusyId] = useState<number | null>(null)
+
+  const load = useCallback(async () => {
+    setLoading(true)
+    setError(null)
+    try {
+      setData(
+        await fetchTechBackgroundJobs({
+          state: filters.state || undefined,
+          job_type: filters.job_type || undefined,
+        }),
+      )
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Could not load background jobs')
+    } finally {
+      setLoading(false)
+    }
+  }, [filters])
+
+  useEffect(() => {
+    void load()
+  }, [load])
+
+  async function runAction(jobId: number, action: 'retry' | 'cancel') {
+    setBusyId(jobId)
+    setMessage(null)
+    try {
+      const res = await postTechBackgroundJobAction(jobId, action)
+      setMessage(res?.message || 'Done.')
+      await load()
+    } catch (err) {
+      setMessage(err instanceof Error ? err.message : 'Action failed')
+    } finally {
+      setBusyId(null)
+    }
+  }
+
+  const jobs = (data?.jobs || []) as any[]
+  const counts = (data?.counts || {}) as Record<string, number>
+
+  return (
+    <div className="space-y-4">
+      <div className="grid gap-3 sm:grid-cols-4">
+        {(['queued', 'running', 'failed', 'done'] as const).map((state) => (
+          <article key={state} className="spa-mgmt-stat p-4 shadow-sm">
+            <div className="text-2xl font-bold tabular-nums text-hub-text">{counts[state] ?? 0}</div>
+            <div className="text-xs font-semibold uppercase tracking-wide text-hub-muted">{state}</div>
+          </article>
+        ))}
+      </div>
+
+      <section className="spa-mgmt-card overflow-hidden shadow-sm">
+        <div className="spa-mgmt-accent-bar" />
+        <div className="flex flex-col gap-3 p-4 sm:flex-row sm:flex-wrap sm:items-end">
+          <label className="flex min-w-[10rem] flex-1 flex-col gap-1.5 sm:max-w-[14rem]">
+            <span className={labelClass}>State</span>
+            <select
+              className={fieldClass}
+              value={filters.state}
+              onChange={(e) => setFilters((f) => ({ ...f, state: e.target.value }))}
+            >
+              <option value="">All states</option>
+              {(data?.states || []).map((st: string) => (
+                <option key={st} value={st}>
+                  {st}
+                </option>
+              ))}
+            </select>
+          </label>
+          <label className="flex min-w-[12rem] flex-1 flex-col gap-1.5 sm:max-w-[18rem]">
+            <span className={labelClass}>Type</span>
+            <select
+              className={fieldClass}
+              value={filters.job_type}
+              onChange={(e) => setFilters((f) => ({ ...f, job_type: e.target.value }))}
+            >
+              <option value="">All types</option>
+              {(data?.job_types || []).map((t: string) => (
+                <option key={t} value={t}>
+                  {t}
+                </option>
+              ))}
+            </select>
+          </label>
+          <button
+            type="button"
+            className="spa-mgmt-btn-primary px-4 py-2.5 text-sm"
+            onClick={() => void load()}
+          >
+            <i className="bi bi-arrow-clockwise" aria-hidden />
+            Refresh
+          </button>
+          {data && !data.embedded_worker ? (
+            <p className="mb-0 text-xs text-hub-muted">
+              Embedded worker is off — jobs run only when ops/run_background_worker.py or the cron drain runs.
+            </p>
+          ) : null}
+        </div>
+      </section>
+
+      {message ? <div className="alert alert-info">{message}</div> : null}
+
+      {loading ? (
+        <div className="spa-mgmt-card p-8 text-center text-hub-muted shadow-sm">Loading jobs…</div>
+      ) : error ? (
+        <div className="alert alert-danger">{error}</div>
+      ) : jobs.length === 0 ? (
+        <div className="spa-mgmt-card border-dashed px-6 py-12 text-center shadow-sm">
+          <i className="bi bi-inbox mb-2 text-2xl text-hub-muted" aria-hidden />
+          <p className="mb-0 font-semibold text-hub-text">No background jobs</p>
+        </div>
+      ) : (
+        <div className="spa-mgmt-card overflow-hidden shadow-sm">
+          <div className="overflow-x-auto">
+            <table className="w-full min-w-[64rem] border-collapse text-left text-sm">
+              <thead>
+                <tr className="border-b border-[var(--spa-mgmt-border)] bg-[color-mix(in_srgb,var(--spa-mgmt-accent-soft)_55%,var(--spa-mgmt-surface))]">
+                  {['Job', 'State', 'Attempts', 'Run after', 'Finished', 'Payload / error', ''].map((h) => (
+                    <th
+                      key={h}
+                      className="whitespace-nowrap px-4 py-3 text-xs font-bold uppercase tracking-wide text-hub-muted"
+                    >
+                      {h}
+                    </th>
+                  ))}
+                </tr>
+              </thead>
+              <tbody>
+                {jobs.map((job) => (
+                  <tr
+                    key={job.id}
+                    className="border-b border-[color-mix(in_srgb,var(--spa-mgmt-border)_70%,transparent)] last:border-b-0 hover:bg-[color-mix(in_srgb,var(--spa-mgmt-accent-soft)_40%,transparent)]"
+                  >
+                    <td className="px-4 py-3 align-top">
+                      <div className="font-mono text-xs font-semibold text-hub-text">{job.job_type}</div>
+                      <div className="text-xs text-hub-muted">
+                        #{job.id} · {formatWhen(job.created_at)}
+                        {job.created_by ? ` · ${job.created_by}` : ''}
+                      </div>
+                    </td>
+                    <td className="px-4 py-3 align-top">
+                      <span
+                        className={`inline-flex rounded-lg px-2.5 py-1 text-xs font-semibold ${
+                          JOB_STATE_TONE[job.state] || 'bg-slate-100 text-slate-700'
+                        }`}
+                      >
+                        {job.state}
+                      </span>
+                    </td>
+                    <td className="whitespace-nowrap px-4 py-3 align-top tabular-nums text-hub-muted">
+                      {job.attempts} / {job.max_attempts}
+                    </td>
+                    <td className="whitespace-nowrap px-4 py-3 align-top text-hub-muted">
+                      {formatWhen(job.run_after)}
+                    </td>
+                    <td className="whitespace-nowrap px-4 py-3 align-top text-hub-muted">
+                      {formatWhen(job.finished_at)}
+                    </td>
+                    <td className="max-w-md px-4 py-3 align-top text-xs leading-relaxed text-hub-muted">
+                      <div>{formatDetailsObject(job.payload || {})}</div>
+                      {job.last_error ? <div className="mt-1 text-rose-700">{job.last_error}</div> : null}
+                    </td>
+                    <td className="whitespace-nowrap px-4 py-3 align-top text-right">
+                      {job.state === 'failed' || job.state === 'cancelled' ? (
+                        <button
+                          type="button"
+                          className="spa-mgmt-btn-ghost px-3 py-1.5 text-xs disabled:opacity-50"
+                          disabled={busyId === job.id}
+                          onClick={() => void runAction(job.id, 'retry')}
+                        >
+                          Retry
+                        </button>
+                      ) : job.state === 'queued' ? (
+                        <button
+                          type="button"
+                          className="spa-mgmt-btn-ghost px-3 py-1.5 text-xs disabled:opacity-50"
+                          disabled={busyId === job.id}
+                          onClick={() => void runAction(job.id, 'cancel')}
+                        >
+                          Cancel
+                        </button>
+                      ) : null}
+                    </td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+        </div>
+      )}
+    </div>
+  )
+}
@@ -370,6 +370,29 @@ export function TechSystemPage() {
               </div>
             </article>
           </div>
+
+          {data.google_api && Object.keys(data.google_api).length > 0 ? (
+            <article className="spa-mgmt-card p-4 shadow-sm">
+              <h2 className="mb-1 text-sm font-bold text-hub-text">Google API throttling</h2>
+              <p className="mb-3 text-xs text-hub-muted">
+                Since this server process started. Rates drop on quota errors and recover on success.
+              </p>
+              <dl className="grid gap-3 sm:grid-cols-2 xl:grid-cols-4">
+                {Object.entries(data.google_api as Record<string, any>).map(([api, m]) => (
+                  <div key={api}>
+                    <dt className={labelClass}>{api}</dt>
+                    <dd className="mb-0 mt-1 text-sm font-semibold text-hub-text">
+                      {Math.round(m.calls ?? 0)} calls · {m.retries ?? 0} retries
+                    </dd>
+                    <dd className="mb-0 text-xs text-hub-muted">
+                      {m.quota_errors ?? 0} quota errors · {m.throttled_seconds ?? 0}s throttled
+                      {m.current_rate != null ? ` · ${m.current_rate}/${m.max_rate} req/s` : ''}
+                    </dd>
+                  </div>
+                ))}
+              </dl>
+            </article>
+          ) : null}
         </div>
       ) : tab === 'config' ? (
         <div className="grid gap-4 xl:grid-cols-2">
@@ -355,3 +355,32 @@ export interface ReportCardHistoryResponse {
   school_years: ReportCardStudentSchoolYear[]
   urls: { generate: string; hub: string }
 }
+
+export interface ReportCardExportPayload {
+  school_year_id: number
+  quarters: string[]
+  grade_level?: number | null
+  class_ids?: number[]
+  output_format?: 'zip' | 'pdf'
+  generate_missing?: boolean
+}
+
+export interface ReportCardExportJob {
+  id: number
+  status: 'queued' | 'running' | 'done' | 'failed'
+  school_year_id: number
+  quarters: string[]
+  grade_level: number | null
+  class_ids: number[]
+  output_format: 'zip' | 'pdf'
+  total: number
+  completed: number
+  failed: number
+  skipped: number
+  percent: number
+  errors: { student_id: number | null; student: string | null; error: string }[]
+  created_at: string | null
+  started_at: string | null
+  finished_at: string | null
+  download_url: string | null
+}
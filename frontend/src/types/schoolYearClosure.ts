@@ -82,6 +82,16 @@ export interface ClosureDashboardResponse {
     }[]
   } | null
   finalize_stats: Record<string, unknown> | null
+  finalize_progress?: {
+    step: 'report_cards' | 'archive'
+    running: boolean
+    started_at: string | null
+    heartbeat_at: string | null
+    total: number
+    processed: number
+    ok: number
+    errors: number
+  } | null
   eighth_grade_outcomes?: {
     students: Array<{
       id: number
@@ -50,6 +50,8 @@ export interface StudentFilters {
   sort: string
   order: string
   page: number
+  /** Keyset cursor for ``page`` ('' = first page); see StudentListResponse.pagination.next_cursor. */
+  cursor?: string
 }
 
 export interface StudentListResponse {
@@ -68,6 +70,8 @@ export interface StudentListResponse {
     pages: number
     has_next: boolean
     has_prev: boolean
+    mode?: 'page' | 'cursor'
+    next_cursor?: string | null
   }
   filters: StudentFilters
   meta: {
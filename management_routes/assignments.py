@@ -2838,10 +2838,9 @@ def export_quiz_to_google_forms(assignment_id):
 @management_required
 def sync_google_forms_submissions(assignment_id):
     """Sync submissions from a linked Google Form"""
-    from services.google_forms_service import get_google_forms_service, get_form_responses
-    from models import Student, Submission, Grade, Enrollment, User
-    from datetime import datetime
-    import json
+    from services.google_forms_service import get_google_forms_service
+    from services.google_forms_sync import sync_google_form_submissions
+    from models import User
     
     assignment = Assignment.query.get_or_404(assignment_id)
     
@@ -2863,71 +2862,16 @@ def sync_google_forms_submissions(assignment_id):
             flash('Failed to connect to Google Forms. Please check your Google account connection.', 'danger')
             return redirect(url_for('management.view_assignment', assignment_id=assignment_id))
         
-        # Get form responses
-        responses = get_form_responses(service, assignment.google_form_id)
-        if responses is None:
-            flash('Failed to retrieve form responses from Google Forms.', 'danger')
-            return redirect(url_for('management.view_assignment', assignment_id=assignment_id))
-        
-        # Get enrolled students for this class
-        enrollments = Enrollment.query.filter_by(class_id=assignment.class_id, is_active=True).all()
-        students_dict = {student.email.lower(): student for enrollment in enrollments 
-                        for student in [enrollment.student] if enrollment.student and enrollment.student.email}
-        
-        synced_count = 0
-        created_submissions = 0
-        
-        # Process each response
-        for response in responses:
-            # Get respondent email from response
-            # Google Forms responses have answers with respondentEmail field
-            respondent_email = response.get('respondentEmail', '').lower()
-            
-            if not respondent_email or respondent_email not in students_dict:
-                # Try to find by name or skip if not found
-                continue
-            
-            student = students_dict[respondent_email]
-            
-            # Get submission timestamp
-            create_time = response.get('createTime', '')
-            submitted_at = datetime.fromisoformat(create_time.replace('Z', '+00:00')) if create_time else datetime.utcnow()
-            
-            # Check if submission already exists
-            existing_submission = Submission.query.filter_by(
-                student_id=student.id,
-                assignment_id=assignment_id
-            ).first()
-            
-            if not existing_submission:
-                # Create new submission
-                submission = Submission(
-                    student_id=student.id,
-                    assignment_id=assignment_id,
-                    submitted_at=submitted_at,
-                    submission_type='online',
-                    comments=f'Synced from Google Form on {datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")}'
-                )
-                db.session.add(submission)
-                created_submissions += 1
-            else:
-                submission = existing_submission
-            
-            # Try to extract grade/score from response if available
-            # Google Forms quiz responses may have a score
-            answers = response.get('answers', {})
-            score = None
-            total_points = assignment.total_points or 100.0
-            
-            # Check if this is a quiz with grading
-            # Google Forms stores grades in a specific format - we'd need to check the form structure
-            # For now, we'll just create submissions and let teachers grade manually
-            
-            synced_count += 1
-        
-        db.session.commit()
-        
-        flash(f'Successfully synced {synced_count} submission(s) from Google Forms ({created_submissions} new).', 'success')
+        # Only responses newer than the assignment's watermark are fetched;
+        # posting full=1 re-scans every response (e.g. after late enrollments).
+        stats = sync_google_form_submissions(
+            assignment, service, full=request.form.get('full') == '1'
+        )
+        flash(
+            f"Synced {stats['matched']} submission(s) from Google Forms "
+            f"({stats['created_submissions']} new, {stats['fetched']} response(s) fetched).",
+            'success',
+        )
         
     except Exception as e:
         db.session.rollback()
@@ -97,12 +97,12 @@ def _attendance_analytics_context(request):
     if risk_filter not in ('all', 'high', 'medium'):
         risk_filter = 'all'
 
-    attendance_records = (
-        Attendance.query.options(joinedload(Attendance.student))
-        .filter(Attendance.date >= start_date, Attendance.date <= end_date)
-        .order_by(Attendance.student_id, Attendance.date)
-        .all()
-    )
+    from models import AttendanceDailyRollup, AttendanceStudentDayRollup
+    from services.attendance_streaks import absence_streaks
+    from sqlalchemy import case, func, or_
+
+    # Summary cards, trend and at-risk totals come from the maintained rollups
+    # (services/attendance_rollups.py), not from every Attendance row in the range.
 
     status_counts = {
         'present': 0,
@@ -114,60 +114,78 @@ def _attendance_analytics_context(request):
     }
     daily_buckets = defaultdict(lambda: {'total': 0, 'present': 0})
 
-    for record in attendance_records:
-        daily_buckets[record.date]['total'] += 1
-        if record.status == 'Present':
-            status_counts['present'] += 1
-            daily_buckets[record.date]['present'] += 1
-        elif record.status == 'Late':
-            status_counts['late'] += 1
-        elif record.status == 'Unexcused Absence':
-            status_counts['unexcused'] += 1
-        elif record.status == 'Excused Absence':
-            status_counts['excused'] += 1
-        elif record.status == 'Suspended':
-            status_counts['suspended'] += 1
-        else:
-            status_counts['other'] += 1
+    daily_rows = (
+        db.session.query(
+            AttendanceDailyRollup.date,
+            AttendanceDailyRollup.status_key,
+            AttendanceDailyRollup.record_count,
+        )
+        .filter(AttendanceDailyRollup.date >= start_date, AttendanceDailyRollup.date <= end_date)
+        .all()
+    )
+    for day, key, count in daily_rows:
+        status_counts[key if key in status_counts else 'other'] += count
+        daily_buckets[day]['total'] += count
+        if key == 'present':
+            daily_buckets[day]['present'] += count
+
+    sd = AttendanceStudentDayRollup
+    in_range = (sd.date >= start_date, sd.date <= end_date)
+    absent_sum = func.sum(sd.unexcused + sd.suspended)
+    late_sum = func.sum(sd.late)
+    absence_days = func.sum(
+        case(((sd.present + sd.late == 0) & (sd.unexcused + sd.excused + sd.suspended > 0), 1), else_=0)
+    )
+    students_tracked = (
+        db.session.query(func.count(func.distinct(sd.student_id))).filter(*in_range).scalar() or 0
+    )
+    # Only students that can reach a risk threshold; a 3-day streak needs 3 absence days.
+    candidates = (
+        db.session.query(
+            sd.student_id,
+            func.sum(sd.total),
+            func.sum(sd.present),
+            absent_sum,
+            late_sum,
+            func.sum(sd.excused),
+        )
+        .filter(*in_range)
+        .group_by(sd.student_id)
+        .having(or_(absent_sum >= 3, late_sum >= 5, absence_days >= 3))
+        .all()
+    )
 
-    student_patterns = defaultdict(lambda: {
-        'total_days': 0,
-        'present': 0,
-        'absent': 0,
-        'late': 0,
-        'excused': 0,
-        'consecutive_absences': 0,
-        'max_consecutive_absences': 0,
-    })
-
-    records_by_student = defaultdict(list)
-    for record in attendance_records:
-        records_by_student[record.student_id].append(record)
-
-    for student_id, records in records_by_student.items():
-        pattern = student_patterns[student_id]
-        for record in sorted(records, key=lambda r: r.date):
-            pattern['total_days'] += 1
-            if record.status == 'Present':
-                pattern['present'] += 1
-                pattern['consecutive_absences'] = 0
-            elif record.status == 'Late':
-                pattern['late'] += 1
-                pattern['consecutive_absences'] = 0
-            elif record.status == 'Excused Absence':
-                pattern['excused'] += 1
-                pattern['consecutive_absences'] += 1
-            elif record.status in ('Unexcused Absence', 'Suspended'):
-                pattern['absent'] += 1
-                pattern['consecutive_absences'] += 1
-            if pattern['consecutive_absences'] > pattern['max_consecutive_absences']:
-                pattern['max_consecutive_absences'] = pattern['consecutive_absences']
+    student_patterns = {}
+    for student_id, total, present, absent, late, excused in candidates:
+        student_patterns[student_id] = {
+            'total_days': int(total or 0),
+            'present': int(present or 0),
+            'absent': int(absent or 0),
+            'late': int(late or 0),
+            'excused': int(excused or 0),
+            'consecutive_absences': 0,
+            'max_consecutive_absences': 0,
+        }
+
+    # Streaks come from one gaps-and-islands query (cached per range).
+    streaks = absence_streaks(start_date, end_date, student_ids=student_patterns)
+    for student_id, pattern in student_patterns.items():
+        streak = streaks.get(student_id)
+        if streak is not None:
+            pattern['consecutive_absences'] = streak.current
+            pattern['max_consecutive_absences'] = streak.longest
+
+    students_by_id = {}
+    candidate_ids = list(student_patterns)
+    for i in range(0, len(candidate_ids), 500):
+        for student in Student.query.filter(Student.id.in_(candidate_ids[i:i + 500])):
+            students_by_id[student.id] = student
 
     at_risk_students = []
     for student_id, pattern in student_patterns.items():
         if pattern['absent'] < 3 and pattern['late'] < 5 and pattern['max_consecutive_absences'] < 3:
             continue
-        student = records_by_student[student_id][0].student if records_by_student[student_id] else Student.query.get(student_id)
+        student = students_by_id.get(student_id)
         if not student:
             continue
         attendance_rate = (pattern['present'] / pattern['total_days'] * 100) if pattern['total_days'] > 0 else 0
@@ -193,10 +211,9 @@ def _attendance_analytics_context(request):
     if risk_filter != 'all':
         at_risk_students = [s for s in at_risk_students if s['risk_level'] == risk_filter]
 
-    total_records = len(attendance_records)
+    total_records = sum(status_counts.values())
     present_count = status_counts['present']
     overall_rate = round((present_count / total_records * 100), 1) if total_records > 0 else 0
-    students_tracked = len(student_patterns)
 
     daily_trend = []
     cursor = start_date
@@ -328,26 +345,13 @@ def mark_all_present(class_id):
 
         teacher_id = getattr(current_user, 'teacher_staff_id', None)
 
-        for student in students:
-            existing_attendance = Attendance.query.filter_by(
-                class_id=class_id,
-                student_id=student.id,
-                date=attendance_date
-            ).first()
-
-            if existing_attendance:
-                existing_attendance.status = 'Present'
-                existing_attendance.teacher_id = teacher_id
-            else:
-                new_attendance = Attendance(
-                    class_id=class_id,
-                    student_id=student.id,
-                    date=attendance_date,
-                    status='Present',
-                    teacher_id=teacher_id
-                )
-                db.session.add(new_attendance)
-
+        from services.attendance_writes import save_class_attendance
+        save_class_attendance(
+            class_id,
+            attendance_date,
+            [{'student_id': student.id, 'status': 'Present'} for student in students],
+            teacher_id=teacher_id,
+        )
         db.session.commit()
         flash('All students marked as present!', 'success')
         return redirect(url_for('management.unified_attendance', class_date=date_str, date=date_str))
@@ -386,42 +390,21 @@ def unified_attendance():
         from utils.student_roster import active_roster_students_query
         students = active_roster_students_query(require_active_enrollment=False).all()
         
-        # Process attendance records
-        updated_count = 0
-        created_count = 0
-        
+        # Process attendance records (one upsert for the whole roster)
+        entries = []
         for student in students:
-            student_id = student.id
-            status = request.form.get(f'status-{student_id}')
-            notes = request.form.get(f'notes-{student_id}', '').strip()
-            
+            status = request.form.get(f'status-{student.id}')
             if status:
-                # Check if record already exists
-                existing_record = SchoolDayAttendance.query.filter_by(
-                    student_id=student_id,
-                    date=attendance_date
-                ).first()
-                
-                if existing_record:
-                    # Update existing record
-                    existing_record.status = status
-                    existing_record.notes = notes
-                    existing_record.recorded_by = current_user.id
-                    existing_record.updated_at = datetime.utcnow()
-                    updated_count += 1
-                else:
-                    # Create new record
-                    new_record = SchoolDayAttendance(
-                        student_id=student_id,
-                        date=attendance_date,
-                        status=status,
-                        notes=notes,
-                        recorded_by=current_user.id
-                    )
-                    db.session.add(new_record)
-                    created_count += 1
+                entries.append({
+                    'student_id': student.id,
+                    'status': status,
+                    'notes': request.form.get(f'notes-{student.id}', '').strip(),
+                })
         
         try:
+            from services.attendance_writes import upsert_school_day_attendance
+            counts = upsert_school_day_attendance(attendance_date, entries, recorded_by=current_user.id)
+            created_count, updated_count = counts['created'], counts['updated']
             db.session.commit()
             if created_count > 0 and updated_count > 0:
                 flash(f'Successfully recorded attendance for {created_count} students and updated {updated_count} existing records.', 'success')
@@ -631,42 +614,21 @@ def school_day_attendance():
         from utils.student_roster import active_roster_students_query
         students = active_roster_students_query(require_active_enrollment=False).all()
         
-        # Process attendance records
-        updated_count = 0
-        created_count = 0
-        
+        # Process attendance records (one upsert for the whole roster)
+        entries = []
         for student in students:
-            student_id = student.id
-            status = request.form.get(f'status_{student_id}')
-            notes = request.form.get(f'notes_{student_id}', '').strip()
-            
+            status = request.form.get(f'status_{student.id}')
             if status:
-                # Check if record already exists
-                existing_record = SchoolDayAttendance.query.filter_by(
-                    student_id=student_id,
-                    date=attendance_date
-                ).first()
-                
-                if existing_record:
-                    # Update existing record
-                    existing_record.status = status
-                    existing_record.notes = notes
-                    existing_record.recorded_by = current_user.id
-                    existing_record.updated_at = datetime.utcnow()
-                    updated_count += 1
-                else:
-                    # Create new record
-                    new_record = SchoolDayAttendance(
-                        student_id=student_id,
-                        date=attendance_date,
-                        status=status,
-                        notes=notes,
-                        recorded_by=current_user.id
-                    )
-                    db.session.add(new_record)
-                    created_count += 1
+                entries.append({
+                    'student_id': student.id,
+                    'status': status,
+                    'notes': request.form.get(f'notes_{student.id}', '').strip(),
+                })
         
         try:
+            from services.attendance_writes import upsert_school_day_attendance
+            counts = upsert_school_day_attendance(attendance_date, entries, recorded_by=current_user.id)
+            created_count, updated_count = counts['created'], counts['updated']
             db.session.commit()
             if created_count > 0 and updated_count > 0:
                 flash(f'Successfully recorded attendance for {created_count} students and updated {updated_count} existing records.', 'success')
@@ -861,10 +823,9 @@ def _attendance_report_filters(start_date, end_date, student_ids, class_ids, sta
     return filters
 
 
-def _attendance_reports_context(request, form_action=None, embed_tab=False):
-    """Build filtered, paginated attendance report data (defaults to last 30 days)."""
+def _attendance_report_params(request):
+    """(start_date, end_date, student_ids, class_ids, status) from the reports query string."""
     from datetime import datetime, timedelta
-    from urllib.parse import urlencode
 
     today = datetime.now().date()
     start_str = (request.args.get('start_date') or '').strip()
@@ -907,6 +868,16 @@ def _attendance_reports_context(request, form_action=None, embed_tab=False):
         class_ids = _parse_id_list([request.args.get('class_id')])
 
     status = (request.args.get('status') or '').strip()
+    return start_date, end_date, student_ids, class_ids, status
+
+
+def _attendance_reports_context(request, form_action=None, embed_tab=False):
+    """Build filtered, paginated attendance report data (defaults to last 30 days)."""
+    from datetime import datetime, timedelta
+    from urllib.parse import urlencode
+
+    today = datetime.now().date()
+    start_date, end_date, student_ids, class_ids, status = _attendance_report_params(request)
     page = max(1, request.args.get('page', 1, type=int))
 
     filters = _attendance_report_filters(start_date, end_date, student_ids, class_ids, status)
@@ -1014,6 +985,40 @@ def _attendance_reports_context(request, form_action=None, embed_tab=False):
     }
 
 
+# ============================================================
+# Route: /attendance/reports/export.csv
+# Function: export_attendance_csv
+# ============================================================
+
+@bp.route('/attendance/reports/export.csv')
+@login_required
+@management_required
+def export_attendance_csv():
+    """Stream the filtered attendance report as CSV (``kind=school_day`` for school-day records)."""
+    from flask import stream_with_context
+    from services.attendance_export import iter_class_attendance_csv, iter_school_day_attendance_csv
+
+    start_date, end_date, student_ids, class_ids, status = _attendance_report_params(request)
+    if request.args.get('kind') == 'school_day':
+        rows = iter_school_day_attendance_csv(start_date, end_date, student_ids=student_ids, status=status)
+        prefix = 'school_day_attendance'
+    else:
+        rows = iter_class_attendance_csv(
+            start_date, end_date, student_ids=student_ids, class_ids=class_ids, status=status
+        )
+        prefix = 'attendance'
+    filename = f'{prefix}_{start_date.isoformat()}_to_{end_date.isoformat()}.csv'
+    return Response(
+        stream_with_context(rows),
+        mimetype='text/csv',
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            # Let proxies pass chunks through instead of buffering the whole export.
+            'X-Accel-Buffering': 'no',
+        },
+    )
+
+
 # ============================================================
 # Route: /attendance/reports
 # Function: attendance_reports
@@ -10,6 +10,7 @@ from flask_login import current_user
 
 from extensions import db
 from models import Attendance, Class, Enrollment, SchoolDayAttendance, Student
+from services.attendance_writes import save_class_attendance, upsert_school_day_attendance
 from utils.school_year_filters import classes_for_active_school_year, get_active_school_year
 
 
@@ -399,9 +400,7 @@ def save_school_day_attendance(attendance_date_str: str, entries: list[dict[str,
     except ValueError:
         return {"success": False, "message": "Invalid date format."}
 
-    updated_count = 0
-    created_count = 0
-
+    rows = []
     for entry in entries:
         student_id = entry.get("student_id")
         status = (entry.get("status") or "").strip()
@@ -411,31 +410,11 @@ def save_school_day_attendance(attendance_date_str: str, entries: list[dict[str,
             continue
         if status not in SCHOOL_DAY_STATUSES:
             return {"success": False, "message": f"Invalid status: {status}"}
-
-        existing_record = SchoolDayAttendance.query.filter_by(
-            student_id=student_id,
-            date=attendance_date,
-        ).first()
-
-        if existing_record:
-            existing_record.status = status
-            existing_record.notes = notes
-            existing_record.recorded_by = current_user.id
-            existing_record.updated_at = datetime.utcnow()
-            updated_count += 1
-        else:
-            db.session.add(
-                SchoolDayAttendance(
-                    student_id=student_id,
-                    date=attendance_date,
-                    status=status,
-                    notes=notes,
-                    recorded_by=current_user.id,
-                )
-            )
-            created_count += 1
+        rows.append({"student_id": int(student_id), "status": status, "notes": notes})
 
     try:
+        counts = upsert_school_day_attendance(attendance_date, rows, recorded_by=current_user.id)
+        created_count, updated_count = counts["created"], counts["updated"]
         db.session.commit()
     except Exception as exc:
         db.session.rollback()
@@ -484,28 +463,13 @@ def mark_class_all_present(class_id: int, date_str: str) -> dict[str, Any]:
     students = [enrollment.student for enrollment in enrollments if enrollment.student is not None]
     teacher_id = getattr(current_user, "teacher_staff_id", None)
 
-    for student in students:
-        existing_attendance = Attendance.query.filter_by(
-            class_id=class_id,
-            student_id=student.id,
-            date=attendance_date,
-        ).first()
-
-        if existing_attendance:
-            existing_attendance.status = "Present"
-            existing_attendance.teacher_id = teacher_id
-        else:
-            db.session.add(
-                Attendance(
-                    class_id=class_id,
-                    student_id=student.id,
-                    date=attendance_date,
-                    status="Present",
-                    teacher_id=teacher_id,
-                )
-            )
-
     try:
+        save_class_attendance(
+            class_id,
+            attendance_date,
+            [{"student_id": student.id, "status": "Present"} for student in students],
+            teacher_id=teacher_id,
+        )
         db.session.commit()
     except Exception as exc:
         db.session.rollback()
@@ -608,7 +572,13 @@ def save_take_class_attendance(
         return {"success": False, "message": "Cannot record attendance for a future date."}
 
     teacher_id = getattr(current_user, "teacher_staff_id", None)
-    saved = 0
+    enrolled_ids = {
+        sid
+        for (sid,) in db.session.query(Enrollment.student_id).filter(
+            Enrollment.class_id == class_id, Enrollment.is_active.is_(True)
+        )
+    }
+    rows = []
     for entry in entries:
         if not isinstance(entry, dict):
             continue
@@ -619,38 +589,14 @@ def save_take_class_attendance(
             continue
         if status not in VALID_ATTENDANCE_STATUSES:
             continue
-        enrollment = Enrollment.query.filter_by(
-            student_id=int(student_id),
-            class_id=class_id,
-            is_active=True,
-        ).first()
-        if not enrollment:
+        if int(student_id) not in enrolled_ids:
             continue
-        record = Attendance.query.filter_by(
-            student_id=int(student_id),
-            class_id=class_id,
-            date=attendance_date,
-        ).first()
-        if record:
-            record.status = status
-            record.notes = notes
-            record.teacher_id = teacher_id
-        else:
-            db.session.add(
-                Attendance(
-                    student_id=int(student_id),
-                    class_id=class_id,
-                    date=attendance_date,
-                    status=status,
-                    notes=notes,
-                    teacher_id=teacher_id,
-                )
-            )
-        saved += 1
+        rows.append({"student_id": int(student_id), "status": status, "notes": notes})
 
-    if not saved:
+    if not rows:
         return {"success": False, "message": "No attendance rows were saved."}
     try:
+        save_class_attendance(class_id, attendance_date, rows, teacher_id=teacher_id)
         db.session.commit()
     except Exception as exc:
         db.session.rollback()
@@ -989,7 +989,8 @@ def google_classroom_action(class_id: int, action: str, google_classroom_id: str
         if action == "link" and google_classroom_id:
             class_obj.google_classroom_id = str(google_classroom_id).strip()
             db.session.commit()
-        ok = provision_and_sync_class_google_classroom(class_id)
+        # An explicit Sync also repairs drift made directly in Classroom.
+        ok = provision_and_sync_class_google_classroom(class_id, force=True)
         db.session.refresh(class_obj)
         if not ok or not class_obj.google_classroom_id:
             return {
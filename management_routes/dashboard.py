@@ -6,13 +6,12 @@ from flask import Blueprint, render_template, request, flash, redirect, url_for,
 from flask_login import login_required, current_user
 from decorators import management_required, permissions_required
 from models import (
-    db, Student, TeacherStaff, Class, Assignment, Grade, Submission, Notification, Enrollment, Attendance, AssignmentRedo, AssignmentReopening,
+    TeacherStaff, Class, Assignment, Grade, Submission, Notification, Enrollment, AssignmentRedo, AssignmentReopening,
     User, ExtensionRequest, SchoolYear
 )
 from sqlalchemy import or_, and_
 from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
-import json
 from .utils import update_assignment_statuses
 from utils.user_roles import user_has_management_entry_access
 
@@ -109,29 +108,15 @@ def build_management_home_payload():
                 None,
             )
 
-        year_classes = Class.query.filter_by(school_year_id=active_school_year.id).all()
-        year_class_ids = [c.id for c in year_classes]
-        # Active students in the current school year (not every Student row in the DB).
-        from utils.student_roster import active_roster_student_filters
-
-        if year_class_ids:
-            active_year_students = (
-                db.session.query(Student.id)
-                .filter(active_roster_student_filters())
-                .join(Enrollment, Enrollment.student_id == Student.id)
-                .filter(
-                    Enrollment.is_active.is_(True),
-                    Enrollment.class_id.in_(year_class_ids),
-                )
-                .distinct()
-                .count()
-            )
-        else:
-            active_year_students = 0
+        # Enrolled students, attendance and grade totals: one maintained snapshot row
+        # (services/dashboard_counters.py) instead of scanning every grade / record.
+        from services.dashboard_counters import dashboard_averages, get_dashboard_counters
+
+        counters = get_dashboard_counters(active_school_year.id)
         stats = {
-            "students": active_year_students,
+            "students": counters.enrolled_students,
             "teachers": TeacherStaff.query.filter(TeacherStaff.is_deleted == False).count(),
-            "classes": len(year_classes),
+            "classes": Class.query.filter_by(school_year_id=active_school_year.id).count(),
             "assignments": Assignment.query.filter_by(school_year_id=active_school_year.id).count(),
             "active_assignments": Assignment.query.filter(
                 Assignment.status == "Active",
@@ -161,32 +146,9 @@ def build_management_home_payload():
             Assignment.due_date < week_end,
         ).count()
 
-        try:
-            total_attendance_records = Attendance.query.count()
-            present_records = Attendance.query.filter_by(status="Present").count()
-            attendance_rate = (
-                round((present_records / total_attendance_records * 100), 1)
-                if total_attendance_records > 0
-                else 0
-            )
-        except Exception as e:
-            current_app.logger.warning(f"Error calculating attendance rate: {e}")
-            attendance_rate = 0
-
-        grades = Grade.query.all()
-        average_grade = 0
-        if grades:
-            total_score = 0
-            valid_grades = 0
-            for grade in grades:
-                try:
-                    grade_data = json.loads(grade.grade_data)
-                    if "score" in grade_data and isinstance(grade_data["score"], (int, float)):
-                        total_score += grade_data["score"]
-                        valid_grades += 1
-                except (json.JSONDecodeError, TypeError, KeyError):
-                    continue
-            average_grade = round(total_score / valid_grades, 1) if valid_grades > 0 else 0
+        averages = dashboard_averages(counters)
+        attendance_rate = averages["attendance_rate"]
+        average_grade = averages["average_grade"]
 
         monthly_stats = {
             "new_students": new_enrollments,
@@ -22,6 +22,7 @@ from management_routes.reports import (
     persist_report_card_record,
 )
 from management_routes.students import _calculate_expected_grad_date
+from services.report_card_pdf import invalidate_report_card_pdf
 from utils.report_card_portal import (
     count_pending_parent_approval,
     is_official_report_card,
@@ -660,6 +661,7 @@ def delete_report_card_record(report_card_id: int) -> dict[str, Any]:
     try:
         db.session.delete(report_card)
         db.session.commit()
+        invalidate_report_card_pdf(report_card_id)
         return {
             "success": True,
             "message": f"Report card deleted for {student_name} ({quarter}).",
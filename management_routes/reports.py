@@ -4,6 +4,7 @@ Reports routes for management users.
 
 import json
 from datetime import datetime, timedelta
+from pathlib import Path
 from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, Response, abort, jsonify
 from flask_login import login_required, current_user
 from decorators import admin_required, management_required, permissions_required
@@ -21,6 +22,7 @@ from utils.report_card_school_year import (
     grade_level_for_school_year,
     record_student_school_year_grade,
 )
+from services.report_card_pdf import invalidate_report_card_pdf
 from utils.user_roles import canonical_role_label
 from utils.report_card_warnings import (
     report_card_unfinalized_banner_message,
@@ -1122,12 +1124,8 @@ def _report_card_pdf_grade_level(student, report_card_data, school_year=None):
 
 
 
-def build_report_card_pdf_response(report_card):
-    """Render a stored report card snapshot as a PDF download response."""
-    from weasyprint import HTML
-    from io import BytesIO
-    from flask import make_response
-
+def render_report_card_html(report_card):
+    """Render a stored report card snapshot to self-contained HTML for WeasyPrint."""
     student = report_card.student
     
     # Parse report card data
@@ -1155,18 +1153,18 @@ def build_report_card_pdf_response(report_card):
         comments_by_class = {}
 
     # Build class list early — needed to normalize JSON snapshot keys (string id / class name)
-    class_objects = []
     class_ids_int = []
-    if selected_classes:
-        for class_id in selected_classes:
-            try:
-                cid = int(class_id)
-            except (TypeError, ValueError):
-                continue
-            class_ids_int.append(cid)
-            class_obj = Class.query.get(cid)
-            if class_obj:
-                class_objects.append(class_obj)
+    for class_id in selected_classes or []:
+        try:
+            class_ids_int.append(int(class_id))
+        except (TypeError, ValueError):
+            continue
+    class_objects = []
+    if class_ids_int:
+        classes_by_id = {
+            c.id: c for c in Class.query.filter(Class.id.in_(set(class_ids_int))).all()
+        }
+        class_objects = [classes_by_id[cid] for cid in class_ids_int if cid in classes_by_id]
 
     from utils.quarter_grade_calculator import get_quarter_grades_for_report
     fresh_grades_by_quarter = get_quarter_grades_for_report(
@@ -1325,62 +1323,46 @@ def build_report_card_pdf_response(report_card):
         **elementary_extras,
     )
     
-    # Read CSS file from filesystem and inject it into the HTML
-    import os
-    css_path = os.path.join(current_app.root_path, 'static', 'report_card_styles.css')
-    try:
-        with open(css_path, 'r', encoding='utf-8') as f:
-            css_content = f.read()
-        # Inject CSS into the HTML (replace the link tag with embedded style)
-        html_content = html_content.replace(
-            '<link rel="stylesheet" href="{{ url_for(\'static\', filename=\'report_card_styles.css\') }}">',
-            f'<style>{css_content}</style>'
-        )
-        # Also handle already-rendered link tags
-        import re
-        html_content = re.sub(
-            r'<link rel="stylesheet" href="[^"]*report_card_styles\.css[^"]*">',
-            f'<style>{css_content}</style>',
-            html_content
-        )
-    except Exception as e:
-        current_app.logger.warning(f'Could not load CSS file: {str(e)}')
-    
-    # Read logo file and convert to base64 for embedding
-    logo_path = os.path.join(current_app.root_path, 'static', 'img', 'clara_logo.png')
-    try:
-        import base64
-        with open(logo_path, 'rb') as f:
-            logo_data = base64.b64encode(f.read()).decode('utf-8')
-        # Replace logo src with base64 data
-        html_content = re.sub(
-            r'<img src="[^"]*clara_logo\.png[^"]*"',
-            f'<img src="data:image/png;base64,{logo_data}"',
-            html_content
-        )
-    except Exception as e:
-        current_app.logger.warning(f'Could not load logo file: {str(e)}')
-    
-    # Ensure any remaining /static asset URLs resolve without HTTP fetches.
+    # The stylesheet <link> and static assets (logo) point at files on disk; the render
+    # pool serves report_card_styles.css from memory and decodes the logo once per
+    # process instead of both being inlined into every card.
+    return localize_static_urls(html_content)
+
+
+def localize_static_urls(html_content):
+    """Point /static/ hrefs and srcs at files on disk so WeasyPrint never fetches over HTTP."""
+    static_uri = Path(current_app.root_path, 'static').resolve().as_uri()
+    html_content = html_content.replace('href="/static/', f'href="{static_uri}/')
+    return html_content.replace('src="/static/', f'src="{static_uri}/')
+
+
+def report_card_pdf_filename(report_card):
+    """Download filename for a report card PDF."""
+    student = report_card.student
+    return f"ReportCard_{student.first_name}_{student.last_name}_{report_card.school_year.name.replace('/', '_')}_{report_card.quarter}.pdf"
+
+
+def build_report_card_pdf_response(report_card):
+    """
+    Stream a stored report card snapshot as a PDF download.
+
+    Cached renders are served from disk; cold renders run in the PDF render pool
+    (services.report_card_pdf) and fall back to a 202 auto-refresh page if they
+    outlast the request budget.
+    """
+    from services.report_card_pdf import (
+        PdfRenderPending,
+        pdf_file_response,
+        pdf_pending_response,
+        render_report_card_pdf,
+    )
+
+    html_content = render_report_card_html(report_card)
     try:
-        static_root = os.path.join(current_app.root_path, 'static').replace('\\', '/')
-        html_content = re.sub(r'href=\"/static/', f'href=\"file:///{static_root}/', html_content)
-        html_content = re.sub(r'src=\"/static/', f'src=\"file:///{static_root}/', html_content)
-    except Exception:
-        pass
-
-    # Generate PDF
-    pdf_buffer = BytesIO()
-    HTML(string=html_content, base_url=current_app.root_path).write_pdf(pdf_buffer)
-    pdf_buffer.seek(0)
-    
-    # Create response
-    response = make_response(pdf_buffer.getvalue())
-    response.headers['Content-Type'] = 'application/pdf'
-    filename = f"ReportCard_{student.first_name}_{student.last_name}_{report_card.school_year.name.replace('/', '_')}_{report_card.quarter}.pdf"
-    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    return response
+        pdf_path = render_report_card_pdf(report_card, html_content, base_url=current_app.root_path)
+    except PdfRenderPending:
+        return pdf_pending_response()
+    return pdf_file_response(pdf_path, report_card_pdf_filename(report_card))
 
 
 @bp.route('/report/card/pdf/<int:report_card_id>')
@@ -1489,6 +1471,7 @@ def delete_report_card(report_card_id):
         
         db.session.delete(report_card)
         db.session.commit()
+        invalidate_report_card_pdf(report_card_id)
         
         flash(f'Report card deleted successfully for {student_name} ({quarter}).', 'success')
     except Exception as e:
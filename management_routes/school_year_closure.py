@@ -440,6 +440,14 @@ def finalize_now(closure_id: int):
         current_app.logger.exception("Manual finalize failed for closure %s", closure_id)
         flash(f'Finalize failed: {exc}', 'danger')
         return _back_to_dashboard(closure_id)
+    if not stats.get('complete'):
+        flash(
+            f"Finalize in progress: {stats.get('students_processed', 0)} of "
+            f"{stats.get('students_total', 0)} students processed. "
+            "It continues in the background; refresh to follow progress.",
+            'info',
+        )
+        return _back_to_dashboard(closure_id)
     flash(
         f"School year finalized. "
         f"Report cards saved: {stats.get('report_cards_ok', 0)}; "
@@ -269,6 +269,7 @@ def query_closure_dashboard(closure_id: int) -> dict[str, Any]:
         "events": [_serialize_event(e) for e in events],
         "checklist": checklist,
         "finalize_stats": finalize_stats,
+        "finalize_progress": syc.finalize_progress_payload(closure),
         "eighth_grade_outcomes": {
             "students": eighth_graders,
             "counts": intent_counts,
@@ -340,6 +341,15 @@ def run_closure_action(closure_id: int, action: str, body: dict[str, Any], actor
         if (body.get("confirm") or "").strip() != "FINALIZE NOW":
             raise ValueError("You must type FINALIZE NOW exactly to confirm.")
         stats = syc.finalize_closure(closure, triggered_by="manual", actor=actor)
+        if not stats.get("complete"):
+            return {
+                "success": True,
+                "message": (
+                    f"Finalize in progress: {stats.get('students_processed', 0)} of "
+                    f"{stats.get('students_total', 0)} students processed. "
+                    "It continues in the background; refresh to follow progress."
+                ),
+            }
         return {
             "success": True,
             "message": (
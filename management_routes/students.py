@@ -14,10 +14,11 @@ from models import (
 )
 from werkzeug.security import generate_password_hash
 from werkzeug.utils import secure_filename
-from sqlalchemy import or_, and_, text, exists
+from sqlalchemy import or_, and_, text, exists, func
 from datetime import datetime, timedelta, date
 import os
 import json
+import base64
 import csv
 import io
 import uuid
@@ -89,7 +90,7 @@ def _remove_uploaded_student_photo(filename: str) -> None:
 from utils.credential_modal import student_grade3_plus_modal_payload, student_k2_modal_payload
 from utils.parent_portal import parent_portal_status_for_student, sync_student_parent_portal
 from services.google_directory_service import suspend_user
-from services.google_sync_tasks import sync_single_user_to_google
+from services.google_sync_tasks import enqueue_google_user_sync
 from utils.google_workspace_passwords import new_google_workspace_initial_password
 from utils.student_login_policy import google_workspace_sync_should_skip_student
 
@@ -204,6 +205,11 @@ def _parse_students_list_args(args) -> dict:
 def _students_search_filter(search_query: str, search_type: str):
     if not search_query:
         return None
+    from services.student_search import student_search_filter
+
+    indexed = student_search_filter(search_query, search_type)
+    if indexed is not None:
+        return indexed
     q = f"%{search_query}%"
     if search_type in ("all", ""):
         return db.or_(
@@ -297,7 +303,6 @@ def _students_list_query(params: dict):
 
     _has_login = exists().where(User.student_id == Student.id)
     new_account_cutoff = _new_student_account_cutoff()
-    joined_user_for_new_accounts = False
     if status_filter == "has_account":
         query = query.filter(_has_login)
     elif status_filter == "no_account":
@@ -307,41 +312,86 @@ def _students_list_query(params: dict):
         query = query.join(User, User.student_id == Student.id).filter(
             User.created_at >= new_account_cutoff
         )
-        joined_user_for_new_accounts = True
 
+    return query.order_by(*(
+        expr.desc() if descending else expr.asc()
+        for expr, descending in _students_sort_keys(params)
+    ))
+
+
+def _students_sort_keys(params: dict) -> list[tuple]:
+    """
+    ORDER BY for the list as ``(expression, descending)`` pairs, always ending in
+    ``Student.id`` so the order is total (stable OFFSET pages, unambiguous cursors).
+    Nullable columns sort through COALESCE so NULLs land in the same place on every
+    database and compare normally in keyset predicates.
+    """
     sort_by = params.get("sort") or "name"
-    sort_order = params.get("order") or "asc"
-    # New-accounts view defaults to newest login first (name sort still used as tie-breaker).
-    if joined_user_for_new_accounts and sort_by == "name":
-        query = query.order_by(
-            User.created_at.desc(),
-            Student.last_name,
-            Student.first_name,
-        )
-    elif sort_by == "name":
-        if sort_order == "desc":
-            query = query.order_by(Student.last_name.desc(), Student.first_name.desc())
-        else:
-            query = query.order_by(Student.last_name, Student.first_name)
+    desc = (params.get("order") or "asc") == "desc"
+    last_name = Student.last_name
+    first_name = Student.first_name
+    if params.get("status") == "new_accounts" and sort_by == "name":
+        # New-accounts view defaults to newest login first (name sort still used as tie-breaker).
+        keys = [(User.created_at, True), (last_name, False), (first_name, False)]
     elif sort_by == "grade":
-        if sort_order == "desc":
-            query = query.order_by(Student.grade_level.desc(), Student.last_name, Student.first_name)
-        else:
-            query = query.order_by(Student.grade_level, Student.last_name, Student.first_name)
+        keys = [(func.coalesce(Student.grade_level, -100), desc), (last_name, False), (first_name, False)]
     elif sort_by == "id":
-        if sort_order == "desc":
-            query = query.order_by(Student.student_id.desc())
-        else:
-            query = query.order_by(Student.student_id)
+        keys = [(func.coalesce(Student.student_id, ""), desc)]
     elif sort_by in ("gpa", "gpa_desc"):
-        if sort_by == "gpa_desc" or sort_order == "desc":
-            query = query.order_by(Student.gpa.desc(), Student.last_name, Student.first_name)
-        else:
-            query = query.order_by(Student.gpa, Student.last_name, Student.first_name)
+        keys = [
+            (func.coalesce(Student.gpa, -1.0), sort_by == "gpa_desc" or desc),
+            (last_name, False),
+            (first_name, False),
+        ]
+    elif sort_by == "name":
+        keys = [(last_name, desc), (first_name, desc)]
+    elif sort_by == "relevance" and params.get("search"):
+        from services.student_search import relevance_sort_expr
+
+        rank = relevance_sort_expr(params["search"], params.get("search_type") or "all")
+        keys = [(rank, False)] if rank is not None else [(last_name, False), (first_name, False)]
     else:
-        query = query.order_by(Student.last_name, Student.first_name)
+        keys = [(last_name, False), (first_name, False)]
+    last_desc = keys[-1][1] if sort_by in ("name", "id") else False
+    return keys + [(Student.id, last_desc)]
+
 
-    return query
+def _keyset_after(keys: list[tuple], values: list):
+    """Rows strictly after ``values`` in the ``keys`` order (mixed directions allowed)."""
+    clauses = []
+    for i, (expr, descending) in enumerate(keys):
+        beyond = expr < values[i] if descending else expr > values[i]
+        clauses.append(and_(*(k[0] == v for k, v in zip(keys[:i], values[:i])), beyond))
+    return or_(*clauses)
+
+
+def _encode_students_cursor(params: dict, values: list) -> str:
+    payload = {
+        "s": params.get("sort") or "name",
+        "o": params.get("order") or "asc",
+        "k": [{"t": v.isoformat()} if isinstance(v, datetime) else v for v in values],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_students_cursor(params: dict, token: str, key_count: int) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = [
+            datetime.fromisoformat(v["t"]) if isinstance(v, dict) else v
+            for v in payload["k"]
+        ]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid students list cursor.") from None
+    if (
+        payload.get("s") != (params.get("sort") or "name")
+        or payload.get("o") != (params.get("order") or "asc")
+        or len(values) != key_count
+    ):
+        raise ValueError("Cursor does not match the current sort; start from the first page.")
+    return values
 
 
 def serialize_student_list_item(student: Student) -> dict:
@@ -394,46 +444,84 @@ def serialize_student_list_item(student: Student) -> dict:
     }
 
 
-def query_students_list(args) -> dict:
+def query_students_list(args, *, allow_cursor: bool = True) -> dict:
+    """
+    One page of the students list plus header counts.
+
+    ``?cursor=`` (empty for the first page, then ``pagination.next_cursor``) switches to
+    keyset paging on the active sort columns plus id, so every page costs the same at
+    any depth; ``?page=`` keeps OFFSET paging (always, with ``allow_cursor=False`` for the
+    server-rendered view, which needs a Pagination object). Counts come
+    from ``services.student_list_stats`` (one cached aggregate per roster version).
+    Raises ValueError for a malformed or mismatched cursor.
+    """
     # Keep stored Student.gpa aligned with active year so alert filters / GPA sort / stats match the UI.
     try:
-        from utils.student_gpa import sync_active_year_gpas
+        from utils.student_gpa import queue_active_year_gpa_sync
 
-        sync_active_year_gpas(commit=True)
+        queue_active_year_gpa_sync()
     except Exception:
-        pass
+        db.session.rollback()
+
+    from services.student_list_stats import students_list_counts
 
     params = _parse_students_list_args(args)
     query = _students_list_query(params)
     status_filter = params.get("status") or ""
-
-    stats_query = query
-    total_students = stats_query.count()
-    if status_filter == "new_accounts":
-        # Every row already has a joined User; avoid EXISTS (auto-correlation with joined User).
-        students_with_accounts = total_students
-        students_without_accounts = 0
-    else:
-        # Grade 3+ portal policy: K–2 User rows (if any) do not count as "with accounts".
-        from utils.student_login_policy import MIN_GRADE_LEVEL_FOR_ACTIVE_STUDENT_LOGIN
-
-        students_with_accounts = stats_query.filter(
-            exists().where(User.student_id == Student.id),
-            Student.grade_level.isnot(None),
-            Student.grade_level >= MIN_GRADE_LEVEL_FOR_ACTIVE_STUDENT_LOGIN,
-        ).count()
-        students_without_accounts = total_students - students_with_accounts
-    high_gpa_count = stats_query.filter(Student.gpa.isnot(None), Student.gpa >= 3.5).count()
-
-    pagination = query.paginate(
-        page=params["page"],
-        per_page=STUDENTS_PER_PAGE,
-        error_out=False,
+    filters_key = tuple(
+        (k, params[k]) for k in ("search", "search_type", "grade_level", "status", "alert_filter")
     )
+    counts = students_list_counts(query, filters_key, accounts_joined=status_filter == "new_accounts")
+
+    pagination = None
+    if allow_cursor and "cursor" in args:
+        keys = _students_sort_keys(params)
+        token = (args.get("cursor") or "").strip()
+        page_query = query
+        if token:
+            page_query = page_query.filter(_keyset_after(keys, _decode_students_cursor(params, token, len(keys))))
+        rows = (
+            page_query.add_columns(*(expr.label(f"_k{i}") for i, (expr, _d) in enumerate(keys)))
+            .limit(STUDENTS_PER_PAGE + 1)
+            .all()
+        )
+        has_next = len(rows) > STUDENTS_PER_PAGE
+        rows = rows[:STUDENTS_PER_PAGE]
+        items = [row[0] for row in rows]
+        next_cursor = _encode_students_cursor(params, list(rows[-1][1:])) if has_next else None
+        page_info = {
+            "mode": "cursor",
+            # Echoed for "Page n of m"; the cursor alone decides which rows come back.
+            "page": params["page"],
+            "per_page": STUDENTS_PER_PAGE,
+            "total": counts["total"],
+            "pages": -(-counts["total"] // STUDENTS_PER_PAGE),
+            "has_next": has_next,
+            "has_prev": bool(token),
+            "next_cursor": next_cursor,
+        }
+    else:
+        pagination = query.paginate(
+            page=params["page"],
+            per_page=STUDENTS_PER_PAGE,
+            error_out=False,
+            count=False,
+        )
+        pagination.total = counts["total"]
+        items = pagination.items
+        page_info = {
+            "mode": "page",
+            "page": pagination.page,
+            "per_page": pagination.per_page,
+            "total": pagination.total,
+            "pages": pagination.pages,
+            "has_next": pagination.has_next,
+            "has_prev": pagination.has_prev,
+        }
 
     # Self-heal: K–2 should not keep portal User rows (leftover from bad creates / demotions).
     stripped = False
-    for s in pagination.items:
+    for s in items:
         if _grade_is_young(s.grade_level) and getattr(s, "user", None):
             try:
                 _strip_student_user_account(s)
@@ -451,23 +539,13 @@ def query_students_list(args) -> dict:
             db.session.rollback()
 
     return {
-        "students": pagination.items,
-        "items": [serialize_student_list_item(s) for s in pagination.items],
+        "students": items,
+        "items": [serialize_student_list_item(s) for s in items],
         "stats": {
-            "total": total_students,
-            "with_accounts": students_with_accounts,
-            "without_accounts": students_without_accounts,
-            "on_page": len(pagination.items),
-            "high_gpa": high_gpa_count,
-        },
-        "pagination": {
-            "page": pagination.page,
-            "per_page": pagination.per_page,
-            "total": pagination.total,
-            "pages": pagination.pages,
-            "has_next": pagination.has_next,
-            "has_prev": pagination.has_prev,
+            **counts,
+            "on_page": len(items),
         },
+        "pagination": page_info,
         "pagination_obj": pagination,
         "filters": params,
     }
@@ -965,37 +1043,23 @@ def add_student():
             db.session.commit()
 
             google_warning = None
-            google_user_created = False
+            google_sync_queued = False
             google_initial_password = new_google_workspace_initial_password()
 
-            try:
-                sync_single_user_to_google(user.id, initial_google_password=google_initial_password)
-            except Exception as e:
-                current_app.logger.warning(
-                    "Google Directory sync after save failed for user %s: %s", user.id, e
-                )
-                google_warning = (
-                    "Google Directory sync failed after save; the account may update on the next sync run."
-                )
-
             if generated_workspace_email:
+                # Directory create/OU/groups run on the background job queue.
                 try:
-                    from services.google_directory_service import get_google_user
-
-                    google_user_created = bool(
-                        get_google_user(generated_workspace_email, quiet_404=True)
-                    )
+                    enqueue_google_user_sync(user.id, initial_google_password=google_initial_password)
+                    google_sync_queued = True
                 except Exception as e:
+                    db.session.rollback()
                     current_app.logger.warning(
-                        "Could not verify Google user %s after create: %s",
-                        generated_workspace_email,
-                        e,
+                        "Could not queue Google Directory sync for user %s: %s", user.id, e
                     )
-                if not google_user_created and not google_warning:
                     google_warning = (
-                        f"Google account was not created for {generated_workspace_email}. "
-                        "Check Directory API permissions / OU paths, then re-save the student "
-                        "or run: FLASK_ENV=production python ops/backfill_student_google_accounts.py"
+                        f"Google account creation for {generated_workspace_email} could not be queued. "
+                        "Re-save the student or run: "
+                        "FLASK_ENV=production python ops/backfill_student_google_accounts.py"
                     )
             else:
                 google_warning = (
@@ -1010,8 +1074,8 @@ def add_student():
                 portal_password=password,
                 school_email=generated_workspace_email,
                 google_initial_password=google_initial_password,
-                google_user_created=google_user_created,
                 google_warning=google_warning,
+                google_sync_queued=google_sync_queued,
             )
             try:
                 from services.email_service import notify_school_admins_new_student_login
@@ -1263,7 +1327,7 @@ def students():
         return redirect("/app/management/students")
 
     params = _parse_students_list_args(request.args)
-    payload = query_students_list(request.args)
+    payload = query_students_list(request.args, allow_cursor=False)
 
     return render_template(
         "management/role_dashboard.html",
@@ -2775,16 +2839,17 @@ def edit_student(student_id):
         db.session.commit()
         if pending_ws_suspend:
             _suspend_student_google_workspace(student, workspace_email=pending_ws_suspend)
-        # Google Directory sync immediately after commit (Save → Workspace updated in one step)
+        # Google Directory sync runs on the background job queue after commit.
         if getattr(student, "user", None) and student.user.google_workspace_email:
             try:
-                sync_kw = {}
-                if new_creds and new_creds.get("google_initial_password"):
-                    sync_kw["initial_google_password"] = new_creds["google_initial_password"]
-                sync_single_user_to_google(student.user.id, **sync_kw)
+                enqueue_google_user_sync(
+                    student.user.id,
+                    initial_google_password=(new_creds or {}).get("google_initial_password"),
+                )
             except Exception as e:
+                db.session.rollback()
                 current_app.logger.warning(
-                    "Google Directory sync after student edit failed for user %s: %s",
+                    "Could not queue Google Directory sync after student edit for user %s: %s",
                     student.user.id,
                     e,
                 )
@@ -2843,7 +2908,8 @@ def edit_student(student_id):
                 google_warning=None,
             )
             response["credential_modal"].setdefault("notes", []).append(
-                "After this save, the app attempted Google Directory sync. If Google sign-in still fails, "
+                "After this save, Google Directory sync runs in the background (usually within a minute). "
+                "If Google sign-in still fails after that, "
                 "open Google Admin or run your usual Directory sync job."
             )
             if promoted:
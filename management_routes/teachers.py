@@ -9,7 +9,7 @@ from models import db, TeacherStaff, User, SchoolYear, TeacherWorkDay, Assignmen
 from werkzeug.security import generate_password_hash
 from datetime import datetime, timedelta
 import json
-from services.google_sync_tasks import sync_single_user_to_google
+from services.google_sync_tasks import enqueue_google_user_sync
 from services.google_directory_service import suspend_user
 from services.google_workspace_offboard import offboard_staff_workspace_account
 from utils.google_workspace_passwords import new_google_workspace_initial_password
@@ -176,7 +176,7 @@ def _post_commit_staff_google_pipeline(
     *,
     google_initial_password: str | None = None,
 ):
-    """Directory sync after staff save. Call after commit."""
+    """Queue Directory sync after staff save. Call after commit."""
     from services.google_ou_policy import staff_google_account_eligible
 
     if not staff_google_account_eligible(teacher_staff):
@@ -186,13 +186,14 @@ def _post_commit_staff_google_pipeline(
         )
         return
     try:
-        sync_single_user_to_google(
+        enqueue_google_user_sync(
             user.id,
             initial_google_password=google_initial_password,
         )
     except Exception as e:
+        db.session.rollback()
         current_app.logger.warning(
-            "Google Directory sync after save failed for user %s: %s", user.id, e
+            "Could not queue Google Directory sync after save for user %s: %s", user.id, e
         )
 
 
@@ -845,10 +846,11 @@ def edit_teacher_staff(staff_id):
                     )
                 elif sync_user.google_workspace_email:
                     try:
-                        sync_single_user_to_google(sync_user.id)
+                        enqueue_google_user_sync(sync_user.id)
                     except Exception as e:
+                        db.session.rollback()
                         current_app.logger.warning(
-                            "Google Directory sync after staff edit failed for user %s: %s",
+                            "Could not queue Google Directory sync after staff edit for user %s: %s",
                             sync_user.id,
                             e,
                         )
@@ -2133,13 +2135,14 @@ def edit_teacher(teacher_id):
                 teacher.user.google_workspace_email = None
         
         db.session.commit()
-        # Google Directory sync immediately after commit (Save → Workspace updated in one step)
+        # Google Directory sync runs on the background job queue after commit.
         if getattr(teacher, "user", None) and teacher.user.google_workspace_email:
             try:
-                sync_single_user_to_google(teacher.user.id)
+                enqueue_google_user_sync(teacher.user.id)
             except Exception as e:
+                db.session.rollback()
                 current_app.logger.warning(
-                    "Google Directory sync after teacher edit failed for user %s: %s",
+                    "Could not queue Google Directory sync after teacher edit for user %s: %s",
                     teacher.user.id,
                     e,
                 )
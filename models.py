@@ -189,6 +189,9 @@ class Student(db.Model):
     removal_note = db.Column(db.Text, nullable=True)
     status_updated_at = db.Column(db.DateTime, nullable=True)
 
+    # Normalized text of the searchable fields, kept current by services/student_search.py.
+    search_document = db.Column(db.Text, nullable=True)
+
     # Relationship to the User model
     user = db.relationship('User', backref='student_profile', uselist=False)
     
@@ -551,6 +554,10 @@ class Class(db.Model):
     google_classroom_id = db.Column(db.String(100), nullable=True)
     # Google Group used for roster email (e.g., physics101@clarascienceacademy.org)
     google_group_email = db.Column(db.String(120), nullable=True)
+    # sha256 of course id + desired teacher/student emails at the last clean Classroom sync;
+    # an unchanged roster skips the Classroom API entirely on the next provision run.
+    google_roster_fingerprint = db.Column(db.String(64), nullable=True)
+    google_roster_synced_at = db.Column(db.DateTime, nullable=True)
 
     # Relationships
     teacher = db.relationship('TeacherStaff', backref='primary_classes', lazy=True, foreign_keys=[teacher_id])
@@ -799,6 +806,8 @@ class Assignment(db.Model):
     google_form_id = db.Column(db.String(255), nullable=True)  # Google Form ID (extracted from URL)
     google_form_url = db.Column(db.String(500), nullable=True)  # Full URL to Google Form
     google_form_linked = db.Column(db.Boolean, default=False, nullable=False)  # Is this quiz linked to a Google Form?
+    # Newest response lastSubmittedTime already synced (RFC3339 as returned by the Forms API)
+    google_form_response_watermark = db.Column(db.String(40), nullable=True)
     
     # File attachment fields
     attachment_filename = db.Column(db.String(255), nullable=True)
@@ -1336,6 +1345,40 @@ class ReportCard(db.Model):
         return f"ReportCard(Student ID: {self.student_id}, Quarter: {self.quarter})"
 
 
+class ReportCardExportJob(db.Model):
+    """
+    Bulk report card export (whole grade or class list) rendered in the background.
+
+    The SPA polls progress counters; the finished ZIP / merged PDF lives at output_path.
+    """
+    __tablename__ = 'report_card_export_job'
+
+    id = db.Column(db.Integer, primary_key=True)
+    school_year_id = db.Column(db.Integer, db.ForeignKey('school_year.id'), nullable=False)
+    quarters = db.Column(db.String(20), nullable=False)  # comma list, e.g. "Q1,Q2"
+    grade_level = db.Column(db.Integer, nullable=True)  # 0 = Kindergarten; null when exporting by class
+    class_ids = db.Column(db.Text, nullable=True)  # JSON list of class ids
+    output_format = db.Column(db.String(10), nullable=False, default='zip')  # zip | pdf
+    generate_missing = db.Column(db.Boolean, default=False, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued|running|done|failed
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    failed_count = db.Column(db.Integer, nullable=False, default=0)
+    skipped_count = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Text, nullable=True)  # JSON list of {student_id, student, error}
+    output_path = db.Column(db.String(500), nullable=True)
+    created_by_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    school_year = db.relationship('SchoolYear', lazy=True)
+    created_by = db.relationship('User', foreign_keys=[created_by_user_id])
+
+    def __repr__(self):
+        return f"ReportCardExportJob(id={self.id}, status={self.status!r}, {self.completed_count}/{self.total_count})"
+
+
 class StudentSchoolYear(db.Model):
     """
     Grade level and enrollment status for a student in a specific school year.
@@ -1647,6 +1690,29 @@ class ActivityLog(db.Model):
     def __repr__(self):
         return f"ActivityLog(User: {self.user_id}, Action: {self.action}, Success: {self.success})"
 
+
+class LogArchiveSegment(db.Model):
+    """
+    Catalog of log rows moved out of ``admin_audit_log`` / ``activity_log`` by retention.
+    One row per archive file: a gzip JSON-lines dump of one calendar month of one table.
+    """
+    __tablename__ = 'log_archive_segment'
+    __table_args__ = (
+        db.Index('ix_log_archive_segment_table_month', 'table_name', 'month'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(64), nullable=False)
+    month = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    path = db.Column(db.String(500), nullable=False, unique=True)  # relative to LOG_ARCHIVE_DIR
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    min_id = db.Column(db.Integer, nullable=True)
+    max_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"LogArchiveSegment({self.table_name} {self.month}: {self.row_count} rows)"
+
 class StudentGoal(db.Model):
     """
     Model for tracking student academic goals for each class.
@@ -1752,6 +1818,8 @@ class MessageGroupMember(db.Model):
     is_admin = db.Column(db.Boolean, default=False)  # For group admins
     is_muted = db.Column(db.Boolean, default=False)  # For muting notifications
     muted_until = db.Column(db.DateTime, nullable=True)  # Temporary mute expiration
+    # Read cursor: newest channel message this member has seen (unread = newer ones from others)
+    last_read_message_id = db.Column(db.Integer, nullable=True)
     
     group = db.relationship('MessageGroup', backref='members')
     user = db.relationship('User', backref='group_memberships')
@@ -1779,6 +1847,26 @@ class MessageAttachment(db.Model):
         return f"MessageAttachment('{self.original_filename}', Message: {self.message_id})"
 
 
+class LiveEvent(db.Model):
+    """
+    Outbox for the Server-Sent Events push channel: one row per recipient. Ids double as
+    SSE event ids, so reconnects resume from ``Last-Event-ID``, and each worker polls new
+    rows to fan out other processes' events.
+    """
+    __tablename__ = 'live_event'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=True)
+    event_type = db.Column(db.String(40), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON object
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    __table_args__ = (db.Index('ix_live_event_user_id_id', 'user_id', 'id'),)
+
+    def __repr__(self):
+        return f"LiveEvent({self.id}, {self.event_type}, User: {self.user_id})"
+
+
 class AnnouncementReadReceipt(db.Model):
     """
     Model for tracking who has read important announcements.
@@ -1972,6 +2060,126 @@ class SchoolDayAttendance(db.Model):
         return f"SchoolDayAttendance(Student: {self.student_id}, Date: {self.date}, Status: {self.status})"
 
 
+class AttendanceDailyRollup(db.Model):
+    """
+    Class-period attendance records per day and status bucket (see services/attendance_rollups.py).
+
+    ``status_key`` is one of present / late / unexcused / excused / suspended / other.
+    Maintained on every commit that wrote Attendance; rebuild with ops/rebuild_attendance_rollups.py.
+    """
+
+    __tablename__ = "attendance_daily_rollup"
+    __table_args__ = (
+        db.UniqueConstraint("date", "status_key", name="uq_attendance_daily_rollup_date_status"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    status_key = db.Column(db.String(16), nullable=False)
+    record_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AttendanceStudentDayRollup(db.Model):
+    """One row per student per day with class-period record counts by status bucket."""
+
+    __tablename__ = "attendance_student_day_rollup"
+    __table_args__ = (
+        db.UniqueConstraint("student_id", "date", name="uq_attendance_student_day_rollup"),
+        db.Index("ix_attendance_student_day_rollup_date", "date"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("student.id"), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    late = db.Column(db.Integer, nullable=False, default=0)
+    unexcused = db.Column(db.Integer, nullable=False, default=0)
+    excused = db.Column(db.Integer, nullable=False, default=0)
+    suspended = db.Column(db.Integer, nullable=False, default=0)
+    other = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AttendanceStudentRollup(db.Model):
+    """
+    Running class-period attendance totals per student, with absence streaks in days.
+
+    An absence day has at least one absence record and no present / late record;
+    streaks count consecutive recorded days (weekends and holidays do not break them).
+    """
+
+    __tablename__ = "attendance_student_rollup"
+
+    student_id = db.Column(db.Integer, db.ForeignKey("student.id"), primary_key=True)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    late = db.Column(db.Integer, nullable=False, default=0)
+    unexcused = db.Column(db.Integer, nullable=False, default=0)
+    excused = db.Column(db.Integer, nullable=False, default=0)
+    suspended = db.Column(db.Integer, nullable=False, default=0)
+    other = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    days_recorded = db.Column(db.Integer, nullable=False, default=0)
+    absence_days = db.Column(db.Integer, nullable=False, default=0)
+    current_absence_streak = db.Column(db.Integer, nullable=False, default=0)
+    max_absence_streak = db.Column(db.Integer, nullable=False, default=0)
+    last_date = db.Column(db.Date, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class DashboardCounters(db.Model):
+    """
+    Headline numbers for the management home, one row per school year
+    (see services/dashboard_counters.py).
+
+    Kept current by deltas on Grade / Attendance / Enrollment writes and recounted
+    from scratch by ``reconcile_dashboard_counters`` to correct drift.
+    """
+
+    __tablename__ = "dashboard_counters"
+
+    id = db.Column(db.Integer, primary_key=True)
+    school_year_id = db.Column(db.Integer, db.ForeignKey("school_year.id"), nullable=False, unique=True)
+    enrolled_students = db.Column(db.Integer, nullable=False, default=0)
+    attendance_records = db.Column(db.Integer, nullable=False, default=0)
+    attendance_present = db.Column(db.Integer, nullable=False, default=0)
+    grade_score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    grade_score_count = db.Column(db.Integer, nullable=False, default=0)
+    reconciled_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class CacheVersion(db.Model):
+    """
+    Shared version counters for process-local caches: writers bump a key, readers fold
+    the current version into their cache key so every worker drops stale entries.
+    """
+    __tablename__ = 'cache_version'
+
+    key = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"CacheVersion('{self.key}': {self.version})"
+
+
+class UnreadCounter(db.Model):
+    """
+    Materialized unread badge count per (user, scope): ``notifications``,
+    ``channel:<group id>`` or ``dm:<partner user id>``. Kept current by session hooks
+    in services/unread_counters.py and recomputed from source by its repair job.
+    """
+    __tablename__ = 'unread_counter'
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(64), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"UnreadCounter(User: {self.user_id}, {self.scope}: {self.count})"
+
+
 class SystemConfig(db.Model):
     """
     Model for storing system configuration settings.
@@ -3244,6 +3452,14 @@ class SchoolYearClosure(db.Model):
     # Outcome stats (JSON; populated on finalize for the dashboard)
     finalize_stats = db.Column(db.Text, nullable=True)
 
+    # Resumable finalize checkpoint: current step ('report_cards' | 'archive'), the
+    # last student id whose report card batch committed, and running counters (JSON).
+    finalize_step = db.Column(db.String(20), nullable=True)
+    finalize_cursor_student_id = db.Column(db.Integer, nullable=True)
+    finalize_progress = db.Column(db.Text, nullable=True)
+    finalize_started_at = db.Column(db.DateTime, nullable=True)
+    finalize_heartbeat_at = db.Column(db.DateTime, nullable=True)
+
     school_year = db.relationship('SchoolYear', backref='closures')
     created_by = db.relationship('User', foreign_keys=[created_by_user_id])
     cancelled_by = db.relationship('User', foreign_keys=[cancelled_by_user_id])
@@ -3317,7 +3533,7 @@ class SchoolYearClosureEvent(db.Model):
 
     event_type examples:
       created, scheduled, phase_advanced, paused, resumed, postponed,
-      cancelled, finalized, reopened,
+      cancelled, finalize_started, finalize_resumed, finalized, reopened,
       extension_granted, extension_revoked,
       notification_sent, notification_failed
     """
@@ -3444,3 +3660,41 @@ class GoogleWorkspaceOffboardJob(db.Model):
             f"status={self.status!r})"
         )
 
+
+class BackgroundJob(db.Model):
+    """
+    Durable work queue row (see services/background_jobs.py).
+
+    Request handlers enqueue; a worker (ops/run_background_worker.py or the embedded
+    thread) claims due rows with a lease, runs the handler for ``job_type`` and
+    retries failures with exponential backoff until ``max_attempts``.
+    """
+
+    __tablename__ = "background_job"
+    __table_args__ = (
+        db.Index("ix_background_job_state_run_after", "state", "run_after"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(60), nullable=False, index=True)
+    payload = db.Column(db.Text, nullable=True)  # JSON object
+    state = db.Column(db.String(20), nullable=False, default="queued")  # queued|running|done|failed|cancelled
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Jobs with the same key collapse into one while queued (e.g. "google.sync_user:42").
+    idempotency_key = db.Column(db.String(200), nullable=True, index=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON returned by the handler
+    created_by_user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    created_by = db.relationship("User", foreign_keys=[created_by_user_id])
+
+    def __repr__(self):
+        return f"BackgroundJob(id={self.id}, type={self.job_type!r}, state={self.state!r})"
+
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Move admin_audit_log / activity_log months older than the hot window to gzip archive files.
+
+  python ops/archive_logs.py                          # LOG_RETENTION_HOT_DAYS, both tables
+  python ops/archive_logs.py --hot-days 365 --dry-run # list what a one-year window would move
+  python ops/archive_logs.py --table activity_log
+
+The background worker queues the same job once a table has rows past the window; use this
+for the first large catch-up or to try a window before setting it. Archives are written
+under LOG_ARCHIVE_DIR and stay browsable from Tech → Logs → Audit.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+
+def _bootstrap_path() -> None:
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--table", choices=("admin_audit_log", "activity_log"), default=None,
+                        help="Only this table (default: both)")
+    parser.add_argument("--hot-days", type=int, default=None,
+                        help="Days kept in the database (default: LOG_RETENTION_HOT_DAYS)")
+    parser.add_argument("--dry-run", action="store_true", help="List the months without moving them")
+    args = parser.parse_args()
+
+    _bootstrap_path()
+    from app import create_app
+    from config import DevelopmentConfig, ProductionConfig
+
+    config_name = (os.environ.get("FLASK_ENV") or "development").strip().lower()
+    config_class = ProductionConfig if config_name == "production" else DevelopmentConfig
+    app = create_app(config_class=config_class)
+
+    from services.log_retention import archive_cutoff, archive_old_logs
+
+    started = time.monotonic()
+    with app.app_context():
+        cutoff = archive_cutoff(args.hot_days)
+        if cutoff is None:
+            print("Log retention is off (set LOG_RETENTION_HOT_DAYS or pass --hot-days).")
+            return 1
+        summary = archive_old_logs(table_name=args.table, days=args.hot_days, dry_run=args.dry_run)
+    verb = "Would archive" if args.dry_run else "Archived"
+    for name, months in summary.items():
+        for month, count in months:
+            print(f"{verb} {name} {month}: {count} rows")
+        if not months:
+            print(f"{name}: nothing before {cutoff:%Y-%m-%d}")
+    print(f"Done in {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
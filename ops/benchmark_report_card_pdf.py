@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-render WeasyPrint time for report cards, before vs after the
+shared stylesheet / font / image caches in utils.report_card_pdf_render.
+
+  python ops/benchmark_report_card_pdf.py [--report-card-id N] [--runs 10]
+
+"before" mirrors the old request path: report_card_styles.css inlined as <style>,
+the logo base64-inlined, and a fresh WeasyPrint setup for every render.
+"after" renders the same card through render_html_to_pdf_bytes with warm caches.
+Runs in-process (no render pool) so the numbers are pure render CPU.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import os
+import statistics
+import sys
+import time
+
+
+def _bootstrap_path() -> None:
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+
+
+def _legacy_html(html_content: str, css_path: str, logo_path: str, static_uri: str) -> str:
+    """Rebuild the pre-cache HTML: inline CSS and base64 logo."""
+    with open(css_path, "r", encoding="utf-8") as fh:
+        css = fh.read()
+    with open(logo_path, "rb") as fh:
+        logo = base64.b64encode(fh.read()).decode("ascii")
+    link = f'<link rel="stylesheet" href="{static_uri}/report_card_styles.css">'
+    if link in html_content:
+        html_content = html_content.replace(link, f"<style>{css}</style>", 1)
+    else:
+        html_content = html_content.replace("</head>", f"<style>{css}</style></head>", 1)
+    return html_content.replace(
+        f'src="{static_uri}/img/clara_logo.png"', f'src="data:image/png;base64,{logo}"'
+    )
+
+
+def _time_runs(fn, runs: int) -> list[float]:
+    out = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - start) * 1000.0)
+    return out
+
+
+def _summary(label: str, samples: list[float]) -> str:
+    return (
+        f"{label:<7} median {statistics.median(samples):8.1f} ms   "
+        f"mean {statistics.mean(samples):8.1f} ms   min {min(samples):8.1f} ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--report-card-id", type=int, default=None, help="defaults to the newest card")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    _bootstrap_path()
+    from pathlib import Path
+
+    from app import create_app
+    from config import DevelopmentConfig, ProductionConfig
+
+    config_name = (os.environ.get("FLASK_ENV") or "development").strip().lower()
+    config_class = ProductionConfig if config_name == "production" else DevelopmentConfig
+    app = create_app(config_class=config_class)
+    with app.app_context(), app.test_request_context():
+        from weasyprint import HTML
+
+        from management_routes.reports import render_report_card_html
+        from models import ReportCard
+        from services.report_card_pdf import report_card_static_image_paths, report_card_stylesheet_paths
+        from utils.report_card_pdf_render import render_html_to_pdf_bytes, warm_pdf_renderer
+
+        if args.report_card_id:
+            report_card = ReportCard.query.get(args.report_card_id)
+        else:
+            report_card = ReportCard.query.order_by(ReportCard.id.desc()).first()
+        if report_card is None:
+            print("No report card found.")
+            return 1
+
+        stylesheets = report_card_stylesheet_paths()
+        images = report_card_static_image_paths()
+        html_content = render_report_card_html(report_card)
+        static_uri = Path(app.root_path, "static").resolve().as_uri()
+        legacy = _legacy_html(html_content, stylesheets[0], images[0], static_uri)
+        base_url = app.root_path
+
+        print(f"Report card {report_card.id} ({report_card.quarter}), {args.runs} runs each")
+        before = _time_runs(lambda: HTML(string=legacy, base_url=base_url).write_pdf(), args.runs)
+        warm_pdf_renderer(stylesheets, images)
+        after = _time_runs(
+            lambda: render_html_to_pdf_bytes(html_content, base_url, stylesheets), args.runs
+        )
+        print(_summary("before", before))
+        print(_summary("after", after))
+        print(f"speedup x{statistics.median(before) / statistics.median(after):.2f} (median)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Rebuild the attendance analytics rollups from class-period Attendance records.
+
+  python ops/rebuild_attendance_rollups.py                     # everything
+  python ops/rebuild_attendance_rollups.py --start 2025-08-01  # only dates from --start (to --end)
+
+Rollups normally stay current on every attendance write; run this after bulk SQL edits,
+restores, or if the app logged "Attendance rollup refresh failed".
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+
+def _bootstrap_path() -> None:
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="first date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="last date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    _bootstrap_path()
+    from app import create_app
+    from config import DevelopmentConfig, ProductionConfig
+
+    config_name = (os.environ.get("FLASK_ENV") or "development").strip().lower()
+    config_class = ProductionConfig if config_name == "production" else DevelopmentConfig
+    app = create_app(config_class=config_class)
+
+    from extensions import db
+    from models import Attendance, AttendanceStudentDayRollup
+    from services.attendance_rollups import rebuild_all_attendance_rollups, refresh_attendance_rollups
+
+    started = time.monotonic()
+    with app.app_context():
+        if args.start is None and args.end is None:
+            counts = rebuild_all_attendance_rollups()
+            print(
+                f"Rebuilt attendance rollups: {counts['daily_rows']} daily, "
+                f"{counts['student_day_rows']} student-day, {counts['student_rows']} student row(s)"
+            )
+        else:
+            # Keys from both sides, so rollup rows whose records were deleted are cleared too.
+            keys = set()
+            for model in (Attendance, AttendanceStudentDayRollup):
+                q = db.session.query(model.student_id, model.date).distinct()
+                if args.start:
+                    q = q.filter(model.date >= args.start)
+                if args.end:
+                    q = q.filter(model.date <= args.end)
+                keys.update(q.all())
+            refresh_attendance_rollups(keys)
+            db.session.commit()
+            print(f"Refreshed attendance rollups for {len(keys)} student-day(s)")
+    print(f"Done in {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Rebuild the communications search index (PostgreSQL tsvector GIN / SQLite FTS5).
+
+  python ops/rebuild_communication_search.py
+
+PostgreSQL expression indexes follow every write on their own; on SQLite, ORM
+flushes keep the FTS tables current, so run this after bulk SQL edits to
+message or announcement text, or after restoring a backup taken without them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+
+def _bootstrap_path() -> None:
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+
+
+def main() -> int:
+    argparse.ArgumentParser(description=__doc__.split("\n\n")[0]).parse_args()
+
+    _bootstrap_path()
+    from app import create_app
+    from config import DevelopmentConfig, ProductionConfig
+
+    config_name = (os.environ.get("FLASK_ENV") or "development").strip().lower()
+    config_class = ProductionConfig if config_name == "production" else DevelopmentConfig
+    app = create_app(config_class=config_class)
+
+    from services.communication_search import (
+        ensure_communication_search_index,
+        refresh_communication_search,
+        search_backend,
+    )
+
+    started = time.monotonic()
+    with app.app_context():
+        ensure_communication_search_index()
+        count = refresh_communication_search()
+        backend = search_backend() or "none (ILIKE fallback)"
+    print(f"Re-indexed {count} message/announcement row(s); index: {backend}; {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
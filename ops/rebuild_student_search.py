@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Rebuild student search documents and the list search index (pg_trgm / SQLite FTS5).
+
+  python ops/rebuild_student_search.py             # every student
+  python ops/rebuild_student_search.py --id 12 40  # a few students
+
+Flushes through the ORM keep the index current; run this after bulk SQL edits to
+names, contacts or addresses, or after restoring a backup taken without the index.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+
+def _bootstrap_path() -> None:
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--id", type=int, nargs="*", default=None, help="Student ids (default: all)")
+    args = parser.parse_args()
+
+    _bootstrap_path()
+    from app import create_app
+    from config import DevelopmentConfig, ProductionConfig
+
+    config_name = (os.environ.get("FLASK_ENV") or "development").strip().lower()
+    config_class = ProductionConfig if config_name == "production" else DevelopmentConfig
+    app = create_app(config_class=config_class)
+
+    from services.student_search import refresh_student_search, search_backend
+
+    started = time.monotonic()
+    with app.app_context():
+        count = refresh_student_search(args.id)
+        backend = search_backend() or "none (ILIKE fallback)"
+    print(f"Refreshed {count} student search document(s); index: {backend}; {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
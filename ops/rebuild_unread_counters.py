@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Recompute the unread badge counters (UnreadCounter) from notifications, DMs and channel read cursors.
+
+  python ops/rebuild_unread_counters.py              # every user
+  python ops/rebuild_unread_counters.py --user 7 12  # a few users
+
+Counters move with every ORM write and the worker recounts them every
+UNREAD_COUNTERS_REPAIR_HOURS; run this after bulk SQL edits to messages or notifications.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+
+def _bootstrap_path() -> None:
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--user", type=int, nargs="*", default=None, help="User ids (default: all)")
+    args = parser.parse_args()
+
+    _bootstrap_path()
+    from app import create_app
+    from config import DevelopmentConfig, ProductionConfig
+
+    config_name = (os.environ.get("FLASK_ENV") or "development").strip().lower()
+    config_class = ProductionConfig if config_name == "production" else DevelopmentConfig
+    app = create_app(config_class=config_class)
+
+    from services.unread_counters import rebuild_unread_counters
+
+    started = time.monotonic()
+    with app.app_context():
+        result = rebuild_unread_counters(args.user)
+    print(
+        f"Rebuilt {result['counters']} unread counter(s), {result['corrected']} corrected; "
+        f"{time.monotonic() - started:.1f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
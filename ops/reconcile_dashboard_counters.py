@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Recount the management home's DashboardCounters rows from grades, attendance and enrollments.
+
+  python ops/reconcile_dashboard_counters.py                  # every school year
+  python ops/reconcile_dashboard_counters.py --school-year 4  # one school year
+
+Counters move by deltas on every write and the home page queues a recount once a row is
+older than DASHBOARD_COUNTERS_RECONCILE_SECONDS; run this after bulk SQL edits or restores.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+
+def _bootstrap_path() -> None:
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--school-year", type=int, default=None, help="SchoolYear id (default: all)")
+    args = parser.parse_args()
+
+    _bootstrap_path()
+    from app import create_app
+    from config import DevelopmentConfig, ProductionConfig
+
+    config_name = (os.environ.get("FLASK_ENV") or "development").strip().lower()
+    config_class = ProductionConfig if config_name == "production" else DevelopmentConfig
+    app = create_app(config_class=config_class)
+
+    from services.dashboard_counters import reconcile_dashboard_counters
+
+    started = time.monotonic()
+    with app.app_context():
+        results = reconcile_dashboard_counters(args.school_year)
+    for year_id, values in results.items():
+        print(
+            f"School year {year_id}: {values['enrolled_students']} students, "
+            f"{values['attendance_records']} attendance records, {values['grade_score_count']} scored grades"
+        )
+    print(f"Reconciled {len(results)} school year(s) in {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
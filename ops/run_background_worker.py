@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Background job worker: claims due BackgroundJob rows and runs them until stopped.
+
+  python ops/run_background_worker.py             # run forever (Ctrl+C / SIGTERM to stop)
+  python ops/run_background_worker.py --once      # drain due jobs, then exit
+  python ops/run_background_worker.py --types google.sync_user,google.provision_class
+
+Safe to run next to the web app's embedded worker: jobs are claimed with a lease,
+so each runs in one place at a time. When this runs as its own service, set
+BACKGROUND_JOBS_EMBEDDED_WORKER=false on the web service.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import signal
+import sys
+import threading
+
+
+def _bootstrap_path() -> None:
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--once", action="store_true", help="drain due jobs and exit")
+    parser.add_argument("--poll", type=float, default=None, help="idle poll interval in seconds")
+    parser.add_argument("--types", default="", help="comma-separated job types to run (default: all)")
+    args = parser.parse_args()
+
+    _bootstrap_path()
+    from app import create_app
+    from config import DevelopmentConfig, ProductionConfig
+
+    config_name = (os.environ.get("FLASK_ENV") or "development").strip().lower()
+    config_class = ProductionConfig if config_name == "production" else DevelopmentConfig
+    app = create_app(config_class=config_class)
+
+    from services.background_jobs import default_worker_id, run_due_jobs, run_worker
+
+    job_types = [t.strip() for t in args.types.split(",") if t.strip()] or None
+    worker_id = f"cli:{default_worker_id()}"
+
+    if args.once:
+        with app.app_context():
+            stats = run_due_jobs(worker_id=worker_id, job_types=job_types)
+        print(f"Background jobs: {stats}")
+        return 0
+
+    stop = threading.Event()
+
+    def _stop(signum, _frame):
+        print(f"Received signal {signum}; finishing the current job and exiting.")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    run_worker(app, worker_id=worker_id, poll_seconds=args.poll, job_types=job_types, stop_event=stop)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -11,18 +11,36 @@ Behavior:
 - Staff:
   - Ensure Google account exists for User.google_workspace_email (create if missing)
   - Ensure OU under ``/Staff/<…>`` subfolders including Terminated & Removed, Administrator, … (see get_staff_ou_path)
-  - Ensure missing OUs exist (ensure_ou_exists) before create/move
+  - Ensure missing OUs exist before create/move
   - Ensure membership in teachers@clarascienceacademy.org
 
+How it works (services/google_directory_diff.py):
+  1. Snapshot Directory state in bulk: paged users.list, one orgunits.list, members.list
+     for each managed school-wide group.
+  2. Compute desired state locally from services/google_ou_policy.
+  3. Diff and issue only the mutations that are actually needed (a no-op night costs
+     only the list pages).
+
 Dry run:
-  Default is DRY RUN (prints actions). To apply changes set APPLY_CHANGES=1.
+  Default is DRY RUN (prints the plan). To apply changes set APPLY_CHANGES=1.
+
+Other env vars:
+  CREATE_MISSING_GROUPS=1   create managed groups that do not exist yet
+  GOOGLE_SYNC_WORKERS=4     concurrent user creates / updates (paced by the shared
+                            per-API rate limiter, GOOGLE_API_RATE_DIRECTORY req/s)
+  MAX_STUDENTS / MAX_STAFF  limit rows (0 = all)
+  PLAN_JSON=path            also write the plan as JSON
+  SNAPSHOT_OUT=path         save the Directory snapshot as JSON
+  DIRECTORY_FAKE_SNAPSHOT=path
+                            plan against a saved snapshot (tests/google_directory_fake.py) instead of
+                            the live Directory API; nothing in Google is touched
 """
 
 from __future__ import annotations
 
+import json
 import os
 import sys
-import time
 from datetime import datetime
 
 # Repo root must be on sys.path before local imports (Render cron cwd may not be project root).
@@ -31,12 +49,6 @@ if _ROOT not in sys.path:
     sys.path.insert(0, _ROOT)
 
 from utils.google_workspace_passwords import google_workspace_initial_password_for_sync
-DOMAIN = "clarascienceacademy.org"
-TEACHERS_GROUP_EMAIL = f"teachers@{DOMAIN}"
-ELEMENTARY_GROUP_EMAIL = f"elementary@{DOMAIN}"
-MIDDLE_SCHOOL_GROUP_EMAIL = f"middle_school@{DOMAIN}"
-HIGH_SCHOOL_GROUP_EMAIL = f"highschool@{DOMAIN}"
-STUDENT_ASSEMBLY_GROUP_EMAIL = f"studentassembly@{DOMAIN}"
 
 
 def _env_bool(name: str, default: bool = False) -> bool:
@@ -53,9 +65,10 @@ def _env_int(name: str, default: int) -> int:
         return default
 
 
-def _sleep_ms(ms: int) -> None:
-    if ms and ms > 0:
-        time.sleep(ms / 1000.0)
+def _write_json(path: str, data) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+    print(f"Wrote {path}")
 
 
 def main() -> int:
@@ -72,18 +85,22 @@ def main() -> int:
 
     apply_changes = _env_bool("APPLY_CHANGES", default=False)
     create_missing_groups = _env_bool("CREATE_MISSING_GROUPS", default=False)
-    sleep_ms = _env_int("SLEEP_MS", 50)
     max_students = _env_int("MAX_STUDENTS", 0)  # 0 = all
     max_staff = _env_int("MAX_STAFF", 0)  # 0 = all
+    plan_json = (os.environ.get("PLAN_JSON") or "").strip()
+    snapshot_out = (os.environ.get("SNAPSHOT_OUT") or "").strip()
+    fake_snapshot = (os.environ.get("DIRECTORY_FAKE_SNAPSHOT") or "").strip()
 
     print("=" * 80)
     print("SYNC ALL TO GOOGLE")
     print("=" * 80)
-    print(f"Mode: {'APPLY' if apply_changes else 'DRY RUN'}")
+    print(f"Mode: {'APPLY' if apply_changes else 'DRY RUN'}{' (fake Directory)' if fake_snapshot else ''}")
     print(
-        f"SLEEP_MS={sleep_ms} MAX_STUDENTS={max_students or 'ALL'} MAX_STAFF={max_staff or 'ALL'} "
+        f"MAX_STUDENTS={max_students or 'ALL'} MAX_STAFF={max_staff or 'ALL'} "
         f"CREATE_MISSING_GROUPS={'1' if create_missing_groups else '0'}"
     )
+    if os.environ.get("SLEEP_MS"):
+        print("[INFO] SLEEP_MS is ignored; calls are paced by the adaptive rate limiter (GOOGLE_API_RATE_*).")
     print("=" * 80)
 
     try:
@@ -102,47 +119,34 @@ def main() -> int:
 
     try:
         from extensions import db
-        from models import Student, TeacherStaff, User
-        from utils.student_login_policy import (
-            google_workspace_sync_should_skip_student,
-            parse_grade_level_for_policy,
-        )
-        from services.google_directory_service import (
-            create_google_group,
-            create_google_user,
-            ensure_ou_exists,
-            ensure_user_in_group,
-            get_google_group,
-            get_google_user,
-            move_user_to_ou,
-            suspend_user,
-            sync_user_groups,
-        )
-        from services.google_ou_policy import (
-            STAFF_OU_TERMINATED_REMOVED,
-            get_staff_ou_path,
-            resolve_student_ou,
-            school_level_group_for_grade,
-            staff_google_account_eligible,
-            sync_staff_google_suspension,
-            sync_student_google_suspension,
+        from models import GoogleWorkspaceOffboardJob, Student, TeacherStaff, User
+        from utils.student_login_policy import google_workspace_sync_should_skip_student
+        from services.google_directory_service import get_directory_service
+        from services.google_directory_diff import (
+            apply_directory_plan,
+            desired_staff_account,
+            desired_student_account,
+            plan_directory_changes,
+            take_directory_snapshot,
         )
+        from services.google_rate_limit import rate_limit_metrics
+        from services.google_ou_policy import get_staff_ou_path, resolve_student_ou
     except Exception as e:
         print(f"[ERROR] Failed to import required modules: {e}")
         return 0
 
     app = create_app(config_class=ConfigClass)
 
-    created_users = 0
-    moved_ous = 0
-    group_adds = 0
-    errors = 0
+    summary = {"created_users": 0, "moved_ous": 0, "group_ensures": 0, "errors": 0}
 
     with app.app_context():
-        from ops.render_db_guard import print_database_target, require_postgres_database
+        if not fake_snapshot:
+            from ops.render_db_guard import print_database_target, require_postgres_database
 
-        require_postgres_database(app, script_name="sync_all_to_google.py")
-        print_database_target(app)
+            require_postgres_database(app, script_name="sync_all_to_google.py")
+            print_database_target(app)
+
+        desired = []
 
         # ------------------------
         # Students: must have User row with non-empty google_workspace_email (no guessed emails)
@@ -163,151 +167,44 @@ def main() -> int:
             "(includes inactive/deleted for Alumni / Transferred & Removed OU moves when grade >= 3)."
         )
 
+        grade_gated = 0
+        status_stamped = 0
         for student, u in student_rows:
             email = (u.google_workspace_email or "").strip()
             if not email:
                 continue
-
             if google_workspace_sync_should_skip_student(getattr(student, "grade_level", None)):
-                gl = parse_grade_level_for_policy(getattr(student, "grade_level", None))
-                print(
-                    f"[INFO] Grade Gate: Skipping {(student.first_name or '').strip()} "
-                    f"{(student.last_name or '').strip()} (Grade {gl})."
-                )
+                grade_gated += 1
                 continue
 
-            print(f"[DEBUG] Syncing database record for: {email}")
-
-            db_active = bool(getattr(student, "is_active", True))
-            marked_for_removal = bool(getattr(student, "marked_for_removal", False))
-            is_deleted = bool(getattr(student, "is_deleted", False))
-
             decision = resolve_student_ou(
                 grade_level=getattr(student, "grade_level", None),
                 grad_year=getattr(student, "grad_year", None),
                 expected_grad_date=getattr(student, "expected_grad_date", None),
-                is_active=db_active,
-                marked_for_removal=marked_for_removal,
-                is_deleted=is_deleted,
+                is_active=bool(getattr(student, "is_active", True)),
+                marked_for_removal=bool(getattr(student, "marked_for_removal", False)),
+                is_deleted=bool(getattr(student, "is_deleted", False)),
                 status_updated_at=getattr(student, "status_updated_at", None),
                 expected_graduation_year=getattr(student, "expected_graduation_year", None),
                 departure_status=getattr(student, "departure_status", None),
             )
-
-            if apply_changes:
-                sync_student_google_suspension(
-                    email,
-                    decision=decision,
-                    is_active=db_active,
-                    marked_for_removal=marked_for_removal,
-                    is_deleted=is_deleted,
-                )
-                _sleep_ms(sleep_ms)
-
-            g_user = get_google_user(email)
-            _sleep_ms(sleep_ms)
-
-            if not g_user:
-                if db_active and not marked_for_removal and not is_deleted:
-                    if apply_changes:
-                        if not ensure_ou_exists(decision.target_ou_path):
-                            errors += 1
-                            print(f"[ERROR] could not ensure OU for student {email}: {decision.target_ou_path}")
-                            continue
-                        created = create_google_user(
-                            {
-                                "primaryEmail": email,
-                                "name": {"givenName": student.first_name, "familyName": student.last_name},
-                                "password": google_workspace_initial_password_for_sync(),
-                                "orgUnitPath": decision.target_ou_path,
-                                "changePasswordAtNextLogin": True,
-                            }
-                        )
-                        _sleep_ms(sleep_ms)
-                        if created:
-                            created_users += 1
-                            print(f"[CREATE] student {email} in OU {decision.target_ou_path}")
-                        else:
-                            errors += 1
-                            print(f"[ERROR] failed to create student {email}")
-                    else:
-                        print(f"[DRY] would create student {email} in OU {decision.target_ou_path}")
-                continue
-            else:
-                if apply_changes and decision.reason in (
-                    "alumni_completed_level",
-                    "transferred_removed",
-                ) and not getattr(student, "status_updated_at", None):
-                    from datetime import datetime
-
-                    try:
-                        student.status_updated_at = datetime.utcnow()
-                        db.session.commit()
-                    except Exception:
-                        db.session.rollback()
-
-                current_ou = g_user.get("orgUnitPath")
-                if current_ou != decision.target_ou_path:
-                    if apply_changes:
-                        ou_res = move_user_to_ou(email, decision.target_ou_path)
-                        if ou_res is True:
-                            moved_ous += 1
-                            print(f"[MOVE] student {email}: {current_ou} -> {decision.target_ou_path}")
-                        elif ou_res is False:
-                            errors += 1
-                            print(f"[ERROR] failed OU move for student {email}")
-                        else:
-                            print(f"[INFO] Skipping protected/admin user: {email}")
-                        _sleep_ms(sleep_ms)
-                    else:
-                        print(f"[DRY] would move student {email}: {current_ou} -> {decision.target_ou_path}")
-
-                if apply_changes and decision.should_suspend_now and not bool(g_user.get("suspended", False)):
-                    if suspend_user(email):
-                        print(f"[SUSPEND] student {email} ({decision.reason})")
-                    else:
-                        errors += 1
-                        print(f"[ERROR] failed to suspend student {email}")
-                    _sleep_ms(sleep_ms)
-
-            # School-level groups: exactly one of Elementary/Middle/High + Student Assembly for active students
-            level_key = school_level_group_for_grade(getattr(student, "grade_level", None))
-            level_email = None
-            if level_key == "elementary":
-                level_email = ELEMENTARY_GROUP_EMAIL
-            elif level_key == "middle_school":
-                level_email = MIDDLE_SCHOOL_GROUP_EMAIL
-            elif level_key == "highschool":
-                level_email = HIGH_SCHOOL_GROUP_EMAIL
-
-            desired_school_groups = [STUDENT_ASSEMBLY_GROUP_EMAIL]
-            if level_email:
-                desired_school_groups.insert(0, level_email)
-
-            if db_active and not marked_for_removal and not is_deleted:
-                if apply_changes:
-                    if create_missing_groups:
-                        for g in desired_school_groups:
-                            if not get_google_group(g):
-                                create_google_group(
-                                    g,
-                                    name=g.split("@", 1)[0].replace("_", " ").title(),
-                                    description="Auto-created by CSA sync.",
-                                )
-                                _sleep_ms(sleep_ms)
-
-                    sg_res = sync_user_groups(email, desired_school_groups)
-                    if sg_res is True:
-                        group_adds += 1
-                        print(f"[GROUP] synced school-level groups for {email} -> {', '.join(desired_school_groups)}")
-                    elif sg_res is False:
-                        errors += 1
-                        print(f"[ERROR] failed syncing school-level groups for {email}")
-                    else:
-                        print(f"[INFO] Skipping protected/admin user: {email}")
-                    _sleep_ms(sleep_ms)
-                else:
-                    print(f"[DRY] would sync school-level groups for {email} -> {', '.join(desired_school_groups)}")
+            desired.append(desired_student_account(student, email, decision))
+
+            # Departure clock for the Alumni grace period / removal policy starts at first sync.
+            if (
+                apply_changes
+                and decision.reason in ("alumni_completed_level", "transferred_removed")
+                and not getattr(student, "status_updated_at", None)
+            ):
+                student.status_updated_at = datetime.utcnow()
+                status_stamped += 1
+        if status_stamped:
+            try:
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+        if grade_gated:
+            print(f"[INFO] Grade Gate: skipped {grade_gated} K–2 student(s) (no Directory sync).")
 
         # ------------------------
         # Staff (Teachers/Staff)
@@ -326,7 +223,7 @@ def main() -> int:
                     user_by_teacher_id[u.teacher_staff_id] = u
 
         print(
-            f"\n[Staff] {len(staff_list)} row(s) from TeacherStaff (all retention states; Directory OU from get_staff_ou_path)."
+            f"[Staff] {len(staff_list)} row(s) from TeacherStaff (all retention states; Directory OU from get_staff_ou_path)."
         )
 
         for staff in staff_list:
@@ -336,128 +233,73 @@ def main() -> int:
                 email = (getattr(staff, "google_workspace_email", None) or "").strip()
             if not email:
                 continue
-
             # Staff OU tiers require TeacherStaff + linked User (u may be None if no login row).
-            target_staff_ou = get_staff_ou_path(staff, u)
-
-            print(
-                f"[DEBUG] Syncing staff id={staff.id} "
-                f"{(staff.first_name or '').strip()} {(staff.last_name or '').strip()} "
-                f"(deleted={bool(getattr(staff, 'is_deleted', False))}, "
-                f"employment={getattr(staff, 'employment_status', None)}, "
-                f"portal_login={getattr(staff, 'portal_login', None)}): "
-                f"{email} (staff OU -> {target_staff_ou})"
-            )
+            desired.append(desired_staff_account(staff, email, get_staff_ou_path(staff, u)))
 
-            if not staff_google_account_eligible(staff):
-                if apply_changes:
-                    sync_staff_google_suspension(email, staff)
-                    _sleep_ms(sleep_ms)
-                    # Still park the account under Terminated & Removed (do not skip OU move).
-                    g_user = get_google_user(email)
-                    _sleep_ms(sleep_ms)
-                    if g_user:
-                        current_ou = g_user.get("orgUnitPath")
-                        if current_ou != target_staff_ou:
-                            ou_res = move_user_to_ou(email, target_staff_ou)
-                            if ou_res is True:
-                                moved_ous += 1
-                                print(f"[MOVE] ineligible staff {email}: {current_ou} -> {target_staff_ou}")
-                            elif ou_res is False:
-                                errors += 1
-                                print(f"[ERROR] failed OU move for ineligible staff {email}")
-                    from services.google_workspace_offboard import enqueue_workspace_license_removal
-
-                    enqueue_workspace_license_removal(
-                        email, kind="staff", related_id=staff.id, commit=True
-                    )
-                print(
-                    f"[SKIP] {email} — not eligible for active Directory sync "
-                    "(removed, inactive, or portal login off). Suspended / Terminated OU / license queue if account exists."
-                )
-                continue
+        # ------------------------
+        # Snapshot, diff, apply
+        # ------------------------
+        if fake_snapshot:
+            from tests.google_directory_fake import FakeDirectoryService
+
+            service = FakeDirectoryService.from_json_file(fake_snapshot)
+        else:
+            service = get_directory_service()
+        if not service:
+            print("[ERROR] Directory service not configured; nothing synced.")
+            return 0
+
+        try:
+            snapshot = take_directory_snapshot(service)
+        except RuntimeError as e:
+            print(f"[ERROR] {e}")
+            print("Aborting: a partial snapshot would plan creates for accounts that already exist.")
+            return 0
+        print(
+            f"\n[Snapshot] {len(snapshot.users)} Google user(s), {len(snapshot.org_units)} OU(s), "
+            f"{len(snapshot.group_members)} group(s) in {snapshot.list_calls} list call(s)."
+        )
+        if snapshot_out:
+            _write_json(snapshot_out, snapshot.as_dict())
+
+        offboarded = {
+            (e or "").lower()
+            for (e,) in db.session.query(GoogleWorkspaceOffboardJob.email).distinct().all()
+        }
+        plan = plan_directory_changes(
+            snapshot,
+            desired,
+            create_missing_groups=create_missing_groups,
+            offboarded_emails=offboarded,
+        )
+        counts = plan.counts()
+        print(
+            f"[Plan] {len(desired)} account(s) checked; {plan.api_mutation_count()} Directory mutation(s) needed: "
+            + ", ".join(f"{op}={n}" for op, n in counts.items() if n)
+        )
+        if plan_json:
+            _write_json(plan_json, plan.as_dict())
+
+        if not apply_changes:
+            for line in plan.report_lines():
+                print(line)
+        else:
+            for line in plan.report_lines(prefix="[PLAN]"):
+                print(line)
+            stats = apply_directory_plan(
+                service,
+                plan,
+                password_factory=google_workspace_initial_password_for_sync,
+                service_factory=None if fake_snapshot else get_directory_service,
+            )
+            print(f"[Apply] {stats}")
+            summary = {
+                "created_users": stats["created_users"],
+                "moved_ous": stats["moved_ous"],
+                "group_ensures": stats["members_added"] + stats["members_removed"],
+                "errors": stats["errors"],
+            }
 
-            if apply_changes:
-                sync_staff_google_suspension(email, staff)
-                _sleep_ms(sleep_ms)
-
-            g_user = get_google_user(email)
-            _sleep_ms(sleep_ms)
-
-            if not g_user:
-                if apply_changes:
-                    if not staff_google_account_eligible(staff):
-                        print(f"[SKIP] would not create Workspace account for ineligible staff {email}")
-                        continue
-                    if not ensure_ou_exists(target_staff_ou):
-                        errors += 1
-                        print(f"[ERROR] could not ensure OU exists for staff {email}: {target_staff_ou}")
-                        continue
-                    created = create_google_user(
-                        {
-                            "primaryEmail": email,
-                            "name": {"givenName": staff.first_name, "familyName": staff.last_name},
-                            "password": google_workspace_initial_password_for_sync(),
-                            "orgUnitPath": target_staff_ou,
-                            "changePasswordAtNextLogin": True,
-                        }
-                    )
-                    _sleep_ms(sleep_ms)
-                    if created:
-                        created_users += 1
-                        print(f"[CREATE] staff {email} in OU {target_staff_ou}")
-                    else:
-                        errors += 1
-                        print(f"[ERROR] failed to create staff {email}")
-                        continue
-                else:
-                    print(f"[DRY] would ensure OU {target_staff_ou} then create staff {email}")
-                    continue
-            else:
-                current_ou = g_user.get("orgUnitPath")
-                if current_ou != target_staff_ou:
-                    if apply_changes:
-                        ou_res = move_user_to_ou(email, target_staff_ou)
-                        if ou_res is True:
-                            moved_ous += 1
-                            print(f"[MOVE] staff {email}: {current_ou} -> {target_staff_ou}")
-                        elif ou_res is False:
-                            errors += 1
-                            print(f"[ERROR] failed OU move for staff {email}")
-                        else:
-                            print(f"[INFO] Skipping protected/admin user: {email}")
-                        _sleep_ms(sleep_ms)
-                    else:
-                        print(f"[DRY] would move staff {email}: {current_ou} -> {target_staff_ou}")
-
-            # Teachers Google Group: not for accounts parked under Terminated & Removed.
-            if STAFF_OU_TERMINATED_REMOVED not in target_staff_ou:
-                if apply_changes:
-                    if create_missing_groups and not get_google_group(TEACHERS_GROUP_EMAIL):
-                        create_google_group(
-                            TEACHERS_GROUP_EMAIL,
-                            name="Teachers",
-                            description="Auto-created by CSA sync.",
-                        )
-                        _sleep_ms(sleep_ms)
-                    if ensure_user_in_group(email, TEACHERS_GROUP_EMAIL):
-                        group_adds += 1
-                        print(f"[GROUP] ensured {email} in {TEACHERS_GROUP_EMAIL}")
-                    else:
-                        errors += 1
-                        print(f"[ERROR] failed ensuring {email} in {TEACHERS_GROUP_EMAIL}")
-                    _sleep_ms(sleep_ms)
-                else:
-                    print(f"[DRY] would ensure {email} in {TEACHERS_GROUP_EMAIL}")
-            else:
-                print(f"[INFO] Skipping {TEACHERS_GROUP_EMAIL} for {email} (OU {target_staff_ou})")
-
-    summary = {
-        "created_users": created_users,
-        "moved_ous": moved_ous,
-        "group_ensures": group_adds,
-        "errors": errors,
-    }
     print("\n" + "=" * 80)
     print("SUMMARY")
     print("=" * 80)
@@ -465,6 +307,11 @@ def main() -> int:
     print(f"moved_ous={summary['moved_ous']}")
     print(f"group_ensures={summary['group_ensures']}")
     print(f"errors={summary['errors']}")
+    for api, m in rate_limit_metrics().items():
+        print(
+            f"google_api[{api}] calls={int(m['calls'])} retries={int(m['retries'])} "
+            f"quota_errors={int(m['quota_errors'])} throttled_seconds={m['throttled_seconds']}"
+        )
     print("=" * 80)
     if not apply_changes:
         print("DRY RUN completed. Set APPLY_CHANGES=1 to perform changes.")
@@ -481,4 +328,3 @@ def main() -> int:
 if __name__ == "__main__":
     main()
     sys.exit(0)
-
@@ -0,0 +1,144 @@
+"""
+Streaming CSV export of class-period and school-day attendance.
+
+Rows are read in keyset order ``(date, id)`` and turned into CSV lines as they arrive, so
+memory stays flat for any date range and the header goes out before the first query
+finishes. On PostgreSQL the whole range is one query read through a server-side cursor
+(``yield_per``); SQLite has no server-side cursors, so it pages with
+``WHERE (date, id) > (last_date, last_id) LIMIT n``, which stays an index range scan
+however deep the export gets.
+
+Generators need an app context for their whole life — wrap them in
+``flask.stream_with_context`` when returning them from a view.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+from datetime import date
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+from sqlalchemy import and_, or_, select
+
+from extensions import db
+from models import Attendance, Class, SchoolDayAttendance, Student, TeacherStaff, User
+
+# Rows per page (SQLite) / per cursor fetch (PostgreSQL).
+EXPORT_CHUNK_SIZE = 2000
+
+CLASS_ATTENDANCE_HEADER = (
+    "Date", "Student ID", "Last Name", "First Name", "Class", "Status", "Notes", "Recorded By",
+)
+SCHOOL_DAY_ATTENDANCE_HEADER = (
+    "Date", "Student ID", "Last Name", "First Name", "Status", "Notes", "Recorded By", "Updated At",
+)
+
+
+def _csv_line(values: Sequence[Any]) -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(["" if v is None else v for v in values])
+    return buf.getvalue()
+
+
+def iter_keyset_rows(stmt, date_col, id_col, *, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the rows of ``stmt`` in ``(date_col, id_col)`` order, a chunk at a time."""
+    stmt = stmt.add_columns(date_col.label("_key_date"), id_col.label("_key_id")).order_by(date_col, id_col)
+    if db.session.get_bind().dialect.name == "postgresql":
+        result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            yield from partition
+        return
+
+    last: Optional[tuple[date, int]] = None
+    while True:
+        page = stmt
+        if last is not None:
+            page = page.where(or_(date_col > last[0], and_(date_col == last[0], id_col > last[1])))
+        rows = db.session.execute(page.limit(chunk_size)).all()
+        if not rows:
+            return
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = (rows[-1]._key_date, rows[-1]._key_id)
+
+
+def iter_class_attendance_csv(
+    start_date: date,
+    end_date: date,
+    *,
+    student_ids: Iterable[int] = (),
+    class_ids: Iterable[int] = (),
+    status: str = "",
+) -> Iterator[str]:
+    """CSV lines (header first) for class-period attendance matching the reports filters."""
+    yield _csv_line(CLASS_ATTENDANCE_HEADER)
+    stmt = (
+        select(
+            Attendance.date,
+            Attendance.student_id,
+            Student.last_name,
+            Student.first_name,
+            Class.name.label("class_name"),
+            Attendance.status,
+            Attendance.notes,
+            TeacherStaff.first_name.label("teacher_first"),
+            TeacherStaff.last_name.label("teacher_last"),
+        )
+        .join(Student, Student.id == Attendance.student_id)
+        .join(Class, Class.id == Attendance.class_id)
+        .outerjoin(TeacherStaff, TeacherStaff.id == Attendance.teacher_id)
+        .where(Attendance.date >= start_date, Attendance.date <= end_date)
+    )
+    student_ids, class_ids = list(student_ids), list(class_ids)
+    if student_ids:
+        stmt = stmt.where(Attendance.student_id.in_(student_ids))
+    if class_ids:
+        stmt = stmt.where(Attendance.class_id.in_(class_ids))
+    if status:
+        stmt = stmt.where(Attendance.status == status)
+
+    for row in iter_keyset_rows(stmt, Attendance.date, Attendance.id):
+        teacher = " ".join(p for p in (row.teacher_first, row.teacher_last) if p)
+        yield _csv_line((
+            row.date.isoformat(), row.student_id, row.last_name, row.first_name,
+            row.class_name, row.status, row.notes, teacher,
+        ))
+
+
+def iter_school_day_attendance_csv(
+    start_date: date,
+    end_date: date,
+    *,
+    student_ids: Iterable[int] = (),
+    status: str = "",
+) -> Iterator[str]:
+    """CSV lines (header first) for school-day attendance in a date range."""
+    yield _csv_line(SCHOOL_DAY_ATTENDANCE_HEADER)
+    stmt = (
+        select(
+            SchoolDayAttendance.date,
+            SchoolDayAttendance.student_id,
+            Student.last_name,
+            Student.first_name,
+            SchoolDayAttendance.status,
+            SchoolDayAttendance.notes,
+            User.username.label("recorded_by"),
+            SchoolDayAttendance.updated_at,
+        )
+        .join(Student, Student.id == SchoolDayAttendance.student_id)
+        .outerjoin(User, User.id == SchoolDayAttendance.recorded_by)
+        .where(SchoolDayAttendance.date >= start_date, SchoolDayAttendance.date <= end_date)
+    )
+    student_ids = list(student_ids)
+    if student_ids:
+        stmt = stmt.where(SchoolDayAttendance.student_id.in_(student_ids))
+    if status:
+        stmt = stmt.where(SchoolDayAttendance.status == status)
+
+    for row in iter_keyset_rows(stmt, SchoolDayAttendance.date, SchoolDayAttendance.id):
+        yield _csv_line((
+            row.date.isoformat(), row.student_id, row.last_name, row.first_name, row.status,
+            row.notes, row.recorded_by, row.updated_at.isoformat(sep=" ", timespec="seconds") if row.updated_at else "",
+        ))
@@ -54,42 +54,84 @@ def is_past_end_of_day_cutoff(app):
     return hour > 15 or (hour == 15 and minute >= 30)
 
 
-def apply_end_of_day_automark(app, target_date, student_ids=None):
+END_OF_DAY_AUTOMARK_NOTE = 'Auto-marked end of day (no attendance recorded by 3:30 PM)'
+
+
+def school_days_between(start_date, end_date):
+    """Weekdays from start_date to end_date (inclusive) outside any SchoolBreak."""
+    from datetime import timedelta
+    from models import SchoolBreak
+
+    breaks = SchoolBreak.query.filter(
+        SchoolBreak.start_date <= end_date,
+        SchoolBreak.end_date >= start_date,
+    ).all()
+    days = []
+    day = start_date
+    while day <= end_date:
+        if day.weekday() < 5 and not any(b.start_date <= day <= b.end_date for b in breaks):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def apply_end_of_day_automark(app, target_date, student_ids=None, end_date=None):
     """
-    Create SchoolDayAttendance with status 'Unexcused Absence' for any student
-    who has no record for target_date. If student_ids is given, only consider
-    those students; otherwise all students.
+    Create SchoolDayAttendance with status 'Unexcused Absence' for every active-roster
+    student who has no record for target_date. If student_ids is given, only consider
+    those students. With end_date, backfill every school day from target_date to
+    end_date (see school_days_between) in one call.
+
+    One INSERT ... SELECT: roster students x dates, anti-joined against existing
+    SchoolDayAttendance (ON CONFLICT DO NOTHING covers a login recorded concurrently).
     Returns the number of new records created.
     """
+    from sqlalchemy import Date, and_, exists, literal, select, true, union_all
     from models import db, Student, SchoolDayAttendance
+    from services.attendance_writes import dialect_insert
+    from utils.student_roster import active_roster_student_filters
 
-    students = Student.query.filter(Student.id.in_(student_ids)) if student_ids else Student.query
-    student_ids_list = [s.id for s in students]
-    existing = {
-        r.student_id for r in
-        SchoolDayAttendance.query.filter(
-            SchoolDayAttendance.date == target_date,
-            SchoolDayAttendance.student_id.in_(student_ids_list)
-        ).all()
-    }
-    to_create = [sid for sid in student_ids_list if sid not in existing]
+    dates = [target_date] if end_date is None else school_days_between(target_date, end_date)
+    if not dates or (student_ids is not None and not student_ids):
+        return 0
+
+    sda = SchoolDayAttendance.__table__
+    now = datetime.utcnow()
     count = 0
-    for student_id in to_create:
-        record = SchoolDayAttendance(
-            student_id=student_id,
-            date=target_date,
-            status='Unexcused Absence',
-            notes='Auto-marked end of day (no attendance recorded by 3:30 PM)',
-            recorded_by=None
-        )
-        db.session.add(record)
-        count += 1
-    if count:
-        try:
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
-            raise
+    try:
+        # SQLite caps a compound SELECT at 500 terms; a school year fits in one statement.
+        for i in range(0, len(dates), 400):
+            days = union_all(
+                *(select(literal(d, Date).label('day')) for d in dates[i:i + 400])
+            ).subquery('days')
+            source = (
+                select(
+                    Student.id,
+                    days.c.day,
+                    literal('Unexcused Absence'),
+                    literal(END_OF_DAY_AUTOMARK_NOTE),
+                    literal(now),
+                    literal(now),
+                )
+                .select_from(Student)
+                .join(days, true())
+                .where(
+                    active_roster_student_filters(),
+                    ~exists().where(and_(sda.c.student_id == Student.id, sda.c.date == days.c.day)),
+                )
+            )
+            if student_ids:
+                source = source.where(Student.id.in_(list(student_ids)))
+            stmt = (
+                dialect_insert()(sda)
+                .from_select(['student_id', 'date', 'status', 'notes', 'created_at', 'updated_at'], source)
+                .on_conflict_do_nothing(index_elements=[sda.c.student_id, sda.c.date])
+            )
+            count += max(db.session.execute(stmt).rowcount or 0, 0)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
     return count
 
 
@@ -0,0 +1,346 @@
+"""
+Maintained aggregates over class-period ``Attendance`` for analytics.
+
+- ``AttendanceDailyRollup``: records per (date, status bucket) — summary cards and the
+  daily trend read a few hundred rows instead of every record in the range.
+- ``AttendanceStudentDayRollup``: per-student per-day counts — range totals per student
+  are one SQL ``GROUP BY``.
+- ``AttendanceStudentRollup``: running totals per student with current / longest
+  absence streak (in recorded days).
+
+Attendance is written from many routes, so rollups are kept current by session hooks
+(``register_attendance_rollup_hooks``): ``before_flush`` collects the (student, date)
+keys of new, changed and deleted records across every flush of the transaction, and
+``before_commit`` recomputes just those dates and students set-based, as the last step
+before the transaction commits. A failure there is contained in a SAVEPOINT and logged —
+the attendance write still succeeds and ``ops/rebuild_attendance_rollups.py`` repairs
+the aggregates.
+
+On PostgreSQL that refresh first takes transaction-scoped advisory locks on its dates
+and students — all of them in one sorted pass, so concurrent refreshes cannot deadlock —
+and the commit right after it releases them. Concurrent attendance writes for the same
+day (the morning rush) therefore only queue for the short refresh step: the later one
+sees the earlier one's committed records, and the delete + re-insert never collides on
+the rollup unique keys.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from itertools import chain
+from typing import Any, Iterable, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, case, delete, event, func, insert, inspect, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, INTEGER
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import (
+    Attendance,
+    AttendanceDailyRollup,
+    AttendanceStudentDayRollup,
+    AttendanceStudentRollup,
+)
+from services.attendance_streaks import bump_absence_streak_version, invalidate_absence_streak_cache
+
+STATUS_KEYS = ("present", "late", "unexcused", "excused", "suspended", "other")
+# Statuses that make a day an absence day (when no present / late record exists that day).
+ABSENCE_KEYS = ("unexcused", "excused", "suspended")
+
+_SESSION_INFO_KEY = "attendance_rollup_keys"
+# Keep IN lists well under SQLite's bound-parameter limit.
+_CHUNK = 500
+# First key of the pg_advisory_xact_lock pairs taken by a refresh.
+_LOCK_DATES = 0x41524401
+_LOCK_STUDENTS = 0x41525301
+_LOCK_SQL = text(
+    "SELECT count(pg_advisory_xact_lock(:ns, k)) FROM (SELECT unnest(:keys) AS k ORDER BY 1) AS keys"
+).bindparams(bindparam("keys", type_=ARRAY(INTEGER)))
+
+_att = Attendance.__table__
+_daily = AttendanceDailyRollup.__table__
+_student_day = AttendanceStudentDayRollup.__table__
+_student = AttendanceStudentRollup.__table__
+
+
+def status_key(status: Optional[str]) -> str:
+    """Bucket a stored status (any casing) the same way the SQL rollup does."""
+    key = (status or "").strip().lower()
+    return {
+        "present": "present",
+        "late": "late",
+        "unexcused absence": "unexcused",
+        "absent": "unexcused",
+        "excused absence": "excused",
+        "suspended": "suspended",
+    }.get(key, "other")
+
+
+def _keyed_attendance(where=None):
+    """Subquery of attendance rows with a computed ``status_key`` column."""
+    norm = func.lower(func.trim(_att.c.status))
+    key = case(
+        (norm == "present", "present"),
+        (norm == "late", "late"),
+        (norm.in_(("unexcused absence", "absent")), "unexcused"),
+        (norm == "excused absence", "excused"),
+        (norm == "suspended", "suspended"),
+        else_="other",
+    )
+    stmt = select(_att.c.student_id, _att.c.date, key.label("status_key"))
+    if where is not None:
+        stmt = stmt.where(where)
+    # Grouping happens on the subquery column: PostgreSQL rejects GROUP BY on a CASE
+    # whose bound parameters differ from the SELECT list's.
+    return stmt.subquery()
+
+
+def _chunks(values: Iterable[Any]) -> Iterable[list[Any]]:
+    items = sorted(set(values))
+    for i in range(0, len(items), _CHUNK):
+        yield items[i : i + _CHUNK]
+
+
+def _lock_refresh(conn, dates: list[date], student_ids: list[int]) -> None:
+    """
+    PostgreSQL: take the (date, student) refresh locks, held until commit. Taken once per
+    transaction (see ``_refresh_before_commit``), in sorted key order, dates before
+    students, so concurrent refreshes cannot deadlock.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(_LOCK_SQL, {"ns": _LOCK_DATES, "keys": [d.toordinal() for d in dates]})
+    conn.execute(_LOCK_SQL, {"ns": _LOCK_STUDENTS, "keys": list(student_ids)})
+
+
+def _rebuild_daily(conn, dates: Optional[list[date]]) -> None:
+    if dates is None:
+        conn.execute(delete(_daily))
+        src = _keyed_attendance()
+    else:
+        conn.execute(delete(_daily).where(_daily.c.date.in_(dates)))
+        src = _keyed_attendance(_att.c.date.in_(dates))
+    conn.execute(
+        insert(_daily).from_select(
+            ["date", "status_key", "record_count"],
+            select(src.c.date, src.c.status_key, func.count()).group_by(src.c.date, src.c.status_key),
+        )
+    )
+
+
+def _rebuild_student_days(conn, student_ids: Optional[list[int]], dates: Optional[list[date]]) -> None:
+    if student_ids is None:
+        conn.execute(delete(_student_day))
+        src = _keyed_attendance()
+    else:
+        conn.execute(
+            delete(_student_day).where(
+                _student_day.c.student_id.in_(student_ids), _student_day.c.date.in_(dates)
+            )
+        )
+        src = _keyed_attendance(_att.c.student_id.in_(student_ids) & _att.c.date.in_(dates))
+    counts = [func.sum(case((src.c.status_key == k, 1), else_=0)) for k in STATUS_KEYS]
+    conn.execute(
+        insert(_student_day).from_select(
+            ["student_id", "date", *STATUS_KEYS, "total"],
+            select(src.c.student_id, src.c.date, *counts, func.count()).group_by(
+                src.c.student_id, src.c.date
+            ),
+        )
+    )
+
+
+def is_absence_day(row: Any) -> bool:
+    return (row.present or 0) + (row.late or 0) == 0 and any(getattr(row, k) for k in ABSENCE_KEYS)
+
+
+def absence_streaks(day_rows: Iterable[Any]) -> tuple[int, int]:
+    """(current, longest) run of consecutive absence days over date-ordered day rows."""
+    current = longest = 0
+    for row in day_rows:
+        current = current + 1 if is_absence_day(row) else 0
+        longest = max(longest, current)
+    return current, longest
+
+
+def _rebuild_students(conn, student_ids: Optional[list[int]]) -> None:
+    cols = [_student_day.c.student_id, _student_day.c.date, *(_student_day.c[k] for k in STATUS_KEYS)]
+    stmt = select(*cols).order_by(_student_day.c.student_id, _student_day.c.date)
+    if student_ids is None:
+        conn.execute(delete(_student))
+    else:
+        conn.execute(delete(_student).where(_student.c.student_id.in_(student_ids)))
+        stmt = stmt.where(_student_day.c.student_id.in_(student_ids))
+
+    now = datetime.utcnow()
+    batch: list[dict[str, Any]] = []
+    acc: Optional[dict[str, Any]] = None
+
+    def _emit() -> None:
+        if acc is not None:
+            batch.append(acc)
+        if len(batch) >= _CHUNK:
+            conn.execute(insert(_student), batch)
+            batch.clear()
+
+    for row in conn.execute(stmt):
+        if acc is None or acc["student_id"] != row.student_id:
+            _emit()
+            acc = {"student_id": row.student_id, **{k: 0 for k in STATUS_KEYS}, "total": 0,
+                   "days_recorded": 0, "absence_days": 0, "current_absence_streak": 0,
+                   "max_absence_streak": 0, "last_date": None, "updated_at": now}
+        for k in STATUS_KEYS:
+            acc[k] += getattr(row, k) or 0
+            acc["total"] += getattr(row, k) or 0
+        acc["days_recorded"] += 1
+        acc["last_date"] = row.date
+        if is_absence_day(row):
+            acc["absence_days"] += 1
+            acc["current_absence_streak"] += 1
+            acc["max_absence_streak"] = max(acc["max_absence_streak"], acc["current_absence_streak"])
+        else:
+            acc["current_absence_streak"] = 0
+    _emit()
+    if batch:
+        conn.execute(insert(_student), batch)
+
+
+def refresh_attendance_rollups(keys: Iterable[tuple[int, date]], *, connection=None,
+                               session: Optional[Session] = None) -> None:
+    """Recompute rollups for the given (student_id, date) keys from ``Attendance``."""
+    keys = {(int(sid), d) for sid, d in keys if sid is not None and d is not None}
+    if not keys:
+        return
+    invalidate_absence_streak_cache(session)
+    conn = connection if connection is not None else db.session.connection()
+    dates = sorted({d for _sid, d in keys})
+    students = sorted({sid for sid, _d in keys})
+    _lock_refresh(conn, dates, students)
+    for date_chunk in _chunks(dates):
+        _rebuild_daily(conn, date_chunk)
+    for student_chunk in _chunks(students):
+        in_chunk = set(student_chunk)
+        chunk_dates = sorted({d for sid, d in keys if sid in in_chunk})
+        for date_chunk in _chunks(chunk_dates):
+            _rebuild_student_days(conn, student_chunk, date_chunk)
+        _rebuild_students(conn, student_chunk)
+
+
+def rebuild_all_attendance_rollups() -> dict[str, int]:
+    """Recompute every rollup table from scratch and commit. Returns row counts."""
+    conn = db.session.connection()
+    _rebuild_daily(conn, None)
+    _rebuild_student_days(conn, None, None)
+    _rebuild_students(conn, None)
+    db.session.commit()
+    bump_absence_streak_version()
+    return {
+        "daily_rows": db.session.query(func.count()).select_from(_daily).scalar() or 0,
+        "student_day_rows": db.session.query(func.count()).select_from(_student_day).scalar() or 0,
+        "student_rows": db.session.query(func.count()).select_from(_student).scalar() or 0,
+    }
+
+
+def ensure_attendance_rollups() -> None:
+    """
+    Build the rollups once on a database that has attendance but was never rolled up.
+    Called at startup, before any write can make the tables non-empty piecemeal.
+    """
+    if db.session.query(_daily.c.id).limit(1).first() is not None:
+        return
+    if db.session.query(_att.c.id).limit(1).first() is None:
+        return
+    current_app.logger.info("Attendance rollups are empty; rebuilding from attendance records")
+    rebuild_all_attendance_rollups()
+
+
+# ---------------------------------------------------------------------------
+# Session hooks
+# ---------------------------------------------------------------------------
+
+
+def _collect_attendance_keys(session: Session, _flush_context, _instances) -> None:
+    touched: set[tuple[Any, Any]] = set()
+    for obj in chain(session.new, session.deleted):
+        if isinstance(obj, Attendance):
+            touched.add((obj.student_id, obj.date))
+    for obj in session.dirty:
+        if not isinstance(obj, Attendance):
+            continue
+        touched.add((obj.student_id, obj.date))
+        # A moved record also changes the rollups of its old student / date.
+        attrs = inspect(obj).attrs
+        old_sid = attrs.student_id.history.deleted
+        old_date = attrs.date.history.deleted
+        if old_sid or old_date:
+            touched.add((old_sid[0] if old_sid else obj.student_id, old_date[0] if old_date else obj.date))
+    if touched:
+        session.info.setdefault(_SESSION_INFO_KEY, set()).update(touched)
+
+
+def apply_attendance_rollup_keys(keys: Iterable[tuple[int, date]], *, connection=None,
+                                 session: Optional[Session] = None) -> None:
+    """
+    Refresh rollups for ``keys`` now, inside a SAVEPOINT; a failure is logged, not raised.
+    Writers inside a request should use ``queue_attendance_rollup_keys`` instead.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    conn = connection if connection is not None else db.session.connection()
+    savepoint = conn.begin_nested()
+    try:
+        refresh_attendance_rollups(keys, connection=conn, session=session)
+        savepoint.commit()
+    except Exception as exc:
+        savepoint.rollback()
+        if has_app_context():
+            current_app.logger.warning(
+                "Attendance rollup refresh failed for %s key(s); run ops/rebuild_attendance_rollups.py: %s",
+                len(keys),
+                exc,
+            )
+
+
+def queue_attendance_rollup_keys(keys: Iterable[tuple[int, date]], session: Optional[Session] = None) -> None:
+    """
+    Refresh rollups for ``keys`` when ``session`` (default: db.session) commits. Bulk Core
+    writes to Attendance bypass the flush hooks and call this directly.
+    """
+    keys = set(keys)
+    if keys:
+        (session if session is not None else db.session).info.setdefault(_SESSION_INFO_KEY, set()).update(keys)
+
+
+def _refresh_before_commit(session: Session) -> None:
+    # A SAVEPOINT release is not the end of the transaction; keep collecting.
+    if session.in_nested_transaction():
+        return
+    # Flush first so the keys of still-pending changes are collected too.
+    session.flush()
+    keys = session.info.pop(_SESSION_INFO_KEY, None)
+    if keys:
+        apply_attendance_rollup_keys(keys, connection=session.connection(), session=session)
+
+
+def _discard_at_transaction_end(session: Session, transaction) -> None:
+    # Only the outermost transaction: a rolled-back SAVEPOINT keeps the outer keys.
+    if transaction.parent is None:
+        session.info.pop(_SESSION_INFO_KEY, None)
+
+
+def _keep_old_value(_target, value, _oldvalue, _initiator):
+    return value
+
+
+def register_attendance_rollup_hooks() -> None:
+    """Keep rollups current on every commit whose flushes touched Attendance (idempotent)."""
+    if not event.contains(Session, "before_flush", _collect_attendance_keys):
+        # Load the old student / date before an expired attribute is overwritten, so a
+        # moved record's previous key is in its history.
+        for attr in (Attendance.student_id, Attendance.date):
+            event.listen(attr, "set", _keep_old_value, active_history=True, retval=True)
+        event.listen(Session, "before_flush", _collect_attendance_keys)
+        event.listen(Session, "before_commit", _refresh_before_commit)
+        event.listen(Session, "after_transaction_end", _discard_at_transaction_end)
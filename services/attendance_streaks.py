@@ -0,0 +1,247 @@
+"""
+Absence streaks computed in SQL (gaps-and-islands) for any date range and class.
+
+A student's *absence day* has at least one absence record and no present / late record
+(see services/attendance_rollups.py). Streaks run over consecutive *recorded* days, so
+weekends and holidays without attendance do not break them. Within a student's days in
+date order, ``ROW_NUMBER() OVER (date) - ROW_NUMBER() OVER (is_absent, date)`` is
+constant along each run of absence days; grouping on it yields the runs ("islands").
+The longest run and the run ending on the student's last recorded day (the current
+streak) come back in one query, on PostgreSQL and SQLite (3.25+) alike.
+
+Results are cached per (range, class, filters) for ATTENDANCE_STREAK_CACHE_SECONDS,
+keyed by the shared ``CacheVersion`` ``attendance.streaks``. A transaction that writes
+Attendance bumps it once it commits (``register_absence_streak_hooks``), so every worker
+drops its entries at that moment and no reader can cache pre-commit data under the new
+version. The bump runs on its own short transaction, after the write's locks are gone.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, case, event, func, select
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Attendance, AttendanceStudentDayRollup
+from services.cache_versions import bump_cache_version, get_cache_version
+
+DEFAULT_CACHE_SECONDS = 300
+_CACHE_MAX_ENTRIES = 64
+STREAKS_VERSION_KEY = "attendance.streaks"
+_SESSION_INFO_KEY = "absence_streaks_changed"
+
+_cache: dict[tuple, tuple[float, dict[int, "AbsenceStreak"]]] = {}
+_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class AbsenceStreak:
+    student_id: int
+    longest: int
+    current: int
+    longest_start: Optional[date] = None
+    longest_end: Optional[date] = None
+
+
+def invalidate_absence_streak_cache(session: Optional[Session] = None) -> None:
+    """Have every worker drop cached streaks once ``session`` (default: db.session) commits."""
+    (session if session is not None else db.session).info[_SESSION_INFO_KEY] = True
+
+
+def bump_absence_streak_version() -> None:
+    """Bump the shared streak version now, in its own transaction."""
+    with db.engine.begin() as conn:
+        bump_cache_version(STREAKS_VERSION_KEY, connection=conn)
+    with _cache_lock:
+        _cache.clear()
+
+
+def _bump_after_commit(session: Session) -> None:
+    if not session.info.pop(_SESSION_INFO_KEY, None):
+        return
+    try:
+        bump_absence_streak_version()
+    except Exception as exc:
+        if has_app_context():
+            current_app.logger.warning("Absence streak cache version bump failed; streaks refresh on TTL: %s", exc)
+
+
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_SESSION_INFO_KEY, None)
+
+
+def register_absence_streak_hooks() -> None:
+    """Bump the shared streak version after commits that wrote Attendance (idempotent)."""
+    if not event.contains(Session, "after_commit", _bump_after_commit):
+        event.listen(Session, "after_commit", _bump_after_commit)
+        event.listen(Session, "after_rollback", _discard_after_rollback)
+
+
+def _cache_seconds() -> float:
+    if not has_app_context():
+        return DEFAULT_CACHE_SECONDS
+    try:
+        return float(current_app.config.get("ATTENDANCE_STREAK_CACHE_SECONDS", DEFAULT_CACHE_SECONDS))
+    except (TypeError, ValueError):
+        return DEFAULT_CACHE_SECONDS
+
+
+def _absence_days(start_date: date, end_date: date, class_id: Optional[int], student_ids):
+    """(student_id, date, is_absent) per recorded day in range."""
+    if class_id is None:
+        sd = AttendanceStudentDayRollup
+        is_absent = case(
+            (and_(sd.present + sd.late == 0, sd.unexcused + sd.excused + sd.suspended > 0), 1),
+            else_=0,
+        )
+        stmt = select(sd.student_id, sd.date, is_absent.label("is_absent")).where(
+            sd.date >= start_date, sd.date <= end_date
+        )
+        if student_ids is not None:
+            stmt = stmt.where(sd.student_id.in_(student_ids))
+        return stmt.cte("absence_days")
+
+    # One class: bucket that class's records per day (same rules as the rollups).
+    norm = func.lower(func.trim(Attendance.status))
+    attended = func.sum(case((norm.in_(("present", "late")), 1), else_=0))
+    absent = func.sum(
+        case((norm.in_(("unexcused absence", "absent", "excused absence", "suspended")), 1), else_=0)
+    )
+    stmt = (
+        select(
+            Attendance.student_id,
+            Attendance.date,
+            case((and_(attended == 0, absent > 0), 1), else_=0).label("is_absent"),
+        )
+        .where(
+            Attendance.class_id == class_id,
+            Attendance.date >= start_date,
+            Attendance.date <= end_date,
+        )
+        .group_by(Attendance.student_id, Attendance.date)
+    )
+    if student_ids is not None:
+        stmt = stmt.where(Attendance.student_id.in_(student_ids))
+    return stmt.cte("absence_days")
+
+
+def _query_streaks(start_date, end_date, class_id, student_ids, min_longest, min_current):
+    days = _absence_days(start_date, end_date, class_id, student_ids)
+    rn_all = func.row_number().over(partition_by=days.c.student_id, order_by=days.c.date)
+    rn_flag = func.row_number().over(
+        partition_by=(days.c.student_id, days.c.is_absent), order_by=days.c.date
+    )
+    numbered = select(
+        days.c.student_id,
+        days.c.date,
+        days.c.is_absent,
+        rn_all.label("rn"),
+        (rn_all - rn_flag).label("grp"),
+    ).cte("numbered")
+    last_day = (
+        select(numbered.c.student_id, func.max(numbered.c.rn).label("last_rn"))
+        .group_by(numbered.c.student_id)
+        .cte("last_day")
+    )
+    islands = (
+        select(
+            numbered.c.student_id,
+            func.count().label("length"),
+            func.min(numbered.c.date).label("start_date"),
+            func.max(numbered.c.date).label("end_date"),
+            func.max(numbered.c.rn).label("end_rn"),
+        )
+        .where(numbered.c.is_absent == 1)
+        .group_by(numbered.c.student_id, numbered.c.grp)
+        .cte("islands")
+    )
+    ranked = select(
+        islands.c.student_id,
+        islands.c.length,
+        islands.c.start_date,
+        islands.c.end_date,
+        case((islands.c.end_rn == last_day.c.last_rn, islands.c.length), else_=0).label("current"),
+        func.row_number()
+        .over(
+            partition_by=islands.c.student_id,
+            order_by=(islands.c.length.desc(), islands.c.end_date.desc()),
+        )
+        .label("pick"),
+    ).join_from(islands, last_day, islands.c.student_id == last_day.c.student_id).cte("ranked")
+
+    current = func.max(ranked.c.current)
+    longest = func.max(ranked.c.length)
+    stmt = (
+        select(
+            ranked.c.student_id,
+            longest.label("longest"),
+            current.label("current"),
+            func.max(case((ranked.c.pick == 1, ranked.c.start_date))).label("longest_start"),
+            func.max(case((ranked.c.pick == 1, ranked.c.end_date))).label("longest_end"),
+        )
+        .group_by(ranked.c.student_id)
+    )
+    if min_longest:
+        stmt = stmt.having(longest >= min_longest)
+    if min_current:
+        stmt = stmt.having(current >= min_current)
+
+    out: dict[int, AbsenceStreak] = {}
+    for row in db.session.execute(stmt):
+        out[int(row.student_id)] = AbsenceStreak(
+            student_id=int(row.student_id),
+            longest=int(row.longest or 0),
+            current=int(row.current or 0),
+            longest_start=row.longest_start,
+            longest_end=row.longest_end,
+        )
+    return out
+
+
+def absence_streaks(
+    start_date: date,
+    end_date: date,
+    *,
+    class_id: Optional[int] = None,
+    student_ids: Optional[Iterable[int]] = None,
+    min_longest: int = 0,
+    min_current: int = 0,
+) -> dict[int, AbsenceStreak]:
+    """
+    Longest and current absence streak per student over ``start_date``..``end_date``.
+
+    Students with no absence day in the range (or below ``min_longest`` /
+    ``min_current``) are omitted. ``class_id`` limits days to one class's records.
+    """
+    ids = None if student_ids is None else tuple(sorted({int(s) for s in student_ids}))
+    if ids == ():
+        return {}
+    ttl = _cache_seconds()
+    version = get_cache_version(STREAKS_VERSION_KEY) if ttl > 0 else 0
+    key = (version, start_date, end_date, class_id, ids, int(min_longest), int(min_current))
+    now = time.monotonic()
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and now - hit[0] < ttl:
+            return dict(hit[1])
+
+    # Very large explicit student lists are cheaper as a range query filtered afterwards.
+    query_ids = ids if ids is not None and len(ids) <= 500 else None
+    result = _query_streaks(start_date, end_date, class_id, query_ids, min_longest, min_current)
+    if ids is not None and query_ids is None:
+        wanted = set(ids)
+        result = {sid: streak for sid, streak in result.items() if sid in wanted}
+
+    if ttl > 0:
+        with _cache_lock:
+            if len(_cache) >= _CACHE_MAX_ENTRIES:
+                _cache.pop(next(iter(_cache)))
+            _cache[key] = (now, result)
+    return dict(result)
@@ -0,0 +1,175 @@
+"""
+Set-based attendance writes for whole rosters.
+
+- ``upsert_school_day_attendance``: one ``INSERT ... ON CONFLICT (student_id, date) DO
+  UPDATE`` per chunk of students (PostgreSQL and SQLite share the syntax), backed by the
+  ``unique_student_date`` constraint on ``SchoolDayAttendance``.
+- ``save_class_attendance``: ``Attendance`` has no unique key on (class, student, date),
+  so the existing rows for the class/date are read in one query, then updated by primary
+  key and the rest inserted, each as a single executemany. These Core statements skip the
+  ORM flush hooks, so the attendance rollup keys are queued for the commit and the
+  dashboard counters are updated explicitly.
+
+Both return ``{"created": n, "updated": n}`` and leave the commit to the caller.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import insert, select, update
+
+from extensions import db
+from models import Attendance, SchoolDayAttendance
+from services.attendance_rollups import queue_attendance_rollup_keys
+from services.dashboard_counters import apply_dashboard_deltas
+
+# Rows per statement; well under SQLite's bound-parameter limit.
+_CHUNK = 500
+
+_school_day = SchoolDayAttendance.__table__
+
+
+def _chunks(items: list[Any]) -> Iterable[list[Any]]:
+    for i in range(0, len(items), _CHUNK):
+        yield items[i : i + _CHUNK]
+
+
+def dialect_insert():
+    """Dialect ``insert`` with ``on_conflict_do_update`` (the app runs on PostgreSQL or SQLite)."""
+    if db.session.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        return sqlite_insert
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+    return pg_insert
+
+
+def upsert_school_day_attendance(
+    attendance_date: date,
+    entries: Iterable[dict[str, Any]],
+    *,
+    recorded_by: Optional[int],
+) -> dict[str, int]:
+    """
+    Record school-day attendance for many students at once.
+
+    ``entries`` are ``{"student_id", "status", "notes"}`` dicts (the last entry per student
+    wins). Existing rows for the date get the new status, notes and recorder.
+    """
+    by_student: dict[int, dict[str, Any]] = {}
+    for entry in entries:
+        by_student[int(entry["student_id"])] = entry
+    if not by_student:
+        return {"created": 0, "updated": 0}
+
+    now = datetime.utcnow()
+    student_ids = sorted(by_student)
+    # Only for the created / updated counts; the upsert itself needs no lookup.
+    existing: set[int] = set()
+    for chunk in _chunks(student_ids):
+        existing.update(
+            db.session.execute(
+                select(_school_day.c.student_id).where(
+                    _school_day.c.date == attendance_date, _school_day.c.student_id.in_(chunk)
+                )
+            ).scalars()
+        )
+
+    rows = [
+        {
+            "student_id": sid,
+            "date": attendance_date,
+            "status": by_student[sid]["status"],
+            "notes": by_student[sid].get("notes") or "",
+            "recorded_by": recorded_by,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for sid in student_ids
+    ]
+    stmt = dialect_insert()(_school_day)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_school_day.c.student_id, _school_day.c.date],
+        set_={
+            "status": stmt.excluded.status,
+            "notes": stmt.excluded.notes,
+            "recorded_by": stmt.excluded.recorded_by,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    for chunk in _chunks(rows):
+        db.session.execute(stmt, chunk)
+
+    return {"created": len(rows) - len(existing), "updated": len(existing)}
+
+
+def save_class_attendance(
+    class_id: int,
+    attendance_date: date,
+    entries: Iterable[dict[str, Any]],
+    *,
+    teacher_id: Optional[int],
+    update_teacher: bool = True,
+) -> dict[str, int]:
+    """
+    Record class-period attendance for many students at once.
+
+    ``entries`` are ``{"student_id", "status"}`` dicts, optionally with ``"notes"`` (omitted
+    notes leave existing notes alone). New rows get ``teacher_id``; existing rows get it
+    too when ``update_teacher`` is set.
+    """
+    by_student: dict[int, dict[str, Any]] = {}
+    for entry in entries:
+        by_student[int(entry["student_id"])] = entry
+    if not by_student:
+        return {"created": 0, "updated": 0}
+
+    student_ids = sorted(by_student)
+    existing: dict[int, list[tuple[int, str]]] = defaultdict(list)
+    for chunk in _chunks(student_ids):
+        for record_id, sid, old_status in db.session.execute(
+            select(Attendance.id, Attendance.student_id, Attendance.status).where(
+                Attendance.class_id == class_id,
+                Attendance.date == attendance_date,
+                Attendance.student_id.in_(chunk),
+            )
+        ):
+            existing[int(sid)].append((int(record_id), old_status))
+
+    inserts: list[dict[str, Any]] = []
+    # Grouped by the set of columns being written: executemany needs uniform parameters.
+    updates: dict[tuple[str, ...], list[dict[str, Any]]] = defaultdict(list)
+    now = datetime.utcnow()
+    present_delta = 0
+    for sid in student_ids:
+        entry = by_student[sid]
+        if sid not in existing:
+            present_delta += entry["status"] == "Present"
+            inserts.append({
+                "student_id": sid, "class_id": class_id, "date": attendance_date,
+                "status": entry["status"], "notes": entry.get("notes"),
+                "teacher_id": teacher_id, "created_at": now,
+            })
+            continue
+        values: dict[str, Any] = {"status": entry["status"]}
+        if "notes" in entry:
+            values["notes"] = entry["notes"]
+        if update_teacher:
+            values["teacher_id"] = teacher_id
+        for record_id, old_status in existing[sid]:
+            updates[tuple(sorted(values))].append({"id": record_id, **values})
+            present_delta += (entry["status"] == "Present") - (old_status == "Present")
+
+    for params in updates.values():
+        for chunk in _chunks(params):
+            db.session.execute(update(Attendance), chunk)
+    for chunk in _chunks(inserts):
+        db.session.execute(insert(Attendance), chunk)
+
+    queue_attendance_rollup_keys((sid, attendance_date) for sid in student_ids)
+    apply_dashboard_deltas(attendance={class_id: (len(inserts), present_delta)})
+    return {"created": len(inserts), "updated": len(student_ids) - len(inserts)}
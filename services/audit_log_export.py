@@ -0,0 +1,225 @@
+"""
+Streaming export of ``AdminAuditLog`` for the tech team.
+
+Hot rows go out newest first in id-descending keyset pages (``WHERE id < last_id ORDER
+BY id DESC LIMIT n``), so they export with constant memory and each page is a
+primary-key range scan however far back the export reaches. Months moved out by
+``services.log_retention`` follow, newest month first, streamed from their archive
+segments (oldest row first within a month, as stored), so the export covers the full
+history. The same filters apply to both: SQL criteria (``audit_log_criteria``) for hot
+pages and ``audit_row_matches`` for archived rows. ``gzip_stream`` compresses the CSV on
+the fly for ``.csv.gz`` downloads.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import zlib
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Iterable, Iterator, Optional
+
+from sqlalchemy import or_, select
+
+from extensions import db
+from models import AdminAuditLog
+
+EXPORT_PAGE_SIZE = 2000
+
+AUDIT_LOG_CSV_HEADER = (
+    "created_at", "user_id", "user_role", "teacher_staff_id",
+    "method", "status_code", "duration_ms", "endpoint", "path",
+    "ip_address", "user_agent",
+    "query_params", "form_data", "json_data",
+)
+
+_EXPORT_COLUMNS = (
+    AdminAuditLog.id,
+    AdminAuditLog.created_at,
+    AdminAuditLog.user_id,
+    AdminAuditLog.user_role,
+    AdminAuditLog.teacher_staff_id,
+    AdminAuditLog.method,
+    AdminAuditLog.status_code,
+    AdminAuditLog.duration_ms,
+    AdminAuditLog.endpoint,
+    AdminAuditLog.path,
+    AdminAuditLog.ip_address,
+    AdminAuditLog.user_agent,
+    AdminAuditLog.query_params,
+    AdminAuditLog.form_data,
+    AdminAuditLog.json_data,
+)
+
+
+def audit_log_criteria(
+    *,
+    q: str = "",
+    method: str = "",
+    status: str = "",
+    user_id: str = "",
+    role: str = "",
+    endpoint: str = "",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> list[Any]:
+    """SQL criteria for the audit-log filters (``end`` is inclusive of that whole day)."""
+    criteria: list[Any] = []
+    if start:
+        criteria.append(AdminAuditLog.created_at >= start)
+    if end:
+        criteria.append(AdminAuditLog.created_at < end + timedelta(days=1))
+    if method:
+        criteria.append(AdminAuditLog.method == method.upper())
+    if str(status).isdigit():
+        criteria.append(AdminAuditLog.status_code == int(status))
+    if str(user_id).isdigit():
+        criteria.append(AdminAuditLog.user_id == int(user_id))
+    if role:
+        criteria.append(AdminAuditLog.user_role == role)
+    if endpoint:
+        criteria.append(AdminAuditLog.endpoint == endpoint)
+    if q:
+        like = f"%{q}%"
+        criteria.append(
+            or_(
+                AdminAuditLog.path.ilike(like),
+                AdminAuditLog.endpoint.ilike(like),
+                AdminAuditLog.user_role.ilike(like),
+                AdminAuditLog.ip_address.ilike(like),
+            )
+        )
+    return criteria
+
+
+def audit_row_matches(
+    row: dict[str, Any],
+    *,
+    q: str = "",
+    method: str = "",
+    status: str = "",
+    user_id: str = "",
+    role: str = "",
+    endpoint: str = "",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> bool:
+    """``audit_log_criteria`` for an archived row (a dict from ``services.log_retention``)."""
+    created = row.get("created_at")
+    if start and (created is None or created < start):
+        return False
+    if end and (created is None or created >= end + timedelta(days=1)):
+        return False
+    if method and row.get("method") != method.upper():
+        return False
+    if str(status).isdigit() and row.get("status_code") != int(status):
+        return False
+    if str(user_id).isdigit() and row.get("user_id") != int(user_id):
+        return False
+    if role and row.get("user_role") != role:
+        return False
+    if endpoint and row.get("endpoint") != endpoint:
+        return False
+    if q:
+        needle = q.lower()
+        fields = ("path", "endpoint", "user_role", "ip_address")
+        if not any(needle in (row.get(f) or "").lower() for f in fields):
+            return False
+    return True
+
+
+def _csv_rows(rows: Iterable[Any], *, header: bool = False) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(AUDIT_LOG_CSV_HEADER)
+    for r in rows:
+        writer.writerow([
+            r.created_at.isoformat() if r.created_at else "",
+            r.user_id or "",
+            r.user_role or "",
+            r.teacher_staff_id or "",
+            r.method or "",
+            r.status_code or "",
+            r.duration_ms or "",
+            r.endpoint or "",
+            r.path or "",
+            r.ip_address or "",
+            r.user_agent or "",
+            r.query_params or "",
+            r.form_data or "",
+            r.json_data or "",
+        ])
+    return buf.getvalue()
+
+
+def iter_audit_log_csv(
+    filters: Optional[dict[str, Any]] = None,
+    *,
+    include_archive: bool = True,
+    page_size: int = EXPORT_PAGE_SIZE,
+) -> Iterator[str]:
+    """
+    CSV text for audit rows matching ``filters`` (``audit_log_criteria`` keywords): the
+    header, then one chunk per page of hot rows, then the archived months.
+    """
+    filters = dict(filters or {})
+    yield _csv_rows((), header=True)
+    base = (
+        select(*_EXPORT_COLUMNS)
+        .where(*audit_log_criteria(**filters))
+        .order_by(AdminAuditLog.id.desc())
+        .limit(page_size)
+    )
+    last_id: Optional[int] = None
+    while True:
+        stmt = base if last_id is None else base.where(AdminAuditLog.id < last_id)
+        rows = db.session.execute(stmt).all()
+        if rows:
+            yield _csv_rows(rows)
+        if len(rows) < page_size:
+            break
+        last_id = rows[-1].id
+    if include_archive:
+        yield from _iter_archived_csv(filters, page_size)
+
+
+def _iter_archived_csv(filters: dict[str, Any], page_size: int) -> Iterator[str]:
+    from services.log_retention import archived_months, iter_archived_rows
+
+    start, end = filters.get("start"), filters.get("end")
+    for month in archived_months("admin_audit_log"):
+        if end and month > end.strftime("%Y-%m"):
+            continue
+        if start and month < start.strftime("%Y-%m"):
+            break
+        # An interrupted retention run can leave archived rows in the hot table too;
+        # those already went out with the hot pages.
+        month_start = datetime.strptime(month, "%Y-%m")
+        month_end = (month_start + timedelta(days=32)).replace(day=1)
+        still_hot = set(db.session.execute(
+            select(AdminAuditLog.id).where(
+                AdminAuditLog.created_at >= month_start, AdminAuditLog.created_at < month_end
+            )
+        ).scalars())
+        batch = []
+        for row in iter_archived_rows("admin_audit_log", month):
+            if row.get("id") in still_hot or not audit_row_matches(row, **filters):
+                continue
+            batch.append(SimpleNamespace(**{col.key: row.get(col.key) for col in _EXPORT_COLUMNS}))
+            if len(batch) >= page_size:
+                yield _csv_rows(batch)
+                batch = []
+        if batch:
+            yield _csv_rows(batch)
+
+
+def gzip_stream(chunks: Iterable[str], *, level: int = 6) -> Iterator[bytes]:
+    """Gzip-compress text chunks (UTF-8) as they are produced."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
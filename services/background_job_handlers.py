@@ -0,0 +1,172 @@
+"""
+Handlers for ``services.background_jobs`` job types.
+
+Each takes the job payload dict and returns an optional result dict. Raising marks
+the attempt failed and schedules a retry with backoff, so handlers raise on
+transient errors and return normally when there is nothing (left) to do.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from flask import current_app
+
+from extensions import db
+
+
+def sync_google_user(payload: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """
+    ``google.sync_user``: push one portal user's OU / groups to Google Workspace.
+
+    A Workspace account that could not be created raises, so the job retries while the
+    encrypted initial password is still in its payload (it is dropped when the job
+    finishes either way, and stops decrypting after BACKGROUND_JOBS_SECRET_TTL_SECONDS).
+    """
+    from services.background_jobs import open_job_secret
+    from services.google_sync_tasks import sync_single_user_to_google
+
+    kwargs = {}
+    initial_password = open_job_secret(payload, "initial_google_password")
+    if initial_password:
+        kwargs["initial_google_password"] = initial_password
+    if "create_missing_groups" in payload:
+        kwargs["create_missing_groups"] = bool(payload["create_missing_groups"])
+    synced = sync_single_user_to_google(int(payload["user_id"]), **kwargs)
+    return {"synced": bool(synced)}
+
+
+def provision_class_google(payload: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """``google.provision_class``: create the class Google Group + Classroom if missing."""
+    from services.class_google_group import provision_class_google_errors
+
+    class_id = int(payload["class_id"])
+    errors = provision_class_google_errors(class_id)
+    if errors:
+        raise RuntimeError(f"Class {class_id}: " + "; ".join(errors))
+    return None
+
+
+def provision_classes_google(payload: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """
+    ``google.provision_classes``: provision a chunk of classes on a bounded worker pool.
+
+    Classes are independent, and the per-API rate limiter keeps the pool inside quota;
+    classes whose Classroom roster fingerprint is unchanged return without API calls.
+    Classes that fail are re-queued as their own ``google.provision_class`` jobs, so
+    they retry (and eventually park as failed) without redoing the rest of the chunk.
+    """
+    from datetime import timedelta
+
+    from services.background_jobs import _now, backoff_seconds, enqueue_job
+    from services.class_google_group import provision_class_google_errors
+    from services.google_rate_limit import run_concurrently
+
+    class_ids = [int(cid) for cid in payload.get("class_ids") or []]
+    results = run_concurrently(provision_class_google_errors, class_ids)
+    failed = {cid: errors for cid, errors in zip(class_ids, results) if errors}
+    for cid, errors in failed.items():
+        current_app.logger.warning("Google provision failed for class %s; re-queued: %s", cid, "; ".join(errors))
+        enqueue_job(
+            "google.provision_class",
+            {"class_id": cid},
+            idempotency_key=f"google.provision_class:{cid}",
+            run_after=_now() + timedelta(seconds=backoff_seconds(1)),
+        )
+    if failed:
+        db.session.commit()
+    return {"classes": len(class_ids), "failed": sorted(failed)}
+
+
+def revoke_workspace_license(payload: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """``google.revoke_license``: revoke licenses for one GoogleWorkspaceOffboardJob."""
+    from models import GoogleWorkspaceOffboardJob
+    from services.google_workspace_offboard import process_license_removal
+
+    offboard = db.session.get(GoogleWorkspaceOffboardJob, int(payload["offboard_job_id"]))
+    if offboard is None or offboard.status not in ("pending", "failed"):
+        return {"status": getattr(offboard, "status", None), "skipped": True}
+    status = process_license_removal(offboard)
+    if status == "failed":
+        raise RuntimeError(offboard.last_error or "License revocation failed.")
+    return {"status": status}
+
+
+def run_report_card_export_job(payload: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """``report_cards.export``: build a bulk report card ZIP / merged PDF."""
+    from models import ReportCardExportJob
+    from services.report_card_export import run_report_card_export
+
+    job_id = int(payload["job_id"])
+    export = db.session.get(ReportCardExportJob, job_id)
+    if export is None:
+        return {"skipped": True}
+    if export.status == "running":
+        # A previous attempt's worker died mid-export; the queue lease makes us the only runner.
+        export.status = "queued"
+        db.session.commit()
+    # Report card templates call url_for(), which needs a request context.
+    with current_app.test_request_context():
+        export = run_report_card_export(job_id)
+    return {"status": getattr(export, "status", None)}
+
+
+def continue_school_year_finalize(payload: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """``school_year.finalize``: resume a checkpointed year-end finalize."""
+    from models import SchoolYearClosure, User
+    from services import school_year_closure as syc
+
+    closure = db.session.get(SchoolYearClosure, int(payload["closure_id"]))
+    if closure is None or not syc.finalize_in_progress(closure):
+        return {"skipped": True}
+    actor_id = payload.get("actor_user_id")
+    actor = db.session.get(User, int(actor_id)) if actor_id else None
+    budget = max(30, int(current_app.config.get("BACKGROUND_JOBS_LEASE_SECONDS") or 300) // 2)
+    try:
+        stats = syc.finalize_closure(
+            closure,
+            triggered_by=payload.get("triggered_by") or "auto",
+            actor=actor,
+            time_budget_seconds=budget,
+        )
+    except ValueError as exc:
+        # Another invocation holds the finalize lease; it carries on instead.
+        db.session.rollback()
+        return {"skipped": True, "reason": str(exc)}
+    return {
+        "complete": bool(stats.get("complete")),
+        "students_processed": stats.get("students_processed"),
+    }
+
+
+def reconcile_dashboard_counters_job(payload: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """``dashboard.reconcile_counters``: recount a school year's management home counters."""
+    from services.dashboard_counters import reconcile_dashboard_counters
+
+    year_id = payload.get("school_year_id")
+    results = reconcile_dashboard_counters(int(year_id) if year_id else None)
+    return {"school_years": len(results)}
+
+
+def archive_old_logs_job(payload: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """``logs.archive``: move audit / activity log months past the hot window to archive files."""
+    from services.log_retention import archive_old_logs
+
+    summary = archive_old_logs(table_name=payload.get("table_name") or None)
+    return {name: sum(count for _month, count in months) for name, months in summary.items()}
+
+
+def sync_student_gpas_job(payload: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """``students.sync_gpas``: rewrite roster Student.gpa for the active school year."""
+    from utils.student_gpa import sync_active_year_gpas
+
+    result = sync_active_year_gpas(commit=True, force=True)
+    return {k: result.get(k) for k in ("school_year_id", "updated", "cleared")}
+
+
+def rebuild_unread_counters_job(payload: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """``unread.rebuild``: recompute unread badge counters from notifications and messages."""
+    from services.unread_counters import rebuild_unread_counters
+
+    user_ids = payload.get("user_ids")
+    return rebuild_unread_counters([int(uid) for uid in user_ids] if user_ids else None)
@@ -0,0 +1,568 @@
+"""
+Durable, DB-backed background job queue.
+
+Request handlers call ``enqueue_job`` (usually inside their own transaction) and
+return; a worker claims due ``BackgroundJob`` rows, runs the handler registered for
+the row's ``job_type`` and records the outcome. Work therefore survives deploys and
+worker restarts, and slow external calls (Google APIs) stay out of form saves.
+
+- Claiming is a compare-and-swap UPDATE, so several workers (or the embedded thread
+  plus ``ops/run_background_worker.py``) never run the same job twice at once.
+- A claimed job holds a lease (``locked_until``) that is renewed while the handler
+  runs; a job whose worker died is picked up again once the lease expires.
+- Failures retry with exponential backoff until ``max_attempts``, then park in
+  ``failed`` for an admin to retry from the Tech → Logs → Jobs view.
+- ``idempotency_key`` collapses duplicate enqueues while a job is still queued.
+- ``SECRET_PAYLOAD_KEYS`` values are stored Fernet-encrypted with a TTL
+  (``BACKGROUND_JOBS_SECRET_TTL_SECONDS``) and removed once the job is done, failed
+  or cancelled; handlers read them with ``open_job_secret``.
+
+Handlers are plain functions ``handler(payload: dict) -> dict | None`` listed in
+``JOB_HANDLERS`` as ``"module:function"`` strings (imported lazily to avoid cycles).
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import importlib
+import json
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, update
+
+from extensions import db
+from models import BackgroundJob
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+JOB_STATES = (JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+JOB_HANDLERS: dict[str, str] = {
+    "google.sync_user": "services.background_job_handlers:sync_google_user",
+    "google.provision_class": "services.background_job_handlers:provision_class_google",
+    "google.provision_classes": "services.background_job_handlers:provision_classes_google",
+    "google.revoke_license": "services.background_job_handlers:revoke_workspace_license",
+    "report_cards.export": "services.background_job_handlers:run_report_card_export_job",
+    "school_year.finalize": "services.background_job_handlers:continue_school_year_finalize",
+    "dashboard.reconcile_counters": "services.background_job_handlers:reconcile_dashboard_counters_job",
+    "logs.archive": "services.background_job_handlers:archive_old_logs_job",
+    "students.sync_gpas": "services.background_job_handlers:sync_student_gpas_job",
+    "unread.rebuild": "services.background_job_handlers:rebuild_unread_counters_job",
+}
+
+# Payload keys stored encrypted, never shown in the admin view and dropped once a job
+# is done, failed or cancelled.
+SECRET_PAYLOAD_KEYS = ("initial_google_password",)
+
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+# Finished (done / cancelled) rows are pruned after this many days.
+FINISHED_JOB_RETENTION_DAYS = 14
+
+_embedded_lock = threading.Lock()
+_embedded_thread: Optional[threading.Thread] = None
+
+
+def _now() -> datetime:
+    return datetime.utcnow()
+
+
+def _config_int(key: str, default: int) -> int:
+    try:
+        return int(current_app.config.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _load_payload(job: BackgroundJob) -> dict[str, Any]:
+    if not job.payload:
+        return {}
+    try:
+        data = json.loads(job.payload)
+    except (TypeError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _secret_fernet():
+    from cryptography.fernet import Fernet
+
+    key = current_app.config.get("ENCRYPTION_KEY")
+    if key:
+        return Fernet(key.encode("utf-8") if isinstance(key, str) else key)
+    # No dedicated key configured: derive one from SECRET_KEY so secrets never hit the
+    # table in plaintext.
+    secret = str(current_app.config.get("SECRET_KEY") or "").encode("utf-8")
+    return Fernet(base64.urlsafe_b64encode(hashlib.sha256(secret).digest()))
+
+
+def _seal_secrets(payload: dict[str, Any]) -> dict[str, Any]:
+    for key in SECRET_PAYLOAD_KEYS:
+        value = payload.get(key)
+        if value:
+            payload[key] = _secret_fernet().encrypt(str(value).encode("utf-8")).decode("ascii")
+        else:
+            payload.pop(key, None)
+    return payload
+
+
+def open_job_secret(payload: dict[str, Any], key: str) -> Optional[str]:
+    """Decrypt a ``SECRET_PAYLOAD_KEYS`` value; None if absent, expired or unreadable."""
+    from cryptography.fernet import InvalidToken
+
+    token = payload.get(key)
+    if not token:
+        return None
+    ttl = _config_int("BACKGROUND_JOBS_SECRET_TTL_SECONDS", 21600)
+    try:
+        return _secret_fernet().decrypt(str(token).encode("ascii"), ttl=ttl).decode("utf-8")
+    except (InvalidToken, ValueError):
+        current_app.logger.warning("Background job secret %r expired or unreadable; ignoring it", key)
+        return None
+
+
+def _scrub_secrets(job: BackgroundJob) -> None:
+    payload = _load_payload(job)
+    if any(k in payload for k in SECRET_PAYLOAD_KEYS):
+        for key in SECRET_PAYLOAD_KEYS:
+            payload.pop(key, None)
+        job.payload = json.dumps(payload)
+
+
+def backoff_seconds(attempts: int) -> int:
+    """Delay before retry ``attempts + 1``: 30s, 60s, 120s, … capped at 1h, ±20% jitter."""
+    delay = min(BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)), BACKOFF_MAX_SECONDS)
+    return int(delay * random.uniform(0.8, 1.2))
+
+
+# ---------------------------------------------------------------------------
+# Enqueue
+# ---------------------------------------------------------------------------
+def enqueue_job(
+    job_type: str,
+    payload: Optional[dict[str, Any]] = None,
+    *,
+    idempotency_key: Optional[str] = None,
+    run_after: Optional[datetime] = None,
+    max_attempts: Optional[int] = None,
+    created_by_user_id: Optional[int] = None,
+    commit: bool = False,
+) -> BackgroundJob:
+    """
+    Add a job to the queue (or fold it into a queued job with the same key).
+
+    Does not commit unless ``commit=True``: enqueueing inside the caller's
+    transaction means the job only becomes visible if the caller's write lands.
+    A duplicate merges its payload into the queued row and keeps the earlier
+    ``run_after``; running jobs are not deduplicated, since they may already have
+    read the state the new enqueue is reacting to.
+    """
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown background job type: {job_type}")
+    payload = _seal_secrets(dict(payload or {}))
+    run_after = run_after or _now()
+
+    job = None
+    if idempotency_key:
+        job = (
+            BackgroundJob.query.filter_by(idempotency_key=idempotency_key, state=JOB_QUEUED)
+            .order_by(BackgroundJob.id.asc())
+            .first()
+        )
+    if job is not None:
+        merged = _load_payload(job)
+        merged.update(payload)
+        job.payload = json.dumps(merged)
+        if run_after < job.run_after:
+            job.run_after = run_after
+    else:
+        job = BackgroundJob(
+            job_type=job_type,
+            payload=json.dumps(payload),
+            state=JOB_QUEUED,
+            attempts=0,
+            max_attempts=max_attempts or _config_int("BACKGROUND_JOBS_MAX_ATTEMPTS", 5),
+            run_after=run_after,
+            idempotency_key=(idempotency_key or None) and idempotency_key[:200],
+            created_by_user_id=created_by_user_id,
+        )
+        db.session.add(job)
+    if commit:
+        db.session.commit()
+    return job
+
+
+# ---------------------------------------------------------------------------
+# Claim / run
+# ---------------------------------------------------------------------------
+def _claimable(now: datetime):
+    return or_(
+        and_(BackgroundJob.state == JOB_QUEUED, BackgroundJob.run_after <= now),
+        and_(BackgroundJob.state == JOB_RUNNING, BackgroundJob.locked_until < now),
+    )
+
+
+def claim_next_job(worker_id: str, *, job_types: Optional[list[str]] = None) -> Optional[BackgroundJob]:
+    """Lease the oldest due job for ``worker_id`` (None when the queue is idle)."""
+    now = _now()
+    lease = timedelta(seconds=_config_int("BACKGROUND_JOBS_LEASE_SECONDS", 300))
+    q = db.session.query(BackgroundJob.id).filter(_claimable(now))
+    if job_types:
+        q = q.filter(BackgroundJob.job_type.in_(job_types))
+    candidate_ids = [row[0] for row in q.order_by(BackgroundJob.run_after, BackgroundJob.id).limit(10).all()]
+    db.session.rollback()
+
+    for job_id in candidate_ids:
+        result = db.session.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job_id, _claimable(now))
+            .values(
+                state=JOB_RUNNING,
+                locked_by=worker_id[:100],
+                locked_until=now + lease,
+                attempts=BackgroundJob.attempts + 1,
+                started_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if result.rowcount == 1:
+            return db.session.get(BackgroundJob, job_id)
+    return None
+
+
+class _LeaseKeeper:
+    """Renews a running job's lease from a side thread until stopped."""
+
+    def __init__(self, app, job_id: int, worker_id: str, lease_seconds: int):
+        self._app = app
+        self._job_id = job_id
+        self._worker_id = worker_id[:100]
+        self._lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"background-job-lease-{job_id}", daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        interval = max(5, self._lease_seconds // 3)
+        while not self._stop.wait(interval):
+            with self._app.app_context():
+                try:
+                    db.session.execute(
+                        update(BackgroundJob)
+                        .where(
+                            BackgroundJob.id == self._job_id,
+                            BackgroundJob.state == JOB_RUNNING,
+                            BackgroundJob.locked_by == self._worker_id,
+                        )
+                        .values(locked_until=_now() + timedelta(seconds=self._lease_seconds))
+                        .execution_options(synchronize_session=False)
+                    )
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    self._app.logger.warning("Could not renew lease for background job %s", self._job_id)
+                finally:
+                    db.session.remove()
+
+
+def _resolve_handler(job_type: str) -> Callable[[dict[str, Any]], Optional[dict[str, Any]]]:
+    target = JOB_HANDLERS.get(job_type)
+    if not target:
+        raise LookupError(f"No handler registered for job type {job_type!r}")
+    module_name, func_name = target.split(":", 1)
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _finish(job_id: int, *, state: str, result: Optional[dict] = None,
+            error: Optional[str] = None, retry_in: Optional[int] = None) -> Optional[BackgroundJob]:
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None:
+        return None
+    job.locked_by = None
+    job.locked_until = None
+    job.last_error = error[:4000] if error else None
+    if state == JOB_QUEUED:
+        job.run_after = _now() + timedelta(seconds=retry_in or 0)
+    else:
+        job.finished_at = _now()
+        _scrub_secrets(job)
+    if result is not None:
+        try:
+            job.result = json.dumps(result, default=str)
+        except (TypeError, ValueError):
+            job.result = None
+    job.state = state
+    db.session.commit()
+    return job
+
+
+def run_job(job: BackgroundJob, worker_id: str) -> str:
+    """Run one claimed job and record its outcome. Returns the resulting state."""
+    job_id = job.id
+    job_type = job.job_type
+    attempts = job.attempts
+    max_attempts = job.max_attempts
+    payload = _load_payload(job)
+    log = current_app.logger
+
+    if attempts > max_attempts:
+        # Worker(s) died holding the lease on every attempt.
+        _finish(job_id, state=JOB_FAILED, error=job.last_error or "Lease expired on every attempt.")
+        return JOB_FAILED
+
+    try:
+        handler = _resolve_handler(job_type)
+    except (LookupError, ImportError, AttributeError) as exc:
+        _finish(job_id, state=JOB_FAILED, error=str(exc))
+        return JOB_FAILED
+
+    app = current_app._get_current_object()
+    lease_seconds = _config_int("BACKGROUND_JOBS_LEASE_SECONDS", 300)
+    started = time.monotonic()
+    try:
+        with _LeaseKeeper(app, job_id, worker_id, lease_seconds):
+            result = handler(payload)
+    except Exception as exc:
+        db.session.rollback()
+        error = f"{type(exc).__name__}: {exc}"
+        if attempts >= max_attempts:
+            log.exception("Background job %s (%s) failed permanently", job_id, job_type)
+            _finish(job_id, state=JOB_FAILED, error=error)
+            return JOB_FAILED
+        delay = backoff_seconds(attempts)
+        log.warning(
+            "Background job %s (%s) attempt %s/%s failed, retrying in %ss: %s",
+            job_id, job_type, attempts, max_attempts, delay, error,
+        )
+        _finish(job_id, state=JOB_QUEUED, error=error, retry_in=delay)
+        return JOB_QUEUED
+
+    _finish(job_id, state=JOB_DONE, result=result if isinstance(result, dict) else None)
+    log.info(
+        "Background job %s (%s) done in %.1fs", job_id, job_type, time.monotonic() - started
+    )
+    return JOB_DONE
+
+
+def run_due_jobs(*, worker_id: Optional[str] = None, max_jobs: Optional[int] = None,
+                 max_seconds: Optional[float] = None,
+                 job_types: Optional[list[str]] = None) -> dict[str, int]:
+    """Drain due jobs until the queue is idle or a job/time limit is reached."""
+    worker_id = worker_id or default_worker_id()
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    stats = {"claimed": 0, JOB_DONE: 0, JOB_QUEUED: 0, JOB_FAILED: 0}
+    while True:
+        if max_jobs is not None and stats["claimed"] >= max_jobs:
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        job = claim_next_job(worker_id, job_types=job_types)
+        if job is None:
+            break
+        stats["claimed"] += 1
+        try:
+            state = run_job(job, worker_id)
+        finally:
+            db.session.remove()
+        stats[state] = stats.get(state, 0) + 1
+    return stats
+
+
+def prune_finished_jobs(older_than_days: int = FINISHED_JOB_RETENTION_DAYS) -> int:
+    """Delete done / cancelled rows older than the retention window."""
+    cutoff = _now() - timedelta(days=older_than_days)
+    # Failed rows are kept for the admin view; make sure none still carries a secret.
+    for key in SECRET_PAYLOAD_KEYS:
+        for job in BackgroundJob.query.filter(
+            BackgroundJob.state == JOB_FAILED, BackgroundJob.payload.contains(f'"{key}"')
+        ):
+            _scrub_secrets(job)
+    deleted = (
+        BackgroundJob.query.filter(
+            BackgroundJob.state.in_((JOB_DONE, JOB_CANCELLED)),
+            BackgroundJob.finished_at < cutoff,
+        ).delete(synchronize_session=False)
+    )
+    db.session.commit()
+    return int(deleted or 0)
+
+
+def _enqueue_log_archive_if_due() -> None:
+    """Queue log retention when a log table has rows past the hot window."""
+    from services.log_retention import log_archive_due
+
+    if log_archive_due():
+        enqueue_job("logs.archive", idempotency_key="logs.archive", commit=True)
+
+
+def _enqueue_unread_repair_if_due() -> None:
+    """Queue the unread counter repair once per UNREAD_COUNTERS_REPAIR_HOURS (0 = never)."""
+    hours = _config_int("UNREAD_COUNTERS_REPAIR_HOURS", 24)
+    if hours <= 0:
+        return
+    recent = BackgroundJob.query.filter(
+        BackgroundJob.job_type == "unread.rebuild",
+        or_(
+            BackgroundJob.state.in_((JOB_QUEUED, JOB_RUNNING)),
+            BackgroundJob.created_at >= _now() - timedelta(hours=hours),
+        ),
+    ).first()
+    if recent is None:
+        enqueue_job("unread.rebuild", idempotency_key="unread.rebuild", commit=True)
+
+
+def run_worker(app, *, worker_id: Optional[str] = None, poll_seconds: Optional[float] = None,
+               job_types: Optional[list[str]] = None, stop_event: Optional[threading.Event] = None) -> None:
+    """Poll-and-run loop used by the CLI and the embedded thread."""
+    worker_id = worker_id or default_worker_id()
+    stop_event = stop_event or threading.Event()
+    with app.app_context():
+        if poll_seconds is None:
+            poll_seconds = float(app.config.get("BACKGROUND_JOBS_POLL_SECONDS") or 2)
+    app.logger.info("Background job worker %s started", worker_id)
+    last_prune = 0.0
+    while not stop_event.is_set():
+        claimed = 0
+        with app.app_context():
+            try:
+                claimed = run_due_jobs(worker_id=worker_id, max_jobs=50, job_types=job_types)["claimed"]
+                if time.monotonic() - last_prune > 3600:
+                    last_prune = time.monotonic()
+                    prune_finished_jobs()
+                    _enqueue_log_archive_if_due()
+                    _enqueue_unread_repair_if_due()
+                    from services.live_events import prune_live_events
+                    prune_live_events()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Background job worker loop error")
+            finally:
+                db.session.remove()
+        if not claimed:
+            stop_event.wait(poll_seconds)
+    app.logger.info("Background job worker %s stopped", worker_id)
+
+
+def start_embedded_worker(app) -> Optional[threading.Thread]:
+    """Start the in-process worker thread once per process (no-op when disabled)."""
+    global _embedded_thread
+    if not app.config.get("BACKGROUND_JOBS_EMBEDDED_WORKER"):
+        return None
+    with _embedded_lock:
+        if _embedded_thread is not None and _embedded_thread.is_alive():
+            return _embedded_thread
+        _embedded_thread = threading.Thread(
+            target=run_worker,
+            args=(app,),
+            kwargs={"worker_id": f"embedded:{default_worker_id()}"},
+            name="background-job-worker",
+            daemon=True,
+        )
+        _embedded_thread.start()
+        return _embedded_thread
+
+
+# ---------------------------------------------------------------------------
+# Admin helpers
+# ---------------------------------------------------------------------------
+def retry_job(job_id: int) -> BackgroundJob:
+    """
+    Requeue a failed or cancelled job with a fresh attempt budget.
+
+    Secret payload values were dropped when the job finished, so a retried
+    ``google.sync_user`` creates the account with a new random initial password.
+    """
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None:
+        raise ValueError("Job not found.")
+    if job.state not in (JOB_FAILED, JOB_CANCELLED):
+        raise ValueError(f"Only failed or cancelled jobs can be retried (job is {job.state}).")
+    job.state = JOB_QUEUED
+    job.attempts = 0
+    job.run_after = _now()
+    job.finished_at = None
+    job.locked_by = None
+    job.locked_until = None
+    db.session.commit()
+    return job
+
+
+def cancel_job(job_id: int) -> BackgroundJob:
+    """Cancel a job that has not started yet."""
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None:
+        raise ValueError("Job not found.")
+    if job.state != JOB_QUEUED:
+        raise ValueError(f"Only queued jobs can be cancelled (job is {job.state}).")
+    job.state = JOB_CANCELLED
+    job.finished_at = _now()
+    _scrub_secrets(job)
+    db.session.commit()
+    return job
+
+
+def job_counts_by_state() -> dict[str, int]:
+    rows = db.session.query(BackgroundJob.state, func.count(BackgroundJob.id)).group_by(BackgroundJob.state).all()
+    counts = {state: 0 for state in JOB_STATES}
+    counts.update({state: int(n) for state, n in rows})
+    return counts
+
+
+def serialize_job(job: BackgroundJob) -> dict[str, Any]:
+    payload = _load_payload(job)
+    for key in SECRET_PAYLOAD_KEYS:
+        if key in payload:
+            payload[key] = "••••"
+    result = None
+    if job.result:
+        try:
+            result = json.loads(job.result)
+        except (TypeError, ValueError):
+            result = None
+
+    def _iso(value):
+        return value.isoformat() if value else None
+
+    return {
+        "id": job.id,
+        "job_type": job.job_type,
+        "state": job.state,
+        "payload": payload,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_after": _iso(job.run_after),
+        "idempotency_key": job.idempotency_key,
+        "locked_by": job.locked_by,
+        "locked_until": _iso(job.locked_until),
+        "last_error": job.last_error,
+        "result": result,
+        "created_by": job.created_by.username if job.created_by else None,
+        "created_at": _iso(job.created_at),
+        "started_at": _iso(job.started_at),
+        "finished_at": _iso(job.finished_at),
+    }
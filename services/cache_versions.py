@@ -0,0 +1,39 @@
+"""
+Shared version counters (``CacheVersion``) for caches kept in each worker process.
+
+A writer bumps a key in the same transaction as the data it changed; readers put
+``get_cache_version(key)`` (one primary-key read) into their cache key. Every gunicorn
+worker therefore stops serving an entry as soon as any process commits a change,
+without cross-process invalidation messages.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select
+
+from extensions import db
+from models import CacheVersion
+
+_table = CacheVersion.__table__
+
+
+def get_cache_version(key: str) -> int:
+    """Current version of ``key`` (0 before its first bump)."""
+    value = db.session.execute(select(_table.c.version).where(_table.c.key == key)).scalar()
+    return int(value or 0)
+
+
+def bump_cache_version(key: str, *, connection: Optional[object] = None) -> None:
+    """Increment ``key`` on ``connection`` (default: the session's), creating it on first use."""
+    from services.attendance_writes import dialect_insert
+
+    now = datetime.utcnow()
+    stmt = dialect_insert()(_table).values(key=key, version=1, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_table.c.key],
+        set_={"version": _table.c.version + 1, "updated_at": now},
+    )
+    (connection or db.session).execute(stmt)
@@ -3,10 +3,18 @@ School-managed Google Classroom provisioning per Clara Class.
 
 Creates courses as botadmin, direct-enrolls teachers/students (no invite accept),
 and deletes courses when a school year is archived.
+
+Each clean sync stores a roster fingerprint on the Class; while the course id and the
+desired teacher/student emails are unchanged, later provision runs skip the Classroom
+API for that class (pass ``force=True`` to reconcile anyway, e.g. after manual edits
+in Classroom).
 """
 
 from __future__ import annotations
 
+import hashlib
+from datetime import datetime
+
 from flask import current_app
 
 from extensions import db
@@ -16,7 +24,7 @@ from services.class_google_group import (
     primary_teacher_group_owner_email,
 )
 from services.google_classroom_admin import (
-    add_student_direct,
+    add_students_direct,
     add_teacher_direct,
     classroom_api_subject,
     classroom_owner_email,
@@ -25,7 +33,7 @@ from services.google_classroom_admin import (
     get_course,
     list_course_student_emails,
     list_course_teacher_emails,
-    remove_student,
+    remove_students,
     remove_teacher,
 )
 
@@ -89,10 +97,40 @@ def collect_classroom_student_emails(class_obj: Class) -> list[str]:
     return out
 
 
-def provision_and_sync_class_google_classroom(class_id: int) -> bool:
+def classroom_roster_fingerprint(
+    course_id: str,
+    teacher_emails: list[str],
+    student_emails: list[str],
+    primary_teacher_email: str | None = None,
+) -> str:
+    """Stable hash of everything a Classroom roster sync reconciles for one class."""
+    lines = [
+        f"course:{course_id}",
+        f"owner:{(classroom_owner_email() or '').lower()}",
+        f"primary:{(primary_teacher_email or '').lower()}",
+    ]
+    lines.extend(sorted(f"teacher:{e.lower()}" for e in teacher_emails))
+    lines.extend(sorted(f"student:{e.lower()}" for e in student_emails))
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def _record_roster_sync(c: Class, fingerprint: str | None) -> None:
+    c.google_roster_fingerprint = fingerprint
+    c.google_roster_synced_at = datetime.utcnow() if fingerprint else c.google_roster_synced_at
+    try:
+        db.session.commit()
+    except Exception as exc:
+        db.session.rollback()
+        current_app.logger.warning("Could not save roster fingerprint for class %s: %s", c.id, exc)
+
+
+def provision_and_sync_class_google_classroom(class_id: int, *, force: bool = False) -> bool:
     """
     Ensure an active class has a school-managed Google Classroom and that
     teacher/student membership matches Clara enrollments (direct add, no invites).
+
+    Returns True without calling Google when the roster fingerprint matches the last
+    clean sync, unless ``force``.
     """
     c = Class.query.get(class_id)
     if not c:
@@ -112,7 +150,19 @@ def provision_and_sync_class_google_classroom(class_id: int) -> bool:
         )
         return False
 
+    desired_teachers = {e.lower(): e for e in collect_classroom_teacher_emails(c)}
+    desired_students = {e.lower(): e for e in collect_classroom_student_emails(c)}
+    primary = primary_teacher_group_owner_email(c)
+
     course_id = (c.google_classroom_id or "").strip() or None
+    if course_id and not force and c.google_roster_fingerprint:
+        fingerprint = classroom_roster_fingerprint(
+            course_id, list(desired_teachers.values()), list(desired_students.values()), primary
+        )
+        if fingerprint == c.google_roster_fingerprint:
+            current_app.logger.debug("Classroom roster unchanged for class %s; skipping", class_id)
+            return True
+
     if course_id:
         existing = get_course(course_id)
         if not existing:
@@ -148,45 +198,52 @@ def provision_and_sync_class_google_classroom(class_id: int) -> bool:
             return False
         course_id = c.google_classroom_id
 
-    desired_teachers = {e.lower(): e for e in collect_classroom_teacher_emails(c)}
-    desired_students = {e.lower(): e for e in collect_classroom_student_emails(c)}
     owner = (classroom_owner_email() or "").lower()
     api_subject = (classroom_api_subject() or "").lower()
     protected_teachers = {e for e in (owner, api_subject) if e}
+    clean = True
 
     # Prefer adding primary teacher first so they appear promptly.
-    primary = primary_teacher_group_owner_email(c)
     if primary:
-        add_teacher_direct(course_id, primary)
+        clean = add_teacher_direct(course_id, primary) and clean
 
     current_teachers = list_course_teacher_emails(course_id)
     current_students = list_course_student_emails(course_id)
 
     for low, email in desired_teachers.items():
         if low not in current_teachers:
-            add_teacher_direct(course_id, email)
+            clean = add_teacher_direct(course_id, email) and clean
 
     for low in current_teachers:
         if low in protected_teachers:
             continue
         if low not in desired_teachers:
-            remove_teacher(course_id, low)
-
-    for low, email in desired_students.items():
-        if low not in current_students:
-            add_student_direct(course_id, email)
-
-    for low in current_students:
-        if low not in desired_students:
-            remove_student(course_id, low)
+            clean = remove_teacher(course_id, low) and clean
 
+    # Rosters change by dozens of students at a time (new school year); batch them.
+    added = add_students_direct(
+        course_id,
+        [email for low, email in desired_students.items() if low not in current_students],
+    )
+    removed = remove_students(course_id, sorted(low for low in current_students if low not in desired_students))
+    clean = clean and all(added.values()) and all(removed.values())
+
+    # Only a fully applied roster is remembered; partial failures are retried next run.
+    _record_roster_sync(
+        c,
+        classroom_roster_fingerprint(
+            course_id, list(desired_teachers.values()), list(desired_students.values()), primary
+        )
+        if clean
+        else None,
+    )
     return True
 
 
-def try_provision_class_google_classroom(class_id: int) -> None:
+def try_provision_class_google_classroom(class_id: int, *, force: bool = False) -> None:
     """Log warnings only; never raises."""
     try:
-        provision_and_sync_class_google_classroom(class_id)
+        provision_and_sync_class_google_classroom(class_id, force=force)
     except Exception as exc:
         current_app.logger.warning(
             "Class Google Classroom sync failed for class_id=%s: %s", class_id, exc
@@ -11,7 +11,7 @@ primary to OWNER before demoting the former primary to MEMBER (if still on the r
 
 from __future__ import annotations
 
-import threading
+import hashlib
 
 from flask import current_app
 
@@ -225,13 +225,46 @@ def try_provision_class_google_group(class_id: int) -> None:
         )
 
 
-def schedule_try_provision_class_google_groups(class_ids: list[int]) -> None:
+def provision_class_google_errors(class_id: int) -> list[str]:
     """
-    Provision Google Groups + Classrooms after the HTTP response returns.
+    Provision the class Google Group and Classroom; return what failed (empty when both
+    succeeded, were no-ops, or the class no longer exists). For background jobs, which
+    must retry a failure instead of finishing as done.
+    """
+    from services.class_google_classroom import provision_and_sync_class_google_classroom
+
+    if db.session.get(Class, class_id) is None:
+        return []
+    errors: list[str] = []
+    for label, provision in (
+        ("Google Group", provision_and_sync_class_google_group),
+        ("Google Classroom", provision_and_sync_class_google_classroom),
+    ):
+        try:
+            if not provision(class_id):
+                errors.append(f"{label} sync failed")
+        except Exception as exc:
+            current_app.logger.warning("Class %s sync failed for class_id=%s: %s", label, class_id, exc)
+            errors.append(f"{label}: {exc}")
+    return errors
+
+
+# Classes per ``google.provision_classes`` job; each job runs its chunk concurrently.
+PROVISION_CLASSES_CHUNK = 25
+
+
+def schedule_try_provision_class_google_groups(class_ids: list[int], *, commit: bool = True) -> None:
+    """
+    Queue Google Group + Classroom provisioning as background jobs.
 
     Core class setup (and other bulk flows) can create many classes; each Google API
     round-trip is slow enough to trip gunicorn worker timeouts if done in-request.
+    A single class gets its own ``google.provision_class`` job; larger sets are queued
+    as ``google.provision_classes`` chunks that provision their classes concurrently.
+    Pass ``commit=False`` to enqueue inside the caller's transaction.
     """
+    from services.background_jobs import enqueue_job
+
     ids: list[int] = []
     seen: set[int] = set()
     for raw in class_ids or []:
@@ -246,33 +279,24 @@ def schedule_try_provision_class_google_groups(class_ids: list[int]) -> None:
     if not ids:
         return
 
-    app = current_app._get_current_object()
-
-    def _run() -> None:
-        with app.app_context():
-            app.logger.info(
-                "Background Google provision starting for %s class(es)",
-                len(ids),
-            )
-            for cid in ids:
-                try:
-                    try_provision_class_google_group(cid)
-                except Exception as exc:
-                    app.logger.warning(
-                        "Background class Google provision failed for class_id=%s: %s",
-                        cid,
-                        exc,
-                    )
-            app.logger.info(
-                "Background Google provision finished for %s class(es)",
-                len(ids),
+    if len(ids) == 1:
+        enqueue_job(
+            "google.provision_class",
+            {"class_id": ids[0]},
+            idempotency_key=f"google.provision_class:{ids[0]}",
+        )
+    else:
+        for start in range(0, len(ids), PROVISION_CLASSES_CHUNK):
+            chunk = ids[start : start + PROVISION_CLASSES_CHUNK]
+            enqueue_job(
+                "google.provision_classes",
+                {"class_ids": chunk},
+                idempotency_key="google.provision_classes:"
+                + hashlib.sha1(",".join(str(cid) for cid in chunk).encode("ascii")).hexdigest(),
             )
-
-    threading.Thread(
-        target=_run,
-        name="class-google-provision",
-        daemon=True,
-    ).start()
+    if commit:
+        db.session.commit()
+    current_app.logger.info("Queued Google provision for %s class(es)", len(ids))
 
 
 def class_ids_needing_google_classroom(school_year_id: int | None = None) -> list[int]:
@@ -0,0 +1,452 @@
+"""
+Full-text search over communications messages and announcements.
+
+- PostgreSQL: GIN expression indexes on ``to_tsvector('english', ...)`` of message content
+  and announcement title + body; queries use the same expressions, ``to_tsquery`` with
+  prefix terms (``meet`` finds "meetings"), and ``ts_headline`` for snippets.
+- SQLite: FTS5 shadow tables (``message_search_fts``, ``announcement_search_fts``; porter
+  stemming, accents folded, rowid = source id) kept current by a flush hook; snippets
+  come from ``snippet()``.
+- Anything else (or an index that could not be created): ILIKE per term, snippets cut in
+  Python.
+
+Results are limited to what the user may read: direct messages they sent or received,
+messages in channels they belong to or created, and the announcements
+``get_user_announcements`` would show them (plus their own). Pages are newest first and
+keyset-paged on id (``cursor`` = last id of the previous page). Snippets are HTML-escaped
+with matches wrapped in ``<mark>``.
+
+Query-level writes to message / announcement text bypass the hook; follow them with
+``refresh_communication_search()`` (or ``ops/rebuild_communication_search.py``).
+"""
+
+from __future__ import annotations
+
+import html
+import re
+from typing import Any, Iterable, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, column, event, func, inspect, literal_column, or_, select, table, text, true
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Announcement, Enrollment, Message, MessageGroup, MessageGroupMember
+
+SCOPES = ("messages", "announcements")
+PAGE_SIZE = 20
+PAGE_SIZE_MAX = 50
+MIN_TERM = 2
+MAX_TERMS = 8
+SNIPPET_CHARS = 160
+
+_PG_CONFIG = "english"
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+_message_fts = table("message_search_fts", column("rowid"), column("content"))
+_announcement_fts = table("announcement_search_fts", column("rowid"), column("title"), column("message"))
+_message = Message.__table__
+_announcement = Announcement.__table__
+_SESSION_INFO_KEY = "_communication_search_touched"
+
+# engine url -> "fts5" | "tsvector" | None
+_backends: dict[str, Optional[str]] = {}
+
+
+# Spelled exactly as in the index definitions so PostgreSQL matches the expression indexes.
+_MESSAGE_DOCUMENT = f"to_tsvector('{_PG_CONFIG}', coalesce(message.content, ''))"
+_ANNOUNCEMENT_DOCUMENT = (
+    f"to_tsvector('{_PG_CONFIG}', coalesce(announcement.title, '') || ' ' || coalesce(announcement.message, ''))"
+)
+
+
+# ---------------------------------------------------------------------------
+# Index setup / backfill
+# ---------------------------------------------------------------------------
+def _detect_backend() -> Optional[str]:
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        found = db.session.execute(
+            text("SELECT count(*) FROM sqlite_master WHERE name IN ('message_search_fts', 'announcement_search_fts')")
+        ).scalar()
+        return "fts5" if found == 2 else None
+    if dialect == "postgresql":
+        found = db.session.execute(
+            text("SELECT count(*) FROM pg_indexes WHERE indexname IN ('ix_message_content_fts', 'ix_announcement_fts')")
+        ).scalar()
+        return "tsvector" if found == 2 else None
+    return None
+
+
+def search_backend() -> Optional[str]:
+    key = str(db.engine.url)
+    if key not in _backends:
+        try:
+            _backends[key] = _detect_backend()
+        except Exception:
+            db.session.rollback()
+            _backends[key] = None
+    return _backends[key]
+
+
+def ensure_communication_search_index() -> Optional[str]:
+    """Create the search indexes for this database and backfill FTS tables (startup; idempotent)."""
+    dialect = db.engine.dialect.name
+    statements = []
+    if dialect == "sqlite":
+        tokenize = "tokenize = 'porter unicode61 remove_diacritics 2'"
+        statements += [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS message_search_fts USING fts5(content, {tokenize})",
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS announcement_search_fts USING fts5(title, message, {tokenize})",
+        ]
+    elif dialect == "postgresql":
+        statements += [
+            f"CREATE INDEX IF NOT EXISTS ix_message_content_fts ON message USING gin (({_MESSAGE_DOCUMENT}))",
+            f"CREATE INDEX IF NOT EXISTS ix_announcement_fts ON announcement USING gin (({_ANNOUNCEMENT_DOCUMENT}))",
+        ]
+    try:
+        with db.engine.connect() as conn:
+            for stmt in statements:
+                conn.execute(text(stmt))
+            conn.commit()
+    except Exception as exc:
+        current_app.logger.warning("Communications search index unavailable; search uses ILIKE: %s", exc)
+    _backends.pop(str(db.engine.url), None)
+    backend = search_backend()
+
+    if backend == "fts5":
+        stale = any(
+            db.session.execute(select(func.count()).select_from(fts)).scalar()
+            != db.session.execute(select(func.count()).select_from(source)).scalar()
+            for fts, source in ((_message_fts, _message), (_announcement_fts, _announcement))
+        )
+        if stale:
+            current_app.logger.info("Building communications search index")
+            refresh_communication_search()
+    return backend
+
+
+def _write_fts_rows(conn, messages: list[tuple[int, Optional[str]]], announcements: list[tuple[int, Any, Any]],
+                    deleted_messages: Iterable[int] = (), deleted_announcements: Iterable[int] = ()) -> None:
+    message_ids = [mid for mid, _content in messages] + list(deleted_messages)
+    if message_ids:
+        conn.execute(_message_fts.delete().where(_message_fts.c.rowid.in_(message_ids)))
+    if messages:
+        conn.execute(_message_fts.insert(), [{"rowid": mid, "content": content or ""} for mid, content in messages])
+    announcement_ids = [aid for aid, _title, _body in announcements] + list(deleted_announcements)
+    if announcement_ids:
+        conn.execute(_announcement_fts.delete().where(_announcement_fts.c.rowid.in_(announcement_ids)))
+    if announcements:
+        conn.execute(
+            _announcement_fts.insert(),
+            [{"rowid": aid, "title": title or "", "message": body or ""} for aid, title, body in announcements],
+        )
+
+
+def refresh_communication_search(*, chunk_size: int = 1000) -> int:
+    """Rebuild the SQLite FTS tables from every message and announcement (no-op elsewhere)."""
+    if search_backend() != "fts5":
+        return 0
+    db.session.execute(_message_fts.delete())
+    db.session.execute(_announcement_fts.delete())
+    conn = db.session.connection()
+    refreshed = 0
+    for source, cols in ((_message, ("content",)), (_announcement, ("title", "message"))):
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(source.c.id, *(source.c[c] for c in cols))
+                .where(source.c.id > last_id)
+                .order_by(source.c.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            if source is _message:
+                _write_fts_rows(conn, [(r.id, r.content) for r in rows], [])
+            else:
+                _write_fts_rows(conn, [], [(r.id, r.title, r.message) for r in rows])
+            refreshed += len(rows)
+            last_id = rows[-1].id
+    db.session.commit()
+    return refreshed
+
+
+# ---------------------------------------------------------------------------
+# Permissions
+# ---------------------------------------------------------------------------
+def _visible_messages(user):
+    """Direct messages the user is part of, and messages in channels they belong to or created."""
+    groups = select(MessageGroupMember.group_id).where(MessageGroupMember.user_id == user.id).union(
+        select(MessageGroup.id).where(MessageGroup.created_by == user.id)
+    )
+    direct = and_(
+        or_(Message.group_id.is_(None), Message.message_type == "direct"),
+        or_(Message.sender_id == user.id, Message.recipient_id == user.id),
+    )
+    return or_(direct, Message.group_id.in_(groups))
+
+
+def _visible_announcements(user):
+    """Same audience rules as ``get_user_announcements``, plus announcements the user sent."""
+    role = user.role or ""
+    if role in ("Director", "School Administrator") or "Teacher" in role:
+        return true()
+    clauses = [Announcement.sender_id == user.id]
+    if role == "Student" and user.student_id:
+        class_ids = select(Enrollment.class_id).where(
+            Enrollment.student_id == user.student_id, Enrollment.is_active == True  # noqa: E712
+        )
+        clauses += [
+            Announcement.target_group.in_(("all_students", "all")),
+            and_(Announcement.target_group == "class", Announcement.class_id.in_(class_ids)),
+        ]
+    return or_(*clauses)
+
+
+# ---------------------------------------------------------------------------
+# Matching and snippets
+# ---------------------------------------------------------------------------
+def search_terms(query: str) -> list[str]:
+    """Word terms of ``query`` (lower-cased, at least MIN_TERM characters, at most MAX_TERMS)."""
+    terms = [t for t in re.findall(r"\w+", (query or "").lower()) if len(t) >= MIN_TERM]
+    return list(dict.fromkeys(terms))[:MAX_TERMS]
+
+
+def _fts_query(terms: list[str]) -> str:
+    return " AND ".join('"' + t.replace('"', '""') + '"*' for t in terms)
+
+
+def _ts_query(terms: list[str]):
+    return func.to_tsquery(_PG_CONFIG, " & ".join(f"{t}:*" for t in terms))
+
+
+def _headline(value, query):
+    options = (
+        f"StartSel={_MARK_START}, StopSel={_MARK_END}, MaxWords=24, MinWords=8, "
+        'MaxFragments=2, FragmentDelimiter=" … "'
+    )
+    return func.ts_headline(_PG_CONFIG, func.coalesce(value, ""), query, options)
+
+
+def _fts_snippet(fts_name: str, column_index: int):
+    return literal_column(
+        f"snippet({fts_name}, {column_index}, '{_MARK_START}', '{_MARK_END}', '…', 16)"
+    )
+
+
+def _python_snippet(value: Optional[str], terms: list[str]) -> str:
+    """Window around the first match with every term occurrence marked (fallback backend)."""
+    value = value or ""
+    lowered = value.lower()
+    hits = [lowered.find(t) for t in terms if t in lowered]
+    start = max(0, min(hits) - SNIPPET_CHARS // 3) if hits else 0
+    window = value[start:start + SNIPPET_CHARS]
+    pattern = re.compile("|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    marked = pattern.sub(lambda m: f"{_MARK_START}{m.group(0)}{_MARK_END}", window) if terms else window
+    return ("…" if start else "") + marked + ("…" if start + SNIPPET_CHARS < len(value) else "")
+
+
+def render_snippet(raw: Optional[str]) -> str:
+    """Escape a marked snippet for HTML and turn the match markers into ``<mark>`` tags."""
+    escaped = html.escape(raw or "")
+    return escaped.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+def _text_match(terms: list[str], *columns):
+    return and_(*(or_(*(col.ilike(f"%{t}%") for col in columns)) for t in terms))
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+def _message_page(user, terms: list[str], cursor: Optional[int], limit: int):
+    backend = search_backend()
+    visible = _visible_messages(user)
+    after = [Message.id < cursor] if cursor else []
+    cols = (Message.id, Message.group_id, Message.sender_id, Message.recipient_id, Message.created_at)
+    if backend == "fts5":
+        stmt = (
+            select(*cols, _fts_snippet("message_search_fts", 0).label("snippet"))
+            .join(_message_fts, _message_fts.c.rowid == Message.id)
+            .where(literal_column("message_search_fts").op("MATCH")(_fts_query(terms)), visible, *after)
+        )
+    elif backend == "tsvector":
+        query = _ts_query(terms)
+        ids = (
+            select(Message.id)
+            .where(literal_column(_MESSAGE_DOCUMENT).op("@@")(query), visible, *after)
+            .order_by(Message.id.desc())
+            .limit(limit + 1)
+            .subquery()
+        )
+        # Headlines only for the page's rows, not for every match.
+        stmt = select(*cols, _headline(Message.content, query).label("snippet")).where(Message.id.in_(select(ids.c.id)))
+    else:
+        # Raw text; search_communications cuts the snippet.
+        stmt = select(*cols, Message.content.label("snippet")).where(_text_match(terms, Message.content), visible, *after)
+    return db.session.execute(stmt.order_by(Message.id.desc()).limit(limit + 1)).all()
+
+
+def _announcement_page(user, terms: list[str], cursor: Optional[int], limit: int):
+    backend = search_backend()
+    visible = _visible_announcements(user)
+    after = [Announcement.id < cursor] if cursor else []
+    cols = (Announcement.id, Announcement.title, Announcement.sender_id, Announcement.target_group,
+            Announcement.class_id, Announcement.timestamp)
+    if backend == "fts5":
+        stmt = (
+            select(*cols, _fts_snippet("announcement_search_fts", 1).label("snippet"))
+            .join(_announcement_fts, _announcement_fts.c.rowid == Announcement.id)
+            .where(literal_column("announcement_search_fts").op("MATCH")(_fts_query(terms)), visible, *after)
+        )
+    elif backend == "tsvector":
+        query = _ts_query(terms)
+        ids = (
+            select(Announcement.id)
+            .where(literal_column(_ANNOUNCEMENT_DOCUMENT).op("@@")(query), visible, *after)
+            .order_by(Announcement.id.desc())
+            .limit(limit + 1)
+            .subquery()
+        )
+        stmt = select(*cols, _headline(Announcement.message, query).label("snippet")).where(
+            Announcement.id.in_(select(ids.c.id))
+        )
+    else:
+        stmt = select(*cols, Announcement.message.label("snippet")).where(
+            _text_match(terms, Announcement.title, Announcement.message), visible, *after
+        )
+    return db.session.execute(stmt.order_by(Announcement.id.desc()).limit(limit + 1)).all()
+
+
+def search_communications(user, query: str, *, scope: str = "messages", cursor: Optional[str] = None,
+                          limit: int = PAGE_SIZE) -> dict[str, Any]:
+    """
+    One page of ``scope`` ("messages" / "announcements") matches for ``user``, newest first.
+    Raises ValueError for an unknown scope, a bad cursor or a query without usable terms.
+    """
+    from communications.helpers import get_user_full_names
+
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown search scope: {scope}")
+    terms = search_terms(query)
+    if not terms:
+        raise ValueError(f"Enter at least {MIN_TERM} characters to search.")
+    try:
+        after_id = int(cursor) if cursor else None
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor.") from None
+    limit = max(1, min(int(limit or PAGE_SIZE), PAGE_SIZE_MAX))
+
+    if scope == "messages":
+        rows = _message_page(user, terms, after_id, limit)
+    else:
+        rows = _announcement_page(user, terms, after_id, limit)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    names = get_user_full_names(r.sender_id for r in rows)
+    # The ILIKE fallback selects the raw text; cut and mark it here.
+    snippets = {
+        r.id: render_snippet(r.snippet if search_backend() else _python_snippet(r.snippet, terms)) for r in rows
+    }
+
+    results = []
+    if scope == "messages":
+        group_ids = {r.group_id for r in rows if r.group_id}
+        groups = dict(
+            db.session.execute(select(MessageGroup.id, MessageGroup.name).where(MessageGroup.id.in_(group_ids))).all()
+        ) if group_ids else {}
+        for r in rows:
+            in_channel = r.group_id is not None and r.group_id in groups
+            results.append({
+                "id": r.id,
+                "kind": "channel" if in_channel else "direct",
+                "group_id": r.group_id if in_channel else None,
+                "channel_name": groups.get(r.group_id) if in_channel else None,
+                "other_user_id": None if in_channel else (r.recipient_id if r.sender_id == user.id else r.sender_id),
+                "sender_id": r.sender_id,
+                "sender_name": names.get(r.sender_id, "Unknown"),
+                "created_at": r.created_at.isoformat() if r.created_at else None,
+                "snippet": snippets[r.id],
+            })
+    else:
+        for r in rows:
+            results.append({
+                "id": r.id,
+                "kind": "announcement",
+                "title": r.title,
+                "target_group": r.target_group,
+                "class_id": r.class_id,
+                "sender_id": r.sender_id,
+                "sender_name": names.get(r.sender_id, "Unknown"),
+                "created_at": r.timestamp.isoformat() if r.timestamp else None,
+                "snippet": snippets[r.id],
+            })
+    return {
+        "results": results,
+        "scope": scope,
+        "terms": terms,
+        "has_more": has_more,
+        "next_cursor": str(rows[-1].id) if has_more and rows else None,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Session hooks
+# ---------------------------------------------------------------------------
+def _text_changed(obj, fields: tuple[str, ...]) -> bool:
+    attrs = inspect(obj).attrs
+    return any(attrs[f].history.has_changes() for f in fields)
+
+
+def _collect_search_changes(session: Session, _flush_context, _instances) -> None:
+    touched = session.info.get(_SESSION_INFO_KEY) or {
+        "messages": [], "announcements": [], "deleted_messages": set(), "deleted_announcements": set(),
+    }
+    for obj in session.new:
+        if isinstance(obj, Message):
+            touched["messages"].append(obj)
+        elif isinstance(obj, Announcement):
+            touched["announcements"].append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Message) and _text_changed(obj, ("content",)):
+            touched["messages"].append(obj)
+        elif isinstance(obj, Announcement) and _text_changed(obj, ("title", "message")):
+            touched["announcements"].append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Message) and obj.id is not None:
+            touched["deleted_messages"].add(int(obj.id))
+        elif isinstance(obj, Announcement) and obj.id is not None:
+            touched["deleted_announcements"].add(int(obj.id))
+    if any(touched.values()):
+        session.info[_SESSION_INFO_KEY] = touched
+
+
+def _apply_search_changes(session: Session, _flush_context) -> None:
+    touched = session.info.pop(_SESSION_INFO_KEY, None)
+    if not touched or search_backend() != "fts5":
+        return
+    conn = session.connection()
+    savepoint = conn.begin_nested()
+    try:
+        _write_fts_rows(
+            conn,
+            [(int(m.id), m.content) for m in touched["messages"] if m.id is not None],
+            [(int(a.id), a.title, a.message) for a in touched["announcements"] if a.id is not None],
+            touched["deleted_messages"],
+            touched["deleted_announcements"],
+        )
+        savepoint.commit()
+    except Exception as exc:
+        savepoint.rollback()
+        if has_app_context():
+            current_app.logger.warning(
+                "Communications search index update failed; run ops/rebuild_communication_search.py: %s", exc
+            )
+
+
+def register_communication_search_hooks() -> None:
+    """Keep the SQLite FTS tables current on ORM flushes (idempotent; PostgreSQL indexes need nothing)."""
+    if not event.contains(Session, "before_flush", _collect_search_changes):
+        event.listen(Session, "before_flush", _collect_search_changes)
+        event.listen(Session, "after_flush_postexec", _apply_search_changes)
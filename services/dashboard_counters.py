@@ -0,0 +1,382 @@
+"""
+Headline numbers for the management home, kept as one ``DashboardCounters`` row per
+school year instead of recounted (and every grade's JSON re-parsed) on each page load.
+
+- Attendance records / present and the grade score sum / count move by deltas: a
+  ``before_flush`` hook works out each write's contribution from the old and new
+  attribute values and ``after_flush_postexec`` adds it to the owning year's row inside
+  the same transaction (``register_dashboard_counter_hooks``).
+- Enrolled students is a distinct count, so Enrollment (and Student roster-flag) writes
+  recount it for the affected years with one ``COUNT`` each.
+- Core bulk writes skip the flush hooks: they report their deltas with
+  ``apply_dashboard_deltas`` (in a SAVEPOINT, like the hook); query-level UPDATE /
+  DELETE on the tracked tables clears ``reconciled_at`` so the next home load queues
+  a recount.
+- ``reconcile_dashboard_counters`` recounts from scratch; the home payload queues it as
+  a background job once a row is older than DASHBOARD_COUNTERS_RECONCILE_SECONDS, and
+  ops/reconcile_dashboard_counters.py runs it from cron or a shell.
+"""
+
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import case, event, func, inspect, insert, select, update
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import (
+    Assignment,
+    Attendance,
+    Class,
+    DashboardCounters,
+    Enrollment,
+    Grade,
+    SchoolYear,
+    Student,
+)
+
+DEFAULT_RECONCILE_SECONDS = 6 * 3600
+RECONCILE_JOB_TYPE = "dashboard.reconcile_counters"
+
+_SESSION_INFO_KEY = "dashboard_counter_deltas"
+_ROSTER_FLAGS = ("is_deleted", "marked_for_removal", "is_active")
+_counters = DashboardCounters.__table__
+
+
+def grade_score(grade_data: Optional[str]) -> Optional[float]:
+    """Numeric ``score`` from a grade's JSON, or None (the home average skips those)."""
+    try:
+        score = json.loads(grade_data or "").get("score")
+    except (TypeError, ValueError, AttributeError):
+        return None
+    return float(score) if isinstance(score, (int, float)) else None
+
+
+class _Deltas:
+    """Pending counter changes for one flush."""
+
+    def __init__(self) -> None:
+        self.grades: dict[int, list[float]] = defaultdict(lambda: [0.0, 0])
+        self.attendance: dict[int, list[int]] = defaultdict(lambda: [0, 0])
+        self.enrollment_class_ids: set[int] = set()
+        self.recount_all_students = False
+
+    def add_grade(self, assignment_id, grade_data, sign: int) -> None:
+        score = grade_score(grade_data)
+        if assignment_id is not None and score is not None:
+            acc = self.grades[int(assignment_id)]
+            acc[0] += sign * score
+            acc[1] += sign
+
+    def add_attendance(self, class_id, status, sign: int) -> None:
+        if class_id is not None:
+            acc = self.attendance[int(class_id)]
+            acc[0] += sign
+            acc[1] += sign if status == "Present" else 0
+
+    def __bool__(self) -> bool:
+        return bool(self.grades or self.attendance or self.enrollment_class_ids or self.recount_all_students)
+
+
+def _committed(obj: Any, attr: str) -> Any:
+    """Attribute value as of the last flush (before this one's pending change)."""
+    hist = inspect(obj).attrs[attr].history
+    if hist.deleted:
+        return hist.deleted[0]
+    return getattr(obj, attr)
+
+
+def _changed(obj: Any, *attrs: str) -> bool:
+    state = inspect(obj).attrs
+    return any(state[a].history.has_changes() for a in attrs)
+
+
+def _year_ids(conn, model, ids: Iterable[int]) -> dict[int, int]:
+    ids = list(ids)
+    if not ids:
+        return {}
+    rows = conn.execute(select(model.id, model.school_year_id).where(model.id.in_(ids)))
+    return {int(i): int(y) for i, y in rows if y is not None}
+
+
+def _enrolled_students_count(school_year_id: int):
+    """Scalar subquery: active-roster students with an active enrollment in the year."""
+    from utils.student_roster import active_roster_student_filters
+
+    return (
+        select(func.count(func.distinct(Student.id)))
+        .join(Enrollment, Enrollment.student_id == Student.id)
+        .join(Class, Class.id == Enrollment.class_id)
+        .where(
+            active_roster_student_filters(),
+            Enrollment.is_active.is_(True),
+            Class.school_year_id == school_year_id,
+        )
+        .scalar_subquery()
+    )
+
+
+def _reconcile_year(conn, school_year_id: int) -> dict[str, Any]:
+    """Full recount for one year (upserts its row, without committing)."""
+    records, present = conn.execute(
+        select(func.count(Attendance.id), func.sum(case((Attendance.status == "Present", 1), else_=0)))
+        .join(Class, Class.id == Attendance.class_id)
+        .where(Class.school_year_id == school_year_id)
+    ).one()
+    score_sum, score_count = 0.0, 0
+    grade_rows = conn.execution_options(yield_per=2000).execute(
+        select(Grade.grade_data)
+        .join(Assignment, Assignment.id == Grade.assignment_id)
+        .where(Assignment.school_year_id == school_year_id)
+    )
+    for (grade_data,) in grade_rows:
+        score = grade_score(grade_data)
+        if score is not None:
+            score_sum += score
+            score_count += 1
+    now = datetime.utcnow()
+    values = {
+        "enrolled_students": conn.execute(select(_enrolled_students_count(school_year_id))).scalar() or 0,
+        "attendance_records": int(records or 0),
+        "attendance_present": int(present or 0),
+        "grade_score_sum": score_sum,
+        "grade_score_count": score_count,
+        "reconciled_at": now,
+        "updated_at": now,
+    }
+    updated = conn.execute(
+        update(_counters).where(_counters.c.school_year_id == school_year_id).values(**values)
+    )
+    if not updated.rowcount:
+        conn.execute(insert(_counters).values(school_year_id=school_year_id, **values))
+    return values
+
+
+def record_dashboard_deltas(
+    *,
+    grades: Optional[dict[int, tuple[float, int]]] = None,
+    attendance: Optional[dict[int, tuple[int, int]]] = None,
+    enrollment_class_ids: Iterable[int] = (),
+    recount_all_students: bool = False,
+    connection=None,
+) -> None:
+    """
+    Apply counter changes: ``grades`` maps assignment id -> (score sum, score count),
+    ``attendance`` maps class id -> (records, present records); enrollment class ids
+    trigger a recount of their years' students. A year without a row is reconciled in
+    full instead (which already includes the write).
+    """
+    conn = connection if connection is not None else db.session.connection()
+    grade_years = _year_ids(conn, Assignment, (grades or {}).keys())
+    attendance_years = _year_ids(conn, Class, (attendance or {}).keys())
+    enrollment_years = set(_year_ids(conn, Class, enrollment_class_ids).values())
+
+    per_year: dict[int, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for assignment_id, (score_sum, score_count) in (grades or {}).items():
+        year = grade_years.get(assignment_id)
+        if year is not None:
+            per_year[year]["grade_score_sum"] += score_sum
+            per_year[year]["grade_score_count"] += score_count
+    for class_id, (records, present) in (attendance or {}).items():
+        year = attendance_years.get(class_id)
+        if year is not None:
+            per_year[year]["attendance_records"] += records
+            per_year[year]["attendance_present"] += present
+    if recount_all_students:
+        enrollment_years.update(conn.execute(select(_counters.c.school_year_id)).scalars())
+
+    years = set(per_year) | enrollment_years
+    if not years:
+        return
+    have = set(
+        conn.execute(
+            select(_counters.c.school_year_id).where(_counters.c.school_year_id.in_(years))
+        ).scalars()
+    )
+    now = datetime.utcnow()
+    for year in years:
+        if year not in have:
+            _reconcile_year(conn, year)
+            continue
+        values: dict[str, Any] = {"updated_at": now}
+        for column, delta in per_year.get(year, {}).items():
+            if delta:
+                col = _counters.c[column]
+                values[column] = col + (int(delta) if column != "grade_score_sum" else delta)
+        if year in enrollment_years:
+            values["enrolled_students"] = _enrolled_students_count(year)
+        conn.execute(update(_counters).where(_counters.c.school_year_id == year).values(**values))
+
+
+def reconcile_dashboard_counters(school_year_id: Optional[int] = None) -> dict[int, dict[str, Any]]:
+    """Recount one year's row (or every year's) from the source tables and commit."""
+    conn = db.session.connection()
+    if school_year_id is not None:
+        year_ids = [int(school_year_id)]
+    else:
+        year_ids = list(db.session.execute(select(SchoolYear.id).order_by(SchoolYear.id)).scalars())
+    results = {year: _reconcile_year(conn, year) for year in year_ids}
+    db.session.commit()
+    return results
+
+
+def _reconcile_seconds() -> int:
+    try:
+        return int(current_app.config.get("DASHBOARD_COUNTERS_RECONCILE_SECONDS", DEFAULT_RECONCILE_SECONDS))
+    except (TypeError, ValueError):
+        return DEFAULT_RECONCILE_SECONDS
+
+
+def get_dashboard_counters(school_year_id: int) -> DashboardCounters:
+    """
+    The year's counters row. Built (and committed) on first use; a row past its
+    reconcile interval is served as-is and a background recount is queued.
+    """
+    row = DashboardCounters.query.filter_by(school_year_id=school_year_id).first()
+    if row is None:
+        reconcile_dashboard_counters(school_year_id)
+        return DashboardCounters.query.filter_by(school_year_id=school_year_id).one()
+
+    max_age = _reconcile_seconds()
+    if max_age > 0 and (
+        row.reconciled_at is None or row.reconciled_at < datetime.utcnow() - timedelta(seconds=max_age)
+    ):
+        try:
+            from services.background_jobs import enqueue_job
+
+            enqueue_job(
+                RECONCILE_JOB_TYPE,
+                {"school_year_id": school_year_id},
+                idempotency_key=f"{RECONCILE_JOB_TYPE}:{school_year_id}",
+                commit=True,
+            )
+        except Exception as exc:
+            db.session.rollback()
+            current_app.logger.warning("Could not queue dashboard counter reconcile: %s", exc)
+    return row
+
+
+def dashboard_averages(row: DashboardCounters) -> dict[str, float]:
+    """``attendance_rate`` (% present) and ``average_grade`` (mean score) from a counters row."""
+    return {
+        "attendance_rate": (
+            round(row.attendance_present / row.attendance_records * 100, 1) if row.attendance_records > 0 else 0
+        ),
+        "average_grade": round(row.grade_score_sum / row.grade_score_count, 1) if row.grade_score_count > 0 else 0,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Session hooks
+# ---------------------------------------------------------------------------
+
+
+def _collect_counter_deltas(session: Session, _flush_context, _instances) -> None:
+    deltas = session.info.get(_SESSION_INFO_KEY) or _Deltas()
+    for obj in session.new:
+        if isinstance(obj, Grade):
+            deltas.add_grade(obj.assignment_id, obj.grade_data, +1)
+        elif isinstance(obj, Attendance):
+            deltas.add_attendance(obj.class_id, obj.status, +1)
+        elif isinstance(obj, Enrollment) and obj.class_id is not None:
+            deltas.enrollment_class_ids.add(int(obj.class_id))
+    for obj in session.deleted:
+        if isinstance(obj, Grade):
+            deltas.add_grade(_committed(obj, "assignment_id"), _committed(obj, "grade_data"), -1)
+        elif isinstance(obj, Attendance):
+            deltas.add_attendance(_committed(obj, "class_id"), _committed(obj, "status"), -1)
+        elif isinstance(obj, Enrollment) and _committed(obj, "class_id") is not None:
+            deltas.enrollment_class_ids.add(int(_committed(obj, "class_id")))
+    for obj in session.dirty:
+        if isinstance(obj, Grade):
+            if _changed(obj, "assignment_id", "grade_data"):
+                deltas.add_grade(_committed(obj, "assignment_id"), _committed(obj, "grade_data"), -1)
+                deltas.add_grade(obj.assignment_id, obj.grade_data, +1)
+        elif isinstance(obj, Attendance):
+            if _changed(obj, "class_id", "status"):
+                deltas.add_attendance(_committed(obj, "class_id"), _committed(obj, "status"), -1)
+                deltas.add_attendance(obj.class_id, obj.status, +1)
+        elif isinstance(obj, Enrollment):
+            if _changed(obj, "class_id", "is_active"):
+                deltas.enrollment_class_ids.update(
+                    int(c) for c in (_committed(obj, "class_id"), obj.class_id) if c is not None
+                )
+        elif isinstance(obj, Student):
+            if _changed(obj, *_ROSTER_FLAGS):
+                deltas.recount_all_students = True
+    if deltas:
+        session.info[_SESSION_INFO_KEY] = deltas
+
+
+def apply_dashboard_deltas(*, connection=None, **deltas: Any) -> None:
+    """
+    ``record_dashboard_deltas`` inside a SAVEPOINT; a failure is logged, not raised, so
+    it never rolls back the write it describes. Bulk Core writes call this directly.
+    """
+    conn = connection if connection is not None else db.session.connection()
+    savepoint = conn.begin_nested()
+    try:
+        record_dashboard_deltas(connection=conn, **deltas)
+        savepoint.commit()
+    except Exception as exc:
+        savepoint.rollback()
+        if has_app_context():
+            current_app.logger.warning("Dashboard counter update failed; the next reconcile corrects it: %s", exc)
+
+
+def _apply_counter_deltas(session: Session, _flush_context) -> None:
+    deltas = session.info.pop(_SESSION_INFO_KEY, None)
+    if not deltas:
+        return
+    apply_dashboard_deltas(
+        grades={k: (v[0], v[1]) for k, v in deltas.grades.items() if v[0] or v[1]},
+        attendance={k: (v[0], v[1]) for k, v in deltas.attendance.items() if v[0] or v[1]},
+        enrollment_class_ids=deltas.enrollment_class_ids,
+        recount_all_students=deltas.recount_all_students,
+        connection=session.connection(),
+    )
+
+
+def _mark_stale_on_bulk_write(orm_execute_state) -> None:
+    """Query-level UPDATE / DELETE on a tracked table: have the next home load recount."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.is_executemany:
+        # Bulk update by primary key: the caller reports its deltas itself.
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ not in (Grade, Attendance, Enrollment, Student):
+        return
+    orm_execute_state.session.connection().execute(update(_counters).values(reconciled_at=None))
+
+
+def _keep_old_value(_target, value, _oldvalue, _initiator):
+    return value
+
+
+# Attributes whose previous value the deltas need. ``active_history`` loads it before an
+# expired attribute (e.g. after a commit) is overwritten; otherwise history has no old value.
+_TRACKED_ATTRIBUTES = (
+    Grade.grade_data,
+    Grade.assignment_id,
+    Attendance.status,
+    Attendance.class_id,
+    Enrollment.class_id,
+    Enrollment.is_active,
+    *(getattr(Student, flag) for flag in _ROSTER_FLAGS),
+)
+
+
+def register_dashboard_counter_hooks() -> None:
+    """Keep counters current on every ORM flush that touches tracked models (idempotent)."""
+    if not event.contains(Session, "before_flush", _collect_counter_deltas):
+        for attr in _TRACKED_ATTRIBUTES:
+            event.listen(attr, "set", _keep_old_value, active_history=True, retval=True)
+        event.listen(Session, "before_flush", _collect_counter_deltas)
+        event.listen(Session, "after_flush_postexec", _apply_counter_deltas)
+        event.listen(Session, "do_orm_execute", _mark_stale_on_bulk_write)
@@ -0,0 +1,127 @@
+"""
+Batch helper for googleapiclient mutations (Directory group members, Classroom rosters).
+
+Callers build the un-executed request objects (``service.members().insert(...)``), hand
+them to ``execute_batched`` with a key each, and get back ``{key: BatchResult}`` — the same
+per-item response / HttpError they would have seen from ``.execute()``, so existing
+error mapping (duplicate member, not found, protected admin 403 …) applies unchanged.
+
+Requests go out as multipart ``BatchHttpRequest`` calls of at most ``max_batch_size``
+items. Google executes the parts of one batch in no particular order, so callers that
+need ordering (promote-before-demote) submit each phase as its own call.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from flask import current_app
+
+from services.google_rate_limit import (
+    acquire,
+    backoff_delay,
+    is_retryable_error,
+    max_retries,
+    note_retry,
+    retry_deadline,
+)
+
+# Directory API accepts up to 1000 calls per batch; keep batches smaller so one
+# throttled batch does not fail hundreds of memberships at once.
+DIRECTORY_BATCH_SIZE = 100
+# Classroom API batches are limited to 50 calls.
+CLASSROOM_BATCH_SIZE = 50
+
+
+@dataclass
+class BatchResult:
+    response: Any = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def execute_batched(
+    service: Any,
+    requests: Iterable[Tuple[Hashable, Any]],
+    *,
+    max_batch_size: int = DIRECTORY_BATCH_SIZE,
+    api: str = "directory",
+) -> Dict[Hashable, BatchResult]:
+    """
+    Execute ``(key, request)`` pairs in batches and return one BatchResult per key.
+
+    Each part costs one token from the ``api`` rate-limit bucket. Parts that fail with
+    a quota or transient 5xx error are retried in a later batch after backoff (honoring
+    ``Retry-After``); other per-part errors are returned to the caller as-is.
+
+    Falls back to executing requests one by one when ``service`` has no
+    ``new_batch_http_request`` (e.g. a test double). A failure of a whole batch
+    (transport error) is recorded against every request in that batch.
+    """
+    items = list(requests)
+    results: Dict[Hashable, BatchResult] = {}
+    if not items:
+        return results
+
+    new_batch = getattr(service, "new_batch_http_request", None)
+    if new_batch is None:
+        for key, request in items:
+            try:
+                results[key] = BatchResult(response=request.execute())
+            except Exception as exc:
+                results[key] = BatchResult(error=exc)
+        return results
+
+    size = max(1, int(max_batch_size))
+    limit = max_retries()
+    deadline = retry_deadline()
+    pending = items
+    attempt = 0
+    while pending:
+        retry: list[Tuple[Hashable, Any]] = []
+        retry_exc: Optional[BaseException] = None
+        for start in range(0, len(pending), size):
+            chunk = pending[start : start + size]
+
+            def _callback(request_id: str, response: Any, exception: Optional[Exception], _chunk=chunk) -> None:
+                key = _chunk[int(request_id)][0]
+                results[key] = BatchResult(response=response, error=exception)
+
+            batch = new_batch(callback=_callback)
+            for idx, (_key, request) in enumerate(chunk):
+                batch.add(request, request_id=str(idx))
+            acquire(api, len(chunk))
+            try:
+                batch.execute()
+            except Exception as exc:
+                current_app.logger.error("Google batch request of %s call(s) failed: %s", len(chunk), exc)
+                for key, _request in chunk:
+                    results[key] = BatchResult(error=exc)
+            for key, request in chunk:
+                err = results.setdefault(key, BatchResult(error=RuntimeError("no response in batch"))).error
+                if err is not None and is_retryable_error(err) and attempt < limit:
+                    retry.append((key, request))
+                    retry_exc = err
+        if not retry:
+            break
+        delay = backoff_delay(attempt, retry_exc)
+        if deadline is not None and time.monotonic() + delay > deadline:
+            break
+        note_retry(api, retry_exc, delay)
+        current_app.logger.warning(
+            "Google %s batch: %s part(s) throttled/failed; retry %s/%s in %.1fs",
+            api,
+            len(retry),
+            attempt + 1,
+            limit,
+            delay,
+        )
+        time.sleep(delay)
+        pending = retry
+        attempt += 1
+    return results
@@ -10,13 +10,17 @@ a school year is archived.
 from __future__ import annotations
 
 import json
-from typing import Any, Optional, Sequence
+import threading
+from typing import Any, Iterable, Optional, Sequence
 
 from flask import current_app
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from services.google_batch import CLASSROOM_BATCH_SIZE, execute_batched
+from services.google_rate_limit import throttled_request_class
+
 
 CLASSROOM_SCOPES = [
     "https://www.googleapis.com/auth/classroom.courses",
@@ -35,7 +39,15 @@ CLASSROOM_DWD_SCOPES = [
     *CLASSROOM_SCOPES,
 ]
 
-_classroom_service_cache: dict[tuple[str, str], Any] = {}
+# One client per thread (httplib2 transport is not thread-safe; syncs use a worker pool).
+_classroom_service_local = threading.local()
+
+
+def _classroom_service_cache() -> dict[tuple[str, str], Any]:
+    cache = getattr(_classroom_service_local, "services", None)
+    if cache is None:
+        cache = _classroom_service_local.services = {}
+    return cache
 
 
 def _http_status(exc: HttpError) -> int | None:
@@ -148,8 +160,9 @@ def get_classroom_admin_service(scopes: Optional[Sequence[str]] = None):
 
     effective_scopes = list(scopes) if scopes else list(CLASSROOM_DWD_SCOPES)
     cache_key = (subject.lower(), ",".join(sorted(effective_scopes)))
-    if cache_key in _classroom_service_cache:
-        return _classroom_service_cache[cache_key]
+    cache = _classroom_service_cache()
+    if cache_key in cache:
+        return cache[cache_key]
 
     sa_email, sa_client_id = _sa_identity_from_config()
     try:
@@ -180,8 +193,14 @@ def get_classroom_admin_service(scopes: Optional[Sequence[str]] = None):
             )
             raise
 
-        service = build("classroom", "v1", credentials=delegated, cache_discovery=False)
-        _classroom_service_cache[cache_key] = service
+        service = build(
+            "classroom",
+            "v1",
+            credentials=delegated,
+            cache_discovery=False,
+            requestBuilder=throttled_request_class("classroom"),
+        )
+        cache[cache_key] = service
         current_app.logger.info(
             "Classroom admin service ready (subject=%s owner=%s sa=%s client_id=%s)",
             subject,
@@ -465,6 +484,73 @@ def remove_student(course_id: str, student_email: str) -> bool:
         return False
 
 
+def add_students_direct(course_id: str, student_emails: Iterable[str]) -> dict[str, bool]:
+    """
+    Batched ``add_student_direct`` for a whole roster: one Classroom batch call per
+    ``CLASSROOM_BATCH_SIZE`` students. Returns ``{email: added_or_already_enrolled}``.
+    """
+    emails = [e.strip() for e in student_emails or [] if e and e.strip()]
+    service = get_classroom_admin_service()
+    if not service or not course_id or not emails:
+        return {e: False for e in emails}
+    results = execute_batched(
+        service,
+        (
+            (email, service.courses().students().create(courseId=course_id, body={"userId": email}))
+            for email in emails
+        ),
+        max_batch_size=CLASSROOM_BATCH_SIZE,
+        api="classroom",
+    )
+    out: dict[str, bool] = {}
+    for email in emails:
+        res = results[email]
+        if res.ok:
+            current_app.logger.info("Added student %s to Classroom %s", email, course_id)
+            out[email] = True
+        elif isinstance(res.error, HttpError) and _already_exists(res.error):
+            out[email] = True
+        else:
+            current_app.logger.error(
+                "Failed to add student %s to Classroom %s (api_subject=%s): %s%s",
+                email,
+                course_id,
+                classroom_api_subject(),
+                res.error,
+                _roster_permission_hint(res.error),
+            )
+            out[email] = False
+    return out
+
+
+def remove_students(course_id: str, student_emails: Iterable[str]) -> dict[str, bool]:
+    """Batched ``remove_student``. Returns ``{email: removed_or_already_absent}``."""
+    emails = [e.strip() for e in student_emails or [] if e and e.strip()]
+    service = get_classroom_admin_service()
+    if not service or not course_id or not emails:
+        return {e: False for e in emails}
+    results = execute_batched(
+        service,
+        (
+            (email, service.courses().students().delete(courseId=course_id, userId=email))
+            for email in emails
+        ),
+        max_batch_size=CLASSROOM_BATCH_SIZE,
+        api="classroom",
+    )
+    out: dict[str, bool] = {}
+    for email in emails:
+        res = results[email]
+        if res.ok or (isinstance(res.error, HttpError) and _not_found(res.error)):
+            out[email] = True
+        else:
+            current_app.logger.warning(
+                "Failed to remove student %s from Classroom %s: %s", email, course_id, res.error
+            )
+            out[email] = False
+    return out
+
+
 def remove_teacher(course_id: str, teacher_email: str) -> bool:
     service = get_classroom_admin_service()
     email = (teacher_email or "").strip()
@@ -10,6 +10,8 @@ from googleapiclient.discovery import build
 from flask import current_app
 import requests
 
+from services.google_rate_limit import throttled_request_class
+
 
 def get_google_service(user):
     """
@@ -58,7 +60,7 @@ def get_google_service(user):
         )
         
         # 3. Build the Classroom service
-        service = build('classroom', 'v1', credentials=creds)
+        service = build('classroom', 'v1', credentials=creds, requestBuilder=throttled_request_class('classroom'))
         return service
         
     except Exception as e:
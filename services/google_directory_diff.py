@@ -0,0 +1,689 @@
+"""
+Snapshot-and-diff engine for the bulk Google Directory sync (scripts/sync_all_to_google.py).
+
+Instead of probing Google once per portal user (users.get, orgunits.get per OU segment,
+groups.list, members.get …), the sync pulls a handful of bulk snapshots:
+
+- every user's ``orgUnitPath`` / ``suspended`` / ``isAdmin`` via paged ``users.list``
+- the OU tree via one ``orgunits.list(type=all)``
+- the members of each managed school-wide group via paged ``members.list``
+
+Desired state is computed locally from ``services.google_ou_policy``
+(``desired_student_account`` / ``desired_staff_account``), diffed against the snapshot
+(``plan_directory_changes``) and only the resulting mutations are issued
+(``apply_directory_plan``). A nightly run where nothing changed costs only the list pages.
+
+All functions take the Directory service object explicitly, so the whole pipeline can run
+against the in-memory ``FakeDirectoryService`` (tests/google_directory_fake.py, loaded
+from a saved snapshot) in tests and offline dry runs.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from flask import current_app
+from googleapiclient.errors import HttpError
+
+from services.google_batch import DIRECTORY_BATCH_SIZE, execute_batched
+from services.google_rate_limit import run_concurrently
+
+from services.google_directory_service import (
+    DIRECTORY_CUSTOMER_ID,
+    _WORKSPACE_DOMAIN,
+    _http_error_suggests_ou_insert_duplicate_or_exists,
+    _is_http_not_found,
+    _is_protected_workspace_admin_403,
+    _normalize_org_unit_path,
+    note_org_unit_created,
+    prime_org_unit_tree,
+)
+from services.google_ou_policy import (
+    STAFF_OU_TERMINATED_REMOVED,
+    StudentOuDecision,
+    _is_departing,
+    school_level_group_for_grade,
+    staff_google_account_eligible,
+    staff_should_suspend_immediately,
+)
+
+TEACHERS_GROUP_EMAIL = f"teachers@{_WORKSPACE_DOMAIN}"
+ELEMENTARY_GROUP_EMAIL = f"elementary@{_WORKSPACE_DOMAIN}"
+MIDDLE_SCHOOL_GROUP_EMAIL = f"middle_school@{_WORKSPACE_DOMAIN}"
+HIGH_SCHOOL_GROUP_EMAIL = f"highschool@{_WORKSPACE_DOMAIN}"
+STUDENT_ASSEMBLY_GROUP_EMAIL = f"studentassembly@{_WORKSPACE_DOMAIN}"
+
+_LEVEL_GROUP_EMAILS = {
+    "elementary": ELEMENTARY_GROUP_EMAIL,
+    "middle_school": MIDDLE_SCHOOL_GROUP_EMAIL,
+    "highschool": HIGH_SCHOOL_GROUP_EMAIL,
+}
+
+STUDENT_MANAGED_GROUP_EMAILS = frozenset(
+    {
+        ELEMENTARY_GROUP_EMAIL,
+        MIDDLE_SCHOOL_GROUP_EMAIL,
+        HIGH_SCHOOL_GROUP_EMAIL,
+        STUDENT_ASSEMBLY_GROUP_EMAIL,
+    }
+)
+SYNC_GROUP_EMAILS = tuple(sorted(STUDENT_MANAGED_GROUP_EMAILS | {TEACHERS_GROUP_EMAIL}))
+
+USERS_LIST_PAGE_SIZE = 500
+MEMBERS_LIST_PAGE_SIZE = 200
+
+# Order mutations are applied in: OUs before the users moved into them, groups before members.
+ACTION_ORDER = (
+    "create_ou",
+    "create_group",
+    "create_user",
+    "update_user",
+    "add_member",
+    "remove_member",
+    "queue_license_removal",
+)
+
+
+def _http_status(exc: HttpError) -> int:
+    return int(getattr(getattr(exc, "resp", None), "status", None) or 0)
+
+
+# ---------------------------------------------------------------------------
+# Snapshot
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class DirectorySnapshot:
+    """Bulk read of the Directory state the sync cares about (keys are lower-cased emails)."""
+
+    users: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    org_units: Set[str] = field(default_factory=lambda: {"/"})
+    # group email -> {member email: role}; None when the group does not exist.
+    group_members: Dict[str, Optional[Dict[str, str]]] = field(default_factory=dict)
+    list_calls: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """JSON-friendly form; the tests' ``FakeDirectoryService.from_snapshot_dict`` loads it back."""
+        return {
+            "users": [dict(u) for _, u in sorted(self.users.items())],
+            "org_units": sorted(p for p in self.org_units if p != "/"),
+            "groups": {
+                g: [{"email": e, "role": r} for e, r in sorted(members.items())]
+                for g, members in sorted(self.group_members.items())
+                if members is not None
+            },
+        }
+
+
+def take_directory_snapshot(service: Any, group_emails: Iterable[str] = SYNC_GROUP_EMAILS) -> DirectorySnapshot:
+    """
+    Page through users, the OU tree and each group's members.
+
+    Raises RuntimeError if the users or OU listing fails: diffing against a partial
+    snapshot would plan creates for accounts that already exist.
+    """
+    snap = DirectorySnapshot()
+
+    page_token: Optional[str] = None
+    try:
+        while True:
+            kwargs: Dict[str, Any] = {
+                "customer": DIRECTORY_CUSTOMER_ID,
+                "maxResults": USERS_LIST_PAGE_SIZE,
+                "projection": "basic",
+                "fields": "nextPageToken,users(primaryEmail,orgUnitPath,suspended,isAdmin)",
+            }
+            if page_token:
+                kwargs["pageToken"] = page_token
+            resp = service.users().list(**kwargs).execute()
+            snap.list_calls += 1
+            for u in resp.get("users") or []:
+                email = (u.get("primaryEmail") or "").strip()
+                if not email:
+                    continue
+                snap.users[email.lower()] = {
+                    "primaryEmail": email,
+                    "orgUnitPath": _normalize_org_unit_path(u.get("orgUnitPath") or "/"),
+                    "suspended": bool(u.get("suspended", False)),
+                    "isAdmin": bool(u.get("isAdmin", False)),
+                }
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                break
+    except HttpError as e:
+        raise RuntimeError(f"Directory API error listing users: {e}") from e
+
+    try:
+        resp = service.orgunits().list(customerId=DIRECTORY_CUSTOMER_ID, type="all").execute()
+        snap.list_calls += 1
+    except HttpError as e:
+        raise RuntimeError(f"Directory API error listing org units: {e}") from e
+    for ou in resp.get("organizationUnits") or []:
+        path = ou.get("orgUnitPath")
+        if path:
+            snap.org_units.add(_normalize_org_unit_path(path))
+    prime_org_unit_tree(snap.org_units)
+
+    for group_email in group_emails:
+        key = (group_email or "").strip().lower()
+        if not key or key in snap.group_members:
+            continue
+        members: Optional[Dict[str, str]] = {}
+        page_token = None
+        try:
+            while True:
+                kwargs = {"groupKey": key, "maxResults": MEMBERS_LIST_PAGE_SIZE}
+                if page_token:
+                    kwargs["pageToken"] = page_token
+                resp = service.members().list(**kwargs).execute()
+                snap.list_calls += 1
+                for m in resp.get("members") or []:
+                    em = (m.get("email") or "").strip().lower()
+                    if em:
+                        members[em] = (m.get("role") or "MEMBER").upper()
+                page_token = resp.get("nextPageToken")
+                if not page_token:
+                    break
+        except HttpError as e:
+            if not _is_http_not_found(e):
+                raise RuntimeError(f"Directory API error listing members of {key}: {e}") from e
+            members = None
+        snap.group_members[key] = members
+
+    return snap
+
+
+# ---------------------------------------------------------------------------
+# Desired state
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class DesiredAccount:
+    """What policy says one portal user's Workspace account should look like."""
+
+    email: str
+    kind: str  # "student" | "staff"
+    target_ou: str
+    suspended: bool
+    given_name: str = ""
+    family_name: str = ""
+    related_id: Optional[int] = None
+    create_if_missing: bool = False
+    # Groups the user must be in, and the managed groups they must be removed from otherwise.
+    groups: Set[str] = field(default_factory=set)
+    managed_groups: Set[str] = field(default_factory=set)
+    # Policy wants the license revoked (suspended accounts, staff without portal login).
+    license_removal: bool = False
+
+
+def student_school_groups(grade_level: Any) -> List[str]:
+    """Exactly one of Elementary / Middle / High (when the grade maps to one) plus Student Assembly."""
+    groups = [STUDENT_ASSEMBLY_GROUP_EMAIL]
+    level_email = _LEVEL_GROUP_EMAILS.get(school_level_group_for_grade(grade_level) or "")
+    if level_email:
+        groups.insert(0, level_email)
+    return groups
+
+
+def desired_student_account(student: Any, email: str, decision: StudentOuDecision) -> DesiredAccount:
+    """Mirror ``sync_student_google_suspension`` + the school-level group rules for one student."""
+    is_active = bool(getattr(student, "is_active", True))
+    marked_for_removal = bool(getattr(student, "marked_for_removal", False))
+    is_deleted = bool(getattr(student, "is_deleted", False))
+    departing = _is_departing(
+        is_active=is_active, marked_for_removal=marked_for_removal, is_deleted=is_deleted
+    )
+    if not departing:
+        suspended = False
+    elif decision.should_suspend_now:
+        suspended = True
+    else:
+        # Alumni keep a grace period; every other departure suspends immediately.
+        suspended = decision.reason != "alumni_completed_level"
+
+    account = DesiredAccount(
+        email=email.strip(),
+        kind="student",
+        target_ou=_normalize_org_unit_path(decision.target_ou_path),
+        suspended=suspended,
+        given_name=(getattr(student, "first_name", None) or "").strip(),
+        family_name=(getattr(student, "last_name", None) or "").strip(),
+        related_id=getattr(student, "id", None),
+        create_if_missing=not departing,
+        license_removal=suspended,
+    )
+    if not departing:
+        account.groups = {g.lower() for g in student_school_groups(getattr(student, "grade_level", None))}
+        account.managed_groups = {g.lower() for g in STUDENT_MANAGED_GROUP_EMAILS}
+    return account
+
+
+def desired_staff_account(staff: Any, email: str, target_ou: str) -> DesiredAccount:
+    """Mirror ``sync_staff_google_suspension`` + the teachers@ rule for one TeacherStaff row."""
+    eligible = staff_google_account_eligible(staff)
+    suspended = staff_should_suspend_immediately(staff)
+    account = DesiredAccount(
+        email=email.strip(),
+        kind="staff",
+        target_ou=_normalize_org_unit_path(target_ou),
+        suspended=suspended,
+        given_name=(getattr(staff, "first_name", None) or "").strip(),
+        family_name=(getattr(staff, "last_name", None) or "").strip(),
+        related_id=getattr(staff, "id", None),
+        create_if_missing=eligible,
+        license_removal=not eligible,
+    )
+    # teachers@ is add-only and never for accounts parked under Terminated & Removed.
+    if eligible and STAFF_OU_TERMINATED_REMOVED not in account.target_ou:
+        account.groups = {TEACHERS_GROUP_EMAIL.lower()}
+    return account
+
+
+# ---------------------------------------------------------------------------
+# Plan
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class PlannedAction:
+    op: str
+    target: str
+    kind: str = ""
+    detail: Dict[str, Any] = field(default_factory=dict)
+
+    def describe(self) -> str:
+        d = self.detail
+        who = f"{self.kind} {self.target}".strip()
+        if self.op == "create_ou":
+            return f"create OU {self.target}"
+        if self.op == "create_group":
+            return f"create group {self.target}"
+        if self.op == "create_user":
+            return f"create {who} in OU {d.get('orgUnitPath')}"
+        if self.op == "update_user":
+            parts = []
+            if "orgUnitPath" in d:
+                parts.append(f"move {d.get('current_ou')} -> {d['orgUnitPath']}")
+            if "suspended" in d:
+                parts.append("suspend" if d["suspended"] else "unsuspend")
+            return f"{' + '.join(parts)} for {who}"
+        if self.op == "add_member":
+            return f"add {who} to {d.get('group')}"
+        if self.op == "remove_member":
+            return f"remove {who} from {d.get('group')}"
+        if self.op == "queue_license_removal":
+            return f"queue license removal for {who}"
+        return f"{self.op} {self.target}"
+
+
+@dataclass
+class DirectoryPlan:
+    actions: List[PlannedAction] = field(default_factory=list)
+    protected: List[str] = field(default_factory=list)
+    notes: List[str] = field(default_factory=list)
+
+    def counts(self) -> Dict[str, int]:
+        out = {op: 0 for op in ACTION_ORDER}
+        for a in self.actions:
+            out[a.op] = out.get(a.op, 0) + 1
+        return out
+
+    def api_mutation_count(self) -> int:
+        return sum(1 for a in self.actions if a.op != "queue_license_removal")
+
+    def report_lines(self, prefix: str = "[DRY] would") -> List[str]:
+        lines = [f"{prefix} {a.describe()}" for a in self.actions]
+        lines.extend(f"[INFO] Skipping protected/admin user: {e}" for e in self.protected)
+        lines.extend(f"[NOTE] {n}" for n in self.notes)
+        return lines
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "counts": self.counts(),
+            "actions": [asdict(a) for a in self.actions],
+            "protected": list(self.protected),
+            "notes": list(self.notes),
+        }
+
+
+def _ou_ancestors(path: str) -> List[str]:
+    """``/A/B/C`` -> ``['/A', '/A/B', '/A/B/C']``."""
+    out: List[str] = []
+    cur = ""
+    for segment in [p for p in _normalize_org_unit_path(path).split("/") if p]:
+        cur = f"{cur}/{segment}"
+        out.append(cur)
+    return out
+
+
+def plan_directory_changes(
+    snapshot: DirectorySnapshot,
+    desired: Iterable[DesiredAccount],
+    *,
+    create_missing_groups: bool = False,
+    offboarded_emails: Iterable[str] = (),
+) -> DirectoryPlan:
+    """
+    Diff desired accounts against the snapshot and return only the mutations needed.
+
+    ``offboarded_emails`` are addresses that already have a GoogleWorkspaceOffboardJob; a
+    license removal is queued for them only when this run is what suspends the account.
+    """
+    plan = DirectoryPlan()
+    by_op: Dict[str, List[PlannedAction]] = {op: [] for op in ACTION_ORDER}
+    offboarded = {(e or "").strip().lower() for e in offboarded_emails}
+    planned_ous: Set[str] = set()
+    planned_groups: Set[str] = set()
+    seen: Set[str] = set()
+
+    def need_ou(path: str) -> None:
+        for p in _ou_ancestors(path):
+            if p not in snapshot.org_units and p not in planned_ous:
+                planned_ous.add(p)
+                by_op["create_ou"].append(PlannedAction("create_ou", p))
+
+    def group_available(group: str) -> bool:
+        if snapshot.group_members.get(group) is not None or group in planned_groups:
+            return True
+        if create_missing_groups:
+            planned_groups.add(group)
+            by_op["create_group"].append(PlannedAction("create_group", group))
+            return True
+        note = f"group {group} does not exist; set CREATE_MISSING_GROUPS=1 to create it"
+        if note not in plan.notes:
+            plan.notes.append(note)
+        return False
+
+    for account in desired:
+        key = account.email.lower()
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        current = snapshot.users.get(key)
+
+        if current is None:
+            if not account.create_if_missing:
+                continue
+            need_ou(account.target_ou)
+            by_op["create_user"].append(
+                PlannedAction(
+                    "create_user",
+                    account.email,
+                    account.kind,
+                    {
+                        "orgUnitPath": account.target_ou,
+                        "givenName": account.given_name,
+                        "familyName": account.family_name,
+                    },
+                )
+            )
+            current_members_of: Callable[[str], Dict[str, str]] = lambda _g: {}
+        else:
+            if current.get("isAdmin"):
+                plan.protected.append(account.email)
+                continue
+            detail: Dict[str, Any] = {}
+            if current.get("orgUnitPath") != account.target_ou:
+                need_ou(account.target_ou)
+                detail["orgUnitPath"] = account.target_ou
+                detail["current_ou"] = current.get("orgUnitPath")
+            now_suspended = bool(current.get("suspended"))
+            if now_suspended != account.suspended:
+                detail["suspended"] = account.suspended
+            if detail:
+                by_op["update_user"].append(PlannedAction("update_user", account.email, account.kind, detail))
+            suspending = account.suspended and not now_suspended
+            if account.license_removal and (suspending or key not in offboarded):
+                by_op["queue_license_removal"].append(
+                    PlannedAction(
+                        "queue_license_removal",
+                        account.email,
+                        account.kind,
+                        {"related_id": account.related_id},
+                    )
+                )
+            current_members_of = lambda g: snapshot.group_members.get(g) or {}
+
+        for group in sorted(account.groups):
+            if key in current_members_of(group):
+                continue
+            if group_available(group):
+                by_op["add_member"].append(
+                    PlannedAction("add_member", account.email, account.kind, {"group": group})
+                )
+        for group in sorted(account.managed_groups - account.groups):
+            if key in current_members_of(group):
+                by_op["remove_member"].append(
+                    PlannedAction("remove_member", account.email, account.kind, {"group": group})
+                )
+
+    by_op["create_ou"].sort(key=lambda a: (a.target.count("/"), a.target))
+    for op in ACTION_ORDER:
+        plan.actions.extend(by_op[op])
+    return plan
+
+
+# ---------------------------------------------------------------------------
+# Apply
+# ---------------------------------------------------------------------------
+
+
+def _default_license_removal(action: PlannedAction) -> None:
+    from services.google_workspace_offboard import enqueue_workspace_license_removal
+
+    enqueue_workspace_license_removal(
+        action.target,
+        kind=action.kind or "unknown",
+        related_id=action.detail.get("related_id"),
+        commit=True,
+    )
+
+
+def apply_directory_plan(
+    service: Any,
+    plan: DirectoryPlan,
+    *,
+    password_factory: Callable[[], str],
+    service_factory: Optional[Callable[[], Any]] = None,
+    workers: Optional[int] = None,
+    queue_license_removal: Optional[Callable[[PlannedAction], None]] = None,
+    echo: Optional[Callable[[str], None]] = print,
+) -> Dict[str, int]:
+    """
+    Issue the planned mutations in order and return per-kind counters.
+
+    OUs and groups are created one at a time (parents first); user creates / updates are
+    independent and run on a bounded pool (``workers``, default GOOGLE_SYNC_WORKERS), each
+    thread using its own client from ``service_factory`` (or the shared ``service`` when
+    none is given, e.g. the fake); membership changes go out batched. Pacing comes from the
+    shared per-API rate limiter, not from sleeps.
+
+    Failures are counted in ``errors`` and logged; dependants of a failed step (users moved
+    into an OU that could not be created, members of a user that could not be created) are
+    skipped rather than attempted.
+    """
+    license_hook = queue_license_removal or _default_license_removal
+    say = echo or (lambda _line: None)
+    stats = {
+        "ous_created": 0,
+        "groups_created": 0,
+        "created_users": 0,
+        "moved_ous": 0,
+        "suspended": 0,
+        "unsuspended": 0,
+        "members_added": 0,
+        "members_removed": 0,
+        "licenses_queued": 0,
+        "protected_skipped": len(plan.protected),
+        "errors": 0,
+        "api_calls": 0,
+    }
+    stats_lock = threading.Lock()
+    failed_ous: Set[str] = set()
+    failed_groups: Set[str] = set()
+    failed_users: Set[str] = set()
+    protected: Set[str] = set()
+
+    def bump(key: str, n: int = 1) -> None:
+        with stats_lock:
+            stats[key] += n
+
+    def fail(message: str) -> None:
+        bump("errors")
+        current_app.logger.error(message)
+        say(f"[ERROR] {message}")
+
+    def skip_protected(email: str) -> None:
+        with stats_lock:
+            protected.add(email.lower())
+            stats["protected_skipped"] += 1
+        say(f"[INFO] Skipping protected/admin user: {email}")
+
+    def ou_failed(path: str) -> bool:
+        return any(p in failed_ous for p in _ou_ancestors(path))
+
+    def run_one(action: PlannedAction, svc: Any) -> None:
+        op = action.op
+        key = action.target.lower()
+        d = action.detail
+        if op in ("create_user", "update_user") and d.get("orgUnitPath") and ou_failed(d["orgUnitPath"]):
+            with stats_lock:
+                failed_users.add(key)
+            fail(f"could not ensure OU for {action.kind} {action.target}: {d['orgUnitPath']}")
+            return
+        bump("api_calls")
+        try:
+            if op == "create_ou":
+                parent, _, name = action.target.rpartition("/")
+                try:
+                    svc.orgunits().insert(
+                        customerId=DIRECTORY_CUSTOMER_ID,
+                        body={"name": name, "parentOrgUnitPath": parent or "/"},
+                    ).execute()
+                except HttpError as e:
+                    status = _http_status(e)
+                    if status == 409 or (status == 400 and _http_error_suggests_ou_insert_duplicate_or_exists(e)):
+                        say(f"[INFO] OU {action.target} already exists")
+                        note_org_unit_created(action.target)
+                        return
+                    raise
+                note_org_unit_created(action.target)
+                bump("ous_created")
+                say(f"[OU] created {action.target}")
+            elif op == "create_group":
+                name = action.target.split("@", 1)[0].replace("_", " ").title()
+                svc.groups().insert(
+                    body={"email": action.target, "name": name, "description": "Auto-created by CSA sync."}
+                ).execute()
+                bump("groups_created")
+                say(f"[GROUP] created {action.target}")
+            elif op == "create_user":
+                body = {
+                    "primaryEmail": action.target,
+                    "name": {"givenName": d.get("givenName") or "", "familyName": d.get("familyName") or ""},
+                    "password": password_factory(),
+                    "orgUnitPath": d["orgUnitPath"],
+                    "changePasswordAtNextLogin": True,
+                }
+                try:
+                    svc.users().insert(body=body).execute()
+                except HttpError as e:
+                    if _http_status(e) != 409:
+                        raise
+                    say(f"[INFO] {action.kind} {action.target} already exists; treating create as success")
+                    return
+                bump("created_users")
+                say(f"[CREATE] {action.kind} {action.target} in OU {d['orgUnitPath']}")
+            elif op == "update_user":
+                body = {k: d[k] for k in ("orgUnitPath", "suspended") if k in d}
+                svc.users().update(userKey=action.target, body=body).execute()
+                if "orgUnitPath" in body:
+                    bump("moved_ous")
+                if "suspended" in body:
+                    bump("suspended" if body["suspended"] else "unsuspended")
+                say(f"[UPDATE] {action.describe()}")
+        except HttpError as e:
+            if op == "update_user" and _is_protected_workspace_admin_403(e):
+                skip_protected(action.target)
+                return
+            with stats_lock:
+                if op == "create_ou":
+                    failed_ous.add(action.target)
+                elif op == "create_group":
+                    failed_groups.add(action.target)
+                elif op == "create_user":
+                    failed_users.add(key)
+            fail(f"Directory API error on {action.describe()}: {e}")
+        except Exception as e:
+            fail(f"Failed to {action.describe()}: {e}")
+
+    def run_users(actions: List[PlannedAction]) -> None:
+        def _task(action: PlannedAction) -> None:
+            run_one(action, service_factory() if service_factory else service)
+
+        run_concurrently(_task, actions, workers=workers)
+
+    def run_members(actions: List[PlannedAction]) -> None:
+        actions = [
+            a
+            for a in actions
+            if a.target.lower() not in failed_users
+            and a.target.lower() not in protected
+            and a.detail.get("group") not in failed_groups
+        ]
+        requests = []
+        for idx, a in enumerate(actions):
+            if a.op == "add_member":
+                req = service.members().insert(
+                    groupKey=a.detail["group"], body={"email": a.target, "role": "MEMBER"}
+                )
+            else:
+                req = service.members().delete(groupKey=a.detail["group"], memberKey=a.target)
+            requests.append((idx, req))
+        results = execute_batched(service, requests, max_batch_size=DIRECTORY_BATCH_SIZE)
+        bump("api_calls", len(actions))
+        for idx, a in enumerate(actions):
+            err = results[idx].error
+            adding = a.op == "add_member"
+            if err is None:
+                bump("members_added" if adding else "members_removed")
+                say(f"[GROUP] {'added' if adding else 'removed'} {a.target} "
+                    f"{'to' if adding else 'from'} {a.detail['group']}")
+            elif isinstance(err, HttpError) and (
+                (adding and _http_status(err) == 409) or (not adding and _is_http_not_found(err))
+            ):
+                continue
+            elif isinstance(err, HttpError) and _is_protected_workspace_admin_403(err):
+                skip_protected(a.target)
+            else:
+                fail(f"Directory API error on {a.describe()}: {err}")
+
+    def run_licenses(actions: List[PlannedAction]) -> None:
+        for action in actions:
+            key = action.target.lower()
+            if key in failed_users or key in protected:
+                continue
+            try:
+                license_hook(action)
+                bump("licenses_queued")
+                say(f"[LICENSE] queued removal for {action.kind} {action.target}")
+            except Exception as e:
+                fail(f"could not queue license removal for {action.target}: {e}")
+
+    # Plan actions are ordered by ACTION_ORDER; walk them phase by phase.
+    phases: Dict[str, List[PlannedAction]] = {op: [] for op in ACTION_ORDER}
+    for action in plan.actions:
+        phases.setdefault(action.op, []).append(action)
+    for action in phases["create_ou"] + phases["create_group"]:
+        run_one(action, service)
+    run_users(phases["create_user"])
+    run_users(phases["update_user"])
+    run_members(phases["add_member"])
+    run_members(phases["remove_member"])
+    run_licenses(phases["queue_license_removal"])
+
+    return stats
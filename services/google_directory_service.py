@@ -8,11 +8,14 @@ Expected config keys (Flask `current_app.config`):
 - GOOGLE_DIRECTORY_SERVICE_ACCOUNT_JSON: raw service account key JSON string (preferred on PaaS e.g. Render)
 - GOOGLE_DIRECTORY_SERVICE_ACCOUNT_FILE: path to service account JSON key file (fallback)
 - GOOGLE_DIRECTORY_DELEGATED_ADMIN: admin user email to impersonate (e.g., admin@clarascienceacademy.org)
+- GOOGLE_OU_TREE_TTL_SECONDS: how long the cached org-unit tree is trusted (0 disables it)
 """
 
 from __future__ import annotations
 
 import json
+import threading
+import time
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from flask import current_app
@@ -20,6 +23,9 @@ from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from services.google_batch import execute_batched
+from services.google_rate_limit import throttled_request_class
+
 
 def _http_error_message_text(exc: HttpError) -> str:
     parts = [str(exc)]
@@ -75,6 +81,13 @@ def _is_http_not_found(exc: HttpError) -> bool:
     return getattr(exc, "status_code", None) == 404
 
 
+def _is_http_conflict(exc: Optional[Exception]) -> bool:
+    """409 from members.insert: the address is already a member of the group."""
+    if not isinstance(exc, HttpError):
+        return False
+    return int(getattr(getattr(exc, "resp", None), "status", None) or 0) == 409
+
+
 _WORKSPACE_DOMAIN = "clarascienceacademy.org"
 
 # School-wide student groups only — per-class lists (class-*@…) are managed separately.
@@ -112,9 +125,17 @@ DIRECTORY_SCOPES_READONLY = [
     "https://www.googleapis.com/auth/admin.directory.user.readonly",
 ]
 
-# Reuse one Directory client per process/scope set so OAuth token + RAB lookups are not
+# Reuse one Directory client per thread/scope set so OAuth token + RAB lookups are not
 # repeated on every API call (reduces transient google.oauth2._client 500 noise on cron).
-_directory_service_cache: dict[tuple[str, ...], Any] = {}
+# Per thread because the httplib2 transport is not thread-safe and syncs use a worker pool.
+_directory_service_local = threading.local()
+
+
+def _directory_service_cache() -> dict[tuple[str, ...], Any]:
+    cache = getattr(_directory_service_local, "services", None)
+    if cache is None:
+        cache = _directory_service_local.services = {}
+    return cache
 
 
 def _build_directory_service(
@@ -134,7 +155,13 @@ def _build_directory_service(
             key_file, scopes=effective_scopes
         )
     delegated_creds = creds.with_subject(delegated_admin)
-    return build("admin", "directory_v1", credentials=delegated_creds, cache_discovery=False)
+    return build(
+        "admin",
+        "directory_v1",
+        credentials=delegated_creds,
+        cache_discovery=False,
+        requestBuilder=throttled_request_class("directory"),
+    )
 
 
 def get_directory_service(scopes: Optional[Sequence[str]] = None):
@@ -168,8 +195,9 @@ def get_directory_service(scopes: Optional[Sequence[str]] = None):
     try:
         effective_scopes = list(scopes) if scopes else DIRECTORY_SCOPES_FULL
         cache_key = tuple(sorted(effective_scopes))
-        if cache_key in _directory_service_cache:
-            return _directory_service_cache[cache_key]
+        cache = _directory_service_cache()
+        if cache_key in cache:
+            return cache[cache_key]
 
         service = _build_directory_service(
             key_json=key_json,
@@ -177,7 +205,7 @@ def get_directory_service(scopes: Optional[Sequence[str]] = None):
             delegated_admin=delegated_admin,
             effective_scopes=effective_scopes,
         )
-        _directory_service_cache[cache_key] = service
+        cache[cache_key] = service
         return service
     except Exception as e:
         current_app.logger.error(f"Failed to build Directory service: {e}")
@@ -288,6 +316,110 @@ def _lookup_org_unit(service, org_unit_path: str) -> Tuple[str, Optional[Dict[st
         return ("error", None)
 
 
+class OrgUnitTree:
+    """
+    Existing OU paths loaded from one ``orgunits.list(type='all')`` call.
+
+    Existence and ancestor checks become set lookups instead of an ``orgunits.get`` per
+    path segment per user; OUs this process creates are added in place.
+    """
+
+    def __init__(self, paths: Iterable[str], loaded_at: Optional[float] = None):
+        self._paths = {"/"}
+        self._lock = threading.Lock()
+        self.loaded_at = time.monotonic() if loaded_at is None else loaded_at
+        for path in paths:
+            self._add(_normalize_org_unit_path(path))
+
+    def _add(self, path: str) -> None:
+        # A listed OU implies its parents exist; keeps the set closed under ancestry.
+        while path and path not in self._paths:
+            self._paths.add(path)
+            path = path.rsplit("/", 1)[0] or "/"
+
+    def __contains__(self, path: object) -> bool:
+        return isinstance(path, str) and _normalize_org_unit_path(path) in self._paths
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def add(self, path: str) -> None:
+        with self._lock:
+            self._add(_normalize_org_unit_path(path))
+
+    def deepest_existing(self, path: str) -> str:
+        cur = _normalize_org_unit_path(path)
+        while cur not in self._paths:
+            cur = cur.rsplit("/", 1)[0] or "/"
+        return cur
+
+
+OU_TREE_DEFAULT_TTL_SECONDS = 600
+
+_ou_tree: Optional[OrgUnitTree] = None
+_ou_tree_lock = threading.Lock()
+
+
+def _ou_tree_ttl_seconds() -> float:
+    try:
+        return float(current_app.config.get("GOOGLE_OU_TREE_TTL_SECONDS", OU_TREE_DEFAULT_TTL_SECONDS))
+    except (TypeError, ValueError):
+        return float(OU_TREE_DEFAULT_TTL_SECONDS)
+
+
+def prime_org_unit_tree(paths: Iterable[str]) -> OrgUnitTree:
+    """Install a tree built from an OU listing the caller already has (e.g. a sync snapshot)."""
+    global _ou_tree
+    tree = OrgUnitTree(paths)
+    with _ou_tree_lock:
+        _ou_tree = tree
+    return tree
+
+
+def note_org_unit_created(path: str) -> None:
+    """Record an OU created (or found to exist) outside ``ensure_ou_exists`` in the cached tree."""
+    tree = _ou_tree
+    if tree is not None:
+        tree.add(path)
+
+
+def invalidate_org_unit_tree() -> None:
+    global _ou_tree
+    with _ou_tree_lock:
+        _ou_tree = None
+
+
+def get_org_unit_tree(service: Any = None, *, refresh: bool = False) -> Optional[OrgUnitTree]:
+    """
+    Return the process-wide OU tree, listing it from the API when missing or older than
+    GOOGLE_OU_TREE_TTL_SECONDS. Returns None when caching is disabled or the listing fails;
+    callers then fall back to per-path ``orgunits.get`` lookups.
+    """
+    global _ou_tree
+    ttl = _ou_tree_ttl_seconds()
+    if ttl <= 0:
+        return None
+    tree = _ou_tree
+    if tree is not None and not refresh and time.monotonic() - tree.loaded_at < ttl:
+        return tree
+    svc = service or get_directory_service()
+    if not svc:
+        return None
+    with _ou_tree_lock:
+        tree = _ou_tree
+        if tree is not None and not refresh and time.monotonic() - tree.loaded_at < ttl:
+            return tree
+        try:
+            resp = svc.orgunits().list(customerId=DIRECTORY_CUSTOMER_ID, type="all").execute()
+        except Exception as e:
+            current_app.logger.warning(f"Could not list org units for OU cache; using per-path lookups: {e}")
+            return None
+        tree = OrgUnitTree(ou.get("orgUnitPath") or "" for ou in resp.get("organizationUnits") or [])
+        _ou_tree = tree
+        current_app.logger.info(f"Loaded org-unit tree ({len(tree)} OUs)")
+        return tree
+
+
 def get_google_ou(org_unit_path: str) -> Optional[Dict[str, Any]]:
     """
     Fetch an organizational unit by full path (e.g. /Students/Elementary/Class of 2035).
@@ -315,6 +447,9 @@ def ensure_ou_exists(path: str, service: Any = None) -> bool:
     For each insert, parentOrgUnitPath is the parent's full path: ``/`` for top-level
     (e.g. /Students), ``/Students`` for /Students/Elementary, etc.
 
+    Existence checks use the cached org-unit tree when available (see ``get_org_unit_tree``),
+    so an OU that is already known costs no API call; created levels are added to the tree.
+
     Returns False if a required unit could not be created (e.g. 403 Forbidden) or on
     unrecoverable insert failures. Logs a warning for 403 without raising.
     """
@@ -325,6 +460,9 @@ def ensure_ou_exists(path: str, service: Any = None) -> bool:
     norm = _normalize_org_unit_path(path)
     if norm == "/":
         return True
+    tree = get_org_unit_tree(svc)
+    if tree is not None and norm in tree:
+        return True
 
     segments = [p for p in norm.split("/") if p]
     # Parent path for the next segment: domain root is "/".
@@ -336,7 +474,10 @@ def ensure_ou_exists(path: str, service: Any = None) -> bool:
         else:
             current_path = parent_full_path + "/" + segment
 
-        status, _ = _lookup_org_unit(svc, current_path)
+        if tree is not None:
+            status = "found" if current_path in tree else "missing"
+        else:
+            status, _ = _lookup_org_unit(svc, current_path)
         if status == "found":
             parent_full_path = current_path
             continue
@@ -369,6 +510,8 @@ def ensure_ou_exists(path: str, service: Any = None) -> bool:
                     current_app.logger.info(
                         f"OU {current_path!r} exists after HTTP {err_status} on insert; continuing."
                     )
+                    if tree is not None:
+                        tree.add(current_path)
                     parent_full_path = current_path
                     continue
                 if err_status == 400 and _http_error_suggests_ou_insert_duplicate_or_exists(e):
@@ -376,6 +519,8 @@ def ensure_ou_exists(path: str, service: Any = None) -> bool:
                         f"Treating HTTP 400 on insert for {current_path!r} as existing OU "
                         f"(duplicate or invalid OU id message); continuing."
                     )
+                    if tree is not None:
+                        tree.add(current_path)
                     parent_full_path = current_path
                     continue
 
@@ -385,6 +530,8 @@ def ensure_ou_exists(path: str, service: Any = None) -> bool:
             current_app.logger.error(f"Failed to create OU {current_path}: {e}")
             return False
 
+        if tree is not None:
+            tree.add(current_path)
         parent_full_path = current_path
 
     return True
@@ -401,6 +548,9 @@ def deepest_existing_ou_ancestor(path: str, service: Any = None) -> Optional[str
     norm = _normalize_org_unit_path(path)
     if norm == "/":
         return "/"
+    tree = get_org_unit_tree(svc)
+    if tree is not None:
+        return tree.deepest_existing(norm)
     segments = [p for p in norm.split("/") if p]
     candidates: List[str] = []
     cur = ""
@@ -515,80 +665,110 @@ def sync_group_members(
 
         current = set(current_roles.keys())
 
+        # Each phase is one batched round trip; phases run in order because parts of a
+        # single batch are not executed in a guaranteed order.
         # Add missing
-        for email_l in sorted(desired - current):
-            role = want_role(email_l)
-            email_body = canon[email_l]
-            try:
-                service.members().insert(
-                    groupKey=group_email,
-                    body={"email": email_body, "role": role},
-                ).execute()
+        adds = {email_l: want_role(email_l) for email_l in sorted(desired - current)}
+        results = execute_batched(
+            service,
+            (
+                (
+                    email_l,
+                    service.members().insert(
+                        groupKey=group_email,
+                        body={"email": canon[email_l], "role": role},
+                    ),
+                )
+                for email_l, role in adds.items()
+            ),
+        )
+        for email_l, role in adds.items():
+            res = results[email_l]
+            if res.ok:
                 current_app.logger.info("Added %s to group %s as %s", email_l, group_email, role)
                 current_roles[email_l] = role
-                member_key_by_lower[email_l] = email_body
-            except HttpError as e:
+            elif _is_http_conflict(res.error):
+                # Duplicate member (added since the list above); promotion below fixes the role.
+                current_roles[email_l] = "MEMBER"
+            else:
                 current_app.logger.error(
-                    "Directory API error adding %s to %s: %s", email_l, group_email, e
+                    "Directory API error adding %s to %s: %s", email_l, group_email, res.error
                 )
+                continue
+            member_key_by_lower[email_l] = canon[email_l]
+
+        def _set_roles(targets: List[str], role: str, done: str, doing: str) -> None:
+            results = execute_batched(
+                service,
+                (
+                    (
+                        email_l,
+                        service.members().update(
+                            groupKey=group_email,
+                            memberKey=member_key(email_l),
+                            body={"role": role},
+                        ),
+                    )
+                    for email_l in targets
+                ),
+            )
+            for email_l in targets:
+                res = results[email_l]
+                if res.ok:
+                    current_app.logger.info("%s %s to %s in %s", done, email_l, role, group_email)
+                    current_roles[email_l] = role
+                else:
+                    current_app.logger.error(
+                        "Directory API error %s %s in %s: %s", doing, email_l, group_email, res.error
+                    )
 
         # Promote to OWNER before demoting former primary (safe when primary changes)
-        for email_l in sorted(desired & set(current_roles.keys())):
-            if want_role(email_l) != "OWNER":
-                continue
-            if current_roles.get(email_l) == "OWNER":
-                continue
-            try:
-                service.members().update(
-                    groupKey=group_email,
-                    memberKey=member_key(email_l),
-                    body={"role": "OWNER"},
-                ).execute()
-                current_app.logger.info("Promoted %s to OWNER in %s", email_l, group_email)
-                current_roles[email_l] = "OWNER"
-            except HttpError as e:
-                current_app.logger.error(
-                    "Directory API error promoting %s in %s: %s", email_l, group_email, e
-                )
+        _set_roles(
+            [
+                email_l
+                for email_l in sorted(desired & set(current_roles.keys()))
+                if want_role(email_l) == "OWNER" and current_roles.get(email_l) != "OWNER"
+            ],
+            "OWNER",
+            "Promoted",
+            "promoting",
+        )
 
         # Demote to MEMBER (former primary still co-teaching, or MANAGER cleanup)
-        for email_l in sorted(desired & set(current_roles.keys())):
-            if want_role(email_l) != "MEMBER":
-                continue
-            cr = current_roles.get(email_l)
-            if cr not in ("OWNER", "MANAGER"):
-                continue
-            try:
-                service.members().update(
-                    groupKey=group_email,
-                    memberKey=member_key(email_l),
-                    body={"role": "MEMBER"},
-                ).execute()
-                current_app.logger.info("Demoted %s to MEMBER in %s", email_l, group_email)
-                current_roles[email_l] = "MEMBER"
-            except HttpError as e:
-                current_app.logger.error(
-                    "Directory API error demoting %s in %s: %s", email_l, group_email, e
-                )
+        _set_roles(
+            [
+                email_l
+                for email_l in sorted(desired & set(current_roles.keys()))
+                if want_role(email_l) == "MEMBER" and current_roles.get(email_l) in ("OWNER", "MANAGER")
+            ],
+            "MEMBER",
+            "Demoted",
+            "demoting",
+        )
 
         # Remove extras
-        for email_l in sorted(set(current_roles.keys()) - desired):
-            try:
-                service.members().delete(
-                    groupKey=group_email, memberKey=member_key(email_l)
-                ).execute()
+        extras = sorted(set(current_roles.keys()) - desired)
+        results = execute_batched(
+            service,
+            (
+                (email_l, service.members().delete(groupKey=group_email, memberKey=member_key(email_l)))
+                for email_l in extras
+            ),
+        )
+        for email_l in extras:
+            res = results[email_l]
+            if res.ok:
                 current_app.logger.info("Removed %s from group %s", email_l, group_email)
                 current_roles.pop(email_l, None)
-            except HttpError as e:
-                if _is_http_not_found(e):
-                    current_app.logger.debug(
-                        "Member %s already absent from %s; skip remove", email_l, group_email
-                    )
-                    current_roles.pop(email_l, None)
-                else:
-                    current_app.logger.error(
-                        "Directory API error removing %s from %s: %s", email_l, group_email, e
-                    )
+            elif isinstance(res.error, HttpError) and _is_http_not_found(res.error):
+                current_app.logger.debug(
+                    "Member %s already absent from %s; skip remove", email_l, group_email
+                )
+                current_roles.pop(email_l, None)
+            else:
+                current_app.logger.error(
+                    "Directory API error removing %s from %s: %s", email_l, group_email, res.error
+                )
 
         return True
     except HttpError as e:
@@ -10,6 +10,8 @@ from googleapiclient.discovery import build
 from flask import current_app
 import requests
 
+from services.google_rate_limit import throttled_request_class
+
 
 def get_google_forms_service(user):
     """
@@ -58,7 +60,7 @@ def get_google_forms_service(user):
         )
         
         # 3. Build the Forms service
-        service = build('forms', 'v1', credentials=creds)
+        service = build('forms', 'v1', credentials=creds, requestBuilder=throttled_request_class('forms'))
         return service
         
     except Exception as e:
@@ -66,21 +68,31 @@ def get_google_forms_service(user):
         return None
 
 
-def get_form_responses(service, form_id):
+def get_form_responses(service, form_id, since=None):
     """
-    Get all responses for a Google Form.
+    Get responses for a Google Form, following pagination.
     
     Args:
         service: Google Forms service object
         form_id: Google Form ID (not the full URL, just the ID)
+        since: Optional RFC3339 timestamp; only responses submitted (or edited)
+            after it are returned (Forms API ``timestamp >`` filter)
     
     Returns:
         List of form responses, or None if error
     """
     try:
-        # Get all responses
-        responses = service.forms().responses().list(formId=form_id).execute()
-        return responses.get('responses', [])
+        kwargs = {'formId': form_id, 'pageSize': 5000}
+        if since:
+            kwargs['filter'] = f'timestamp > {since}'
+        out = []
+        while True:
+            page = service.forms().responses().list(**kwargs).execute()
+            out.extend(page.get('responses', []))
+            token = page.get('nextPageToken')
+            if not token:
+                return out
+            kwargs['pageToken'] = token
     except Exception as e:
         current_app.logger.error(f"Failed to get form responses for form {form_id}: {e}")
         return None
@@ -0,0 +1,228 @@
+"""
+Incremental Google Forms → Submission / Grade sync for linked assignments.
+
+Each assignment keeps ``google_form_response_watermark``: the newest
+``lastSubmittedTime`` seen from the form. A sync asks the Forms API only for
+responses after it (edited responses come back too, since editing bumps that
+timestamp), so re-syncing a large form during the day costs just the new responses.
+The watermark never moves past a response that matched no student (late enrollment,
+email mismatch): it stops just below the oldest one, so that response is fetched
+again, and imported once it matches, on every later sync.
+
+Respondents are matched through one email → student map for the class (student
+email and Workspace login email). Writes are set-based: existing Submission / Grade
+rows for the matched students are loaded in one query each, new rows are inserted
+with a single executemany and Forms-owned grades are updated the same way. Grades
+entered or voided by a teacher are never overwritten.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from flask import current_app
+from sqlalchemy import insert, update
+
+from extensions import db
+from models import Assignment, Enrollment, Grade, Student, Submission, User
+from services.dashboard_counters import apply_dashboard_deltas, grade_score
+from services.google_forms_service import get_form_responses
+
+# ``grade_data["source"]`` for grades written by this sync.
+GOOGLE_FORMS_GRADE_SOURCE = "google_forms"
+
+
+def _parse_rfc3339(value: str | None) -> Optional[datetime]:
+    """Naive UTC datetime from a Forms timestamp (``2024-05-01T14:03:11.123456Z``)."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        # Python < 3.11 rejects more than 6 fractional digits; trim nanoseconds.
+        head, _, frac = value.rstrip("Z").partition(".")
+        try:
+            parsed = datetime.fromisoformat(f"{head}.{frac[:6]}+00:00" if frac else f"{head}+00:00")
+        except ValueError:
+            return None
+    return parsed.replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def class_student_email_map(class_id: int) -> dict[str, int]:
+    """Lower-cased student / Workspace email → student id for active enrollments in a class."""
+    rows = (
+        db.session.query(Student.id, Student.email, User.google_workspace_email)
+        .join(Enrollment, Enrollment.student_id == Student.id)
+        .outerjoin(User, User.student_id == Student.id)
+        .filter(
+            Enrollment.class_id == class_id,
+            Enrollment.is_active.is_(True),
+            Student.is_deleted.is_(False),
+        )
+        .all()
+    )
+    out: dict[str, int] = {}
+    for student_id, email, workspace_email in rows:
+        for e in (email, workspace_email):
+            e = (e or "").strip().lower()
+            if e:
+                out.setdefault(e, int(student_id))
+    return out
+
+
+def respondent_email(response: dict[str, Any]) -> str:
+    """``respondentEmail`` when the form collects it, else the first email-looking text answer."""
+    email = (response.get("respondentEmail") or "").strip().lower()
+    if email:
+        return email
+    for answer in (response.get("answers") or {}).values():
+        for text_answer in (answer.get("textAnswers") or {}).get("answers") or []:
+            value = (text_answer.get("value") or "").strip().lower()
+            local, _, domain = value.partition("@")
+            if local and "." in domain:
+                return value
+    return ""
+
+
+def _forms_grade_data(score: float, total_points: float, graded_at: datetime) -> str:
+    percentage = round(score / total_points * 100.0, 2) if total_points else 0.0
+    return json.dumps({
+        "score": score, "points_earned": score, "raw_points": score,
+        "total_points": total_points, "max_score": total_points,
+        "percentage": percentage, "comment": "", "feedback": "",
+        "source": GOOGLE_FORMS_GRADE_SOURCE,
+        "graded_at": graded_at.isoformat(),
+    })
+
+
+def _is_forms_owned(grade_data: str | None) -> bool:
+    try:
+        return (json.loads(grade_data or "{}") or {}).get("source") == GOOGLE_FORMS_GRADE_SOURCE
+    except (TypeError, ValueError):
+        return False
+
+
+def sync_google_form_submissions(assignment: Assignment, service: Any, *, full: bool = False) -> dict[str, int]:
+    """
+    Pull new Google Form responses for ``assignment`` into Submission / Grade rows and
+    advance the watermark. ``full=True`` ignores the watermark (re-scan every response).
+
+    Raises RuntimeError when the Forms API call fails; commits on success.
+    """
+    since = None if full else (assignment.google_form_response_watermark or None)
+    responses = get_form_responses(service, assignment.google_form_id, since=since)
+    if responses is None:
+        raise RuntimeError("Failed to retrieve form responses from Google Forms.")
+
+    stats = {"fetched": len(responses), "matched": 0, "unmatched": 0,
+             "created_submissions": 0, "grades_created": 0, "grades_updated": 0}
+    # Keep the API's own timestamp string (full precision) for the next filter;
+    # compare parsed values, since fractional-second precision varies.
+    previous = assignment.google_form_response_watermark or ""
+    # A full re-scan recomputes the watermark from every response.
+    watermark = "" if full else previous
+    watermark_at = _parse_rfc3339(watermark) or datetime.min
+    # (parsed, raw) timestamp of every response, and the oldest one that matched no student.
+    seen: list[tuple[datetime, str]] = []
+    oldest_unmatched: Optional[datetime] = None
+
+    emails = class_student_email_map(assignment.class_id)
+    # Latest response per student (a form may allow several submissions).
+    latest: dict[int, tuple[datetime, dict[str, Any]]] = {}
+    for response in responses:
+        submitted = response.get("lastSubmittedTime") or response.get("createTime") or ""
+        submitted_at = _parse_rfc3339(submitted) or datetime.min
+        seen.append((submitted_at, submitted))
+        student_id = emails.get(respondent_email(response))
+        if student_id is None:
+            stats["unmatched"] += 1
+            if oldest_unmatched is None or submitted_at < oldest_unmatched:
+                oldest_unmatched = submitted_at
+            continue
+        prior = latest.get(student_id)
+        if prior is None or submitted_at >= prior[0]:
+            latest[student_id] = (submitted_at, response)
+    stats["matched"] = len(latest)
+    for submitted_at, submitted in seen:
+        if oldest_unmatched is not None and submitted_at >= oldest_unmatched:
+            continue
+        if submitted_at > watermark_at:
+            watermark, watermark_at = submitted, submitted_at
+    if stats["unmatched"]:
+        current_app.logger.info(
+            "Google Forms sync for assignment %s: %s response(s) did not match an enrolled student",
+            assignment.id,
+            stats["unmatched"],
+        )
+
+    now = datetime.utcnow()
+    if latest:
+        student_ids = list(latest)
+        have_submission = {
+            sid for (sid,) in db.session.query(Submission.student_id).filter(
+                Submission.assignment_id == assignment.id,
+                Submission.student_id.in_(student_ids),
+            )
+        }
+        grades: dict[int, tuple[int, bool, str]] = {}
+        for gid, sid, voided, data in db.session.query(
+            Grade.id, Grade.student_id, Grade.is_voided, Grade.grade_data
+        ).filter(Grade.assignment_id == assignment.id, Grade.student_id.in_(student_ids)):
+            grades.setdefault(int(sid), (int(gid), bool(voided), data))
+
+        comment = f'Synced from Google Form on {now.strftime("%Y-%m-%d %H:%M:%S")}'
+        new_submissions: list[dict[str, Any]] = []
+        new_grades: list[dict[str, Any]] = []
+        grade_updates: list[dict[str, Any]] = []
+        total_points = float(assignment.total_points or 100.0)
+        # Bulk statements skip the flush hooks; the dashboard counters get this delta.
+        score_delta = [0.0, 0]
+        for sid, (_submitted_at, response) in latest.items():
+            if sid not in have_submission:
+                new_submissions.append({
+                    "student_id": sid,
+                    "assignment_id": assignment.id,
+                    "submitted_at": _parse_rfc3339(response.get("createTime")) or now,
+                    "submission_type": "online",
+                    "comments": comment,
+                })
+            # Quiz-mode forms report totalScore; plain forms leave grading to the teacher.
+            if response.get("totalScore") is None:
+                continue
+            try:
+                score = float(response["totalScore"])
+            except (TypeError, ValueError):
+                continue
+            grade_data = _forms_grade_data(score, total_points, now)
+            existing = grades.get(sid)
+            if existing is None:
+                new_grades.append({
+                    "student_id": sid, "assignment_id": assignment.id,
+                    "grade_data": grade_data, "graded_at": now, "is_voided": False,
+                })
+                score_delta[0] += score
+                score_delta[1] += 1
+            elif not existing[1] and _is_forms_owned(existing[2]):
+                grade_updates.append({"id": existing[0], "grade_data": grade_data, "graded_at": now})
+                old_score = grade_score(existing[2])
+                score_delta[0] += score - (old_score or 0.0)
+                score_delta[1] += 0 if old_score is not None else 1
+
+        if new_submissions:
+            db.session.execute(insert(Submission), new_submissions)
+        if new_grades:
+            db.session.execute(insert(Grade), new_grades)
+        if grade_updates:
+            db.session.execute(update(Grade), grade_updates)
+        if new_grades or grade_updates:
+            apply_dashboard_deltas(grades={assignment.id: (score_delta[0], score_delta[1])})
+        stats["created_submissions"] = len(new_submissions)
+        stats["grades_created"] = len(new_grades)
+        stats["grades_updated"] = len(grade_updates)
+
+    if watermark != previous:
+        assignment.google_form_response_watermark = watermark or None
+    db.session.commit()
+    return stats
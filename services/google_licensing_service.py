@@ -8,6 +8,7 @@ Requires domain-wide delegation scope:
 from __future__ import annotations
 
 import json
+import threading
 from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from flask import current_app
@@ -15,6 +16,8 @@ from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from services.google_rate_limit import throttled_request_class
+
 LICENSING_SCOPE = "https://www.googleapis.com/auth/apps.licensing"
 
 # (productId, skuId) pairs commonly used for Education / Workspace.
@@ -32,7 +35,15 @@ EDUCATION_LICENSE_SKUS: Tuple[Tuple[str, str], ...] = (
     ("101037", "1010370001"),  # Teaching and Learning Upgrade
 )
 
-_licensing_service_cache: dict[tuple[str, ...], Any] = {}
+# One client per thread (httplib2 transport is not thread-safe).
+_licensing_service_local = threading.local()
+
+
+def _licensing_service_cache() -> dict[tuple[str, ...], Any]:
+    cache = getattr(_licensing_service_local, "services", None)
+    if cache is None:
+        cache = _licensing_service_local.services = {}
+    return cache
 
 
 def get_licensing_service(scopes: Optional[Sequence[str]] = None):
@@ -57,8 +68,9 @@ def get_licensing_service(scopes: Optional[Sequence[str]] = None):
 
     effective_scopes = list(scopes) if scopes else [LICENSING_SCOPE]
     cache_key = tuple(sorted(effective_scopes))
-    if cache_key in _licensing_service_cache:
-        return _licensing_service_cache[cache_key]
+    cache = _licensing_service_cache()
+    if cache_key in cache:
+        return cache[cache_key]
 
     try:
         if key_json:
@@ -71,8 +83,14 @@ def get_licensing_service(scopes: Optional[Sequence[str]] = None):
                 key_file, scopes=effective_scopes
             )
         delegated = creds.with_subject(delegated_admin)
-        service = build("licensing", "v1", credentials=delegated, cache_discovery=False)
-        _licensing_service_cache[cache_key] = service
+        service = build(
+            "licensing",
+            "v1",
+            credentials=delegated,
+            cache_discovery=False,
+            requestBuilder=throttled_request_class("licensing"),
+        )
+        cache[cache_key] = service
         return service
     except Exception as e:
         current_app.logger.error("Failed to build Licensing API client: %s", e)
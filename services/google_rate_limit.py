@@ -0,0 +1,338 @@
+"""
+Shared, adaptive throttling for Google Workspace API calls.
+
+One token bucket per API (``directory``, ``classroom``, ``licensing``, ``forms``) is shared
+by every thread in the process. Clients built by this app pass
+``requestBuilder=throttled_request_class(api)`` to ``googleapiclient.discovery.build``, so
+every ``.execute()`` waits for a token and quota errors (429, 403 rateLimitExceeded /
+userRateLimitExceeded / quotaExceeded) and transient 5xx are retried with exponential
+backoff plus jitter, honoring ``Retry-After``. A quota error also halves the bucket's rate;
+successes let it climb back to the configured ceiling, so syncs run as fast as quota
+allows rather than at a hand-picked sleep.
+
+Calls made while serving a request (``in_request()``, also true on pool threads a request
+started) get a short retry budget (``GOOGLE_API_REQUEST_MAX_RETRIES``, backoff capped at a
+few seconds, ``GOOGLE_API_REQUEST_RETRY_BUDGET_SECONDS`` in total) so a throttled call fails
+fast instead of outliving the gunicorn worker timeout; background jobs and ops scripts keep
+the long backoff.
+
+``run_concurrently`` is the bounded pool for independent users / classes; the shared
+buckets keep the pool inside quota. ``rate_limit_metrics()`` reports calls, retries and
+throttled time per API (shown on the Tech system page and printed by sync scripts).
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
+
+from flask import current_app, has_app_context, has_request_context
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+T = TypeVar("T")
+
+GOOGLE_APIS = ("directory", "classroom", "licensing", "forms")
+
+# Requests per second per API. Directory allows ~2400 queries/min per admin, Classroom
+# and Forms a few hundred per minute per user; Licensing is the tightest.
+DEFAULT_RATES = {
+    "directory": 20.0,
+    "classroom": 8.0,
+    "licensing": 2.0,
+    "forms": 4.0,
+}
+DEFAULT_MAX_RETRIES = 6
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 64.0
+REQUEST_MAX_RETRIES = 2
+REQUEST_BACKOFF_MAX_SECONDS = 4.0
+REQUEST_RETRY_BUDGET_SECONDS = 15.0
+
+_QUOTA_REASONS = ("ratelimitexceeded", "userratelimitexceeded", "quotaexceeded")
+_RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _config_float(key: str, default: float) -> float:
+    if not has_app_context():
+        return default
+    try:
+        value = float(current_app.config.get(key) or default)
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket whose refill rate drops by half on a quota error and recovers
+    additively on success (AIMD). ``acquire`` may run the balance negative; the caller
+    then sleeps off its debt, so concurrent callers queue fairly instead of spinning.
+    """
+
+    def __init__(self, name: str, rate: float, burst: Optional[float] = None):
+        self.name = name
+        self.max_rate = float(rate)
+        self.min_rate = max(0.2, self.max_rate / 20.0)
+        self.rate = self.max_rate
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take ``tokens`` and sleep until they are paid for. Returns seconds waited."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_throttled(self) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2.0)
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+    def on_success(self) -> None:
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 50.0)
+
+
+_buckets: Dict[str, AdaptiveTokenBucket] = {}
+_metrics: Dict[str, Dict[str, float]] = {}
+_registry_lock = threading.Lock()
+
+
+def get_bucket(api: str) -> AdaptiveTokenBucket:
+    bucket = _buckets.get(api)
+    if bucket is not None:
+        return bucket
+    with _registry_lock:
+        bucket = _buckets.get(api)
+        if bucket is None:
+            rate = _config_float(f"GOOGLE_API_RATE_{api.upper()}", DEFAULT_RATES.get(api, 5.0))
+            bucket = AdaptiveTokenBucket(api, rate)
+            _buckets[api] = bucket
+        return bucket
+
+
+def _record(api: str, **deltas: float) -> None:
+    with _registry_lock:
+        m = _metrics.setdefault(
+            api,
+            {"calls": 0, "retries": 0, "quota_errors": 0, "failures": 0, "throttled_seconds": 0.0},
+        )
+        for key, value in deltas.items():
+            m[key] = m.get(key, 0) + value
+
+
+def rate_limit_metrics() -> Dict[str, Dict[str, Any]]:
+    """Per-API counters since process start (or ``reset_rate_limit_metrics``)."""
+    with _registry_lock:
+        out: Dict[str, Dict[str, Any]] = {}
+        for api, m in sorted(_metrics.items()):
+            row: Dict[str, Any] = dict(m)
+            row["throttled_seconds"] = round(float(m.get("throttled_seconds", 0.0)), 2)
+            bucket = _buckets.get(api)
+            if bucket is not None:
+                row["current_rate"] = round(bucket.rate, 2)
+                row["max_rate"] = bucket.max_rate
+            out[api] = row
+        return out
+
+
+def reset_rate_limit_metrics() -> None:
+    with _registry_lock:
+        _metrics.clear()
+
+
+def _error_text(exc: HttpError) -> str:
+    parts = [str(exc)]
+    content = getattr(exc, "content", None)
+    if content:
+        parts.append(content.decode("utf-8", errors="replace") if isinstance(content, bytes) else str(content))
+    return " ".join(parts).lower()
+
+
+def is_quota_error(exc: BaseException) -> bool:
+    if not isinstance(exc, HttpError):
+        return False
+    status = int(getattr(getattr(exc, "resp", None), "status", None) or 0)
+    if status == 429:
+        return True
+    return status == 403 and any(reason in _error_text(exc) for reason in _QUOTA_REASONS)
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    if not isinstance(exc, HttpError):
+        return False
+    status = int(getattr(getattr(exc, "resp", None), "status", None) or 0)
+    return status in _RETRYABLE_STATUSES or is_quota_error(exc)
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Parse ``Retry-After`` (seconds or HTTP date) from an HttpError response, if present."""
+    resp = getattr(exc, "resp", None)
+    raw = None
+    if resp is not None and hasattr(resp, "get"):
+        raw = resp.get("retry-after") or resp.get("Retry-After")
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(raw)).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_request_local = threading.local()
+
+
+def in_request() -> bool:
+    """True while serving an HTTP request, or on a pool thread that a request started."""
+    return has_request_context() or bool(getattr(_request_local, "active", False))
+
+
+def backoff_delay(attempt: int, exc: Optional[BaseException] = None) -> float:
+    """``Retry-After`` when given, else full-jitter exponential backoff (64s cap; 4s in a request)."""
+    cap = REQUEST_BACKOFF_MAX_SECONDS if in_request() else BACKOFF_MAX_SECONDS
+    hinted = retry_after_seconds(exc) if exc is not None else None
+    if hinted is not None:
+        return min(hinted, cap * 2)
+    ceiling = min(cap, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(ceiling / 2.0, ceiling)
+
+
+def max_retries() -> int:
+    if in_request():
+        return int(_config_float("GOOGLE_API_REQUEST_MAX_RETRIES", REQUEST_MAX_RETRIES))
+    return int(_config_float("GOOGLE_API_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+
+
+def retry_deadline() -> Optional[float]:
+    """Monotonic time after which an in-request call stops retrying (None outside requests)."""
+    if not in_request():
+        return None
+    return time.monotonic() + _config_float("GOOGLE_API_REQUEST_RETRY_BUDGET_SECONDS", REQUEST_RETRY_BUDGET_SECONDS)
+
+
+def note_retry(api: str, exc: BaseException, delay: float) -> None:
+    """Account for a retry decided by the caller (batched requests) and adapt the bucket."""
+    quota = is_quota_error(exc)
+    if quota:
+        get_bucket(api).on_throttled()
+    _record(api, retries=1, quota_errors=1 if quota else 0, throttled_seconds=delay)
+
+
+def acquire(api: str, tokens: float = 1.0) -> None:
+    waited = get_bucket(api).acquire(tokens)
+    _record(api, calls=tokens, throttled_seconds=waited)
+
+
+def execute_with_backoff(api: str, fn: Callable[[], T]) -> T:
+    """Run one Google API call under the ``api`` bucket, retrying quota / 5xx errors."""
+    bucket = get_bucket(api)
+    limit = max_retries()
+    deadline = retry_deadline()
+    attempt = 0
+    while True:
+        acquire(api)
+        try:
+            result = fn()
+        except HttpError as exc:
+            delay = backoff_delay(attempt, exc)
+            if (
+                not is_retryable_error(exc)
+                or attempt >= limit
+                or (deadline is not None and time.monotonic() + delay > deadline)
+            ):
+                _record(api, failures=1)
+                raise
+            note_retry(api, exc, delay)
+            if has_app_context():
+                current_app.logger.warning(
+                    "Google %s API %s; retry %s/%s in %.1fs",
+                    api,
+                    getattr(getattr(exc, "resp", None), "status", "error"),
+                    attempt + 1,
+                    limit,
+                    delay,
+                )
+            time.sleep(delay)
+            attempt += 1
+            continue
+        bucket.on_success()
+        return result
+
+
+_request_classes: Dict[str, type] = {}
+
+
+def throttled_request_class(api: str) -> type:
+    """``HttpRequest`` subclass for ``build(..., requestBuilder=...)`` that throttles ``execute``."""
+    cls = _request_classes.get(api)
+    if cls is None:
+
+        class _ThrottledHttpRequest(HttpRequest):
+            api_name = api
+
+            def execute(self, http=None, num_retries=0):
+                return execute_with_backoff(
+                    self.api_name,
+                    lambda: HttpRequest.execute(self, http=http, num_retries=num_retries),
+                )
+
+        _ThrottledHttpRequest.__name__ = f"Throttled{api.title()}HttpRequest"
+        cls = _request_classes.setdefault(api, _ThrottledHttpRequest)
+    return cls
+
+
+def sync_workers() -> int:
+    return max(1, int(_config_float("GOOGLE_SYNC_WORKERS", 4)))
+
+
+def run_concurrently(fn: Callable[[Any], T], items: Iterable[Any], *, workers: Optional[int] = None) -> List[T]:
+    """
+    Run ``fn(item)`` for independent items on a bounded pool; results keep input order.
+
+    Each worker thread gets its own app context (and DB session, removed afterwards).
+    Google client objects are not thread-safe, so ``fn`` should fetch its client via the
+    ``get_*_service`` helpers, which hand out one client per thread.
+    """
+    items = list(items)
+    n = min(workers or sync_workers(), len(items))
+    if n <= 1:
+        return [fn(item) for item in items]
+
+    app = current_app._get_current_object()
+    interactive = in_request()
+
+    def _run(item: Any) -> T:
+        from extensions import db
+
+        with app.app_context():
+            _request_local.active = interactive
+            try:
+                return fn(item)
+            finally:
+                _request_local.active = False
+                db.session.remove()
+
+    with ThreadPoolExecutor(max_workers=n, thread_name_prefix="google-sync") as pool:
+        return list(pool.map(_run, items))
@@ -126,7 +126,7 @@ def _sync_student_workspace(
             }
         )
         if not created:
-            logger.warning("sync_single_user_to_google: create_google_user failed for student %s", email)
+            raise RuntimeError(f"Could not create Google Workspace account for student {email}")
         else:
             g_user = get_google_user(email)
     else:
@@ -198,12 +198,9 @@ def _sync_staff_workspace(
             )
             return
         if not ensure_ou_exists(target_ou):
-            logger.warning(
-                "sync_single_user_to_google: ensure_ou_exists failed for staff OU %s (%s); skip create",
-                target_ou,
-                email,
+            raise RuntimeError(
+                f"Could not create staff OU {target_ou}; Google Workspace account {email} not created"
             )
-            return
         created = create_google_user(
             {
                 "primaryEmail": email,
@@ -214,7 +211,7 @@ def _sync_staff_workspace(
             }
         )
         if not created:
-            logger.warning("sync_single_user_to_google: create_google_user failed for staff %s", email)
+            raise RuntimeError(f"Could not create Google Workspace account for staff {email}")
     else:
         current_ou = g_user.get("orgUnitPath")
         if current_ou != target_ou:
@@ -241,7 +238,8 @@ def sync_single_user_to_google(
     push OU + group membership to Google (same behavior as sync_all_to_google for that row).
 
     Returns True if a Workspace email existed and sync was attempted, False if skipped.
-    Caller should wrap in try/except if failures must never propagate.
+    Raises ``RuntimeError`` when a missing account could not be created;
+    caller should wrap in try/except if failures must never propagate.
     """
     user = db.session.get(User, user_id)
     if not user:
@@ -286,3 +284,28 @@ def sync_single_user_to_google(
 
     logger.debug("sync_single_user_to_google: user %s is not a student or staff link; skip", user_id)
     return False
+
+
+def enqueue_google_user_sync(
+    user_id: int,
+    *,
+    initial_google_password: str | None = None,
+    commit: bool = True,
+) -> None:
+    """
+    Queue ``sync_single_user_to_google`` as a background job instead of calling
+    Google from the request. Repeated saves before the worker runs collapse into one
+    job; the initial password is stored encrypted and dropped from the job row once the
+    job is done or has failed.
+    """
+    from services.background_jobs import enqueue_job
+
+    payload: dict = {"user_id": int(user_id)}
+    if initial_google_password:
+        payload["initial_google_password"] = initial_google_password
+    enqueue_job(
+        "google.sync_user",
+        payload,
+        idempotency_key=f"google.sync_user:{int(user_id)}",
+        commit=commit,
+    )
@@ -52,6 +52,15 @@ def enqueue_workspace_license_removal(
         status="pending",
     )
     db.session.add(job)
+    db.session.flush()
+    from services.background_jobs import enqueue_job
+
+    enqueue_job(
+        "google.revoke_license",
+        {"offboard_job_id": job.id},
+        idempotency_key=f"google.revoke_license:{job.id}",
+        run_after=job.license_remove_after,
+    )
     if commit:
         try:
             db.session.commit()
@@ -110,12 +119,50 @@ def offboard_staff_workspace_account(
     )
 
 
+def process_license_removal(job: GoogleWorkspaceOffboardJob) -> str:
+    """Revoke licenses for one offboard row; commits and returns the new status."""
+    from services.google_licensing_service import revoke_all_education_licenses
+
+    job_id = job.id
+    try:
+        result = revoke_all_education_licenses(job.email)
+        if result.get("ok") or result.get("revoked", 0) > 0:
+            job.status = "done"
+            job.license_removed_at = datetime.utcnow()
+            job.last_error = None
+        elif result.get("attempted", 0) == 0:
+            job.status = "skipped"
+            job.last_error = "no licensing client or empty email"
+        else:
+            job.status = "failed"
+            job.last_error = ", ".join(result.get("errors") or ["revoke failed"])
+        db.session.commit()
+        return job.status
+    except Exception as e:
+        db.session.rollback()
+        try:
+            job = db.session.get(GoogleWorkspaceOffboardJob, job_id)
+            if job:
+                job.status = "failed"
+                job.last_error = str(e)[:500]
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+        current_app.logger.exception(
+            "License removal failed for offboard job %s (%s)",
+            job_id,
+            getattr(job, "email", None),
+        )
+        return "failed"
+
+
 def process_due_license_removals(*, limit: int = 100) -> dict:
     """
     Cron helper: revoke licenses for jobs past ``license_remove_after``.
-    """
-    from services.google_licensing_service import revoke_all_education_licenses
 
+    New rows also get a ``google.revoke_license`` background job; this sweep still
+    covers rows queued before the job system existed.
+    """
     now = datetime.utcnow()
     q = (
         GoogleWorkspaceOffboardJob.query.filter(
@@ -131,38 +178,13 @@ def process_due_license_removals(*, limit: int = 100) -> dict:
     skipped = 0
 
     for job in jobs:
-        try:
-            result = revoke_all_education_licenses(job.email)
-            if result.get("ok") or result.get("revoked", 0) > 0:
-                job.status = "done"
-                job.license_removed_at = datetime.utcnow()
-                job.last_error = None
-                done += 1
-            elif result.get("attempted", 0) == 0:
-                job.status = "skipped"
-                job.last_error = "no licensing client or empty email"
-                skipped += 1
-            else:
-                job.status = "failed"
-                job.last_error = ", ".join(result.get("errors") or ["revoke failed"])
-                failed += 1
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
+        status = process_license_removal(job)
+        if status == "done":
+            done += 1
+        elif status == "skipped":
+            skipped += 1
+        else:
             failed += 1
-            try:
-                job = db.session.get(GoogleWorkspaceOffboardJob, job.id)
-                if job:
-                    job.status = "failed"
-                    job.last_error = str(e)[:500]
-                    db.session.commit()
-            except Exception:
-                db.session.rollback()
-            current_app.logger.exception(
-                "process_due_license_removals failed for job %s (%s)",
-                getattr(job, "id", None),
-                getattr(job, "email", None),
-            )
 
     return {
         "ok": True,
@@ -0,0 +1,477 @@
+"""
+Server-Sent Events push channel for messages, reactions, notifications and announcements.
+
+Writers do nothing special: session hooks turn new ``Message`` / ``MessageReaction`` /
+``Notification`` / ``Announcement`` rows (and notifications being read or deleted) into
+``LiveEvent`` outbox rows inside the same transaction, one per recipient. After the
+commit the events go straight to this process's subscribers, so a sender's own worker
+delivers in milliseconds. For events committed by other processes (other gunicorn
+workers, ops scripts, the background job worker) each serving process runs one pump
+thread that reads new outbox rows every LIVE_EVENTS_POLL_SECONDS while it has open
+streams, one indexed query per process rather than one poll per browser tab.
+
+Event ids are the outbox ids. A reconnecting ``EventSource`` sends ``Last-Event-ID`` and
+gets the rows it missed; when too many were missed it gets a ``resync`` event instead and
+reloads over REST. Payloads carry ids and counts only; clients fetch content through the
+existing endpoints (e.g. channel messages with ``?after=``).
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event as sa_event, func, insert, or_, select
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import (
+    Announcement,
+    Enrollment,
+    LiveEvent,
+    Message,
+    MessageGroupMember,
+    MessageReaction,
+    Notification,
+    Student,
+    UnreadCounter,
+    User,
+)
+from services.unread_counters import SCOPE_NOTIFICATIONS
+
+EVENT_MESSAGE = "message"
+EVENT_REACTION = "reaction"
+EVENT_NOTIFICATIONS = "notifications"
+EVENT_ANNOUNCEMENT = "announcement"
+EVENT_RESYNC = "resync"
+
+DEFAULT_MAX_STREAMS = 8
+DEFAULT_POLL_SECONDS = 1.0
+HEARTBEAT_SECONDS = 15
+STREAM_SECONDS = 300  # streams end after this; EventSource reconnects with Last-Event-ID
+RECONNECT_MS = 3000
+REPLAY_LIMIT = 200
+RETENTION_HOURS = 24
+_PUMP_LOOKBACK_SECONDS = 10  # re-read recent rows: ids commit out of order across processes
+_SUBSCRIBER_BUFFER = 500
+_SEEN_IDS_MAX = 10000
+
+_PENDING_KEY = "_live_events_pending"
+_OUTBOX_KEY = "_live_events_outbox"
+
+_table = LiveEvent.__table__
+
+
+def live_events_enabled() -> bool:
+    if not has_app_context():
+        return True
+    return bool(current_app.config.get("LIVE_EVENTS_ENABLED", True))
+
+
+def _config_number(key: str, default, cast):
+    try:
+        return cast(current_app.config.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# ---------------------------------------------------------------------------
+# In-process hub
+# ---------------------------------------------------------------------------
+class Subscriber:
+    """One open stream: buffered events for ``user_id`` plus a wakeup flag."""
+
+    __slots__ = ("user_id", "events", "wakeup", "overflowed")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.events: deque = deque(maxlen=_SUBSCRIBER_BUFFER)
+        self.wakeup = threading.Event()
+        self.overflowed = False
+
+
+class LiveEventHub:
+    """Per-process fan-out of committed events to open SSE streams."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[int, set[Subscriber]] = {}
+        self._seen: OrderedDict[int, None] = OrderedDict()
+        self._high_water: Optional[int] = None
+        self._pump: Optional[threading.Thread] = None
+
+    def stream_count(self) -> int:
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def subscribe(self, user_id: int, *, max_streams: int) -> Optional[Subscriber]:
+        """New subscriber, or None when this process already serves ``max_streams`` streams."""
+        with self._lock:
+            if sum(len(subs) for subs in self._subscribers.values()) >= max_streams:
+                return None
+            subscriber = Subscriber(user_id)
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            subs = self._subscribers.get(subscriber.user_id)
+            if subs is not None:
+                subs.discard(subscriber)
+                if not subs:
+                    del self._subscribers[subscriber.user_id]
+
+    def subscribed_user_ids(self) -> list[int]:
+        with self._lock:
+            return list(self._subscribers)
+
+    def publish(self, events: Iterable[dict]) -> int:
+        """Queue events for matching subscribers, skipping ids this process already published."""
+        delivered = 0
+        with self._lock:
+            for ev in events:
+                if ev["id"] in self._seen:
+                    continue
+                self._seen[ev["id"]] = None
+                if len(self._seen) > _SEEN_IDS_MAX:
+                    self._seen.popitem(last=False)
+                for subscriber in self._subscribers.get(ev["user_id"], ()):
+                    if len(subscriber.events) == subscriber.events.maxlen:
+                        subscriber.overflowed = True
+                    subscriber.events.append(ev)
+                    subscriber.wakeup.set()
+                    delivered += 1
+        return delivered
+
+    def drain(self, subscriber: Subscriber) -> tuple[list[dict], bool]:
+        with self._lock:
+            events = list(subscriber.events)
+            subscriber.events.clear()
+            subscriber.wakeup.clear()
+            overflowed, subscriber.overflowed = subscriber.overflowed, False
+        return events, overflowed
+
+    # -- cross-process pump -------------------------------------------------
+    def ensure_pump(self, app) -> None:
+        with self._lock:
+            if self._pump is not None and self._pump.is_alive():
+                return
+            self._pump = threading.Thread(target=self._run_pump, args=(app,), name="live-event-pump", daemon=True)
+            self._pump.start()
+
+    def _run_pump(self, app) -> None:
+        with app.app_context():
+            poll_seconds = max(0.2, _config_number("LIVE_EVENTS_POLL_SECONDS", DEFAULT_POLL_SECONDS, float))
+        while True:
+            time.sleep(poll_seconds)
+            user_ids = self.subscribed_user_ids()
+            if not user_ids:
+                self._high_water = None
+                continue
+            with app.app_context():
+                try:
+                    self.publish(self._read_new_rows(user_ids))
+                except Exception as exc:
+                    db.session.rollback()
+                    app.logger.warning("Live event pump read failed: %s", exc)
+                finally:
+                    db.session.remove()
+
+    def _read_new_rows(self, user_ids: list[int]) -> list[dict]:
+        if self._high_water is None:
+            self._high_water = int(db.session.execute(select(func.max(_table.c.id))).scalar() or 0)
+            return []
+        recent = datetime.utcnow() - timedelta(seconds=_PUMP_LOOKBACK_SECONDS)
+        rows = db.session.execute(
+            select(_table.c.id, _table.c.user_id, _table.c.event_type, _table.c.payload)
+            .where(
+                or_(_table.c.id > self._high_water, _table.c.created_at >= recent),
+                _table.c.user_id.in_(user_ids),
+            )
+            .order_by(_table.c.id)
+            .limit(1000)
+        ).all()
+        if rows:
+            self._high_water = max(self._high_water, rows[-1].id)
+        return [_row_event(row) for row in rows]
+
+
+hub = LiveEventHub()
+
+
+def _row_event(row) -> dict:
+    try:
+        data = json.loads(row.payload or "{}")
+    except ValueError:
+        data = {}
+    return {"id": row.id, "user_id": row.user_id, "type": row.event_type, "data": data}
+
+
+# ---------------------------------------------------------------------------
+# Streams
+# ---------------------------------------------------------------------------
+def format_sse(ev: dict) -> str:
+    return f"id: {ev['id']}\nevent: {ev['type']}\ndata: {json.dumps(ev['data'], separators=(',', ':'))}\n\n"
+
+
+def replay_events(user_id: int, last_event_id: int) -> Optional[list[dict]]:
+    """Outbox rows for ``user_id`` after ``last_event_id``; None when more than REPLAY_LIMIT were missed."""
+    rows = db.session.execute(
+        select(_table.c.id, _table.c.user_id, _table.c.event_type, _table.c.payload)
+        .where(
+            _table.c.id > last_event_id,
+            _table.c.user_id == user_id,
+        )
+        .order_by(_table.c.id)
+        .limit(REPLAY_LIMIT + 1)
+    ).all()
+    if len(rows) > REPLAY_LIMIT:
+        return None
+    return [_row_event(row) for row in rows]
+
+
+def event_stream(subscriber: Subscriber, replay: Optional[list[dict]]) -> Iterator[str]:
+    """SSE body for one subscriber; needs no app context and holds no DB connection."""
+    try:
+        yield f"retry: {RECONNECT_MS}\n\n"
+        replayed: set[int] = set()
+        if replay is None:
+            yield f"event: {EVENT_RESYNC}\ndata: {{}}\n\n"
+        else:
+            for ev in replay:
+                replayed.add(ev["id"])
+                yield format_sse(ev)
+        deadline = time.monotonic() + STREAM_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            woke = subscriber.wakeup.wait(min(HEARTBEAT_SECONDS, remaining))
+            events, overflowed = hub.drain(subscriber)
+            if overflowed:
+                yield f"event: {EVENT_RESYNC}\ndata: {{}}\n\n"
+            for ev in events:
+                if ev["id"] not in replayed:
+                    yield format_sse(ev)
+            if not woke:
+                yield ": keepalive\n\n"
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+def open_stream(user_id: int, last_event_id: Optional[int], app) -> Optional[Iterator[str]]:
+    """Subscribe ``user_id`` and return its SSE body, or None when this process is at capacity."""
+    max_streams = _config_number("LIVE_EVENTS_MAX_STREAMS", DEFAULT_MAX_STREAMS, int)
+    subscriber = hub.subscribe(user_id, max_streams=max_streams)
+    if subscriber is None:
+        return None
+    try:
+        replay = replay_events(user_id, last_event_id) if last_event_id is not None else []
+        hub.ensure_pump(app)
+    except Exception:
+        hub.unsubscribe(subscriber)
+        raise
+    return event_stream(subscriber, replay)
+
+
+def prune_live_events(older_than_hours: int = RETENTION_HOURS) -> int:
+    """Delete outbox rows past the replay window."""
+    cutoff = datetime.utcnow() - timedelta(hours=older_than_hours)
+    deleted = db.session.execute(_table.delete().where(_table.c.created_at < cutoff)).rowcount
+    db.session.commit()
+    return int(deleted or 0)
+
+
+# ---------------------------------------------------------------------------
+# Outbox hooks
+# ---------------------------------------------------------------------------
+def _notification_read_changed(obj: Notification) -> bool:
+    return sa_inspect(obj).attrs.is_read.history.has_changes()
+
+
+def _collect_live_events(session: Session, _flush_context) -> None:
+    """after_flush: note new rows (ids are assigned now) and notification read-state changes."""
+    if not live_events_enabled():
+        return
+    pending = session.info.get(_PENDING_KEY) or []
+    for obj in session.new:
+        if isinstance(obj, Message):
+            pending.append((EVENT_MESSAGE, obj.id, obj.group_id, obj.sender_id, obj.recipient_id,
+                            obj.parent_message_id))
+        elif isinstance(obj, MessageReaction):
+            pending.append((EVENT_REACTION, obj.message_id))
+        elif isinstance(obj, Notification):
+            pending.append((EVENT_NOTIFICATIONS, obj.user_id, obj.id, obj.type, obj.title, obj.link))
+        elif isinstance(obj, Announcement):
+            pending.append((EVENT_ANNOUNCEMENT, obj.id, obj.target_group, obj.class_id))
+    for obj in session.deleted:
+        if isinstance(obj, MessageReaction):
+            pending.append((EVENT_REACTION, obj.message_id))
+        elif isinstance(obj, Notification):
+            pending.append((EVENT_NOTIFICATIONS, obj.user_id, None, None, None, None))
+    for obj in session.dirty:
+        if isinstance(obj, Notification) and _notification_read_changed(obj):
+            pending.append((EVENT_NOTIFICATIONS, obj.user_id, None, None, None, None))
+    if pending:
+        session.info[_PENDING_KEY] = pending
+
+
+def _group_members(conn, group_ids: set) -> dict[int, set[int]]:
+    members: dict[int, set[int]] = {}
+    if not group_ids:
+        return members
+    rows = conn.execute(
+        select(MessageGroupMember.group_id, MessageGroupMember.user_id)
+        .where(MessageGroupMember.group_id.in_(group_ids))
+    )
+    for group_id, user_id in rows:
+        members.setdefault(group_id, set()).add(user_id)
+    return members
+
+
+def _announcement_audience(conn, target_group: Optional[str], class_id: Optional[int]) -> set[int]:
+    """
+    Users who see the announcement in ``get_user_announcements``: directors, administrators
+    and teachers see every one; students see school-wide ones and their classes' ones.
+    """
+    staff = select(User.id).where(
+        or_(User.role.in_(("Director", "School Administrator")), User.role.contains("Teacher"))
+    )
+    users = set(conn.execute(staff).scalars())
+    students = select(User.id).join(Student, Student.id == User.student_id).where(User.role == "Student")
+    if target_group in ("all", "all_students"):
+        users.update(conn.execute(students).scalars())
+    elif target_group == "class" and class_id is not None:
+        users.update(conn.execute(
+            students.join(Enrollment, Enrollment.student_id == Student.id)
+            .where(Enrollment.class_id == class_id, Enrollment.is_active.is_(True))
+        ).scalars())
+    return users
+
+
+def _build_events(conn, pending: list[tuple]) -> list[tuple[int, str, dict]]:
+    """(recipient user id, event type, payload) for the collected changes."""
+    messages = [p for p in pending if p[0] == EVENT_MESSAGE]
+    reaction_ids = {p[1] for p in pending if p[0] == EVENT_REACTION}
+    notes = [p for p in pending if p[0] == EVENT_NOTIFICATIONS]
+    out: list[tuple[int, str, dict]] = []
+
+    reacted = {}
+    if reaction_ids:
+        reacted = {
+            row.id: row for row in conn.execute(
+                select(Message.id, Message.group_id, Message.sender_id, Message.recipient_id)
+                .where(Message.id.in_(reaction_ids))
+            )
+        }
+    members = _group_members(
+        conn, {p[2] for p in messages if p[2]} | {m.group_id for m in reacted.values() if m.group_id}
+    )
+
+    def audience(group_id, sender_id, recipient_id) -> set[int]:
+        users = set(members.get(group_id, ())) if group_id else set()
+        users.update(u for u in (sender_id, recipient_id) if u is not None)
+        return users
+
+    for _, message_id, group_id, sender_id, recipient_id, parent_id in messages:
+        data = {"message_id": message_id, "group_id": group_id, "sender_id": sender_id,
+                "parent_message_id": parent_id}
+        out.extend((user_id, EVENT_MESSAGE, data) for user_id in sorted(audience(group_id, sender_id, recipient_id)))
+
+    if reacted:
+        counts: dict[int, dict[str, int]] = {}
+        for message_id, emoji, n in conn.execute(
+            select(MessageReaction.message_id, MessageReaction.emoji, func.count(MessageReaction.id))
+            .where(MessageReaction.message_id.in_(list(reacted)))
+            .group_by(MessageReaction.message_id, MessageReaction.emoji)
+            .order_by(func.min(MessageReaction.id))
+        ):
+            counts.setdefault(message_id, {})[emoji] = n
+        for message_id, msg in reacted.items():
+            data = {"message_id": message_id, "group_id": msg.group_id, "reactions": counts.get(message_id, {})}
+            out.extend((user_id, EVENT_REACTION, data)
+                       for user_id in sorted(audience(msg.group_id, msg.sender_id, msg.recipient_id)))
+
+    if notes:
+        note_users = {p[1] for p in notes}
+        # The unread counter hooks run first (registered earlier), so this flush is included.
+        unread = dict.fromkeys(note_users, 0)
+        unread.update(conn.execute(
+            select(UnreadCounter.user_id, UnreadCounter.count)
+            .where(UnreadCounter.user_id.in_(note_users), UnreadCounter.scope == SCOPE_NOTIFICATIONS)
+        ).all())
+        announced = set()
+        for _, user_id, note_id, note_type, title, link in notes:
+            if note_id is None:
+                continue
+            announced.add(user_id)
+            out.append((user_id, EVENT_NOTIFICATIONS, {
+                "unread_count": unread[user_id],
+                "notification": {"id": note_id, "type": note_type, "title": title, "link": link},
+            }))
+        for user_id in sorted(note_users - announced):
+            out.append((user_id, EVENT_NOTIFICATIONS, {"unread_count": unread[user_id], "notification": None}))
+
+    for p in pending:
+        if p[0] != EVENT_ANNOUNCEMENT:
+            continue
+        _, announcement_id, target_group, class_id = p
+        data = {"announcement_id": announcement_id, "target_group": target_group, "class_id": class_id}
+        out.extend((user_id, EVENT_ANNOUNCEMENT, data)
+                   for user_id in sorted(_announcement_audience(conn, target_group, class_id)))
+    return out
+
+
+def _write_live_events(session: Session, _flush_context) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    conn = session.connection()
+    savepoint = conn.begin_nested()
+    try:
+        events = _build_events(conn, pending)
+        if events:
+            now = datetime.utcnow()
+            params = [
+                {"user_id": user_id, "event_type": event_type,
+                 "payload": json.dumps(data, separators=(",", ":")), "created_at": now}
+                for user_id, event_type, data in events
+            ]
+            ids = conn.execute(
+                insert(_table).returning(_table.c.id, sort_by_parameter_order=True), params
+            ).scalars().all()
+            session.info.setdefault(_OUTBOX_KEY, []).extend(
+                {"id": event_id, "user_id": user_id, "type": event_type, "data": data}
+                for event_id, (user_id, event_type, data) in zip(ids, events)
+            )
+        savepoint.commit()
+    except Exception as exc:
+        savepoint.rollback()
+        if has_app_context():
+            current_app.logger.warning("Live event outbox write failed; clients catch up on reload: %s", exc)
+
+
+def _publish_committed(session: Session) -> None:
+    events = session.info.pop(_OUTBOX_KEY, None)
+    if events:
+        hub.publish(events)
+
+
+def _discard_uncommitted(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_OUTBOX_KEY, None)
+
+
+def register_live_event_hooks() -> None:
+    """Write outbox rows for pushable changes and publish them after commit (idempotent)."""
+    if not sa_event.contains(Session, "after_flush", _collect_live_events):
+        sa_event.listen(Session, "after_flush", _collect_live_events)
+        sa_event.listen(Session, "after_flush_postexec", _write_live_events)
+        sa_event.listen(Session, "after_commit", _publish_committed)
+        sa_event.listen(Session, "after_rollback", _discard_uncommitted)
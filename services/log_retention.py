@@ -0,0 +1,247 @@
+"""
+Retention for the append-only log tables (``admin_audit_log``, ``activity_log``).
+
+Rows younger than ``LOG_RETENTION_HOT_DAYS`` stay in the database. Older rows leave a
+calendar month at a time: the month is written to a gzip JSON-lines file under
+``LOG_ARCHIVE_DIR``, recorded as a ``LogArchiveSegment``, and only then deleted from the
+hot table in short id batches. Each month therefore behaves like a detached range
+partition on SQLite and PostgreSQL alike — the hot tables hold only the retention
+window, and archived months stay readable through ``iter_archived_rows`` (the tech
+audit viewer's archive mode).
+
+Crash safety: files are written under a temporary name and renamed, the catalog row
+commits before the first delete, and every run starts by deleting hot rows a committed
+segment already holds, so an interrupted month is neither lost nor archived twice.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Iterator, Optional
+
+from flask import current_app
+from sqlalchemy import delete, func, select
+
+from extensions import db
+from models import ActivityLog, AdminAuditLog, LogArchiveSegment
+
+ARCHIVE_PAGE_SIZE = 5000
+DELETE_BATCH_SIZE = 2000
+
+# table name -> (model, timestamp column that decides a row's month)
+ARCHIVED_LOG_TABLES: dict[str, tuple[Any, Any]] = {
+    "admin_audit_log": (AdminAuditLog, AdminAuditLog.created_at),
+    "activity_log": (ActivityLog, ActivityLog.timestamp),
+}
+
+
+def archive_dir() -> str:
+    configured = (current_app.config.get("LOG_ARCHIVE_DIR") or "").strip()
+    path = configured or os.path.join(current_app.instance_path, "log_archive")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def hot_days() -> int:
+    try:
+        return int(current_app.config.get("LOG_RETENTION_HOT_DAYS") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _month_start(value: date) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _next_month(value: datetime) -> datetime:
+    return datetime(value.year + (value.month == 12), value.month % 12 + 1, 1)
+
+
+def archive_cutoff(days: Optional[int] = None, *, now: Optional[datetime] = None) -> Optional[datetime]:
+    """First instant kept hot: the start of the month ``days`` ago (None = retention off)."""
+    days = hot_days() if days is None else days
+    if days <= 0:
+        return None
+    return _month_start((now or datetime.utcnow()) - timedelta(days=days))
+
+
+def _table_spec(table_name: str) -> tuple[Any, Any]:
+    try:
+        return ARCHIVED_LOG_TABLES[table_name]
+    except KeyError:
+        raise ValueError(f"Unknown log table: {table_name}") from None
+
+
+def _jsonable(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def _purge_archived_rows(table_name: str) -> int:
+    """Delete hot rows that a committed segment already holds (an interrupted earlier run)."""
+    model, ts_col = _table_spec(table_name)
+    removed = 0
+    segments = LogArchiveSegment.query.filter_by(table_name=table_name).all()
+    for seg in segments:
+        if seg.min_id is None:
+            continue
+        start = datetime.strptime(seg.month, "%Y-%m")
+        removed += _delete_batched(
+            model, ts_col >= start, ts_col < _next_month(start),
+            model.id >= seg.min_id, model.id <= seg.max_id,
+        )
+    return removed
+
+
+def _delete_batched(model, *criteria) -> int:
+    removed = 0
+    while True:
+        ids = select(model.id).where(*criteria).order_by(model.id).limit(DELETE_BATCH_SIZE)
+        result = db.session.execute(delete(model).where(model.id.in_(ids.scalar_subquery())))
+        db.session.commit()
+        count = result.rowcount or 0
+        removed += count
+        if count < DELETE_BATCH_SIZE:
+            return removed
+
+
+def _archive_month(table_name: str, month_start: datetime) -> Optional[LogArchiveSegment]:
+    model, ts_col = _table_spec(table_name)
+    month_end = _next_month(month_start)
+    month = month_start.strftime("%Y-%m")
+    in_month = (ts_col >= month_start, ts_col < month_end)
+
+    part = LogArchiveSegment.query.filter_by(table_name=table_name, month=month).count() + 1
+    rel_path = os.path.join(table_name, f"{month}-{part}.jsonl.gz")
+    full_path = os.path.join(archive_dir(), rel_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+    columns = list(model.__table__.columns)
+    stmt = select(*columns).where(*in_month).order_by(model.id).limit(ARCHIVE_PAGE_SIZE)
+    row_count, min_id, max_id = 0, None, None
+    tmp_path = full_path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as fh:
+        while True:
+            page = stmt if max_id is None else stmt.where(model.id > max_id)
+            rows = db.session.execute(page).all()
+            for row in rows:
+                fh.write(json.dumps({c.name: _jsonable(row._mapping[c]) for c in columns}) + "\n")
+            if rows:
+                min_id = rows[0].id if min_id is None else min_id
+                max_id = rows[-1].id
+                row_count += len(rows)
+            if len(rows) < ARCHIVE_PAGE_SIZE:
+                break
+    if not row_count:
+        os.remove(tmp_path)
+        return None
+    os.replace(tmp_path, full_path)
+
+    segment = LogArchiveSegment(
+        table_name=table_name, month=month, path=rel_path,
+        row_count=row_count, min_id=min_id, max_id=max_id,
+    )
+    db.session.add(segment)
+    db.session.commit()
+    _delete_batched(model, *in_month, model.id >= min_id, model.id <= max_id)
+    return segment
+
+
+def pending_archive_months(table_name: str, cutoff: datetime) -> list[tuple[str, int]]:
+    """``(YYYY-MM, rows)`` for hot months older than ``cutoff``, oldest first."""
+    model, ts_col = _table_spec(table_name)
+    months: list[tuple[str, int]] = []
+    oldest = db.session.execute(select(func.min(ts_col))).scalar()
+    start = _month_start(oldest) if oldest else None
+    while start is not None and start < cutoff:
+        end = _next_month(start)
+        count = db.session.execute(
+            select(func.count(model.id)).where(ts_col >= start, ts_col < end)
+        ).scalar() or 0
+        if count:
+            months.append((start.strftime("%Y-%m"), int(count)))
+        start = end
+    return months
+
+
+def archive_old_logs(
+    *,
+    table_name: Optional[str] = None,
+    days: Optional[int] = None,
+    dry_run: bool = False,
+) -> dict[str, list[tuple[str, int]]]:
+    """
+    Move months older than the hot window out of each log table.
+
+    Returns ``{table: [(month, rows), ...]}`` for the months archived (or, with
+    ``dry_run``, the months that would be).
+    """
+    cutoff = archive_cutoff(days)
+    if cutoff is None:
+        return {}
+    tables = [table_name] if table_name else list(ARCHIVED_LOG_TABLES)
+    summary: dict[str, list[tuple[str, int]]] = {}
+    for name in tables:
+        pending = pending_archive_months(name, cutoff)
+        if dry_run:
+            summary[name] = pending
+            continue
+        purged = _purge_archived_rows(name)
+        if purged:
+            current_app.logger.warning("Log retention: removed %s already-archived %s rows", purged, name)
+        done: list[tuple[str, int]] = []
+        for month, _count in pending:
+            segment = _archive_month(name, datetime.strptime(month, "%Y-%m"))
+            if segment is not None:
+                done.append((month, segment.row_count))
+                current_app.logger.info(
+                    "Log retention: archived %s %s (%s rows) to %s",
+                    name, month, segment.row_count, segment.path,
+                )
+        summary[name] = done
+    return summary
+
+
+def log_archive_due() -> bool:
+    """True when any log table holds rows older than the hot window (cheap: one MIN per table)."""
+    cutoff = archive_cutoff()
+    if cutoff is None:
+        return False
+    for _model, ts_col in ARCHIVED_LOG_TABLES.values():
+        oldest = db.session.execute(select(func.min(ts_col))).scalar()
+        if oldest is not None and oldest < cutoff:
+            return True
+    return False
+
+
+def archived_months(table_name: str) -> list[str]:
+    """Archived months for ``table_name``, newest first."""
+    _table_spec(table_name)
+    rows = (
+        db.session.query(LogArchiveSegment.month)
+        .filter(LogArchiveSegment.table_name == table_name)
+        .distinct()
+        .order_by(LogArchiveSegment.month.desc())
+        .all()
+    )
+    return [r.month for r in rows]
+
+
+def iter_archived_rows(table_name: str, month: str) -> Iterator[dict[str, Any]]:
+    """Archived rows of one month in id order; the timestamp column comes back as a datetime."""
+    _model, ts_col = _table_spec(table_name)
+    segments = (
+        LogArchiveSegment.query.filter_by(table_name=table_name, month=month)
+        .order_by(LogArchiveSegment.min_id)
+        .all()
+    )
+    base = archive_dir()
+    for seg in segments:
+        with gzip.open(os.path.join(base, seg.path), "rt", encoding="utf-8") as fh:
+            for line in fh:
+                row = json.loads(line)
+                if row.get(ts_col.name):
+                    row[ts_col.name] = datetime.fromisoformat(row[ts_col.name])
+                yield row
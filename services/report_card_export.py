@@ -0,0 +1,380 @@
+"""
+Bulk report card export: a whole grade or class list as one ZIP or merged PDF.
+
+Each student's latest report card for the selected quarters is rendered through the
+shared PDF render pool (services.report_card_pdf), so cached PDFs are reused and
+cold renders run in parallel across processes. Progress lives on
+``ReportCardExportJob`` for the SPA to poll.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import as_completed
+from datetime import datetime
+from typing import Any, Optional
+
+from flask import current_app
+
+from extensions import db
+from models import Class, Enrollment, ReportCard, ReportCardExportJob, SchoolYear, Student
+from services.report_card_pdf import (
+    ensure_cached_pdf,
+    pdf_cache_dir,
+    report_card_pdf_cache_key,
+    report_card_pdf_prefix,
+    report_card_stylesheet_paths,
+)
+
+VALID_QUARTERS = ("Q1", "Q2", "Q3", "Q4")
+OUTPUT_FORMATS = ("zip", "pdf")
+# Finished archives are only kept long enough to download.
+EXPORT_FILE_MAX_AGE_SECONDS = 24 * 3600
+# Commit progress at most this often so large exports do not hammer the DB.
+_PROGRESS_COMMIT_INTERVAL = 2.0
+
+
+def export_dir() -> str:
+    path = os.path.join(pdf_cache_dir(), "exports")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _prune_old_exports() -> None:
+    cutoff = time.time() - EXPORT_FILE_MAX_AGE_SECONDS
+    try:
+        names = os.listdir(export_dir())
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(export_dir(), name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+        except OSError:
+            pass
+
+
+def _job_class_ids(job: ReportCardExportJob) -> list[int]:
+    try:
+        return [int(c) for c in json.loads(job.class_ids or "[]")]
+    except (TypeError, ValueError):
+        return []
+
+
+def _job_errors(job: ReportCardExportJob) -> list[dict[str, Any]]:
+    try:
+        errors = json.loads(job.errors or "[]")
+    except (TypeError, ValueError):
+        return []
+    return errors if isinstance(errors, list) else []
+
+
+def export_job_payload(job: ReportCardExportJob) -> dict[str, Any]:
+    """JSON shape polled by the SPA."""
+    processed = (job.completed_count or 0) + (job.failed_count or 0) + (job.skipped_count or 0)
+    total = job.total_count or 0
+    return {
+        "id": job.id,
+        "status": job.status,
+        "school_year_id": job.school_year_id,
+        "quarters": [q for q in (job.quarters or "").split(",") if q],
+        "grade_level": job.grade_level,
+        "class_ids": _job_class_ids(job),
+        "output_format": job.output_format,
+        "total": total,
+        "completed": job.completed_count or 0,
+        "failed": job.failed_count or 0,
+        "skipped": job.skipped_count or 0,
+        "percent": round(processed / total * 100) if total else (100 if job.status == "done" else 0),
+        "errors": _job_errors(job),
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "download_url": (
+            f"/api/spa/report-cards/exports/{job.id}/download"
+            if job.status == "done" and job.output_path
+            else None
+        ),
+    }
+
+
+def create_report_card_export(
+    *,
+    school_year_id: int,
+    quarters: list[str],
+    grade_level: Optional[int] = None,
+    class_ids: Optional[list[int]] = None,
+    output_format: str = "zip",
+    generate_missing: bool = False,
+    created_by_user_id: Optional[int] = None,
+) -> ReportCardExportJob:
+    """Validate and queue an export. Raises ValueError on bad input."""
+    if not SchoolYear.query.get(school_year_id):
+        raise ValueError("School year not found.")
+    quarters_clean = [q for q in VALID_QUARTERS if q in (quarters or [])]
+    if not quarters_clean:
+        raise ValueError("Select at least one quarter.")
+    class_ids_clean = sorted({int(c) for c in (class_ids or [])})
+    if grade_level is None and not class_ids_clean:
+        raise ValueError("Select a grade level or at least one class.")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError("Output format must be 'zip' or 'pdf'.")
+
+    job = ReportCardExportJob(
+        school_year_id=school_year_id,
+        quarters=",".join(quarters_clean),
+        grade_level=grade_level,
+        class_ids=json.dumps(class_ids_clean) if class_ids_clean else None,
+        output_format=output_format,
+        generate_missing=bool(generate_missing),
+        status="queued",
+        created_by_user_id=created_by_user_id,
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def schedule_report_card_export(job_id: int) -> None:
+    """Hand the export to the background job queue (runs after the HTTP response)."""
+    from services.background_jobs import enqueue_job
+
+    job = ReportCardExportJob.query.get(job_id)
+    enqueue_job(
+        "report_cards.export",
+        {"job_id": int(job_id)},
+        idempotency_key=f"report_cards.export:{int(job_id)}",
+        created_by_user_id=getattr(job, "created_by_user_id", None),
+        commit=True,
+    )
+
+
+def _export_students(job: ReportCardExportJob, school_year: SchoolYear) -> list[Student]:
+    """Students enrolled that year in the selected classes / grade, sorted by name."""
+    from utils.report_card_school_year import grade_levels_for_school_year
+
+    q = (
+        Student.query.join(Enrollment, Enrollment.student_id == Student.id)
+        .join(Class, Class.id == Enrollment.class_id)
+        .filter(Class.school_year_id == school_year.id)
+    )
+    class_ids = _job_class_ids(job)
+    if class_ids:
+        q = q.filter(Class.id.in_(class_ids))
+    if job.grade_level is not None and school_year.is_active:
+        # Open year: the live roster grade decides, straight in SQL.
+        q = q.filter(Student.grade_level == job.grade_level)
+    students = q.distinct().order_by(Student.last_name, Student.first_name, Student.id).all()
+    if job.grade_level is not None and not school_year.is_active:
+        grades = grade_levels_for_school_year(students, school_year)
+        students = [s for s in students if grades.get(s.id) == job.grade_level]
+    return students
+
+
+def _latest_cards_by_student(student_ids: list[int], school_year_id: int, quarter_str: str) -> dict[int, ReportCard]:
+    from management_routes.reports import _sort_report_cards_newest_first
+
+    if not student_ids:
+        return {}
+    rows = ReportCard.query.filter(
+        ReportCard.student_id.in_(student_ids),
+        ReportCard.school_year_id == school_year_id,
+        ReportCard.quarter == quarter_str,
+    ).all()
+    latest: dict[int, ReportCard] = {}
+    for rc in _sort_report_cards_newest_first(rows):
+        latest.setdefault(rc.student_id, rc)
+    return latest
+
+
+def _generate_missing_card(student: Student, school_year: SchoolYear, quarters: list[str]):
+    """Persist a fresh snapshot for a student with no card yet; returns (card, error)."""
+    from management_routes.reports import persist_report_card_record
+
+    class_ids = [
+        row[0]
+        for row in db.session.query(Enrollment.class_id)
+        .join(Class, Class.id == Enrollment.class_id)
+        .filter(Enrollment.student_id == student.id, Class.school_year_id == school_year.id)
+        .distinct()
+        .all()
+    ]
+    res = persist_report_card_record(
+        student_id_int=student.id,
+        school_year_id_int=school_year.id,
+        class_ids_int=class_ids,
+        quarters_to_include=quarters,
+        notify_admins=False,
+    )
+    if not res["ok"]:
+        return None, res.get("error") or "Could not generate report card."
+    return res["report_card"], None
+
+
+def _unique_name(name: str, used: set[str]) -> str:
+    base, ext = os.path.splitext(name)
+    candidate, n = name, 2
+    while candidate in used:
+        candidate = f"{base}_{n}{ext}"
+        n += 1
+    used.add(candidate)
+    return candidate
+
+
+def _write_zip(out_path: str, entries: list[tuple[str, str]]) -> None:
+    used: set[str] = set()
+    tmp = f"{out_path}.tmp"
+    # PDFs are already compressed; storing avoids burning CPU for ~0% gain.
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as zf:
+        for filename, pdf_path in entries:
+            zf.write(pdf_path, arcname=_unique_name(filename, used))
+    os.replace(tmp, out_path)
+
+
+def _write_merged_pdf(out_path: str, entries: list[tuple[str, str]]) -> None:
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for _filename, pdf_path in entries:
+        writer.append(pdf_path)
+    tmp = f"{out_path}.tmp"
+    with open(tmp, "wb") as fh:
+        writer.write(fh)
+    writer.close()
+    os.replace(tmp, out_path)
+
+
+def run_report_card_export(job_id: int) -> Optional[ReportCardExportJob]:
+    """Render every card in the job and assemble the archive. Safe to call synchronously."""
+    from management_routes.reports import (
+        _quarter_str_from_selection,
+        render_report_card_html,
+        report_card_pdf_filename,
+    )
+
+    job = ReportCardExportJob.query.get(job_id)
+    if job is None or job.status not in ("queued", "failed"):
+        return job
+    job.status = "running"
+    job.started_at = datetime.utcnow()
+    job.finished_at = None
+    job.completed_count = job.failed_count = job.skipped_count = 0
+    job.errors = None
+    db.session.commit()
+
+    errors: list[dict[str, Any]] = []
+    counts = {"completed": 0, "failed": 0, "skipped": 0}
+    counts_lock = threading.Lock()
+    last_commit = [0.0]
+
+    def _record_error(student: Student, message: str) -> None:
+        errors.append({
+            "student_id": student.id,
+            "student": f"{student.first_name} {student.last_name}".strip(),
+            "error": message,
+        })
+
+    def _flush_progress(force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - last_commit[0] < _PROGRESS_COMMIT_INTERVAL:
+            return
+        with counts_lock:
+            job.completed_count = counts["completed"]
+            job.failed_count = counts["failed"]
+            job.skipped_count = counts["skipped"]
+        job.errors = json.dumps(errors) if errors else None
+        db.session.commit()
+        last_commit[0] = now
+
+    def _on_render_done(future) -> None:
+        with counts_lock:
+            counts["completed" if future.exception() is None else "failed"] += 1
+
+    try:
+        _prune_old_exports()
+        school_year = SchoolYear.query.get(job.school_year_id)
+        quarters = [q for q in (job.quarters or "").split(",") if q]
+        quarter_str = _quarter_str_from_selection(quarters)
+        students = _export_students(job, school_year)
+        job.total_count = len(students)
+        db.session.commit()
+
+        cards = _latest_cards_by_student([s.id for s in students], school_year.id, quarter_str)
+        base_url = current_app.root_path
+        stylesheets = report_card_stylesheet_paths()
+        pending = []  # (student, filename, future) in roster order
+        for student in students:
+            report_card = cards.get(student.id)
+            if report_card is None and job.generate_missing:
+                report_card, error = _generate_missing_card(student, school_year, quarters)
+                if error:
+                    counts["skipped"] += 1
+                    _record_error(student, error)
+                    continue
+            if report_card is None:
+                counts["skipped"] += 1
+                _record_error(student, f"No {quarter_str} report card on file.")
+                continue
+            try:
+                html_content = render_report_card_html(report_card)
+            except Exception as exc:
+                db.session.rollback()
+                with counts_lock:
+                    counts["failed"] += 1
+                _record_error(student, f"Could not build report card: {exc}")
+                continue
+            future = ensure_cached_pdf(
+                report_card_pdf_prefix(report_card.id),
+                report_card_pdf_cache_key(report_card, html_content),
+                html_content,
+                base_url,
+                stylesheets,
+            )
+            future.add_done_callback(_on_render_done)
+            pending.append((student, report_card_pdf_filename(report_card), future))
+            _flush_progress()
+
+        by_future = {future: (student, filename) for student, filename, future in pending}
+        rendered: dict[int, tuple[str, str]] = {}
+        for future in as_completed(by_future):
+            student, filename = by_future[future]
+            try:
+                rendered[student.id] = (filename, future.result())
+            except Exception as exc:
+                _record_error(student, f"PDF render failed: {exc}")
+            _flush_progress()
+
+        entries = [rendered[s.id] for s, _f, _fut in pending if s.id in rendered]
+        if not entries:
+            raise RuntimeError("No report cards could be exported for this selection.")
+        out_path = os.path.join(export_dir(), f"report_card_export_{job.id}.{job.output_format}")
+        if job.output_format == "pdf":
+            _write_merged_pdf(out_path, entries)
+        else:
+            _write_zip(out_path, entries)
+
+        job.output_path = out_path
+        job.status = "done"
+    except Exception as exc:
+        db.session.rollback()
+        current_app.logger.exception("Report card export %s failed", job_id)
+        errors.append({"student_id": None, "student": None, "error": str(exc)})
+        job.status = "failed"
+    job.finished_at = datetime.utcnow()
+    _flush_progress(force=True)
+    return job
+
+
+def export_download_name(job: ReportCardExportJob) -> str:
+    sy = job.school_year.name.replace("/", "_") if job.school_year else str(job.school_year_id)
+    if job.grade_level is not None:
+        scope = "K" if job.grade_level == 0 else f"Grade{job.grade_level}"
+    else:
+        scope = "Classes"
+    quarters = (job.quarters or "").replace(",", "-")
+    return f"ReportCards_{sy}_{scope}_{quarters}.{job.output_format}"
@@ -0,0 +1,357 @@
+"""
+Report card PDF rendering off the request thread, with an on-disk PDF cache.
+
+WeasyPrint holds the GIL for seconds per card, so renders are dispatched to a small
+``ProcessPoolExecutor`` instead of running on a gthread worker. Finished PDFs are
+written under ``REPORT_CARD_PDF_CACHE_DIR`` keyed by
+``(report_card_id, generated_at, template version, data hash)``; repeat downloads
+stream the cached file. A render that outlives ``REPORT_CARD_PDF_WAIT_SECONDS``
+keeps running in the pool and lands in the cache for the client's retry; one-off
+documents (teacher grade / attendance reports) are cached by their HTML hash for the
+same reason and deleted once served.
+"""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from flask import current_app, make_response, send_file
+
+from utils.report_card_pdf_render import (
+    render_html_to_pdf_file,
+    stylesheet_fingerprint,
+    warm_pdf_renderer,
+)
+
+# Bump when report card templates or report_card_styles.css change in a way that must
+# invalidate every cached PDF (the data hash already covers per-card content).
+REPORT_CARD_PDF_TEMPLATE_VERSION = "1"
+# Cache prefix and lifetime for one-off renders nobody came back for.
+ONE_OFF_PDF_PREFIX = "adhoc"
+ONE_OFF_PDF_MAX_AGE_SECONDS = 3600
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_inflight: dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+class PdfRenderPending(Exception):
+    """A cold render is still running in the pool; the PDF will appear at ``cache_path``."""
+
+    def __init__(self, cache_path: str):
+        super().__init__(cache_path)
+        self.cache_path = cache_path
+
+
+def _config_int(key: str, default: int) -> int:
+    try:
+        return int(current_app.config.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def pdf_cache_dir() -> str:
+    """Directory holding rendered PDFs (created on demand)."""
+    configured = (current_app.config.get("REPORT_CARD_PDF_CACHE_DIR") or "").strip()
+    path = configured or os.path.join(current_app.instance_path, "report_card_pdfs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def report_card_stylesheet_paths() -> tuple[str, ...]:
+    """Shared stylesheets for every report card / teacher report PDF template."""
+    return (os.path.join(current_app.root_path, "static", "report_card_styles.css"),)
+
+
+def report_card_static_image_paths() -> tuple[str, ...]:
+    """Static images every card embeds (decoded once per pool process)."""
+    return (os.path.join(current_app.root_path, "static", "img", "clara_logo.png"),)
+
+
+def get_render_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Shared per-process render pool, or None when ``REPORT_CARD_PDF_WORKERS`` is 0
+    (renders then run inline, e.g. on hosts that cannot start subprocesses).
+    """
+    global _pool
+    size = _config_int("REPORT_CARD_PDF_WORKERS", 1)
+    if size <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a multi-threaded gunicorn worker mid-request.
+            _pool = ProcessPoolExecutor(
+                max_workers=size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_pdf_renderer,
+                initargs=(report_card_stylesheet_paths(), report_card_static_image_paths()),
+            )
+        return _pool
+
+
+def prewarm_render_pool() -> None:
+    """
+    Start pool processes now (each runs ``warm_pdf_renderer``) instead of on the
+    first download. Enabled with ``REPORT_CARD_PDF_PREWARM``.
+    """
+    pool = get_render_pool()
+    if pool is None:
+        return
+    for _ in range(_config_int("REPORT_CARD_PDF_WORKERS", 1)):
+        pool.submit(os.getpid)
+
+
+def _discard_pool(broken: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    try:
+        broken.shutdown(wait=False, cancel_futures=True)
+    except Exception:
+        pass
+
+
+def _submit(fn, *args) -> Optional[Future]:
+    """Submit ``fn(*args)`` to the pool; None when pooling is disabled or broken (render inline)."""
+    pool = get_render_pool()
+    if pool is not None:
+        try:
+            return pool.submit(fn, *args)
+        except (BrokenProcessPool, RuntimeError) as exc:
+            current_app.logger.warning("PDF render pool unavailable, rendering inline: %s", exc)
+            _discard_pool(pool)
+    return None
+
+
+def _run_inline(future: Future, fn, *args) -> None:
+    try:
+        future.set_result(fn(*args))
+    except Exception as exc:
+        future.set_exception(exc)
+
+
+def _wait(future: Future, timeout: Optional[float], fn, *args):
+    """Wait for a pool result; re-run inline once if the pool died under us."""
+    try:
+        return future.result(timeout=timeout)
+    except BrokenProcessPool:
+        pool = _pool
+        if pool is not None:
+            _discard_pool(pool)
+        return fn(*args)
+
+
+def _prune_siblings(cache_dir: str, prefix: str, keep_path: str) -> None:
+    """Drop older renders for the same subject once a newer one is on disk."""
+    for path in glob.glob(os.path.join(cache_dir, f"{prefix}_*.pdf")):
+        if path != keep_path:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def _cache_key(*parts) -> str:
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _html_hash(html_content: str) -> str:
+    return hashlib.sha256((html_content or "").encode("utf-8")).hexdigest()
+
+
+def report_card_pdf_cache_key(report_card, html_content: str) -> str:
+    """Cache key for one report card render: snapshot identity plus a hash of its HTML."""
+    generated_at = report_card.generated_at.isoformat() if report_card.generated_at else ""
+    return _cache_key(
+        report_card.id,
+        generated_at,
+        REPORT_CARD_PDF_TEMPLATE_VERSION,
+        stylesheet_fingerprint(report_card_stylesheet_paths()),
+        _html_hash(html_content),
+    )
+
+
+def ensure_cached_pdf(
+    prefix: str,
+    cache_key: str,
+    html_content: str,
+    base_url: Optional[str],
+    stylesheet_paths: tuple[str, ...] = (),
+    *,
+    prune_siblings: bool = True,
+) -> Future:
+    """
+    Future resolving to the cached PDF path for ``prefix``/``cache_key``.
+
+    Already-cached PDFs resolve immediately; concurrent requests for the same key
+    share one in-flight render. Without a pool the render runs inline, after the
+    in-flight entry is registered and the lock released, so other downloads never
+    queue behind it.
+    """
+    cache_dir = pdf_cache_dir()
+    path = os.path.join(cache_dir, f"{prefix}_{cache_key}.pdf")
+    if os.path.isfile(path):
+        done: Future = Future()
+        done.set_result(path)
+        return done
+
+    args = (html_content, base_url, path, stylesheet_paths)
+    with _inflight_lock:
+        future = _inflight.get(path)
+        if future is not None:
+            return future
+        future = _submit(render_html_to_pdf_file, *args)
+        inline = future is None
+        if inline:
+            future = Future()
+        _inflight[path] = future
+
+    def _on_done(f: Future) -> None:
+        with _inflight_lock:
+            _inflight.pop(path, None)
+        if prune_siblings and not f.cancelled() and f.exception() is None:
+            _prune_siblings(cache_dir, prefix, path)
+
+    future.add_done_callback(_on_done)
+    if inline:
+        _run_inline(future, render_html_to_pdf_file, *args)
+    return future
+
+
+def render_cached_pdf(
+    prefix: str,
+    cache_key: str,
+    html_content: str,
+    base_url: Optional[str] = None,
+    wait_seconds: Optional[float] = None,
+    stylesheet_paths: tuple[str, ...] = (),
+) -> str:
+    """
+    Path to the rendered PDF, rendering in the pool on a cache miss.
+
+    Raises ``PdfRenderPending`` when the render takes longer than ``wait_seconds``
+    (default ``REPORT_CARD_PDF_WAIT_SECONDS``); it keeps going in the background.
+    """
+    if wait_seconds is None:
+        wait_seconds = _config_int("REPORT_CARD_PDF_WAIT_SECONDS", 40)
+    future = ensure_cached_pdf(prefix, cache_key, html_content, base_url, stylesheet_paths)
+    path = os.path.join(pdf_cache_dir(), f"{prefix}_{cache_key}.pdf")
+    try:
+        return _wait(
+            future, wait_seconds, render_html_to_pdf_file, html_content, base_url, path, stylesheet_paths
+        )
+    except FutureTimeoutError:
+        raise PdfRenderPending(path)
+
+
+def render_report_card_pdf(report_card, html_content: str, base_url: Optional[str] = None,
+                           wait_seconds: Optional[float] = None) -> str:
+    """Cached PDF path for a stored report card snapshot (see ``render_cached_pdf``)."""
+    return render_cached_pdf(
+        report_card_pdf_prefix(report_card.id),
+        report_card_pdf_cache_key(report_card, html_content),
+        html_content,
+        base_url,
+        wait_seconds,
+        report_card_stylesheet_paths(),
+    )
+
+
+def report_card_pdf_prefix(report_card_id: int) -> str:
+    return f"rc{int(report_card_id)}"
+
+
+def render_pdf_bytes(
+    html_content: str,
+    base_url: Optional[str] = None,
+    stylesheet_paths: Optional[tuple[str, ...]] = None,
+    wait_seconds: Optional[float] = None,
+) -> bytes:
+    """
+    Render a one-off PDF in the pool and return its bytes.
+
+    Uses the shared report card stylesheets unless ``stylesheet_paths`` is given. The
+    render lands in the PDF cache under the document's HTML hash, so when it outlives
+    ``wait_seconds`` (default ``REPORT_CARD_PDF_WAIT_SECONDS``) this raises
+    ``PdfRenderPending`` and the client's retry picks up the finished file.
+    """
+    if stylesheet_paths is None:
+        stylesheet_paths = report_card_stylesheet_paths()
+    if wait_seconds is None:
+        wait_seconds = _config_int("REPORT_CARD_PDF_WAIT_SECONDS", 40)
+    cache_dir = pdf_cache_dir()
+    _expire_one_off_pdfs(cache_dir)
+    cache_key = _cache_key(stylesheet_fingerprint(stylesheet_paths), _html_hash(html_content))
+    path = os.path.join(cache_dir, f"{ONE_OFF_PDF_PREFIX}_{cache_key}.pdf")
+    future = ensure_cached_pdf(
+        ONE_OFF_PDF_PREFIX, cache_key, html_content, base_url, stylesheet_paths, prune_siblings=False
+    )
+    try:
+        _wait(future, wait_seconds, render_html_to_pdf_file, html_content, base_url, path, stylesheet_paths)
+    except FutureTimeoutError:
+        raise PdfRenderPending(path)
+    with open(path, "rb") as fh:
+        data = fh.read()
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+    return data
+
+
+def _expire_one_off_pdfs(cache_dir: str) -> None:
+    cutoff = time.time() - ONE_OFF_PDF_MAX_AGE_SECONDS
+    for path in glob.glob(os.path.join(cache_dir, f"{ONE_OFF_PDF_PREFIX}_*.pdf")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+        except OSError:
+            pass
+
+
+def invalidate_report_card_pdf(report_card_id: int) -> None:
+    """Remove every cached render for a report card (e.g. after it is deleted)."""
+    try:
+        cache_dir = pdf_cache_dir()
+    except OSError:
+        return
+    _prune_siblings(cache_dir, report_card_pdf_prefix(report_card_id), keep_path="")
+
+
+def pdf_file_response(path: str, filename: str, *, as_attachment: bool = True):
+    """Stream a cached PDF from disk."""
+    return send_file(
+        path,
+        mimetype="application/pdf",
+        as_attachment=as_attachment,
+        download_name=filename,
+        max_age=0,
+    )
+
+
+def pdf_pending_response(retry_after: int = 5):
+    """202 page that reloads itself until the background render is cached."""
+    body = (
+        "<!doctype html><html><head>"
+        f'<meta http-equiv="refresh" content="{int(retry_after)}">'
+        "<title>Preparing PDF…</title></head>"
+        "<body><p>Your PDF is being prepared. This page will refresh automatically.</p>"
+        "</body></html>"
+    )
+    response = make_response(body, 202)
+    response.headers["Content-Type"] = "text/html; charset=utf-8"
+    response.headers["Retry-After"] = str(int(retry_after))
+    response.headers["Cache-Control"] = "no-store"
+    return response
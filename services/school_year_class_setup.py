@@ -387,7 +387,7 @@ def resync_student_core_enrollments_for_grade_change(
         try:
             from services.class_google_group import schedule_try_provision_class_google_groups
 
-            schedule_try_provision_class_google_groups([class_id])
+            schedule_try_provision_class_google_groups([class_id], commit=False)
         except Exception:
             try:
                 from services.class_google_group import try_provision_class_google_group
@@ -39,11 +39,13 @@ Every state change writes a SchoolYearClosureEvent row for the audit trail.
 from __future__ import annotations
 
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
-from typing import Iterable, Optional
+from typing import Optional
 
 from flask import current_app, has_request_context, url_for
-from sqlalchemy import or_, and_
+from sqlalchemy import and_, or_, update
 
 from extensions import db
 from models import (
@@ -480,6 +482,22 @@ def advance_closure_if_due(closure: SchoolYearClosure, *,
     t = today or _today()
     transitioned = None
 
+    # A checkpointed finalize (crash or time budget) resumes before any phase logic.
+    if finalize_in_progress(closure):
+        if allow_finalize and not finalize_is_running(closure):
+            try:
+                stats = finalize_closure(closure, triggered_by='auto', actor=None)
+                if stats.get('complete'):
+                    transitioned = PHASE_FINALIZED
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception(
+                    "Resuming finalize failed for closure id=%s; will retry on next tick.", closure.id
+                )
+        closure.last_tick_at = _now()
+        db.session.commit()
+        return transitioned
+
     # scheduled → student_window once we hit Day 0
     if closure.phase == PHASE_SCHEDULED and t >= closure.closure_date:
         _enter_phase(closure, PHASE_STUDENT_WINDOW, actor_label=actor_label)
@@ -507,9 +525,10 @@ def advance_closure_if_due(closure: SchoolYearClosure, *,
             )
         else:
             try:
-                finalize_closure(closure, triggered_by='auto', actor=None)
-                transitioned = PHASE_FINALIZED
+                if finalize_closure(closure, triggered_by='auto', actor=None).get('complete'):
+                    transitioned = PHASE_FINALIZED
             except Exception:
+                db.session.rollback()
                 current_app.logger.exception(
                     "Auto-finalize failed for closure id=%s; will retry on next tick.", closure.id
                 )
@@ -855,8 +874,238 @@ def _class_has_unexpired_extension(class_id: int, closure: SchoolYearClosure, *,
 # ---------------------------------------------------------------------------
 # Finalize (the actual year-end archival job — refactored from the old route)
 # ---------------------------------------------------------------------------
+FINALIZE_STEP_REPORT_CARDS = 'report_cards'
+FINALIZE_STEP_ARCHIVE = 'archive'
+FINALIZE_QUARTERS = ['Q1', 'Q2', 'Q3', 'Q4']
+# A run whose heartbeat is older than this is treated as dead and may be taken over.
+FINALIZE_LEASE_SECONDS = 180
+_FINALIZE_ERRORS_SAMPLE = 15
+
+
+def _config_int(key: str, default: int) -> int:
+    try:
+        return int(current_app.config.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _finalize_progress(closure: SchoolYearClosure) -> dict:
+    progress = {}
+    if closure.finalize_progress:
+        try:
+            progress = json.loads(closure.finalize_progress) or {}
+        except (TypeError, ValueError):
+            progress = {}
+    for key in ('total', 'processed', 'ok', 'skipped', 'errors'):
+        progress.setdefault(key, 0)
+    progress.setdefault('errors_sample', [])
+    return progress
+
+
+def finalize_in_progress(closure: SchoolYearClosure) -> bool:
+    """True once finalize has checkpointed work but not yet reached PHASE_FINALIZED."""
+    return bool(closure.finalize_step) and closure.phase not in TERMINAL_PHASES
+
+
+def finalize_is_running(closure: SchoolYearClosure) -> bool:
+    """True while some invocation holds the finalize lease (recent heartbeat)."""
+    hb = closure.finalize_heartbeat_at
+    return (
+        finalize_in_progress(closure)
+        and hb is not None
+        and _now() - hb < timedelta(seconds=FINALIZE_LEASE_SECONDS)
+    )
+
+
+def finalize_progress_payload(closure: SchoolYearClosure) -> Optional[dict]:
+    """Checkpoint counters for the dashboard while a finalize is part-way through."""
+    if not finalize_in_progress(closure):
+        return None
+    progress = _finalize_progress(closure)
+    return {
+        'step': closure.finalize_step,
+        'running': finalize_is_running(closure),
+        'started_at': closure.finalize_started_at.isoformat() if closure.finalize_started_at else None,
+        'heartbeat_at': closure.finalize_heartbeat_at.isoformat() if closure.finalize_heartbeat_at else None,
+        'total': progress['total'],
+        'processed': progress['processed'],
+        'ok': progress['ok'],
+        'errors': progress['errors'],
+    }
+
+
+def _enrolled_class_ids_by_student(school_year_id: int) -> dict[int, list[int]]:
+    """student_id -> class ids for every active enrollment in the year (one query)."""
+    rows = (
+        db.session.query(Enrollment.student_id, Enrollment.class_id)
+        .join(Class, Enrollment.class_id == Class.id)
+        .join(Student, Enrollment.student_id == Student.id)
+        .filter(
+            Class.school_year_id == school_year_id,
+            Enrollment.is_active.is_(True),
+            Student.is_deleted.is_(False),
+        )
+        .distinct()
+        .all()
+    )
+    by_student: dict[int, set[int]] = {}
+    for student_id, class_id in rows:
+        by_student.setdefault(student_id, set()).add(class_id)
+    return {sid: sorted(cids) for sid, cids in by_student.items()}
+
+
+def _already_finalized_student_ids(closure: SchoolYearClosure, student_ids: list[int]) -> set[int]:
+    """Students in this batch that already got this run's auto report card (crash mid-chunk)."""
+    if not student_ids or not closure.finalize_started_at:
+        return set()
+    from management_routes.reports import _quarter_str_from_selection
+
+    rows = (
+        db.session.query(ReportCard.student_id)
+        .filter(
+            ReportCard.school_year_id == closure.school_year_id,
+            ReportCard.student_id.in_(student_ids),
+            ReportCard.quarter == _quarter_str_from_selection(FINALIZE_QUARTERS),
+            ReportCard.is_auto_generated.is_(True),
+            ReportCard.generated_at >= closure.finalize_started_at,
+        )
+        .distinct()
+        .all()
+    )
+    return {r[0] for r in rows}
+
+
+def _generate_finalize_report_card(student_id: int, school_year_id: int, class_ids: list[int],
+                                   actor_user_id: Optional[int]) -> tuple[int, bool, Optional[str]]:
+    """Persist one student's official Q1–Q4 card and tag it auto-generated.
+
+    Returns ``(student_id, ok, error)``; never raises. Uses (and commits) the
+    current session, so thread workers must run inside their own app context.
+    """
+    from management_routes.reports import persist_report_card_record
+
+    try:
+        res = persist_report_card_record(
+            student_id_int=student_id,
+            school_year_id_int=school_year_id,
+            class_ids_int=class_ids,
+            quarters_to_include=FINALIZE_QUARTERS,
+            report_type='official',
+            include_attendance=True,
+            include_comments=True,
+            enrollment_must_be_active=True,
+            notify_admins=False,
+        )
+    except Exception as exc:
+        db.session.rollback()
+        return student_id, False, str(exc)
+    if not res.get('ok'):
+        db.session.rollback()
+        return student_id, False, res.get('error') or 'Report card was not saved.'
+    report_card = res.get('report_card')
+    if report_card is not None:
+        try:
+            report_card.is_auto_generated = True
+            report_card.generated_by_user_id = actor_user_id
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception(
+                "Failed to tag auto-generated report card for student %s", student_id
+            )
+    return student_id, True, None
+
+
+def _generate_finalize_batch(batch: list[tuple[int, list[int]]], school_year_id: int,
+                             actor_user_id: Optional[int], workers: int) -> list[tuple[int, bool, Optional[str]]]:
+    """Generate report cards for one chunk, fanning out across ``workers`` threads."""
+    if workers <= 1 or len(batch) <= 1:
+        return [
+            _generate_finalize_report_card(sid, school_year_id, cids, actor_user_id)
+            for sid, cids in batch
+        ]
+
+    app = current_app._get_current_object()
+
+    def _run(item: tuple[int, list[int]]) -> tuple[int, bool, Optional[str]]:
+        sid, cids = item
+        # Own app context = own scoped session/connection per worker thread.
+        with app.app_context():
+            try:
+                return _generate_finalize_report_card(sid, school_year_id, cids, actor_user_id)
+            finally:
+                db.session.remove()
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(batch))) as pool:
+        return list(pool.map(_run, batch))
+
+
+def _claim_finalize(closure: SchoolYearClosure, *, triggered_by: str,
+                    actor: Optional[User]) -> None:
+    """Start a new finalize run or resume the checkpointed one; commits the lease.
+
+    The lease is taken with one conditional UPDATE on the heartbeat, so of two
+    concurrent callers only the one whose UPDATE matched the row proceeds.
+    """
+    now = _now()
+    cutoff = now - timedelta(seconds=FINALIZE_LEASE_SECONDS)
+    claimed = db.session.execute(
+        update(SchoolYearClosure)
+        .where(
+            SchoolYearClosure.id == closure.id,
+            or_(
+                SchoolYearClosure.finalize_heartbeat_at.is_(None),
+                SchoolYearClosure.finalize_heartbeat_at < cutoff,
+            ),
+        )
+        .values(finalize_heartbeat_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if claimed != 1:
+        db.session.rollback()
+        db.session.refresh(closure)
+        progress = _finalize_progress(closure)
+        raise ValueError(
+            f"Finalize is already running ({progress['processed']}/{progress['total']} "
+            "students processed)."
+        )
+    # Pick up the checkpoint as the previous run left it.
+    db.session.refresh(closure)
+    if closure.finalize_step:
+        _log_event(closure, 'finalize_resumed', actor=actor, actor_label=triggered_by, payload={
+            'step': closure.finalize_step,
+            'cursor_student_id': closure.finalize_cursor_student_id,
+        })
+    else:
+        closure.finalize_step = FINALIZE_STEP_REPORT_CARDS
+        closure.finalize_cursor_student_id = None
+        closure.finalize_progress = None
+        closure.finalize_started_at = now
+        _log_event(closure, 'finalize_started', actor=actor, actor_label=triggered_by)
+    db.session.commit()
+
+
+def schedule_finalize_continuation(closure_id: int, *, triggered_by: str,
+                                   actor_user_id: Optional[int]) -> None:
+    """Queue the rest of a finalize that hit its time budget as a background job.
+
+    The checkpoint lives on the closure row, so a lost job only delays the work:
+    the next cron tick or "Finalize now" resumes it too.
+    """
+    from services.background_jobs import enqueue_job
+
+    enqueue_job(
+        'school_year.finalize',
+        {'closure_id': closure_id, 'triggered_by': triggered_by, 'actor_user_id': actor_user_id},
+        idempotency_key=f'school_year.finalize:{closure_id}',
+        created_by_user_id=actor_user_id,
+        commit=True,
+    )
+
+
 def finalize_closure(closure: SchoolYearClosure, *, triggered_by: str = 'manual',
-                     actor: Optional[User] = None) -> dict:
+                     actor: Optional[User] = None,
+                     time_budget_seconds: Optional[float] = None) -> dict:
     """
     Run the irreversible finalize step:
       - Generate official Q1–Q4 report cards (marked is_auto_generated=True) for
@@ -869,87 +1118,123 @@ def finalize_closure(closure: SchoolYearClosure, *, triggered_by: str = 'manual'
         12th-grade as before; provisions new 3rd-grade portal logins on demand).
       - Mark the SchoolYear is_active=False.
       - Move closure to PHASE_FINALIZED with stats stored on the closure row.
+
+    Report cards are generated in student-id order, in chunks of
+    SCHOOL_YEAR_FINALIZE_CHUNK_SIZE across SCHOOL_YEAR_FINALIZE_WORKERS threads;
+    each chunk commits a checkpoint (cursor + counters) on the closure row. When
+    ``time_budget_seconds`` (default SCHOOL_YEAR_FINALIZE_TIME_BUDGET_SECONDS,
+    0 = unlimited) runs out, the checkpoint is saved, the rest continues on a
+    background job and partial stats with ``complete=False`` are returned.
+    Calling again after a crash resumes from the checkpoint.
     """
     if closure.phase in TERMINAL_PHASES:
         raise ValueError(f"Cannot finalize a {closure.phase} closure.")
 
-    # Lazy import to avoid circular dependencies.
-    from models import Assignment, GroupAssignment
-    from management_routes.reports import (
-        persist_report_card_record,
-        _apply_grade_promotion_after_year_close,
-    )
-
     sy = SchoolYear.query.get(closure.school_year_id)
     if not sy:
         raise ValueError(f"School year id={closure.school_year_id} not found.")
 
-    actor_id = actor.id if actor else None
-    classes_in_year = Class.query.filter_by(school_year_id=sy.id).all()
-    class_ids = [c.id for c in classes_in_year]
-
-    students = (
-        Student.query.filter(Student.is_deleted.is_(False))
-        .order_by(Student.last_name, Student.first_name)
-        .all()
-    )
+    if time_budget_seconds is None:
+        time_budget_seconds = _config_int('SCHOOL_YEAR_FINALIZE_TIME_BUDGET_SECONDS', 40)
+    deadline = time.monotonic() + time_budget_seconds if time_budget_seconds > 0 else None
+    chunk_size = max(1, _config_int('SCHOOL_YEAR_FINALIZE_CHUNK_SIZE', 25))
+    workers = max(1, _config_int('SCHOOL_YEAR_FINALIZE_WORKERS', 3))
+    if db.engine.dialect.name == 'sqlite':
+        workers = 1  # SQLite allows a single writer.
 
-    ok_n = skip_n = err_n = 0
-    errors_sample: list[str] = []
-    enrolled_student_ids: set[int] = set()
-    quarters_full = ['Q1', 'Q2', 'Q3', 'Q4']
-
-    for student in students:
-        enrs = (
-            Enrollment.query.join(Class, Enrollment.class_id == Class.id)
-            .filter(
-                Class.school_year_id == sy.id,
-                Enrollment.student_id == student.id,
-                Enrollment.is_active.is_(True),
-            )
-            .all()
-        )
-        if not enrs:
-            skip_n += 1
-            continue
-        enrolled_student_ids.add(student.id)
-        cid_list = list({e.class_id for e in enrs})
-        try:
-            res = persist_report_card_record(
-                student_id_int=student.id,
-                school_year_id_int=sy.id,
-                class_ids_int=cid_list,
-                quarters_to_include=quarters_full,
-                report_type='official',
-                include_attendance=True,
-                include_comments=True,
-                enrollment_must_be_active=True,
-                notify_admins=False,
+    _claim_finalize(closure, triggered_by=triggered_by, actor=actor)
+    actor_id = actor.id if actor else None
+    class_ids_by_student = _enrolled_class_ids_by_student(sy.id)
+    progress = _finalize_progress(closure)
+
+    if closure.finalize_step == FINALIZE_STEP_REPORT_CARDS:
+        if not progress['total']:
+            progress['total'] = len(class_ids_by_student)
+            progress['skipped'] = (
+                Student.query.filter(Student.is_deleted.is_(False)).count() - len(class_ids_by_student)
             )
-        except Exception as exc:
-            err_n += 1
-            if len(errors_sample) < 15:
-                errors_sample.append(f"{student.first_name} {student.last_name}: {exc}")
-            continue
-        if res.get('ok'):
-            ok_n += 1
-            # Tag the just-saved ReportCard rows as auto-generated.
-            try:
-                _mark_report_cards_auto_generated(
-                    student_id=student.id,
-                    school_year_id=sy.id,
-                    quarters=quarters_full,
-                    actor_user_id=actor_id,
-                    cutoff=_now(),
-                )
-            except Exception:
-                current_app.logger.exception(
-                    "Failed to tag auto-generated report cards for student %s", student.id
+        cursor = closure.finalize_cursor_student_id or 0
+        pending = sorted(sid for sid in class_ids_by_student if sid > cursor)
+
+        for start in range(0, len(pending), chunk_size):
+            # Always finish at least one chunk per invocation so every run makes progress.
+            if start and deadline is not None and time.monotonic() >= deadline:
+                break
+            chunk = pending[start:start + chunk_size]
+            done = _already_finalized_student_ids(closure, chunk)
+            batch = [(sid, class_ids_by_student[sid]) for sid in chunk if sid not in done]
+            results = _generate_finalize_batch(batch, sy.id, actor_id, workers)
+
+            progress['ok'] += len(done)
+            failed_ids = []
+            for sid, ok, error in results:
+                if ok:
+                    progress['ok'] += 1
+                else:
+                    progress['errors'] += 1
+                    failed_ids.append((sid, error))
+            if failed_ids and len(progress['errors_sample']) < _FINALIZE_ERRORS_SAMPLE:
+                names = dict(
+                    db.session.query(Student.id, Student.first_name + ' ' + Student.last_name)
+                    .filter(Student.id.in_([sid for sid, _ in failed_ids]))
+                    .all()
                 )
+                for sid, error in failed_ids:
+                    if len(progress['errors_sample']) >= _FINALIZE_ERRORS_SAMPLE:
+                        break
+                    progress['errors_sample'].append(f"{names.get(sid, f'Student {sid}')}: {error}")
+            progress['processed'] += len(chunk)
+
+            closure.finalize_cursor_student_id = chunk[-1]
+            closure.finalize_progress = json.dumps(progress)
+            closure.finalize_heartbeat_at = _now()
+            db.session.commit()
         else:
-            err_n += 1
-            if len(errors_sample) < 15:
-                errors_sample.append(f"{student.first_name} {student.last_name}: {res.get('error')}")
+            closure.finalize_step = FINALIZE_STEP_ARCHIVE
+            closure.finalize_heartbeat_at = _now()
+            db.session.commit()
+
+    if closure.finalize_step != FINALIZE_STEP_ARCHIVE:
+        # Out of time: release the lease and let a background job carry on.
+        closure.finalize_heartbeat_at = None
+        db.session.commit()
+        partial = {
+            'triggered_by': triggered_by,
+            'complete': False,
+            'report_cards_ok': progress['ok'],
+            'report_cards_skipped': progress['skipped'],
+            'report_cards_errors': progress['errors'],
+            'errors_sample': progress['errors_sample'],
+            'students_total': progress['total'],
+            'students_processed': progress['processed'],
+        }
+        current_app.logger.info(
+            "Finalize for closure id=%s paused at student id=%s (%s/%s); continuing in background.",
+            closure.id, closure.finalize_cursor_student_id, progress['processed'], progress['total'],
+        )
+        schedule_finalize_continuation(closure.id, triggered_by=triggered_by, actor_user_id=actor_id)
+        return partial
+
+    stats = _archive_finalized_year(closure, sy, class_ids_by_student, progress,
+                                    triggered_by=triggered_by)
+    _log_event(closure, 'finalized', actor=actor, actor_label=triggered_by, payload=stats)
+    db.session.commit()
+    current_app.logger.info(
+        "Finalized school-year closure id=%s (year=%s): %s", closure.id, sy.name, stats
+    )
+    return stats
+
+
+def _archive_finalized_year(closure: SchoolYearClosure, sy: SchoolYear,
+                            class_ids_by_student: dict[int, list[int]], progress: dict, *,
+                            triggered_by: str) -> dict:
+    """Archive step of finalize (one transaction; caller commits)."""
+    from models import Assignment, GroupAssignment
+    from management_routes.reports import _apply_grade_promotion_after_year_close
+
+    classes_in_year = Class.query.filter_by(school_year_id=sy.id).all()
+    class_ids = [c.id for c in classes_in_year]
+    enrolled_student_ids = set(class_ids_by_student)
 
     google_group_stats = None
     google_classroom_stats = None
@@ -1025,12 +1310,15 @@ def finalize_closure(closure: SchoolYearClosure, *, triggered_by: str = 'manual'
     closure.phase = PHASE_FINALIZED
     closure.finalized_at = _now()
     closure.last_tick_at = _now()
+    closure.finalize_step = None
+    closure.finalize_heartbeat_at = None
     stats = {
         'triggered_by': triggered_by,
-        'report_cards_ok': ok_n,
-        'report_cards_skipped': skip_n,
-        'report_cards_errors': err_n,
-        'errors_sample': errors_sample,
+        'complete': True,
+        'report_cards_ok': progress['ok'],
+        'report_cards_skipped': progress['skipped'],
+        'report_cards_errors': progress['errors'],
+        'errors_sample': progress['errors_sample'],
         'promotion': promo_stats,
         'promotion_failed': promo_failed,
         'classes_archived': len(class_ids),
@@ -1039,50 +1327,9 @@ def finalize_closure(closure: SchoolYearClosure, *, triggered_by: str = 'manual'
         'class_google_classrooms': google_classroom_stats,
     }
     closure.finalize_stats = json.dumps(stats)
-
-    _log_event(closure, 'finalized', actor=actor, actor_label=triggered_by, payload=stats)
-    db.session.commit()
-    current_app.logger.info(
-        "Finalized school-year closure id=%s (year=%s): %s", closure.id, sy.name, stats
-    )
     return stats
 
 
-def _mark_report_cards_auto_generated(*, student_id: int, school_year_id: int,
-                                      quarters: Iterable[str], actor_user_id: Optional[int],
-                                      cutoff: datetime) -> None:
-    """Set is_auto_generated=True on the just-created report card rows.
-
-    persist_report_card_record stores the quarter label as a combined string
-    (e.g. "Q1-Q4" when all four quarters are selected, "Q1" for a single
-    quarter). Match against both the combined label AND every individual
-    quarter so we catch whichever shape was actually persisted.
-    """
-    quarters_list = [q for q in quarters if q]
-    # Derive the combined label the same way persist_report_card_record did
-    from management_routes.reports import _quarter_str_from_selection
-    combined = _quarter_str_from_selection(quarters_list)
-    label_candidates = set(quarters_list)
-    if combined:
-        label_candidates.add(combined)
-    if not label_candidates:
-        return
-    (
-        ReportCard.query
-        .filter(ReportCard.student_id == student_id)
-        .filter(ReportCard.school_year_id == school_year_id)
-        .filter(ReportCard.quarter.in_(list(label_candidates)))
-        .filter(or_(ReportCard.generated_at.is_(None), ReportCard.generated_at <= cutoff))
-        .update(
-            {
-                ReportCard.is_auto_generated: True,
-                ReportCard.generated_by_user_id: actor_user_id,
-            },
-            synchronize_session=False,
-        )
-    )
-
-
 # ---------------------------------------------------------------------------
 # Pre-finalization checklist (for the dashboard)
 # ---------------------------------------------------------------------------
@@ -0,0 +1,157 @@
+"""
+Cached header counts for the management students list.
+
+The list shows how many students match the filters, how many of them have a portal
+login and how many have a 3.5+ GPA. All three come from one aggregate over the
+filtered query, cached per (filters, roster version) for
+STUDENTS_LIST_COUNTS_CACHE_SECONDS. The roster version (``CacheVersion`` key
+``students.roster``) is bumped by any flush that adds, removes or edits a Student or
+adds / removes / relinks a student's User, and by query-level writes to either table,
+so paging and re-sorting reuse the counts while a roster change shows up on the next
+request in every worker.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, case, event, exists, func
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from models import Student, User
+from services.cache_versions import bump_cache_version, get_cache_version
+
+ROSTER_VERSION_KEY = "students.roster"
+DEFAULT_CACHE_SECONDS = 300
+_CACHE_MAX_ENTRIES = 128
+_SESSION_INFO_KEY = "_student_roster_touched"
+
+_cache: dict[tuple, tuple[float, dict[str, int]]] = {}
+_cache_lock = threading.Lock()
+
+
+def _cache_seconds() -> float:
+    if not has_app_context():
+        return DEFAULT_CACHE_SECONDS
+    try:
+        return float(current_app.config.get("STUDENTS_LIST_COUNTS_CACHE_SECONDS", DEFAULT_CACHE_SECONDS))
+    except (TypeError, ValueError):
+        return DEFAULT_CACHE_SECONDS
+
+
+def _aggregate_counts(query, *, accounts_joined: bool) -> dict[str, int]:
+    from utils.student_login_policy import MIN_GRADE_LEVEL_FOR_ACTIVE_STUDENT_LOGIN
+
+    high_gpa = case((and_(Student.gpa.isnot(None), Student.gpa >= 3.5), 1), else_=0)
+    if accounts_joined:
+        # Every row already has a joined User; EXISTS would auto-correlate User away.
+        total, high = query.order_by(None).with_entities(func.count(), func.sum(high_gpa)).one()
+        with_accounts = total
+    else:
+        # Grade 3+ portal policy: K–2 User rows (if any) do not count as "with accounts".
+        has_login = case(
+            (
+                and_(
+                    exists().where(User.student_id == Student.id),
+                    Student.grade_level.isnot(None),
+                    Student.grade_level >= MIN_GRADE_LEVEL_FOR_ACTIVE_STUDENT_LOGIN,
+                ),
+                1,
+            ),
+            else_=0,
+        )
+        total, with_accounts, high = (
+            query.order_by(None)
+            .with_entities(func.count(), func.sum(has_login), func.sum(high_gpa))
+            .one()
+        )
+    total = int(total or 0)
+    with_accounts = int(with_accounts or 0)
+    return {
+        "total": total,
+        "with_accounts": with_accounts,
+        "without_accounts": total - with_accounts,
+        "high_gpa": int(high or 0),
+    }
+
+
+def students_list_counts(query, filters_key: tuple, *, accounts_joined: bool = False) -> dict[str, int]:
+    """``total`` / ``with_accounts`` / ``without_accounts`` / ``high_gpa`` for a filtered list query."""
+    key = (get_cache_version(ROSTER_VERSION_KEY), filters_key)
+    ttl = _cache_seconds()
+    now = time.monotonic()
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and now - hit[0] < ttl:
+            return dict(hit[1])
+
+    counts = _aggregate_counts(query, accounts_joined=accounts_joined)
+    if ttl > 0:
+        with _cache_lock:
+            if len(_cache) >= _CACHE_MAX_ENTRIES:
+                _cache.pop(next(iter(_cache)))
+            _cache[key] = (now, counts)
+    return dict(counts)
+
+
+# ---------------------------------------------------------------------------
+# Roster version hooks
+# ---------------------------------------------------------------------------
+def _user_links_student(user: User) -> bool:
+    history = sa_inspect(user).attrs.student_id.history
+    return bool(history.has_changes() and any(v is not None for v in (*history.added, *history.deleted)))
+
+
+def _collect_roster_changes(session: Session, _flush_context, _instances) -> None:
+    if session.info.get(_SESSION_INFO_KEY):
+        return
+    for obj in session.new:
+        if isinstance(obj, Student) or (isinstance(obj, User) and obj.student_id is not None):
+            session.info[_SESSION_INFO_KEY] = True
+            return
+    for obj in session.deleted:
+        if isinstance(obj, (Student, User)):
+            session.info[_SESSION_INFO_KEY] = True
+            return
+    for obj in session.dirty:
+        if isinstance(obj, Student) and session.is_modified(obj, include_collections=False):
+            session.info[_SESSION_INFO_KEY] = True
+            return
+        if isinstance(obj, User) and _user_links_student(obj):
+            session.info[_SESSION_INFO_KEY] = True
+            return
+
+
+def _bump_roster_version(session: Session, _flush_context) -> None:
+    if not session.info.pop(_SESSION_INFO_KEY, False):
+        return
+    conn = session.connection()
+    savepoint = conn.begin_nested()
+    try:
+        bump_cache_version(ROSTER_VERSION_KEY, connection=conn)
+        savepoint.commit()
+    except Exception as exc:
+        savepoint.rollback()
+        if has_app_context():
+            current_app.logger.warning("Students list roster version bump failed; counts refresh on TTL: %s", exc)
+
+
+def _bump_on_bulk_write(orm_execute_state) -> None:
+    """Query-level INSERT / UPDATE / DELETE on Student or User."""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ not in (Student, User):
+        return
+    bump_cache_version(ROSTER_VERSION_KEY, connection=orm_execute_state.session.connection())
+
+
+def register_student_list_hooks() -> None:
+    """Bump the roster version on every ORM write that can change the list counts (idempotent)."""
+    if not event.contains(Session, "before_flush", _collect_roster_changes):
+        event.listen(Session, "before_flush", _collect_roster_changes)
+        event.listen(Session, "after_flush_postexec", _bump_roster_version)
+        event.listen(Session, "do_orm_execute", _bump_on_bulk_write)
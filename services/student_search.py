@@ -0,0 +1,455 @@
+"""
+Indexed search for the management students list.
+
+Every Student carries ``search_document``: its searchable fields lower-cased, accents
+stripped and phone numbers repeated as bare digits, rewritten by a flush hook whenever
+one of those fields changes. Matching keeps the substring semantics of the ILIKE chain
+it replaces ("son" finds "Johnson"), per term ("john smi" needs both terms somewhere),
+but is served by an index:
+
+- PostgreSQL: ``pg_trgm`` GIN indexes on ``search_document`` and on the full name, so
+  ``ILIKE '%term%'`` is an index scan; ranking uses trigram word similarity to the name.
+  Raw columns (the name index, short terms, per-type searches) are compared through
+  ``student_search_unaccent(lower(...))``, an IMMUTABLE wrapper over the ``unaccent``
+  extension, so they fold accents like the normalized terms do.
+- SQLite: an FTS5 shadow table (``student_search_fts``, trigram tokenizer, one column per
+  search type, rowid = student id) kept current by the same flush hook; ranking is bm25
+  with the name column weighted highest.
+
+Names starting with the first term rank first. A search that finds nothing retries on
+names with typo tolerance (pg_trgm similarity / difflib), so "jhon" still finds "John".
+Terms shorter than three characters use a substring match on the accent-folded columns
+(SQLite: on the normalized FTS columns), and a database without pg_trgm / FTS5 keeps the
+plain ILIKE chain. Without ``unaccent`` PostgreSQL folds case only.
+
+Query-level UPDATEs of searchable columns bypass the hook; follow them with
+``refresh_student_search(ids)`` (or ``ops/rebuild_student_search.py``).
+"""
+
+from __future__ import annotations
+
+import difflib
+import re
+import unicodedata
+from typing import Any, Iterable, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, bindparam, case, column, event, func, inspect, literal_column, or_, select, table, text, update
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Student
+
+# FTS column -> Student fields, in FTS table order (bm25 weights follow it).
+SEARCH_COLUMNS: dict[str, tuple[str, ...]] = {
+    "name": ("first_name", "last_name"),
+    "parents": ("parent1_first_name", "parent1_last_name", "parent2_first_name", "parent2_last_name"),
+    "contact": ("email", "parent1_email", "parent2_email", "emergency_email"),
+    "phone": ("parent1_phone", "parent2_phone", "emergency_phone"),
+    "address": ("street", "city", "state", "zip_code"),
+    "misc": ("student_id", "emergency_first_name", "emergency_last_name", "previous_school"),
+}
+SEARCHABLE_FIELDS = tuple(f for fields in SEARCH_COLUMNS.values() for f in fields)
+_BM25_WEIGHTS = (10.0, 3.0, 2.0, 2.0, 1.0, 1.0)
+
+# The list's "search in" options -> FTS columns.
+_TYPE_COLUMNS: dict[str, tuple[str, ...]] = {
+    "all": tuple(SEARCH_COLUMNS),
+    "name": ("name",),
+    "contact": ("contact",),
+    "phone": ("phone",),
+    "address": ("address",),
+    "parents": ("parents",),
+}
+
+MIN_INDEXED_TERM = 3
+RANKED_LIMIT = 500
+FUZZY_LIMIT = 50
+FUZZY_MIN_RATIO = 0.75
+
+_fts = table("student_search_fts", column("rowid"), *(column(c) for c in SEARCH_COLUMNS))
+_student = Student.__table__
+_SESSION_INFO_KEY = "_student_search_touched"
+
+# engine url -> "fts5" | "pg_trgm" | None
+_backends: dict[str, Optional[str]] = {}
+# engine url -> whether student_search_unaccent() exists (PostgreSQL)
+_unaccent: dict[str, bool] = {}
+
+
+
+def normalize(value: Any) -> str:
+    """Lower-case, accent-free, single-spaced text."""
+    if value is None:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(value))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.lower().split())
+
+
+def _column_texts(values: dict[str, Any]) -> dict[str, str]:
+    texts = {}
+    for col, fields in SEARCH_COLUMNS.items():
+        parts = [normalize(values.get(f)) for f in fields]
+        if col == "phone":
+            parts += [re.sub(r"\D", "", p) for p in parts if re.search(r"\D", p)]
+        texts[col] = " ".join(p for p in parts if p)
+    return texts
+
+
+def build_search_document(values: dict[str, Any]) -> str:
+    return "\n".join(t for t in _column_texts(values).values() if t)
+
+
+def _student_values(student: Student) -> dict[str, Any]:
+    return {f: getattr(student, f, None) for f in SEARCHABLE_FIELDS}
+
+
+def _fold(expr):
+    """``expr`` lower-cased, and accent-free where the database can do it."""
+    if has_unaccent():
+        return func.student_search_unaccent(func.lower(expr))
+    return func.lower(expr)
+
+
+def _name_expr():
+    return _fold(func.coalesce(Student.first_name, "") + " " + func.coalesce(Student.last_name, ""))
+
+
+# ---------------------------------------------------------------------------
+# Index setup / backfill
+# ---------------------------------------------------------------------------
+def _detect_backend() -> Optional[str]:
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        found = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'student_search_fts'")
+        ).first()
+        return "fts5" if found else None
+    if dialect == "postgresql":
+        found = db.session.execute(
+            text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_student_search_document_trgm'")
+        ).first()
+        return "pg_trgm" if found else None
+    return None
+
+
+def search_backend() -> Optional[str]:
+    key = str(db.engine.url)
+    if key not in _backends:
+        try:
+            _backends[key] = _detect_backend()
+        except Exception:
+            db.session.rollback()
+            _backends[key] = None
+    return _backends[key]
+
+
+def has_unaccent() -> bool:
+    key = str(db.engine.url)
+    if key not in _unaccent:
+        found = None
+        if db.engine.dialect.name == "postgresql":
+            try:
+                found = db.session.execute(
+                    text("SELECT 1 FROM pg_proc WHERE proname = 'student_search_unaccent'")
+                ).first()
+            except Exception:
+                db.session.rollback()
+        _unaccent[key] = found is not None
+    return _unaccent[key]
+
+
+_NAME_SQL = "lower(coalesce(first_name, '') || ' ' || coalesce(last_name, ''))"
+_UNACCENT_STATEMENTS = (
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() is STABLE (its dictionary is looked up by name), so it cannot be
+    # indexed directly; pinning the dictionary makes this wrapper safe to mark IMMUTABLE.
+    "CREATE OR REPLACE FUNCTION student_search_unaccent(text) RETURNS text "
+    "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+    "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$",
+    "DROP INDEX IF EXISTS ix_student_name_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_student_name_unaccent_trgm ON student USING gin "
+    f"(student_search_unaccent({_NAME_SQL}) gin_trgm_ops)",
+)
+
+
+def ensure_student_search_index() -> Optional[str]:
+    """Create the search index for this database and backfill documents (startup; idempotent)."""
+    dialect = db.engine.dialect.name
+    statements = []
+    if dialect == "sqlite":
+        statements.append(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS student_search_fts USING fts5("
+            + ", ".join(SEARCH_COLUMNS) + ", tokenize = 'trigram')"
+        )
+    elif dialect == "postgresql":
+        statements += [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX IF NOT EXISTS ix_student_search_document_trgm "
+            "ON student USING gin (search_document gin_trgm_ops)",
+        ]
+    try:
+        with db.engine.connect() as conn:
+            for stmt in statements:
+                conn.execute(text(stmt))
+            conn.commit()
+    except Exception as exc:
+        current_app.logger.warning("Student search index unavailable; list search uses ILIKE: %s", exc)
+    if dialect == "postgresql":
+        try:
+            with db.engine.connect() as conn:
+                for stmt in _UNACCENT_STATEMENTS:
+                    conn.execute(text(stmt))
+                conn.commit()
+        except Exception as exc:
+            current_app.logger.warning("unaccent unavailable; student name search folds case only: %s", exc)
+            try:
+                with db.engine.connect() as conn:
+                    conn.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS ix_student_name_trgm ON student USING gin (({_NAME_SQL}) gin_trgm_ops)"
+                    ))
+                    conn.commit()
+            except Exception:
+                pass
+    _backends.pop(str(db.engine.url), None)
+    _unaccent.pop(str(db.engine.url), None)
+    backend = search_backend()
+
+    missing = db.session.execute(
+        select(func.count()).select_from(_student).where(_student.c.search_document.is_(None))
+    ).scalar()
+    stale_fts = False
+    if backend == "fts5":
+        indexed = db.session.execute(select(func.count()).select_from(_fts)).scalar()
+        total = db.session.execute(select(func.count()).select_from(_student)).scalar()
+        stale_fts = indexed != total
+    if missing or stale_fts:
+        current_app.logger.info("Building student search documents")
+        refresh_student_search()
+    return backend
+
+
+def _write_fts_rows(conn, rows: list[tuple[int, dict[str, Any]]], deleted_ids: Iterable[int] = ()) -> None:
+    ids = [sid for sid, _values in rows] + list(deleted_ids)
+    if ids:
+        conn.execute(_fts.delete().where(_fts.c.rowid.in_(ids)))
+    if rows:
+        conn.execute(
+            _fts.insert(),
+            [{"rowid": sid, **_column_texts(values)} for sid, values in rows],
+        )
+
+
+def refresh_student_search(student_ids: Optional[Iterable[int]] = None, *, chunk_size: int = 500) -> int:
+    """Rewrite search documents (and FTS rows) for ``student_ids`` (None = every student)."""
+    from services.cache_versions import bump_cache_version
+    from services.student_list_stats import ROSTER_VERSION_KEY
+
+    backend = search_backend()
+    cols = [_student.c.id, *(_student.c[f] for f in SEARCHABLE_FIELDS)]
+    stmt = select(*cols).order_by(_student.c.id)
+    if student_ids is not None:
+        ids = sorted({int(s) for s in student_ids})
+        if not ids:
+            return 0
+        stmt = stmt.where(_student.c.id.in_(ids))
+    if backend == "fts5" and student_ids is None:
+        db.session.execute(_fts.delete())
+
+    refreshed, last_id = 0, None
+    doc_update = update(_student).where(_student.c.id == bindparam("sid")).values(search_document=bindparam("doc"))
+    while True:
+        page = stmt if last_id is None else stmt.where(_student.c.id > last_id)
+        rows = db.session.execute(page.limit(chunk_size)).all()
+        if not rows:
+            break
+        values = [(row.id, {f: row._mapping[f] for f in SEARCHABLE_FIELDS}) for row in rows]
+        db.session.execute(doc_update, [{"sid": sid, "doc": build_search_document(v)} for sid, v in values])
+        if backend == "fts5":
+            _write_fts_rows(db.session.connection(), values)
+        refreshed += len(rows)
+        last_id = rows[-1].id
+    bump_cache_version(ROSTER_VERSION_KEY)
+    db.session.commit()
+    return refreshed
+
+
+# ---------------------------------------------------------------------------
+# Matching and ranking
+# ---------------------------------------------------------------------------
+def _terms(query: str) -> list[str]:
+    return normalize(query).split()
+
+
+def _type_columns(search_type: str) -> Optional[tuple[str, ...]]:
+    return _TYPE_COLUMNS.get(search_type or "all")
+
+
+def _ilike_term(backend: Optional[str], term: str, columns: tuple[str, ...]):
+    """Substring match of a normalized term against the same normalization of ``columns``."""
+    like = f"%{term}%"
+    if backend == "fts5":
+        fts_rows = select(_fts.c.rowid).where(or_(*(_fts.c[c].like(like) for c in columns))).correlate(None)
+        return Student.id.in_(fts_rows)
+    return or_(*(_fold(getattr(Student, f)).ilike(like) for c in columns for f in SEARCH_COLUMNS[c]))
+
+
+def _fts_match(terms: list[str], columns: tuple[str, ...]) -> str:
+    scope = "" if columns == tuple(SEARCH_COLUMNS) else "{" + " ".join(columns) + "} : "
+    return " AND ".join(scope + '"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def _fts_matches(terms: list[str], columns: tuple[str, ...]):
+    long_terms = [t for t in terms if len(t) >= MIN_INDEXED_TERM]
+    return literal_column("student_search_fts").op("MATCH")(_fts_match(long_terms, columns))
+
+
+def _match_clause(backend: str, terms: list[str], columns: tuple[str, ...]):
+    long_terms = [t for t in terms if len(t) >= MIN_INDEXED_TERM]
+    clauses = [_ilike_term(backend, t, columns) for t in terms if len(t) < MIN_INDEXED_TERM]
+    if backend == "fts5":
+        clauses.append(Student.id.in_(select(_fts.c.rowid).where(_fts_matches(terms, columns))))
+    elif columns == tuple(SEARCH_COLUMNS):
+        clauses += [Student.search_document.ilike(f"%{t}%") for t in long_terms]
+    elif columns == ("name",):
+        clauses += [_name_expr().ilike(f"%{t}%") for t in long_terms]
+    else:
+        clauses += [_ilike_term(backend, t, columns) for t in long_terms]
+    return and_(*clauses)
+
+
+def _fuzzy_name_ids(backend: str, terms: list[str]) -> list[int]:
+    """Students whose name is a near miss for every term (best first)."""
+    terms = [t for t in terms if len(t) >= MIN_INDEXED_TERM]
+    if not terms:
+        return []
+    if backend == "pg_trgm":
+        name = _name_expr()
+        score = sum((func.word_similarity(t, name) for t in terms[1:]), func.word_similarity(terms[0], name))
+        rows = db.session.execute(
+            select(Student.id)
+            .where(*(name.op("%>")(t) for t in terms))
+            .order_by(score.desc(), Student.id)
+            .limit(FUZZY_LIMIT)
+        ).all()
+        return [r.id for r in rows]
+
+    scored = []
+    for sid, first, last in db.session.execute(select(Student.id, Student.first_name, Student.last_name)):
+        tokens = normalize(f"{first or ''} {last or ''}").split()
+        best = []
+        for term in terms:
+            ratio = max((difflib.SequenceMatcher(None, term, tok).ratio() for tok in tokens), default=0.0)
+            if ratio < FUZZY_MIN_RATIO:
+                break
+            best.append(ratio)
+        else:
+            scored.append((-sum(best) / len(best), sid))
+    scored.sort()
+    return [sid for _score, sid in scored[:FUZZY_LIMIT]]
+
+
+def student_search_filter(query: str, search_type: str = "all"):
+    """
+    SQL criterion for the list's search box, or None when the caller should keep its
+    ILIKE chain (no index on this database, only very short terms, or a search type
+    without an index column).
+    """
+    backend = search_backend()
+    terms = _terms(query)
+    columns = _type_columns(search_type)
+    if backend is None or columns is None or not any(len(t) >= MIN_INDEXED_TERM for t in terms):
+        return None
+    clause = _match_clause(backend, terms, columns)
+    if "name" in columns and db.session.execute(select(Student.id).where(clause).limit(1)).first() is None:
+        fuzzy = _fuzzy_name_ids(backend, terms)
+        if fuzzy:
+            return Student.id.in_(fuzzy)
+    return clause
+
+
+def ranked_student_ids(query: str, search_type: str = "all", *, limit: int = RANKED_LIMIT) -> list[int]:
+    """Matching student ids, best match first (names starting with the first term lead)."""
+    backend = search_backend()
+    terms = _terms(query)
+    columns = _type_columns(search_type)
+    if backend is None or columns is None or not any(len(t) >= MIN_INDEXED_TERM for t in terms):
+        return []
+    name = _name_expr()
+    prefix = or_(name.like(f"{terms[0]}%"), name.like(f"% {terms[0]}%"))
+    if backend == "fts5":
+        # bm25() only works in the statement that holds the MATCH, so join instead of IN.
+        weights = ", ".join(str(w) for w in _BM25_WEIGHTS)
+        score = literal_column(f"bm25(student_search_fts, {weights})")
+        stmt = (
+            select(Student.id)
+            .join(_fts, _fts.c.rowid == Student.id)
+            .where(_fts_matches(terms, columns))
+            .where(*(_ilike_term(backend, t, columns) for t in terms if len(t) < MIN_INDEXED_TERM))
+            .order_by(case((prefix, 0), else_=1), score, Student.id)
+        )
+    else:
+        stmt = (
+            select(Student.id)
+            .where(_match_clause(backend, terms, columns))
+            .order_by(case((prefix, 0), else_=1), func.word_similarity(" ".join(terms), name).desc(), Student.id)
+        )
+    ids = [r.id for r in db.session.execute(stmt.limit(limit)).all()]
+    if not ids and "name" in columns:
+        ids = _fuzzy_name_ids(backend, terms)
+    return ids
+
+
+def relevance_sort_expr(query: str, search_type: str = "all"):
+    """Sort key (rank position, lower is better) for ``sort=relevance``, or None without a ranking."""
+    ids = ranked_student_ids(query, search_type)
+    if not ids:
+        return None
+    return case({sid: pos for pos, sid in enumerate(ids)}, value=Student.id, else_=len(ids))
+
+
+# ---------------------------------------------------------------------------
+# Session hooks
+# ---------------------------------------------------------------------------
+def _collect_search_changes(session: Session, _flush_context, _instances) -> None:
+    touched = session.info.setdefault(_SESSION_INFO_KEY, {"students": [], "deleted": set()})
+    for obj in session.new:
+        if isinstance(obj, Student):
+            obj.search_document = build_search_document(_student_values(obj))
+            touched["students"].append(obj)
+    for obj in session.dirty:
+        if not isinstance(obj, Student):
+            continue
+        attrs = inspect(obj).attrs
+        if any(attrs[f].history.has_changes() for f in SEARCHABLE_FIELDS):
+            obj.search_document = build_search_document(_student_values(obj))
+            touched["students"].append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Student) and obj.id is not None:
+            touched["deleted"].add(int(obj.id))
+
+
+def _apply_search_changes(session: Session, _flush_context) -> None:
+    touched = session.info.pop(_SESSION_INFO_KEY, None)
+    if not touched or not (touched["students"] or touched["deleted"]):
+        return
+    if search_backend() != "fts5":
+        return
+    rows = [(int(s.id), _student_values(s)) for s in touched["students"] if s.id is not None]
+    conn = session.connection()
+    savepoint = conn.begin_nested()
+    try:
+        _write_fts_rows(conn, rows, touched["deleted"])
+        savepoint.commit()
+    except Exception as exc:
+        savepoint.rollback()
+        if has_app_context():
+            current_app.logger.warning("Student search index update failed; run ops/rebuild_student_search.py: %s", exc)
+
+
+def register_student_search_hooks() -> None:
+    """Keep search documents (and the SQLite FTS table) current on ORM flushes (idempotent)."""
+    if not event.contains(Session, "before_flush", _collect_search_changes):
+        event.listen(Session, "before_flush", _collect_search_changes)
+        event.listen(Session, "after_flush_postexec", _apply_search_changes)
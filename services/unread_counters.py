@@ -0,0 +1,496 @@
+"""
+Unread badge counts kept in ``UnreadCounter`` rows, one per (user, scope), so a badge
+is a primary-key read instead of a ``COUNT`` over message / notification history.
+
+Scopes:
+
+- ``notifications``: the user's unread ``Notification`` rows.
+- ``dm:<partner user id>``: unread direct messages from that user (``is_read`` on the row;
+  a DM is a message without a group or with ``message_type == 'direct'``).
+- ``channel:<group id>``: channel messages from other people newer than the member's read
+  cursor (``MessageGroupMember.last_read_message_id``). Group message rows have no
+  per-reader state, so channels use a cursor that ``mark_channel_read`` moves forward.
+  Class channels are also visible without a member row (Directors / School
+  Administrators, the class teacher, enrolled students; see
+  ``communications.shared.get_user_channels``). Those readers have no cursor: posts
+  fan out to them too, opening the channel zeroes their counter, and the repair keeps
+  their counter as is.
+
+Session hooks apply the deltas of every ORM write in the same transaction: new, deleted
+and read / unread notifications and DMs, channel messages fanned out to the members in
+one ``INSERT .. SELECT`` upsert, and members joining (cursor starts at the newest message)
+or leaving (counter dropped). Query-level updates skip the hooks, so code that bulk-marks
+rows read resets the scope itself (``clear_unread``). ``rebuild_unread_counters``
+recomputes everything from source; the worker queues it daily as ``unread.rebuild`` and
+ops/rebuild_unread_counters.py runs it by hand.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, case, cast, event, func, literal, or_, select, union, update
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.types import DateTime, Integer, String
+
+from extensions import db
+from models import (
+    Class,
+    Enrollment,
+    Message,
+    MessageGroup,
+    MessageGroupMember,
+    Notification,
+    UnreadCounter,
+    User,
+)
+
+SCOPE_NOTIFICATIONS = "notifications"
+REBUILD_JOB_TYPE = "unread.rebuild"
+
+_SESSION_INFO_KEY = "_unread_counter_deltas"
+_counters = UnreadCounter.__table__
+_messages = Message.__table__
+_members = MessageGroupMember.__table__
+_notifications = Notification.__table__
+_groups = MessageGroup.__table__
+_classes = Class.__table__
+_enrollments = Enrollment.__table__
+_users = User.__table__
+_ADMIN_ROLES = ("Director", "School Administrator")
+
+
+def channel_scope(group_id: int) -> str:
+    return f"channel:{group_id}"
+
+
+def dm_scope(partner_id: int) -> str:
+    return f"dm:{partner_id}"
+
+
+def _class_viewer_selects(group_id: int) -> list:
+    """Users who see class channel ``group_id`` without a member row (same rules as get_user_channels)."""
+    channel = and_(
+        _groups.c.id == group_id,
+        _groups.c.group_type == "class",
+        _groups.c.is_active == True,  # noqa: E712
+    )
+    students = (
+        select(_users.c.id.label("user_id"))
+        .select_from(
+            _groups.join(_enrollments, _enrollments.c.class_id == _groups.c.class_id)
+            .join(_users, _users.c.student_id == _enrollments.c.student_id)
+        )
+        .where(channel, _enrollments.c.is_active == True, _users.c.role == "Student")  # noqa: E712
+    )
+    active_class = _groups.join(_classes, _classes.c.id == _groups.c.class_id)
+    teacher = (
+        select(_users.c.id.label("user_id"))
+        .select_from(active_class.join(_users, _users.c.teacher_staff_id == _classes.c.teacher_id))
+        .where(channel, _classes.c.is_active == True, _users.c.role.contains("Teacher"))  # noqa: E712
+    )
+    admins = (
+        select(_users.c.id.label("user_id"))
+        .select_from(active_class.join(_users, _users.c.role.in_(_ADMIN_ROLES)))
+        .where(channel, _classes.c.is_active == True)  # noqa: E712
+    )
+    return [students, teacher, admins]
+
+
+def _class_viewers(group_id: int):
+    return union(*_class_viewer_selects(group_id)).subquery()
+
+
+def _channel_audience(group_id: int):
+    """Members of ``group_id`` plus, for class channels, everyone who can open it."""
+    members = select(_members.c.user_id.label("user_id")).where(_members.c.group_id == group_id)
+    return union(members, *_class_viewer_selects(group_id)).subquery()
+
+
+def _member_row(conn, group_id: int, user_id: int):
+    return conn.execute(
+        select(_members.c.id, _members.c.last_read_message_id)
+        .where(_members.c.group_id == group_id, _members.c.user_id == user_id)
+        .order_by(_members.c.id)
+        .limit(1)
+    ).first()
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+def get_unread_count(user_id: int, scope: str) -> int:
+    """One badge (0 when the user has no counter for ``scope``)."""
+    value = db.session.execute(
+        select(_counters.c.count).where(_counters.c.user_id == user_id, _counters.c.scope == scope)
+    ).scalar()
+    return int(value or 0)
+
+
+def get_unread_counts(user_id: int, scopes: Iterable[str]) -> dict[str, int]:
+    """Badges for several scopes of one user in a single primary-key range read."""
+    scopes = list(dict.fromkeys(scopes))
+    counts = dict.fromkeys(scopes, 0)
+    if scopes:
+        counts.update(db.session.execute(
+            select(_counters.c.scope, _counters.c.count)
+            .where(_counters.c.user_id == user_id, _counters.c.scope.in_(scopes))
+        ).all())
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# Read cursors / explicit resets
+# ---------------------------------------------------------------------------
+def _set_count(conn, user_id: int, scope: str, count: int) -> None:
+    from services.attendance_writes import dialect_insert
+
+    now = datetime.utcnow()
+    stmt = dialect_insert()(_counters).values(user_id=user_id, scope=scope, count=count, updated_at=now)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=[_counters.c.user_id, _counters.c.scope],
+        set_={"count": count, "updated_at": now},
+    ))
+
+
+def clear_unread(user_id: int, scope: str) -> None:
+    """Zero a badge after the caller marked all of its rows read (in the caller's transaction)."""
+    _set_count(db.session.connection(), user_id, scope, 0)
+
+
+def drop_channel_counters(group_id: int) -> None:
+    """
+    Delete every counter for a channel. For callers that remove a group's messages and
+    members with query-level deletes, which skip the session hooks. Does not commit.
+    """
+    db.session.execute(_counters.delete().where(_counters.c.scope == channel_scope(group_id)))
+
+
+def _channel_unread_after(conn, group_id: int, user_id: int, cursor: Optional[int]) -> int:
+    return int(conn.execute(
+        select(func.count(_messages.c.id)).where(
+            _messages.c.group_id == group_id,
+            _messages.c.id > (cursor or 0),
+            _messages.c.sender_id != user_id,
+        )
+    ).scalar() or 0)
+
+
+def mark_channel_read(user_id: int, group_id: int, message_id: Optional[int] = None) -> bool:
+    """
+    Move the member's read cursor forward to ``message_id`` (default: the channel's newest
+    message) and recount the messages still after it. A class-channel viewer without a
+    member row has no cursor, so their counter is zeroed. False when ``user_id`` cannot see
+    the channel. Does not commit.
+    """
+    conn = db.session.connection()
+    member = _member_row(conn, group_id, user_id)
+    if member is None:
+        viewers = _class_viewers(group_id)
+        if conn.execute(select(viewers.c.user_id).where(viewers.c.user_id == user_id).limit(1)).first() is None:
+            return False
+        _set_count(conn, user_id, channel_scope(group_id), 0)
+        return True
+    if message_id is None:
+        message_id = conn.execute(
+            select(func.max(_messages.c.id)).where(_messages.c.group_id == group_id)
+        ).scalar()
+    cursor = max(member.last_read_message_id or 0, message_id or 0)
+    if cursor != (member.last_read_message_id or 0):
+        conn.execute(
+            update(_members)
+            .where(_members.c.group_id == group_id, _members.c.user_id == user_id)
+            .values(last_read_message_id=cursor)
+        )
+    _set_count(conn, user_id, channel_scope(group_id), _channel_unread_after(conn, group_id, user_id, cursor))
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Repair
+# ---------------------------------------------------------------------------
+def _is_dm():
+    return or_(_messages.c.group_id.is_(None), _messages.c.message_type == "direct")
+
+
+def _source_counts(user_ids: Optional[list[int]]) -> dict[tuple[int, str], int]:
+    counts: dict[tuple[int, str], int] = {}
+    note_q = (
+        select(_notifications.c.user_id, func.count(_notifications.c.id))
+        .where(_notifications.c.is_read == False)  # noqa: E712
+        .group_by(_notifications.c.user_id)
+    )
+    dm_q = (
+        select(_messages.c.recipient_id, _messages.c.sender_id, func.count(_messages.c.id))
+        .where(_is_dm(), _messages.c.is_read == False, _messages.c.sender_id != _messages.c.recipient_id)  # noqa: E712
+        .group_by(_messages.c.recipient_id, _messages.c.sender_id)
+    )
+    channel_q = (
+        select(_members.c.user_id, _members.c.group_id, func.count(func.distinct(_messages.c.id)))
+        .select_from(_members.join(_messages, _messages.c.group_id == _members.c.group_id))
+        .where(
+            _messages.c.id > func.coalesce(_members.c.last_read_message_id, 0),
+            _messages.c.sender_id != _members.c.user_id,
+        )
+        .group_by(_members.c.user_id, _members.c.group_id)
+    )
+    if user_ids is not None:
+        note_q = note_q.where(_notifications.c.user_id.in_(user_ids))
+        dm_q = dm_q.where(_messages.c.recipient_id.in_(user_ids))
+        channel_q = channel_q.where(_members.c.user_id.in_(user_ids))
+
+    for user_id, n in db.session.execute(note_q):
+        counts[(user_id, SCOPE_NOTIFICATIONS)] = int(n)
+    for user_id, partner_id, n in db.session.execute(dm_q):
+        counts[(user_id, dm_scope(partner_id))] = int(n)
+    for user_id, group_id, n in db.session.execute(channel_q):
+        counts[(user_id, channel_scope(group_id))] = int(n)
+    return counts
+
+
+def rebuild_unread_counters(user_ids: Optional[list[int]] = None) -> dict[str, int]:
+    """Recompute counters from notifications, DMs and channel cursors (all users or ``user_ids``)."""
+    counts = _source_counts(user_ids)
+    # Channel counters of viewers without a member row have no source to recompute from.
+    recomputable = or_(
+        ~_counters.c.scope.startswith("channel:"),
+        select(_members.c.id).where(
+            _members.c.user_id == _counters.c.user_id,
+            _counters.c.scope == literal("channel:") + cast(_members.c.group_id, String),
+        ).exists(),
+    )
+    existing = select(_counters.c.user_id, _counters.c.scope, _counters.c.count).where(recomputable)
+    delete = _counters.delete().where(recomputable)
+    if user_ids is not None:
+        existing = existing.where(_counters.c.user_id.in_(user_ids))
+        delete = delete.where(_counters.c.user_id.in_(user_ids))
+    previous = {(row.user_id, row.scope): row.count for row in db.session.execute(existing)}
+    db.session.execute(delete)
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "scope": scope, "count": n, "updated_at": now}
+        for (user_id, scope), n in counts.items() if n > 0
+    ]
+    if rows:
+        db.session.execute(_counters.insert(), rows)
+    db.session.commit()
+    corrected = sum(1 for key in set(previous) | set(counts) if previous.get(key, 0) != counts.get(key, 0))
+    return {"counters": len(rows), "corrected": corrected}
+
+
+def ensure_unread_counters() -> None:
+    """First boot with the counter table: build it once from existing history."""
+    if db.session.execute(select(_counters.c.user_id).limit(1)).first() is not None:
+        return
+    has_unread = db.session.execute(
+        select(_notifications.c.id).where(_notifications.c.is_read == False).limit(1)  # noqa: E712
+    ).first() or db.session.execute(
+        select(_messages.c.id).where(_is_dm(), _messages.c.is_read == False).limit(1)  # noqa: E712
+    ).first()
+    if has_unread is None:
+        return
+    current_app.logger.info("Unread counters are empty; rebuilding from notifications and messages")
+    rebuild_unread_counters()
+
+
+# ---------------------------------------------------------------------------
+# Session hooks
+# ---------------------------------------------------------------------------
+class _Deltas:
+    """Pending counter changes for one flush."""
+
+    def __init__(self):
+        self.direct: dict[tuple[int, str], int] = defaultdict(int)
+        self.channel_posts: dict[tuple[int, int], int] = defaultdict(int)  # (group, sender) -> new messages
+        self.channel_removals: list[tuple[int, int, int]] = []  # (group, sender, message id)
+        self.left: set[tuple[int, int]] = set()  # (user, group)
+        self.joined: list[MessageGroupMember] = []  # their users are caught up, not counted
+
+    def __bool__(self):
+        return bool(self.direct or self.channel_posts or self.channel_removals or self.left or self.joined)
+
+
+def _old(obj, name: str):
+    history = sa_inspect(obj).attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(obj, name)
+
+
+def _notification_key(user_id, is_read) -> Optional[tuple[int, str]]:
+    return (user_id, SCOPE_NOTIFICATIONS) if user_id is not None and not is_read else None
+
+
+def _dm_key(sender_id, recipient_id, group_id, message_type, is_read) -> Optional[tuple[int, str]]:
+    if is_read or recipient_id is None or sender_id is None or sender_id == recipient_id:
+        return None
+    if group_id is not None and message_type != "direct":
+        return None
+    return (recipient_id, dm_scope(sender_id))
+
+
+def _notification_state(obj: Notification, old: bool = False):
+    get = (lambda name: _old(obj, name)) if old else (lambda name: getattr(obj, name))
+    return _notification_key(get("user_id"), get("is_read"))
+
+
+def _dm_state(obj: Message, old: bool = False):
+    get = (lambda name: _old(obj, name)) if old else (lambda name: getattr(obj, name))
+    return _dm_key(get("sender_id"), get("recipient_id"), get("group_id"), get("message_type"), get("is_read"))
+
+
+def _collect_unread_deltas(session: Session, _flush_context, _instances) -> None:
+    deltas = session.info.get(_SESSION_INFO_KEY) or _Deltas()
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            key = _notification_state(obj)
+            if key:
+                deltas.direct[key] += 1
+        elif isinstance(obj, Message):
+            key = _dm_state(obj)
+            if key:
+                deltas.direct[key] += 1
+            elif obj.group_id is not None and obj.sender_id is not None:
+                deltas.channel_posts[(obj.group_id, obj.sender_id)] += 1
+        elif isinstance(obj, MessageGroupMember) and obj.last_read_message_id is None:
+            deltas.joined.append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Notification):
+            key = _notification_state(obj, old=True)
+            if key:
+                deltas.direct[key] -= 1
+        elif isinstance(obj, Message):
+            key = _dm_state(obj, old=True)
+            if key:
+                deltas.direct[key] -= 1
+            elif _old(obj, "group_id") is not None:
+                deltas.channel_removals.append((_old(obj, "group_id"), _old(obj, "sender_id"), obj.id))
+        elif isinstance(obj, MessageGroupMember):
+            deltas.left.add((_old(obj, "user_id"), _old(obj, "group_id")))
+    for obj in session.dirty:
+        if isinstance(obj, Notification):
+            before, after = _notification_state(obj, old=True), _notification_state(obj)
+        elif isinstance(obj, Message):
+            before, after = _dm_state(obj, old=True), _dm_state(obj)
+        else:
+            continue
+        if before != after:
+            if before:
+                deltas.direct[before] -= 1
+            if after:
+                deltas.direct[after] += 1
+    if deltas:
+        session.info[_SESSION_INFO_KEY] = deltas
+
+
+def _apply_unread_deltas(session: Session, _flush_context) -> None:
+    deltas = session.info.pop(_SESSION_INFO_KEY, None)
+    if not deltas:
+        return
+    from services.attendance_writes import dialect_insert
+
+    conn = session.connection()
+    savepoint = conn.begin_nested()
+    try:
+        now = datetime.utcnow()
+        insert = dialect_insert()
+        for member in deltas.joined:
+            # A new member has read everything posted before they joined.
+            conn.execute(
+                update(_members)
+                .where(_members.c.id == member.id, _members.c.last_read_message_id.is_(None))
+                .values(last_read_message_id=select(func.max(_messages.c.id))
+                        .where(_messages.c.group_id == member.group_id).scalar_subquery())
+            )
+        for user_id, group_id in deltas.left:
+            conn.execute(_counters.delete().where(
+                _counters.c.user_id == user_id, _counters.c.scope == channel_scope(group_id)
+            ))
+        for (group_id, sender_id), n in deltas.channel_posts.items():
+            audience = _channel_audience(group_id)
+            fan_out = (
+                select(
+                    audience.c.user_id,
+                    literal(channel_scope(group_id), String),
+                    literal(n, Integer),
+                    literal(now, DateTime),
+                )
+                .where(audience.c.user_id != sender_id)
+            )
+            just_joined = [m.user_id for m in deltas.joined if m.group_id == group_id]
+            if just_joined:
+                fan_out = fan_out.where(audience.c.user_id.notin_(just_joined))
+            stmt = insert(_counters).from_select(["user_id", "scope", "count", "updated_at"], fan_out)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[_counters.c.user_id, _counters.c.scope],
+                set_={"count": _counters.c.count + n, "updated_at": now},
+            ))
+        for group_id, sender_id, message_id in deltas.channel_removals:
+            behind = select(_members.c.user_id).where(
+                _members.c.group_id == group_id,
+                _members.c.user_id != sender_id,
+                func.coalesce(_members.c.last_read_message_id, 0) < message_id,
+            )
+            cursorless = _class_viewers(group_id)
+            readers = union(
+                behind,
+                select(cursorless.c.user_id).where(
+                    cursorless.c.user_id != sender_id,
+                    cursorless.c.user_id.notin_(
+                        select(_members.c.user_id).where(_members.c.group_id == group_id)
+                    ),
+                ),
+            )
+            conn.execute(
+                update(_counters)
+                .where(
+                    _counters.c.scope == channel_scope(group_id),
+                    _counters.c.user_id.in_(readers),
+                    _counters.c.count > 0,
+                )
+                .values(count=_counters.c.count - 1, updated_at=now)
+            )
+        for (user_id, scope), delta in deltas.direct.items():
+            if not delta:
+                continue
+            stmt = insert(_counters).values(user_id=user_id, scope=scope, count=max(delta, 0), updated_at=now)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[_counters.c.user_id, _counters.c.scope],
+                set_={
+                    "count": case((_counters.c.count + delta < 0, 0), else_=_counters.c.count + delta),
+                    "updated_at": now,
+                },
+            ))
+        savepoint.commit()
+    except Exception as exc:
+        savepoint.rollback()
+        if has_app_context():
+            current_app.logger.warning("Unread counter update failed; the daily repair will fix it: %s", exc)
+
+
+def _keep_old_value(_target, value, _oldvalue, _initiator):
+    return value
+
+
+# Attributes whose previous value the deltas need. ``active_history`` loads it before an
+# expired attribute (e.g. after a commit) is overwritten; otherwise history has no old value.
+_TRACKED_ATTRIBUTES = (
+    Notification.user_id,
+    Notification.is_read,
+    Message.sender_id,
+    Message.recipient_id,
+    Message.group_id,
+    Message.message_type,
+    Message.is_read,
+)
+
+
+def register_unread_counter_hooks() -> None:
+    """Keep UnreadCounter rows in step with ORM writes (idempotent)."""
+    if not event.contains(Session, "before_flush", _collect_unread_deltas):
+        for attr in _TRACKED_ATTRIBUTES:
+            event.listen(attr, "set", _keep_old_value, active_history=True, retval=True)
+        event.listen(Session, "before_flush", _collect_unread_deltas)
+        event.listen(Session, "after_flush_postexec", _apply_unread_deltas)
@@ -7,6 +7,7 @@ from flask_login import login_required, current_user
 from decorators import teacher_required
 from .utils import get_teacher_or_admin, is_admin, is_authorized_for_class
 from models import db, Class, Attendance, Enrollment, Student, TeacherStaff
+from services.attendance_writes import save_class_attendance
 from datetime import datetime, timedelta, date
 import csv
 import io
@@ -97,34 +98,23 @@ def take_attendance(class_id):
         try:
             attendance_date = datetime.strptime(date_str, '%Y-%m-%d').date()
             
-            # Process attendance for each student
+            # Collect attendance for each student, then write the roster in one batch
+            entries = []
             for student in students:
                 raw_status = request.form.get(f'status_{student.id}')
                 status = normalize_attendance_status(raw_status)
                 if not status or status not in VALID_ATTENDANCE_STATUSES:
                     continue
                 notes = (request.form.get(f'notes_{student.id}') or '').strip() or None
+                entries.append({'student_id': student.id, 'status': status, 'notes': notes})
 
-                existing_attendance = Attendance.query.filter_by(
-                    class_id=class_id,
-                    student_id=student.id,
-                    date=attendance_date
-                ).first()
-
-                if existing_attendance:
-                    existing_attendance.status = status
-                    existing_attendance.notes = notes
-                else:
-                    new_attendance = Attendance(
-                        class_id=class_id,
-                        student_id=student.id,
-                        date=attendance_date,
-                        status=status,
-                        notes=notes,
-                        teacher_id=current_user.teacher_staff_id
-                    )
-                    db.session.add(new_attendance)
-            
+            save_class_attendance(
+                class_id,
+                attendance_date,
+                entries,
+                teacher_id=current_user.teacher_staff_id,
+                update_teacher=False,
+            )
             db.session.commit()
             flash('Attendance recorded successfully!', 'success')
             return redirect(url_for('teacher.attendance.take_attendance', class_id=class_id, date=date_str))
@@ -300,25 +290,13 @@ def mark_all_present(class_id):
         enrollments = Enrollment.query.filter_by(class_id=class_id, is_active=True).all()
         students = [enrollment.student for enrollment in enrollments if enrollment.student is not None]
         
-        for student in students:
-            existing_attendance = Attendance.query.filter_by(
-                class_id=class_id,
-                student_id=student.id,
-                date=attendance_date
-            ).first()
-            
-            if existing_attendance:
-                existing_attendance.status = 'Present'
-            else:
-                new_attendance = Attendance(
-                    class_id=class_id,
-                    student_id=student.id,
-                    date=attendance_date,
-                    status='Present',
-                    teacher_id=current_user.teacher_staff_id
-                )
-                db.session.add(new_attendance)
-        
+        save_class_attendance(
+            class_id,
+            attendance_date,
+            [{'student_id': student.id, 'status': 'Present'} for student in students],
+            teacher_id=current_user.teacher_staff_id,
+            update_teacher=False,
+        )
         db.session.commit()
         flash('All students marked as present!', 'success')
         return redirect(url_for('teacher.attendance.take_attendance', class_id=class_id, date=date_str))
@@ -2199,12 +2199,10 @@ def student_grades_report(student_id):
 @teacher_required
 def student_grades_report_pdf(student_id):
     """Generate PDF of student grades report."""
-    from weasyprint import HTML
-    from io import BytesIO
     from flask import make_response
+    from services.report_card_pdf import PdfRenderPending, pdf_pending_response, render_pdf_bytes
     from models import GroupAssignment, GroupGrade, AcademicPeriod
     from utils.quarter_grade_calculator import get_quarter_grades_for_report
-    import os
     
     student = Student.query.get_or_404(student_id)
     teacher = get_teacher_or_admin()
@@ -2269,18 +2267,12 @@ def student_grades_report_pdf(student_id):
                                   school_year=school_year,
                                   generated_date=datetime.utcnow())
     
-    # Inject CSS
-    css_path = os.path.join(current_app.root_path, 'static', 'report_card_styles.css')
+    # Generate PDF in the shared render pool (keeps WeasyPrint off the request thread);
+    # report_card_styles.css is applied there from its pre-parsed copy.
     try:
-        with open(css_path, 'r', encoding='utf-8') as f:
-            css_content = f.read()
-        html_content = html_content.replace('</head>', f'<style>{css_content}</style></head>')
-    except Exception as e:
-        current_app.logger.warning(f"Could not load CSS file: {e}")
-    
-    # Generate PDF
-    html_doc = HTML(string=html_content)
-    pdf_bytes = html_doc.write_pdf()
+        pdf_bytes = render_pdf_bytes(html_content)
+    except PdfRenderPending:
+        return pdf_pending_response()
     
     # Create response
     response = make_response(pdf_bytes)
@@ -2386,10 +2378,8 @@ def student_attendance_report(student_id):
 @teacher_required
 def student_attendance_report_pdf(student_id):
     """Generate PDF of student attendance report."""
-    from weasyprint import HTML
-    from io import BytesIO
     from flask import make_response
-    import os
+    from services.report_card_pdf import PdfRenderPending, pdf_pending_response, render_pdf_bytes
     
     student = Student.query.get_or_404(student_id)
     teacher = get_teacher_or_admin()
@@ -2468,18 +2458,12 @@ def student_attendance_report_pdf(student_id):
                                   attendance_rate=attendance_rate,
                                   generated_date=datetime.utcnow())
     
-    # Inject CSS
-    css_path = os.path.join(current_app.root_path, 'static', 'report_card_styles.css')
+    # Generate PDF in the shared render pool (keeps WeasyPrint off the request thread);
+    # report_card_styles.css is applied there from its pre-parsed copy.
     try:
-        with open(css_path, 'r', encoding='utf-8') as f:
-            css_content = f.read()
-        html_content = html_content.replace('</head>', f'<style>{css_content}</style></head>')
-    except Exception as e:
-        current_app.logger.warning(f"Could not load CSS file: {e}")
-    
-    # Generate PDF
-    html_doc = HTML(string=html_content)
-    pdf_bytes = html_doc.write_pdf()
+        pdf_bytes = render_pdf_bytes(html_content)
+    except PdfRenderPending:
+        return pdf_pending_response()
     
     # Create response
     response = make_response(pdf_bytes)
@@ -7,7 +7,7 @@ import json
 from datetime import datetime, timedelta
 
 # Core Flask imports
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session, Response, current_app
+from flask import Blueprint, render_template, request, flash, redirect, url_for, session, Response, current_app, stream_with_context
 from flask_login import login_required, current_user, login_user, logout_user
 
 # Database and model imports
@@ -68,27 +68,11 @@ def audit_logs():
     page = request.args.get('page', type=int) or 1
     per_page = min(200, max(20, request.args.get('per_page', type=int) or 50))
 
-    qry = AdminAuditLog.query
-    if start:
-        qry = qry.filter(AdminAuditLog.created_at >= start)
-    if end:
-        qry = qry.filter(AdminAuditLog.created_at < (end + timedelta(days=1)))
-    if method:
-        qry = qry.filter(AdminAuditLog.method == method)
-    if status.isdigit():
-        qry = qry.filter(AdminAuditLog.status_code == int(status))
-    if user_id.isdigit():
-        qry = qry.filter(AdminAuditLog.user_id == int(user_id))
-    if q:
-        like = f"%{q}%"
-        qry = qry.filter(
-            or_(
-                AdminAuditLog.path.ilike(like),
-                AdminAuditLog.endpoint.ilike(like),
-                AdminAuditLog.user_role.ilike(like),
-                AdminAuditLog.ip_address.ilike(like),
-            )
-        )
+    from services.audit_log_export import audit_log_criteria
+
+    qry = AdminAuditLog.query.filter(*audit_log_criteria(
+        q=q, method=method, status=status, user_id=user_id, start=start, end=end,
+    ))
 
     qry = qry.order_by(AdminAuditLog.created_at.desc())
     pagination = qry.paginate(page=page, per_page=per_page, error_out=False)
@@ -116,70 +100,39 @@ def audit_logs():
 @login_required
 @tech_required
 def export_audit_logs_csv():
-    """Export filtered audit logs to CSV (Tech-only)."""
-    q = (request.args.get('q') or '').strip()
-    method = (request.args.get('method') or '').strip().upper()
-    status = request.args.get('status', '').strip()
-    user_id = request.args.get('user_id', '').strip()
-    start = _parse_dt_ymd(request.args.get('start'))
-    end = _parse_dt_ymd(request.args.get('end'))
-
-    qry = AdminAuditLog.query
-    if start:
-        qry = qry.filter(AdminAuditLog.created_at >= start)
-    if end:
-        qry = qry.filter(AdminAuditLog.created_at < (end + timedelta(days=1)))
-    if method:
-        qry = qry.filter(AdminAuditLog.method == method)
-    if status.isdigit():
-        qry = qry.filter(AdminAuditLog.status_code == int(status))
-    if user_id.isdigit():
-        qry = qry.filter(AdminAuditLog.user_id == int(user_id))
-    if q:
-        like = f"%{q}%"
-        qry = qry.filter(
-            or_(
-                AdminAuditLog.path.ilike(like),
-                AdminAuditLog.endpoint.ilike(like),
-                AdminAuditLog.user_role.ilike(like),
-                AdminAuditLog.ip_address.ilike(like),
-            )
+    """
+    Stream filtered audit logs as CSV with no row cap (Tech-only): hot rows newest
+    first, then archived months. ``gzip=1`` sends a compressed ``.csv.gz`` built on the fly.
+    """
+    from services.audit_log_export import gzip_stream, iter_audit_log_csv
+
+    filters = dict(
+        q=(request.args.get('q') or '').strip(),
+        method=(request.args.get('method') or '').strip(),
+        status=request.args.get('status', '').strip(),
+        user_id=request.args.get('user_id', '').strip(),
+        role=(request.args.get('role') or '').strip(),
+        endpoint=(request.args.get('endpoint') or '').strip(),
+        start=_parse_dt_ymd(request.args.get('start')),
+        end=_parse_dt_ymd(request.args.get('end')),
+    )
+    chunks = iter_audit_log_csv(filters)
+    if request.args.get('gzip') == '1':
+        return Response(
+            stream_with_context(gzip_stream(chunks)),
+            mimetype='application/gzip',
+            headers={
+                'Content-Disposition': 'attachment; filename=admin_audit_logs.csv.gz',
+                'X-Accel-Buffering': 'no',
+            },
         )
-
-    qry = qry.order_by(AdminAuditLog.created_at.desc()).limit(20000)
-    rows = qry.all()
-
-    buf = io.StringIO()
-    writer = csv.writer(buf)
-    writer.writerow([
-        'created_at', 'user_id', 'user_role', 'teacher_staff_id',
-        'method', 'status_code', 'duration_ms', 'endpoint', 'path',
-        'ip_address', 'user_agent',
-        'query_params', 'form_data', 'json_data',
-    ])
-    for r in rows:
-        writer.writerow([
-            r.created_at.isoformat() if r.created_at else '',
-            r.user_id or '',
-            r.user_role or '',
-            r.teacher_staff_id or '',
-            r.method or '',
-            r.status_code or '',
-            r.duration_ms or '',
-            r.endpoint or '',
-            r.path or '',
-            r.ip_address or '',
-            r.user_agent or '',
-            r.query_params or '',
-            r.form_data or '',
-            r.json_data or '',
-        ])
-
-    out = buf.getvalue().encode('utf-8')
     return Response(
-        out,
+        stream_with_context(chunks),
         mimetype='text/csv',
-        headers={'Content-Disposition': 'attachment; filename=admin_audit_logs.csv'},
+        headers={
+            'Content-Disposition': 'attachment; filename=admin_audit_logs.csv',
+            'X-Accel-Buffering': 'no',
+        },
     )
 
 @tech_blueprint.route('/dashboard')
@@ -6,6 +6,7 @@ import os
 import shutil
 import sys
 from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 from typing import Any
 
 from flask import current_app, request, session
@@ -16,6 +17,7 @@ from sqlalchemy.orm import joinedload
 from models import (
     ActivityLog,
     AdminAuditLog,
+    BackgroundJob,
     BugReport,
     MaintenanceMode,
     Student,
@@ -370,89 +372,137 @@ def build_audit_logs_payload(
     method: str = "",
     status: str = "",
     user_id: int | None = None,
+    role: str = "",
+    endpoint: str = "",
     start: str = "",
     end: str = "",
     page: int = 1,
     per_page: int = 50,
+    archive_month: str = "",
 ) -> dict[str, Any]:
-    query = AdminAuditLog.query
-    if q:
-        like = f"%{q}%"
-        query = query.filter(
-            db.or_(
-                AdminAuditLog.path.ilike(like),
-                AdminAuditLog.endpoint.ilike(like),
-                AdminAuditLog.user_role.ilike(like),
-            )
-        )
-    if method:
-        query = query.filter(AdminAuditLog.method == method.upper())
-    if status:
-        try:
-            query = query.filter(AdminAuditLog.status_code == int(status))
-        except ValueError:
-            pass
-    if user_id:
-        query = query.filter(AdminAuditLog.user_id == user_id)
-    if start:
-        try:
-            query = query.filter(AdminAuditLog.created_at >= datetime.strptime(start, "%Y-%m-%d"))
-        except ValueError:
-            pass
-    if end:
-        try:
-            query = query.filter(
-                AdminAuditLog.created_at < datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)
-            )
-        except ValueError:
-            pass
+    from services.log_retention import archived_months
 
     per_page = max(20, min(int(per_page or 50), 200))
     page = max(1, int(page or 1))
-    pagination = query.order_by(AdminAuditLog.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    if archive_month:
+        logs, total = _archived_audit_logs_page(
+            archive_month, q=q, method=method, status=status, user_id=user_id,
+            role=role, endpoint=endpoint, start=start, end=end, page=page, per_page=per_page,
+        )
+        pagination = {
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "pages": max(1, -(-total // per_page)),
+        }
+    else:
+        logs, pagination = _hot_audit_logs_page(
+            q=q, method=method, status=status, user_id=user_id,
+            role=role, endpoint=endpoint, start=start, end=end, page=page, per_page=per_page,
+        )
     user_options = [
         {"id": u.id, "label": f"{u.username} ({u.role})"}
         for u in User.query.order_by(User.username).limit(500).all()
     ]
     return {
-        "logs": [
-            {
-                "id": row.id,
-                "created_at": _iso(row.created_at),
-                "created_display": _fmt(row.created_at),
-                "user_id": row.user_id,
-                "user_role": row.user_role,
-                "method": row.method,
-                "status_code": row.status_code,
-                "duration_ms": row.duration_ms,
-                "endpoint": row.endpoint,
-                "path": row.path,
-                "ip_address": row.ip_address,
-            }
-            for row in pagination.items
-        ],
-        "pagination": {
-            "page": pagination.page,
-            "per_page": pagination.per_page,
-            "total": pagination.total,
-            "pages": pagination.pages,
-        },
+        "logs": logs,
+        "pagination": pagination,
         "user_options": user_options,
+        "archive_months": archived_months("admin_audit_log"),
         "filters": {
             "q": q or "",
             "method": method or "",
             "status": status or "",
             "user_id": user_id,
+            "role": role or "",
+            "endpoint": endpoint or "",
             "start": start or "",
             "end": end or "",
             "page": page,
             "per_page": per_page,
+            "archive_month": archive_month or "",
         },
     }
 
 
+def _audit_log_row(row) -> dict[str, Any]:
+    return {
+        "id": row.id,
+        "created_at": _iso(row.created_at),
+        "created_display": _fmt(row.created_at),
+        "user_id": row.user_id,
+        "user_role": row.user_role,
+        "method": row.method,
+        "status_code": row.status_code,
+        "duration_ms": row.duration_ms,
+        "endpoint": row.endpoint,
+        "path": row.path,
+        "ip_address": row.ip_address,
+    }
+
+
+def _audit_day(value: str) -> datetime | None:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d") if value else None
+    except ValueError:
+        return None
+
+
+def _archived_audit_logs_page(
+    month: str, *, q, method, status, user_id, role, endpoint, start, end, page: int, per_page: int,
+) -> tuple[list[dict[str, Any]], int]:
+    """
+    One page (newest first) of an archived month with the audit filters applied.
+
+    Segments are stored oldest first, so the month is streamed twice: once to count the
+    matches, then again keeping only the rows that fall in the requested page.
+    """
+    from services.audit_log_export import audit_row_matches
+    from services.log_retention import iter_archived_rows
+
+    filters = dict(
+        q=q, method=method, status=str(status or ""), user_id=str(user_id or ""),
+        role=role, endpoint=endpoint, start=_audit_day(start), end=_audit_day(end),
+    )
+
+    def _matches():
+        return (row for row in iter_archived_rows("admin_audit_log", month) if audit_row_matches(row, **filters))
+
+    total = sum(1 for _ in _matches())
+    # Newest-first positions [offset, offset + per_page) are these oldest-first positions.
+    last = total - (page - 1) * per_page
+    first = max(0, last - per_page)
+    window = []
+    if last > 0:
+        for i, row in enumerate(_matches()):
+            if i >= last:
+                break
+            if i >= first:
+                window.append(row)
+    window.reverse()
+    return [_audit_log_row(SimpleNamespace(**row)) for row in window], total
+
+
+def _hot_audit_logs_page(
+    *, q, method, status, user_id, role, endpoint, start, end, page: int, per_page: int,
+) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    from services.audit_log_export import audit_log_criteria
+
+    query = AdminAuditLog.query.filter(*audit_log_criteria(
+        q=q, method=method, status=str(status or ""), user_id=str(user_id or ""),
+        role=role, endpoint=endpoint, start=_audit_day(start), end=_audit_day(end),
+    ))
+    pagination = query.order_by(AdminAuditLog.created_at.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+    return [_audit_log_row(row) for row in pagination.items], {
+        "page": pagination.page,
+        "per_page": pagination.per_page,
+        "total": pagination.total,
+        "pages": pagination.pages,
+    }
+
+
 def build_error_reports_payload(
     *,
     type_filter: str = "All",
@@ -541,11 +591,60 @@ def build_error_reports_payload(
 # --- System ------------------------------------------------------------------
 
 
+def build_background_jobs_payload(
+    *, state: str = "", job_type: str = "", limit: int = 100
+) -> dict[str, Any]:
+    from services.background_jobs import JOB_HANDLERS, JOB_STATES, job_counts_by_state, serialize_job
+
+    q = BackgroundJob.query
+    if state in JOB_STATES:
+        q = q.filter(BackgroundJob.state == state)
+    if job_type:
+        q = q.filter(BackgroundJob.job_type == job_type)
+    limit = max(1, min(int(limit or 100), 500))
+    jobs = (
+        q.options(joinedload(BackgroundJob.created_by))
+        .order_by(BackgroundJob.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return {
+        "jobs": [serialize_job(j) for j in jobs],
+        "counts": job_counts_by_state(),
+        "states": list(JOB_STATES),
+        "job_types": sorted(JOB_HANDLERS),
+        "embedded_worker": bool(current_app.config.get("BACKGROUND_JOBS_EMBEDDED_WORKER")),
+    }
+
+
+def retry_background_job(job_id: int) -> tuple[dict[str, Any] | None, str | None, int]:
+    from services.background_jobs import retry_job, serialize_job
+
+    try:
+        job = retry_job(job_id)
+    except ValueError as exc:
+        db.session.rollback()
+        return None, str(exc), 400
+    return {"success": True, "message": f"Job {job.id} re-queued.", "job": serialize_job(job)}, None, 200
+
+
+def cancel_background_job(job_id: int) -> tuple[dict[str, Any] | None, str | None, int]:
+    from services.background_jobs import cancel_job, serialize_job
+
+    try:
+        job = cancel_job(job_id)
+    except ValueError as exc:
+        db.session.rollback()
+        return None, str(exc), 400
+    return {"success": True, "message": f"Job {job.id} cancelled.", "job": serialize_job(job)}, None, 200
+
+
 def build_system_payload() -> dict[str, Any]:
     import flask
     import psutil
 
     now = datetime.now()
+    from services.google_rate_limit import rate_limit_metrics
     from utils.maintenance_mode import get_active_maintenance
 
     maintenance = get_active_maintenance()
@@ -660,6 +759,7 @@ def build_system_payload() -> dict[str, Any]:
             "now_sample": school_tz_now,
         },
         "maintenance": _maintenance_payload(maintenance),
+        "google_api": rate_limit_metrics(),
         "theme_choices": [
             "default",
             "light",
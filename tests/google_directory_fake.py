@@ -0,0 +1,267 @@
+"""
+In-memory stand-in for the Google Directory client (``admin`` / ``directory_v1``).
+
+Covers the calls services/google_directory_diff.py makes. Used by the tests and by
+scripts/sync_all_to_google.py's DIRECTORY_FAKE_SNAPSHOT offline dry run.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from googleapiclient.errors import HttpError
+
+from services.google_directory_service import _normalize_org_unit_path
+
+
+class _FakeRequest:
+    def __init__(self, fn: Callable[[], Any]):
+        self._fn = fn
+
+    def execute(self) -> Any:
+        return self._fn()
+
+
+class _FakeBatch:
+    def __init__(self, fake: "FakeDirectoryService", callback: Callable[[str, Any, Optional[Exception]], None]):
+        self._fake = fake
+        self._callback = callback
+        self._parts: List[tuple] = []
+
+    def add(self, request: _FakeRequest, request_id: str) -> None:
+        self._parts.append((request_id, request))
+
+    def execute(self) -> None:
+        self._fake.calls.append(("batch", {"size": len(self._parts)}))
+        for request_id, request in self._parts:
+            try:
+                self._callback(request_id, request.execute(), None)
+            except HttpError as exc:
+                self._callback(request_id, None, exc)
+
+
+def _fake_http_error(status: int, message: str) -> HttpError:
+    import httplib2
+
+    return HttpError(httplib2.Response({"status": status}), message.encode("utf-8"))
+
+
+class FakeDirectoryService:
+    """
+    Directory state loaded from ``DirectorySnapshot.as_dict()`` output; every request is
+    recorded in ``calls`` as ``(resource.method, kwargs)``.
+    """
+
+    def __init__(self) -> None:
+        self.users_by_email: Dict[str, Dict[str, Any]] = {}
+        self.org_units: Set[str] = set()
+        self.group_members: Dict[str, Dict[str, str]] = {}
+        self.calls: List[tuple] = []
+
+    @classmethod
+    def from_snapshot_dict(cls, data: Dict[str, Any]) -> "FakeDirectoryService":
+        fake = cls()
+        for u in data.get("users") or []:
+            email = (u.get("primaryEmail") or "").strip()
+            if email:
+                fake.users_by_email[email.lower()] = {
+                    "primaryEmail": email,
+                    "orgUnitPath": _normalize_org_unit_path(u.get("orgUnitPath") or "/"),
+                    "suspended": bool(u.get("suspended", False)),
+                    "isAdmin": bool(u.get("isAdmin", False)),
+                }
+        fake.org_units = {_normalize_org_unit_path(p) for p in data.get("org_units") or []}
+        for g, members in (data.get("groups") or {}).items():
+            fake.group_members[g.lower()] = {
+                (m.get("email") or "").strip().lower(): (m.get("role") or "MEMBER").upper()
+                for m in members or []
+                if m.get("email")
+            }
+        return fake
+
+    @classmethod
+    def from_json_file(cls, path: str) -> "FakeDirectoryService":
+        with open(path, "r", encoding="utf-8") as fh:
+            return cls.from_snapshot_dict(json.load(fh))
+
+    def mutation_calls(self) -> List[tuple]:
+        return [c for c in self.calls if not c[0].endswith((".list", ".get")) and c[0] != "batch"]
+
+    def http_round_trips(self) -> int:
+        """Requests that would have gone over the wire (batched parts count once per batch)."""
+        batched = sum(c[1]["size"] for c in self.calls if c[0] == "batch")
+        return len(self.calls) - batched
+
+    def new_batch_http_request(self, callback: Callable[[str, Any, Optional[Exception]], None]):
+        return _FakeBatch(self, callback)
+
+    def _record(self, name: str, kwargs: Dict[str, Any], fn: Callable[[], Any]) -> _FakeRequest:
+        self.calls.append((name, dict(kwargs)))
+        return _FakeRequest(fn)
+
+    @staticmethod
+    def _page(items: List[Any], kwargs: Dict[str, Any], key: str, default_size: int) -> Dict[str, Any]:
+        start = int(kwargs.get("pageToken") or 0)
+        size = int(kwargs.get("maxResults") or default_size)
+        out: Dict[str, Any] = {key: items[start : start + size]}
+        if start + size < len(items):
+            out["nextPageToken"] = str(start + size)
+        return out
+
+    # -- resources ---------------------------------------------------------
+
+    def users(self) -> "FakeDirectoryService._Users":
+        return FakeDirectoryService._Users(self)
+
+    def orgunits(self) -> "FakeDirectoryService._OrgUnits":
+        return FakeDirectoryService._OrgUnits(self)
+
+    def groups(self) -> "FakeDirectoryService._Groups":
+        return FakeDirectoryService._Groups(self)
+
+    def members(self) -> "FakeDirectoryService._Members":
+        return FakeDirectoryService._Members(self)
+
+    class _Users:
+        def __init__(self, fake: "FakeDirectoryService"):
+            self.fake = fake
+
+        def list(self, **kwargs):
+            def run():
+                items = [dict(u) for _, u in sorted(self.fake.users_by_email.items())]
+                return self.fake._page(items, kwargs, "users", 100)
+
+            return self.fake._record("users.list", kwargs, run)
+
+        def get(self, userKey: str, **kwargs):
+            def run():
+                u = self.fake.users_by_email.get(userKey.lower())
+                if u is None:
+                    raise _fake_http_error(404, "Resource Not Found: userKey")
+                return dict(u)
+
+            return self.fake._record("users.get", {"userKey": userKey, **kwargs}, run)
+
+        def insert(self, body: Dict[str, Any], **kwargs):
+            def run():
+                email = body["primaryEmail"]
+                if email.lower() in self.fake.users_by_email:
+                    raise _fake_http_error(409, "Entity already exists.")
+                ou = _normalize_org_unit_path(body.get("orgUnitPath") or "/")
+                if ou != "/" and ou not in self.fake.org_units:
+                    raise _fake_http_error(400, "Invalid Input: orgUnitPath")
+                self.fake.users_by_email[email.lower()] = {
+                    "primaryEmail": email,
+                    "orgUnitPath": ou,
+                    "suspended": bool(body.get("suspended", False)),
+                    "isAdmin": False,
+                }
+                return dict(self.fake.users_by_email[email.lower()])
+
+            return self.fake._record("users.insert", {"body": {k: v for k, v in body.items() if k != "password"}}, run)
+
+        def update(self, userKey: str, body: Dict[str, Any], **kwargs):
+            def run():
+                u = self.fake.users_by_email.get(userKey.lower())
+                if u is None:
+                    raise _fake_http_error(404, "Resource Not Found: userKey")
+                if u.get("isAdmin"):
+                    raise _fake_http_error(403, "Not Authorized to access this resource/api")
+                if "orgUnitPath" in body:
+                    ou = _normalize_org_unit_path(body["orgUnitPath"])
+                    if ou != "/" and ou not in self.fake.org_units:
+                        raise _fake_http_error(400, "Invalid Input: orgUnitPath")
+                    u["orgUnitPath"] = ou
+                if "suspended" in body:
+                    u["suspended"] = bool(body["suspended"])
+                return dict(u)
+
+            return self.fake._record("users.update", {"userKey": userKey, "body": dict(body)}, run)
+
+    class _OrgUnits:
+        def __init__(self, fake: "FakeDirectoryService"):
+            self.fake = fake
+
+        def list(self, **kwargs):
+            def run():
+                return {"organizationUnits": [{"orgUnitPath": p} for p in sorted(self.fake.org_units)]}
+
+            return self.fake._record("orgunits.list", kwargs, run)
+
+        def insert(self, customerId: str, body: Dict[str, Any]):
+            def run():
+                parent = _normalize_org_unit_path(body.get("parentOrgUnitPath") or "/")
+                if parent != "/" and parent not in self.fake.org_units:
+                    raise _fake_http_error(400, "Invalid Input: parentOrgUnitPath")
+                path = _normalize_org_unit_path(f"{parent}/{body['name']}")
+                if path in self.fake.org_units:
+                    raise _fake_http_error(400, "Invalid Ou Id")
+                self.fake.org_units.add(path)
+                return {"orgUnitPath": path, "name": body["name"]}
+
+            return self.fake._record("orgunits.insert", {"body": dict(body)}, run)
+
+    class _Groups:
+        def __init__(self, fake: "FakeDirectoryService"):
+            self.fake = fake
+
+        def insert(self, body: Dict[str, Any]):
+            def run():
+                key = body["email"].lower()
+                if key in self.fake.group_members:
+                    raise _fake_http_error(409, "Entity already exists.")
+                self.fake.group_members[key] = {}
+                return dict(body)
+
+            return self.fake._record("groups.insert", {"body": dict(body)}, run)
+
+    class _Members:
+        def __init__(self, fake: "FakeDirectoryService"):
+            self.fake = fake
+
+        def _group(self, groupKey: str) -> Dict[str, str]:
+            members = self.fake.group_members.get(groupKey.lower())
+            if members is None:
+                raise _fake_http_error(404, "Resource Not Found: groupKey")
+            return members
+
+        def list(self, groupKey: str, **kwargs):
+            def run():
+                items = [{"email": e, "role": r} for e, r in sorted(self._group(groupKey).items())]
+                return self.fake._page(items, kwargs, "members", 200)
+
+            return self.fake._record("members.list", {"groupKey": groupKey, **kwargs}, run)
+
+        def insert(self, groupKey: str, body: Dict[str, Any]):
+            def run():
+                members = self._group(groupKey)
+                key = body["email"].lower()
+                if key in members:
+                    raise _fake_http_error(409, "Member already exists.")
+                members[key] = (body.get("role") or "MEMBER").upper()
+                return dict(body)
+
+            return self.fake._record("members.insert", {"groupKey": groupKey, "body": dict(body)}, run)
+
+        def update(self, groupKey: str, memberKey: str, body: Dict[str, Any]):
+            def run():
+                members = self._group(groupKey)
+                if memberKey.lower() not in members:
+                    raise _fake_http_error(404, "Resource Not Found: memberKey")
+                members[memberKey.lower()] = (body.get("role") or "MEMBER").upper()
+                return {"email": memberKey, "role": members[memberKey.lower()]}
+
+            return self.fake._record(
+                "members.update", {"groupKey": groupKey, "memberKey": memberKey, "body": dict(body)}, run
+            )
+
+        def delete(self, groupKey: str, memberKey: str):
+            def run():
+                members = self._group(groupKey)
+                if memberKey.lower() not in members:
+                    raise _fake_http_error(404, "Resource Not Found: memberKey")
+                members.pop(memberKey.lower())
+                return ""
+
+            return self.fake._record("members.delete", {"groupKey": groupKey, "memberKey": memberKey}, run)
@@ -0,0 +1,226 @@
+"""
+Plan decisions of services/google_directory_diff.py against fixture Directory listings.
+
+Run from the repo root: ``python -m pytest tests/test_google_directory_diff.py``.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from services import google_directory_diff  # noqa: E402
+from services.google_directory_diff import (  # noqa: E402
+    HIGH_SCHOOL_GROUP_EMAIL,
+    MIDDLE_SCHOOL_GROUP_EMAIL,
+    STUDENT_ASSEMBLY_GROUP_EMAIL,
+    STUDENT_MANAGED_GROUP_EMAILS,
+    TEACHERS_GROUP_EMAIL,
+    DesiredAccount,
+    apply_directory_plan,
+    plan_directory_changes,
+    take_directory_snapshot,
+)
+from services.google_directory_service import _WORKSPACE_DOMAIN  # noqa: E402
+from tests.google_directory_fake import FakeDirectoryService  # noqa: E402
+
+STUDENT_OU = "/Students/Middle School/Grade 7"
+
+
+def _email(local: str) -> str:
+    return f"{local}@{_WORKSPACE_DOMAIN}"
+
+
+def _fixture_listing() -> dict:
+    """A small Directory as ``DirectorySnapshot.as_dict()`` would save it."""
+    return {
+        "users": [
+            {"primaryEmail": _email("ada.student"), "orgUnitPath": STUDENT_OU, "suspended": False},
+            {"primaryEmail": _email("ben.student"), "orgUnitPath": "/Students/Middle School/Grade 6",
+             "suspended": False},
+            {"primaryEmail": _email("cal.leaver"), "orgUnitPath": STUDENT_OU, "suspended": False},
+            {"primaryEmail": _email("dee.parked"), "orgUnitPath": STUDENT_OU, "suspended": True},
+            {"primaryEmail": _email("it.admin"), "orgUnitPath": "/", "suspended": False, "isAdmin": True},
+            {"primaryEmail": _email("tess.teacher"), "orgUnitPath": "/Staff/Teachers", "suspended": False},
+        ],
+        "org_units": [
+            "/Staff",
+            "/Staff/Teachers",
+            "/Students",
+            "/Students/Middle School",
+            "/Students/Middle School/Grade 6",
+            "/Students/Middle School/Grade 7",
+        ],
+        "groups": {
+            MIDDLE_SCHOOL_GROUP_EMAIL.lower(): [
+                {"email": _email("ada.student"), "role": "MEMBER"},
+                {"email": _email("cal.leaver"), "role": "MEMBER"},
+            ],
+            STUDENT_ASSEMBLY_GROUP_EMAIL.lower(): [
+                {"email": _email("ada.student"), "role": "MEMBER"},
+                {"email": _email("cal.leaver"), "role": "MEMBER"},
+            ],
+            TEACHERS_GROUP_EMAIL.lower(): [{"email": _email("tess.teacher"), "role": "MEMBER"}],
+        },
+    }
+
+
+def _student(local: str, ou: str = STUDENT_OU, *, active: bool = True, **overrides) -> DesiredAccount:
+    account = DesiredAccount(
+        email=_email(local),
+        kind="student",
+        target_ou=ou,
+        suspended=not active,
+        create_if_missing=active,
+        license_removal=not active,
+    )
+    if active:
+        account.groups = {MIDDLE_SCHOOL_GROUP_EMAIL.lower(), STUDENT_ASSEMBLY_GROUP_EMAIL.lower()}
+        account.managed_groups = {g.lower() for g in STUDENT_MANAGED_GROUP_EMAILS}
+    for name, value in overrides.items():
+        setattr(account, name, value)
+    return account
+
+
+def _teacher(local: str) -> DesiredAccount:
+    return DesiredAccount(
+        email=_email(local),
+        kind="staff",
+        target_ou="/Staff/Teachers",
+        suspended=False,
+        create_if_missing=True,
+        groups={TEACHERS_GROUP_EMAIL.lower()},
+    )
+
+
+@pytest.fixture
+def fake() -> FakeDirectoryService:
+    return FakeDirectoryService.from_snapshot_dict(_fixture_listing())
+
+
+@pytest.fixture
+def snapshot(fake):
+    return take_directory_snapshot(fake)
+
+
+def _ops(plan, op: str) -> dict:
+    return {a.target.lower(): a for a in plan.actions if a.op == op}
+
+
+def test_snapshot_pages_through_listings(fake, monkeypatch):
+    monkeypatch.setattr(google_directory_diff, "USERS_LIST_PAGE_SIZE", 2)
+    monkeypatch.setattr(google_directory_diff, "MEMBERS_LIST_PAGE_SIZE", 1)
+    snap = take_directory_snapshot(fake)
+    assert set(snap.users) == {u["primaryEmail"].lower() for u in _fixture_listing()["users"]}
+    assert STUDENT_OU in snap.org_units
+    assert snap.group_members[TEACHERS_GROUP_EMAIL.lower()] == {_email("tess.teacher"): "MEMBER"}
+    # Managed groups missing from the listing come back as None, not as empty groups.
+    missing = set(snap.group_members) - set(_fixture_listing()["groups"])
+    assert missing and all(snap.group_members[g] is None for g in missing)
+    assert sum(1 for name, _kwargs in fake.calls if name == "users.list") == 3
+    assert not fake.mutation_calls()
+
+
+def test_in_sync_accounts_plan_nothing(snapshot):
+    plan = plan_directory_changes(snapshot, [_student("ada.student"), _teacher("tess.teacher")])
+    assert plan.actions == []
+
+
+def test_missing_account_is_created_with_parent_ous_first(snapshot):
+    new_ou = "/Students/High School/Grade 9"
+    plan = plan_directory_changes(snapshot, [_student("eve.new", new_ou, groups=set(), managed_groups=set())])
+    assert [a.op for a in plan.actions] == ["create_ou", "create_ou", "create_user"]
+    assert [a.target for a in plan.actions[:2]] == ["/Students/High School", new_ou]
+    assert plan.actions[2].detail["orgUnitPath"] == new_ou
+
+
+def test_departed_account_is_not_created(snapshot):
+    plan = plan_directory_changes(snapshot, [_student("gone.student", active=False)])
+    assert plan.actions == []
+
+
+def test_moved_account_is_updated_not_recreated(snapshot):
+    plan = plan_directory_changes(snapshot, [_student("ben.student")])
+    update = _ops(plan, "update_user")[_email("ben.student")]
+    assert update.detail == {"orgUnitPath": STUDENT_OU, "current_ou": "/Students/Middle School/Grade 6"}
+    assert not _ops(plan, "create_user")
+    added = {a.detail["group"] for a in plan.actions if a.op == "add_member"}
+    assert added == {MIDDLE_SCHOOL_GROUP_EMAIL.lower(), STUDENT_ASSEMBLY_GROUP_EMAIL.lower()}
+
+
+def test_departing_account_is_suspended_and_keeps_its_groups(snapshot):
+    plan = plan_directory_changes(snapshot, [_student("cal.leaver", active=False)])
+    assert _ops(plan, "update_user")[_email("cal.leaver")].detail == {"suspended": True}
+    assert _ops(plan, "queue_license_removal")
+    assert not _ops(plan, "remove_member") and not _ops(plan, "add_member")
+
+
+def test_level_change_swaps_school_groups(snapshot):
+    high = _student(
+        "ada.student",
+        "/Students/Middle School/Grade 7",
+        groups={HIGH_SCHOOL_GROUP_EMAIL.lower(), STUDENT_ASSEMBLY_GROUP_EMAIL.lower()},
+    )
+    plan = plan_directory_changes(snapshot, [high], create_missing_groups=True)
+    assert [(a.op, a.detail.get("group")) for a in plan.actions if a.op != "create_group"] == [
+        ("add_member", HIGH_SCHOOL_GROUP_EMAIL.lower()),
+        ("remove_member", MIDDLE_SCHOOL_GROUP_EMAIL.lower()),
+    ]
+
+
+def test_already_suspended_and_offboarded_account_plans_nothing(snapshot):
+    plan = plan_directory_changes(
+        snapshot, [_student("dee.parked", active=False)], offboarded_emails=[_email("dee.parked")]
+    )
+    assert plan.actions == []
+
+
+def test_returning_account_is_unsuspended(snapshot):
+    plan = plan_directory_changes(snapshot, [_student("dee.parked")])
+    assert _ops(plan, "update_user")[_email("dee.parked")].detail == {"suspended": False}
+    assert not _ops(plan, "queue_license_removal")
+
+
+def test_admin_accounts_are_never_touched(snapshot):
+    plan = plan_directory_changes(snapshot, [_student("it.admin", active=False)])
+    assert plan.actions == []
+    assert plan.protected == [_email("it.admin")]
+
+
+def test_missing_group_needs_opt_in(snapshot):
+    account = _student("ada.student", groups={"robotics@" + _WORKSPACE_DOMAIN}, managed_groups=set())
+    plan = plan_directory_changes(snapshot, [account])
+    assert plan.actions == [] and plan.notes
+    plan = plan_directory_changes(snapshot, [account], create_missing_groups=True)
+    assert [a.op for a in plan.actions] == ["create_group", "add_member"]
+
+
+def test_applied_plan_converges(fake, snapshot):
+    desired = [
+        _student("ben.student"),
+        _student("cal.leaver", active=False),
+        _student("eve.new", "/Students/High School/Grade 9", groups=set(), managed_groups=set()),
+        _teacher("tess.teacher"),
+    ]
+    plan = plan_directory_changes(snapshot, desired)
+    queued = []
+    stats = apply_directory_plan(
+        fake,
+        plan,
+        password_factory=lambda: "not-a-real-password",
+        workers=1,
+        queue_license_removal=queued.append,
+        echo=None,
+    )
+    assert stats["errors"] == 0
+    assert [a.target for a in queued] == [_email("cal.leaver")]
+    replan = plan_directory_changes(
+        take_directory_snapshot(fake), desired, offboarded_emails=[_email("cal.leaver")]
+    )
+    assert replan.actions == []
@@ -95,6 +95,7 @@ def student_grade3_plus_modal_payload(
     google_initial_password: str,
     google_user_created: Optional[bool] = None,
     google_warning: Optional[str] = None,
+    google_sync_queued: bool = False,
 ) -> Dict[str, Any]:
     fields: List[Dict[str, Any]] = [
         {"label": "Student", "value": f"{first_name} {last_name}".strip()},
@@ -117,6 +118,13 @@ def student_grade3_plus_modal_payload(
     alerts: List[Dict[str, str]] = []
     if google_warning:
         alerts.append({"type": "warning", "text": google_warning})
+    elif google_sync_queued and school_email:
+        alerts.append(
+            {
+                "type": "info",
+                "text": "The Google account is being created in the background and usually appears within a minute.",
+            }
+        )
     elif google_user_created is False and school_email:
         alerts.append(
             {
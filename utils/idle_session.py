@@ -38,6 +38,11 @@ _EXEMPT_ENDPOINTS = {
     "spa_api.spa_health",
 }
 
+# Checked for expiry but not counted as activity (an open push stream is not the user).
+_PASSIVE_ENDPOINTS = {
+    "spa_api.live_events_stream",
+}
+
 
 def idle_timeout_minutes() -> int:
     """Minutes of inactivity before forced logout (env / config, min 5)."""
@@ -123,7 +128,8 @@ def enforce_idle_session() -> Any:
             flash("You were signed out after a period of inactivity. Please sign in again.", "info")
             return redirect(url_for("auth.login", idle=1))
 
-    mark_session_activity()
+    if request.endpoint not in _PASSIVE_ENDPOINTS:
+        mark_session_activity()
     return None
 
 
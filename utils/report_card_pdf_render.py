@@ -0,0 +1,155 @@
+"""
+WeasyPrint entry points that run inside the PDF render pool.
+
+Kept free of Flask and model imports so spawned pool processes start quickly and
+never open database connections; everything they need arrives as arguments.
+
+Shared report card stylesheets are parsed into ``weasyprint.CSS`` once per process
+(re-parsed only when the file changes) and passed as ``stylesheets=[...]``; a template's
+own ``<link>`` to them is dropped so it is not fetched and parsed again. WeasyPrint
+applies these at user origin, below the templates' own ``<style>`` blocks (which every
+template already places after the link). Fonts are discovered through one shared
+``FontConfiguration`` and decoded images (school logo) stay in a per-process image
+cache, so each render skips CSS parsing, font discovery and image decoding.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import tempfile
+from io import BytesIO
+from typing import Sequence
+
+_font_config = None
+# path -> ((mtime_ns, size), weasyprint.CSS)
+_stylesheets: dict = {}
+# WeasyPrint image cache (url -> decoded image), shared across renders.
+_image_cache: dict = {}
+
+_WARMUP_HTML = "<html><body><p>Clara Science Academy</p></body></html>"
+
+
+def font_configuration():
+    """Process-wide ``FontConfiguration`` (fontconfig discovery runs once)."""
+    global _font_config
+    if _font_config is None:
+        from weasyprint.text.fonts import FontConfiguration
+
+        _font_config = FontConfiguration()
+    return _font_config
+
+
+def parsed_stylesheet(path: str):
+    """``weasyprint.CSS`` for ``path``, parsed once and kept until the file's mtime/size changes."""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _stylesheets.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    from weasyprint import CSS
+
+    css = CSS(filename=path, font_config=font_configuration())
+    _stylesheets[path] = (stamp, css)
+    return css
+
+
+def parsed_stylesheets(paths: Sequence[str]) -> list:
+    """Parsed copies of the shared stylesheets; a missing file is skipped (renders unstyled)."""
+    sheets = []
+    for path in paths or ():
+        try:
+            sheets.append(parsed_stylesheet(path))
+        except OSError:
+            pass
+    return sheets
+
+
+def stylesheet_fingerprint(paths: Sequence[str]) -> str:
+    """Cheap version stamp for a stylesheet set (part of PDF cache keys)."""
+    parts = []
+    for path in paths or ():
+        try:
+            st = os.stat(path)
+            parts.append(f"{os.path.basename(path)}:{st.st_mtime_ns}:{st.st_size}")
+        except OSError:
+            parts.append(f"{os.path.basename(path)}:missing")
+    return ";".join(parts)
+
+
+def unlink_stylesheets(html_content: str, paths: Sequence[str]) -> str:
+    """Drop ``<link>`` tags (after ``localize_static_urls``) to stylesheets passed pre-parsed."""
+    for path in paths or ():
+        uri = re.escape(_file_uri(path))
+        html_content = re.sub(rf'<link\b[^>]*href="{uri}(?:\?[^"]*)?"[^>]*>', "", html_content)
+    return html_content
+
+
+def render_html_to_pdf_bytes(
+    html_content: str,
+    base_url: str | None = None,
+    stylesheet_paths: Sequence[str] = (),
+) -> bytes:
+    """Render an HTML document (plus shared stylesheets) to PDF bytes."""
+    from weasyprint import HTML
+
+    buffer = BytesIO()
+    html_content = unlink_stylesheets(html_content, stylesheet_paths)
+    HTML(string=html_content, base_url=base_url).write_pdf(
+        buffer,
+        stylesheets=parsed_stylesheets(stylesheet_paths),
+        font_config=font_configuration(),
+        cache=_image_cache,
+    )
+    return buffer.getvalue()
+
+
+def render_html_to_pdf_file(
+    html_content: str,
+    base_url: str | None,
+    out_path: str,
+    stylesheet_paths: Sequence[str] = (),
+) -> str:
+    """
+    Render an HTML document straight into ``out_path``.
+
+    Writes to a sibling temp file and renames it into place, so concurrent readers
+    either see the finished PDF or no file at all.
+    """
+    pdf_bytes = render_html_to_pdf_bytes(html_content, base_url, stylesheet_paths)
+    out_dir = os.path.dirname(out_path) or "."
+    os.makedirs(out_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix=".pdf.tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(pdf_bytes)
+        os.replace(tmp_path, out_path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return out_path
+
+
+def warm_pdf_renderer(stylesheet_paths: Sequence[str] = (), image_paths: Sequence[str] = ()) -> None:
+    """
+    Pool initializer: parse stylesheets, load fonts and decode static images up front
+    so the first real render in this process is not the slow one.
+    """
+    try:
+        images = "".join(
+            f'<img src="{_file_uri(p)}" style="width:1px">' for p in image_paths or () if os.path.isfile(p)
+        )
+        html = _WARMUP_HTML.replace("</body>", f"{images}</body>")
+        render_html_to_pdf_bytes(html, None, stylesheet_paths)
+    except Exception:
+        # Warm-up is best effort; real renders surface their own errors.
+        pass
+
+
+def _file_uri(path: str) -> str:
+    from pathlib import Path
+
+    return Path(path).resolve().as_uri()
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from collections import Counter
+from collections import Counter, defaultdict
 from typing import Any
 
 from extensions import db
@@ -136,6 +136,10 @@ def _grade_from_year_enrollments(student_id: int, school_year_id: int) -> int |
         )
         .all()
     )
+    return _grade_from_classes(classes)
+
+
+def _grade_from_classes(classes: list[Class]) -> int | None:
     hard_votes: list[int] = []
     soft_votes: list[int] = []
     for class_obj in classes:
@@ -311,6 +315,49 @@ def grade_level_for_school_year(student: Student, school_year: SchoolYear) -> in
     return derived
 
 
+def grade_levels_for_school_year(students: list[Student], school_year: SchoolYear) -> dict[int, int | None]:
+    """
+    ``grade_level_for_school_year`` for many students, read-only.
+
+    Same priority, but the year's classes and ``StudentSchoolYear`` rows are loaded in
+    one query each, and no row is upserted or healed, so bulk reads (exports) stay
+    read-only.
+    """
+    if not students or school_year is None:
+        return {}
+    if bool(getattr(school_year, "is_active", False)):
+        return {
+            s.id: int(s.grade_level) if s.grade_level is not None else None for s in students
+        }
+
+    ids = [s.id for s in students]
+    classes: dict[int, list[Class]] = defaultdict(list)
+    for student_id, class_obj in (
+        db.session.query(Enrollment.student_id, Class)
+        .join(Class, Class.id == Enrollment.class_id)
+        .filter(Enrollment.student_id.in_(ids), Class.school_year_id == school_year.id)
+        .all()
+    ):
+        classes[student_id].append(class_obj)
+    records = {
+        r.student_id: int(r.grade_level)
+        for r in StudentSchoolYear.query.filter(
+            StudentSchoolYear.student_id.in_(ids),
+            StudentSchoolYear.school_year_id == school_year.id,
+        )
+    }
+
+    grades: dict[int, int | None] = {}
+    for s in students:
+        grade = _grade_from_classes(classes.get(s.id, []))
+        if grade is None:
+            grade = records.get(s.id)
+        if grade is None:
+            grade = _derive_grade_level_for_school_year(s, school_year)
+        grades[s.id] = grade
+    return grades
+
+
 def enrollment_must_be_active_for_report_card(
     student: Student,
     school_year: SchoolYear | None,
@@ -175,6 +175,25 @@ def _gpa_from_grades(grades: list) -> float | None:
     return float(calculate_student_gpa(grades))
 
 
+def queue_active_year_gpa_sync() -> bool:
+    """
+    Queue ``sync_active_year_gpas`` as a background job, at most once per throttle window.
+
+    List views call this instead of syncing inline, so a page load never waits on the
+    full-roster GPA recompute. Returns True when a job was queued.
+    """
+    global _last_sync_at
+
+    now = time.time()
+    if (now - _last_sync_at) < _SYNC_TTL_SEC:
+        return False
+    _last_sync_at = now
+    from services.background_jobs import enqueue_job
+
+    enqueue_job("students.sync_gpas", idempotency_key="students.sync_gpas", commit=True)
+    return True
+
+
 def sync_active_year_gpas(*, commit: bool = True, force: bool = False) -> dict:
     """
     Rewrite Student.gpa for roster display.